@@ -5,11 +5,20 @@ pytest configuration and fixtures
 import pytest
 import sys
 import os
-from unittest.mock import Mock, MagicMock
+import threading
+import time
+import collections
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, MagicMock, patch
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.utils import ExtractorError
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+
 @pytest.fixture
 def qt_app():
     """Create QApplication instance for tests"""
@@ -20,6 +29,50 @@ def qt_app():
     yield app
     # Don't quit app as other tests might need it
 
+
+@pytest.fixture(autouse=True)
+def isolated_queue_journal(tmp_path, monkeypatch):
+    """Give every MainWindow a fresh queue journal, download archive, sync record and info cache instead of the user's"""
+    monkeypatch.setattr('src.queue_store.default_journal_path', lambda: str(tmp_path / 'queue.db'))
+    monkeypatch.setattr('src.main_window.default_archive_path', lambda: str(tmp_path / 'archive.txt'))
+    monkeypatch.setattr('src.main_window.default_sync_path', lambda: str(tmp_path / 'sync.db'))
+    monkeypatch.setattr('src.main_window.default_info_cache_path', lambda: str(tmp_path / 'info_cache.db'))
+
+
+@pytest.fixture(autouse=True)
+def cleanup_download_managers(monkeypatch):
+    """Stop the pools of every DownloadManager a test creates, so none of its threads outlive the test"""
+    from src.download_manager import DownloadManager
+    managers = []
+    init = DownloadManager.__init__
+    
+    def recording_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        managers.append(self)
+        
+    monkeypatch.setattr(DownloadManager, '__init__', recording_init)
+    yield
+    for manager in managers:
+        manager.cleanup()
+
+
+@pytest.fixture
+def process_events_until(qt_app):
+    """Return a helper that spins the Qt event loop until a condition holds"""
+    import time
+    
+    def wait(condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            qt_app.processEvents()
+            time.sleep(0.001)
+        return True
+        
+    return wait
+
+
 @pytest.fixture
 def mock_yt_dlp():
     """Mock yt-dlp module for testing"""
@@ -27,6 +80,7 @@ def mock_yt_dlp():
     mock.YoutubeDL = MagicMock()
     return mock
 
+
 @pytest.fixture
 def sample_video_info():
     """Sample video info data for testing"""
@@ -48,6 +102,7 @@ def sample_video_info():
         ]
     }
 
+
 @pytest.fixture
 def sample_progress_data():
     """Sample progress data for testing"""
@@ -58,4 +113,189 @@ def sample_progress_data():
         'speed': 512000,
         'eta': 18,
         'percent': 10.0
-    }
\ No newline at end of file
+    }
+
+
+class _MediaRequestHandler(BaseHTTPRequestHandler):
+    """Serves /media/<size> as <size> bytes of dummy media data,
+    /status/<code> as an empty response with that HTTP status and
+    /hls/<count>/<size>.m3u8 as an HLS playlist of <count> media fragments.
+    
+    Honours "Range: bytes=<start>-" and records every Range header it sees
+    in range_requests. Media requests wait fragment_delay seconds first, to
+    stand in for CDN latency. connections counts the TCP connections
+    accepted.
+    """
+    range_requests = []
+    fragment_delay = 0.0
+    connections = 0
+    
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+        
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path.startswith('/status/'):
+            self.send_error(int(path.rsplit('/', 1)[-1]))
+            return
+            
+        if path.startswith('/hls/'):
+            count, size = path[len('/hls/'):-len('.m3u8')].split('/')
+            playlist = '#EXTM3U\n#EXT-X-TARGETDURATION:2\n#EXT-X-MEDIA-SEQUENCE:0\n'
+            playlist += ''.join(f'#EXTINF:2.0,\n/media/{size}?fragment={i}\n' for i in range(int(count)))
+            body = (playlist + '#EXT-X-ENDLIST\n').encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+            
+        try:
+            size = int(path.rstrip('/').rsplit('/', 1)[-1])
+        except ValueError:
+            self.send_error(404)
+            return
+            
+        if self.fragment_delay and 'fragment=' in self.path:
+            time.sleep(self.fragment_delay)
+            
+        start = 0
+        requested_range = self.headers.get('Range')
+        if requested_range:
+            self.range_requests.append(requested_range)
+            start = int(requested_range.split('=', 1)[1].split('-', 1)[0])
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{size - 1}/{size}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(size - start))
+        self.end_headers()
+        try:
+            self.wfile.write(b'\0' * (size - start))
+        except OSError:
+            # Client stopped reading (paused or cancelled download)
+            pass
+        
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_media_server():
+    """Local HTTP server for download tests, yields its base URL"""
+    _MediaRequestHandler.range_requests = []
+    _MediaRequestHandler.fragment_delay = 0.0
+    _MediaRequestHandler.connections = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _MediaRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class _KeepAliveMediaRequestHandler(_MediaRequestHandler):
+    """_MediaRequestHandler that keeps connections open between requests, as CDNs do"""
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+
+@pytest.fixture
+def keepalive_media_server():
+    """local_media_server with HTTP/1.1 keep-alive, yields its base URL and its handler class"""
+    _KeepAliveMediaRequestHandler.range_requests = []
+    _KeepAliveMediaRequestHandler.fragment_delay = 0.0
+    _KeepAliveMediaRequestHandler.connections = 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _KeepAliveMediaRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", _KeepAliveMediaRequestHandler
+    server.shutdown()
+    server.server_close()
+
+
+class CountingIE(InfoExtractor):
+    """Stand-in extractor that counts how often each video is extracted; ids in broken fail.
+    
+    Ids starting with "heavy" first parse a large JSON page heavy_rounds
+    times, like extractors that decode big player responses.
+    """
+    _VALID_URL = r'https?://counting\.invalid/(?P<id>\w+)'
+    media_url = None
+    calls = collections.Counter()
+    broken = set()
+    heavy_rounds = 3
+    _heavy_page = None
+    
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        self.calls[video_id] += 1
+        if video_id in self.broken:
+            raise ExtractorError('This video is unavailable', expected=True)
+        if video_id.startswith('heavy'):
+            if CountingIE._heavy_page is None:
+                CountingIE._heavy_page = json.dumps([{'id': n, 'title': f'Entry {n}', 'formats': list(range(20))}
+                                                     for n in range(20000)])
+            for _ in range(self.heavy_rounds):
+                json.loads(CountingIE._heavy_page)
+        info = {
+            'id': video_id,
+            'title': f'Video {video_id}',
+            'uploader': 'Counting Channel',
+            'url': self.media_url,
+            'ext': 'mp4',
+        }
+        if self.media_url.endswith('.m3u8'):
+            info['protocol'] = 'm3u8_native'
+        return info
+
+
+class CountingPlaylistIE(InfoExtractor):
+    """Stand-in channel of <count> CountingIE videos, newest (highest number) first.
+    
+    Entries are fetched in pages of page_size, each one request to the
+    media server, and yielded one at a time. yielded counts the entries
+    handed out so far.
+    """
+    _VALID_URL = r'https?://counting\.invalid/playlist/(?P<id>[a-z]+)(?P<count>\d+)'
+    page_size = 5
+    yielded = 0
+    
+    def _entries(self, playlist_id, count):
+        for position, n in enumerate(range(count - 1, -1, -1)):
+            if position % self.page_size == 0:
+                self._request_webpage(f'{CountingIE.media_url}?page={position // self.page_size}',
+                                      playlist_id, note=False)
+            CountingPlaylistIE.yielded += 1
+            yield self.url_result(f'https://counting.invalid/{playlist_id}{n}', CountingIE,
+                                  video_id=f'{playlist_id}{n}', video_title=f'Entry {n}')
+            
+    def _real_extract(self, url):
+        playlist_id, count = self._match_valid_url(url).group('id', 'count')
+        CountingPlaylistIE.yielded = 0
+        return self.playlist_result(self._entries(playlist_id, int(count)), playlist_id, f'Playlist {playlist_id}')
+
+
+class StandInYoutubeDL(yt_dlp.YoutubeDL):
+    """YoutubeDL that only knows about CountingIE and CountingPlaylistIE"""
+    instances = 0
+    
+    def __init__(self, params=None, auto_init=True):
+        super().__init__(params, auto_init=False)
+        self.add_info_extractor(CountingPlaylistIE())
+        self.add_info_extractor(CountingIE())
+        StandInYoutubeDL.instances += 1
+
+
+@pytest.fixture
+def counting_extractor(local_media_server):
+    """Route yt-dlp through CountingIE, yields per-video extraction counts"""
+    CountingIE.media_url = f"{local_media_server}/media/4096"
+    CountingIE.calls.clear()
+    CountingIE.broken.clear()
+    StandInYoutubeDL.instances = 0
+    with patch('yt_dlp.YoutubeDL', StandInYoutubeDL):
+        yield CountingIE.calls
@@ -1,15 +1,54 @@
 #!/usr/bin/env python3
 """
 YT Leechr - A Feature-Rich, Cross-Platform GUI for yt-dlp
+
+Run with --headless to download without the GUI; see src/headless.py.
+--control-port PORT serves the local control API (src/control_api.py),
+with the token from YT_LEECHR_CONTROL_TOKEN if that is set.
 """
 
+import multiprocessing
 import sys
 import os
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import Qt
-from src.main_window import MainWindow
+
+
+def control_port(argv):
+    """The port --control-port asks for, or None; raises ValueError if it is not a valid port"""
+    if '--control-port' not in argv[1:]:
+        return None
+    index = argv.index('--control-port')
+    if index + 1 >= len(argv):
+        raise ValueError("--control-port needs a port number")
+    value = argv[index + 1]
+    if not value.isdigit() or not 0 <= int(value) <= 65535:
+        raise ValueError(f"invalid port {value!r}")
+    return int(value)
+
+
+def start_control_server(window, argv):
+    """Serve the control API if argv asks for it; a bad or busy port is reported and the GUI runs without it"""
+    from PyQt6.QtWidgets import QMessageBox
+    try:
+        port = control_port(argv)
+        if port is not None:
+            window.start_control_server(port, os.environ.get('YT_LEECHR_CONTROL_TOKEN', ''))
+    except (ValueError, OSError) as e:
+        message = f"Control API not started: {e}"
+        print(message, file=sys.stderr)
+        QMessageBox.warning(window, "Control API", message)
+
 
 def main():
+    # Frozen builds start worker processes (src/process_pool.py) through this executable
+    multiprocessing.freeze_support()
+    if sys.argv[1:2] == ['--headless']:
+        # Imported here so headless runs never load QtWidgets
+        from src.headless import main as headless_main
+        sys.exit(headless_main(sys.argv[2:]))
+    
+    from PyQt6.QtWidgets import QApplication
+    from src.main_window import MainWindow
+    
     app = QApplication(sys.argv)
     app.setApplicationName("YT Leechr")
     app.setApplicationVersion("1.0.0")
@@ -20,8 +59,10 @@ def main():
     
     window = MainWindow()
     window.show()
+    start_control_server(window, sys.argv)
     
     sys.exit(app.exec())
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,107 @@
+"""
+Process-wide bandwidth limit shared by all downloads
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional
+
+# Smallest burst, so short reads never stall behind a tiny limit
+MIN_BURST = 64 * 1024
+
+# Longest single wait, so aborted callers notice within this many seconds
+_MAX_WAIT = 0.25
+
+
+class TokenBucket:
+    """Token bucket in bytes that every download thread draws from.
+
+    consume() blocks until the bytes are covered, so the combined rate of
+    all callers stays at or below rate however many downloads run. Waiting
+    callers are served in weighted fair order (start-time fair queueing):
+    a consumer with weight 2 gets twice the share of one with weight 1.
+    A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate: float = 0, burst: Optional[float] = None):
+        self._cond = threading.Condition()
+        self._rate = 0.0
+        self._burst = float(MIN_BURST)
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._virtual_time = 0.0
+        self._finish_tags: Dict[Hashable, float] = {}
+        self._waiting = []
+        self._seq = itertools.count()
+        self.set_rate(rate, burst)
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float, burst: Optional[float] = None):
+        """Change the limit in bytes/s; applies to transfers already running"""
+        with self._cond:
+            self._refill()
+            was_unlimited = not self._rate
+            self._rate = max(0.0, float(rate))
+            # Default to a quarter second of traffic
+            self._burst = float(burst) if burst else max(self._rate / 4, MIN_BURST)
+            # A newly enabled limit starts with a full bucket
+            self._tokens = self._burst if was_unlimited else min(self._tokens, self._burst)
+            self._cond.notify_all()
+
+    def consume(self, nbytes: int, consumer: Hashable = None, weight: float = 1.0,
+                abort: Optional[Callable[[], bool]] = None) -> bool:
+        """Wait until nbytes may pass. Returns False if abort() became true first.
+
+        A single call larger than the burst is let through once the bucket
+        is full and leaves it in debt, which later callers wait out.
+        """
+        if nbytes <= 0:
+            return True
+        with self._cond:
+            if not self._rate:
+                return True
+            start = max(self._virtual_time, self._finish_tags.get(consumer, 0.0))
+            tag = start + nbytes / max(weight, 0.01)
+            ticket = (tag, next(self._seq))
+            self._finish_tags[consumer] = tag
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if abort is not None and abort():
+                        return False
+                    if not self._rate:
+                        return True
+                    self._refill()
+                    needed = min(nbytes, self._burst)
+                    if self._waiting[0] == ticket and self._tokens >= needed:
+                        self._tokens -= nbytes
+                        self._virtual_time = tag
+                        return True
+                    if self._waiting[0] == ticket:
+                        timeout = (needed - self._tokens) / self._rate
+                    else:
+                        timeout = None
+                    self._cond.wait(_MAX_WAIT if timeout is None else min(timeout, _MAX_WAIT))
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._forget_idle_consumers()
+                self._cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self._rate:
+            self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def _forget_idle_consumers(self):
+        # A consumer whose last tag is behind virtual time starts from
+        # virtual time again anyway, so its tag carries no information
+        if len(self._finish_tags) > 256:
+            self._finish_tags = {consumer: tag for consumer, tag in self._finish_tags.items()
+                                 if tag > self._virtual_time}
@@ -0,0 +1,92 @@
+"""
+Adaptive download concurrency driven by measured throughput
+"""
+
+import time
+from typing import Callable
+
+
+class ConcurrencyTuner:
+    """AIMD controller for the number of simultaneous downloads.
+
+    evaluate() is called once per measurement window with the current slot
+    count. While the queue has more work than slots, one slot is added per
+    window as long as that keeps raising aggregate throughput by min_gain.
+    A slot that buys nothing (the link is saturated) is taken back and
+    probing pauses for hold_windows. An error rate above max_error_rate
+    halves the slot count.
+    """
+
+    def __init__(self, min_slots: int = 1, max_slots: int = 10, min_gain: float = 0.1,
+                 max_error_rate: float = 0.2, hold_windows: int = 6,
+                 clock: Callable[[], float] = time.monotonic):
+        self.min_gain = min_gain
+        self.max_error_rate = max_error_rate
+        self.hold_windows = hold_windows
+        self.clock = clock
+        self.min_slots = 1
+        self.max_slots = 1
+        self.set_bounds(min_slots, max_slots)
+        self.throughput = 0.0
+        self.reset()
+
+    def set_bounds(self, min_slots: int, max_slots: int):
+        self.min_slots = max(1, int(min_slots))
+        self.max_slots = max(self.min_slots, int(max_slots))
+
+    def clamp(self, slots: int) -> int:
+        return max(self.min_slots, min(int(slots), self.max_slots))
+
+    def reset(self):
+        """Start measuring afresh, e.g. when auto mode is switched on"""
+        self._window_start = self.clock()
+        self._bytes = 0
+        self._completed = 0
+        self._errors = 0
+        self._probing = False
+        self._baseline = 0.0
+        self._hold = 0
+
+    def record_bytes(self, nbytes: int):
+        self._bytes += nbytes
+
+    def record_outcome(self, error: bool):
+        if error:
+            self._errors += 1
+        else:
+            self._completed += 1
+
+    def evaluate(self, current: int, demand: bool) -> int:
+        """Close the current window and return the slot count for the next one.
+
+        demand says whether queued items are waiting for a slot; without it
+        an extra slot could not be used, so none is added.
+        """
+        now = self.clock()
+        elapsed = now - self._window_start
+        throughput = self._bytes / elapsed if elapsed > 0 else 0.0
+        outcomes = self._completed + self._errors
+        error_rate = self._errors / outcomes if outcomes else 0.0
+        self._window_start = now
+        self._bytes = self._completed = self._errors = 0
+        self.throughput = throughput
+
+        target = current
+        if error_rate > self.max_error_rate:
+            target = current // 2
+            self._probing = False
+            self._hold = self.hold_windows
+        elif self._probing and throughput < self._baseline * (1 + self.min_gain):
+            self._probing = False
+            target = current - 1
+            self._hold = self.hold_windows
+        elif self._hold > 0:
+            self._hold -= 1
+        elif demand and current < self.max_slots:
+            # Additive increase; the next window shows whether it paid off
+            self._baseline = throughput
+            self._probing = True
+            target = current + 1
+        else:
+            self._probing = False
+        return self.clamp(target)
@@ -0,0 +1,451 @@
+"""
+Local HTTP/JSON control API for a running DownloadManager
+
+    GET  /status                  item counts by status, combined speed and info cache counters
+    GET  /items                   ?status=a,b&batch=&parent=&offset=&limit= (default 1000)
+    GET  /items/<id>
+    POST /items                   {"urls": [...], "settings": {...}, "priority": 0, "weight": 1.0};
+                                  settings may override format and post-processing options,
+                                  and output_dir/output_template only when a token is set;
+                                  weight is the items' share of the bandwidth limit
+    POST /items/<id>/<action>     pause, resume, cancel or retry
+    POST /items/<action>          the same for {"ids": [...]}, or every item without ids
+    GET  /events                  server-sent events, one "items" event per interval
+                                  with the latest state of every item that changed
+
+The server listens on loopback only. POSTs must be application/json and
+the Host header must name a loopback address, so web pages cannot drive
+it; with a token set every request needs "Authorization: Bearer <token>".
+"""
+
+import json
+import logging
+import queue
+import threading
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qs, urlsplit
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from .dedup import canonical_key
+from .download_item import DownloadItem
+from .download_manager import DownloadManager
+
+logger = logging.getLogger(__name__)
+
+# Progress report statuses as the API names them
+_STATUS_NAMES = {
+    'finished': 'processing',  # one file is done; merging or another format may follow
+}
+
+_LOOPBACK_HOSTS = frozenset({'127.0.0.1', 'localhost', '::1'})
+
+# Settings a client may override per request; the rest (custom yt-dlp
+# arguments, concurrency, limits) stay as the window has them
+_CLIENT_SETTINGS = frozenset({
+    'format', 'extract_audio', 'audio_format', 'audio_quality', 'download_subtitles',
+    'subtitle_languages', 'embed_subtitles', 'write_thumbnail', 'add_metadata',
+    'download_playlist', 'use_download_archive', 'use_info_cache', 'concurrent_fragments',
+})
+# Where files are written; only overridable when a token guards the API
+_PATH_SETTINGS = frozenset({'output_dir', 'output_template'})
+
+
+class ControlError(Exception):
+    """A request the API refuses, with the HTTP status to answer it with"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ControlServer(QObject):
+    """Serves the control API for manager from a background thread.
+
+    Request threads never touch the manager: each operation is handed to
+    the Qt thread the server lives in and its result waited for. Item
+    state is kept from the manager's signals; progress reports arriving
+    between two event intervals are coalesced into one update per item.
+    """
+    items_added = pyqtSignal(list, dict)  # DownloadItems queued through the API, their settings
+    _invoke = pyqtSignal(object)
+
+    # How often /events subscribers get the items that changed
+    event_interval_ms = 250
+    # Updates a slow /events subscriber may fall behind before it is dropped
+    max_pending_events = 64
+    # Longest a request waits for the Qt thread, in seconds
+    call_timeout = 30.0
+
+    def __init__(self, manager: DownloadManager, settings_provider: Callable[[], Dict[str, Any]],
+                 port: int = 0, token: str = ""):
+        super().__init__()
+        self.manager = manager
+        self.settings_provider = settings_provider
+        self.requested_port = port
+        self.token = token
+        self.items: Dict[str, DownloadItem] = {}
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self._changed: Set[str] = set()
+        self._subscribers: List[queue.Queue] = []
+        self._subscribers_lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._invoke.connect(self._run_call)
+        self.event_timer = QTimer(self)
+        self.event_timer.timeout.connect(self.flush_events)
+
+        manager.download_progress.connect(self.on_progress)
+        manager.download_completed.connect(self.on_completed)
+        manager.download_error.connect(self.on_error)
+        manager.info_extracted.connect(lambda download_id, title, uploader: self.mark_changed(download_id))
+        manager.playlist_entry_added.connect(lambda item, settings: self.track([item]))
+        manager.playlist_expanded.connect(lambda download_id, count: self.on_completed(download_id, ""))
+        manager.sync_finished.connect(lambda download_id, stats: self.on_completed(download_id, ""))
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1] if self._httpd is not None else 0
+
+    def start(self):
+        """Start listening on 127.0.0.1; raises OSError if the port is taken"""
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', self.requested_port), _ControlHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.block_on_close = False
+        self._httpd.control = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="control-api", daemon=True)
+        self._thread.start()
+        self.event_timer.start(self.event_interval_ms)
+
+    def stop(self):
+        self.event_timer.stop()
+        if self._httpd is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._httpd = None
+        with self._subscribers_lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscriber in subscribers:
+            subscriber.put(None)
+
+    def track(self, download_items: Iterable[DownloadItem]):
+        """Make items queued elsewhere (the window, playlist expansion) visible through the API"""
+        for download_item in download_items:
+            self.items[download_item.id] = download_item
+            self.states.setdefault(download_item.id, {'status': download_item.status.value})
+            self._changed.add(download_item.id)
+
+    def forget(self, download_ids: Iterable[str]):
+        for download_id in download_ids:
+            self.items.pop(download_id, None)
+            self.states.pop(download_id, None)
+            self._changed.discard(download_id)
+
+    def mark_changed(self, download_id: str):
+        if download_id in self.items:
+            self._changed.add(download_id)
+
+    def on_progress(self, download_id: str, progress: dict):
+        state = self.states.get(download_id)
+        if state is None:
+            return
+        if 'status' in progress:
+            state['status'] = _STATUS_NAMES.get(progress['status'], progress['status'])
+        for key in ('downloaded_bytes', 'total_bytes', 'speed', 'eta', 'percent'):
+            if key in progress:
+                state[key] = progress[key]
+        self._changed.add(download_id)
+
+    def on_completed(self, download_id: str, filepath: str):
+        state = self.states.get(download_id)
+        if state is not None:
+            state.update(status='completed', filepath=filepath, percent=100.0, speed=0)
+            self._changed.add(download_id)
+
+    def on_error(self, download_id: str, error: str):
+        state = self.states.get(download_id)
+        if state is not None:
+            state.update(status='error', error=error, speed=0)
+            self._changed.add(download_id)
+
+    def describe(self, download_id: str) -> Dict[str, Any]:
+        item = self.items[download_id]
+        return dict(self.states[download_id], id=item.id, url=item.url, title=item.title,
+                    uploader=item.uploader, batch_id=item.batch_id, parent_id=item.parent_id,
+                    priority=item.priority, weight=item.bandwidth_weight)
+
+    def flush_events(self):
+        """Send every subscriber one update holding the items changed since the last"""
+        if not self._changed:
+            return
+        changed, self._changed = self._changed, set()
+        if not self._subscribers:
+            return
+        payload = json.dumps({'items': [self.describe(i) for i in changed if i in self.items]})
+        with self._subscribers_lock:
+            for subscriber in list(self._subscribers):
+                try:
+                    subscriber.put_nowait(payload)
+                except queue.Full:
+                    # Too far behind to catch up; its stream is closed
+                    self._subscribers.remove(subscriber)
+                    _drain(subscriber)
+                    subscriber.put_nowait(None)
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(self.max_pending_events)
+        with self._subscribers_lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._subscribers_lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def call(self, function: Callable, *args) -> Any:
+        """Run function(*args) on the server's Qt thread and return its result; for request threads"""
+        future = Future()
+        self._invoke.emit((future, function, args))
+        try:
+            return future.result(self.call_timeout)
+        except FutureTimeout:
+            # Dropped while still queued, so a client retrying does not get it run twice
+            if future.cancel():
+                raise ControlError(503, "the application is busy")
+        # Already running on the Qt thread: its result is the answer
+        return future.result()
+
+    def _run_call(self, call):
+        future, function, args = call
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def enqueue(self, urls: List[str], settings: Dict[str, Any], priority: int,
+                weight: float = 1.0) -> Dict[str, Any]:
+        """Queue urls as one batch, skipping duplicates and archived videos as imports do"""
+        settings = dict(self.settings_provider(), **settings)
+        use_archive = settings.get('use_download_archive', True)
+        batch_id = uuid.uuid4().hex  # one request is one batch for fair-share scheduling
+        added, duplicates, archived = [], [], []
+        for url in urls:
+            if self.manager.find_duplicate(url, settings):
+                duplicates.append(url)
+            elif use_archive and self.manager.is_archived(url, settings):
+                archived.append(url)
+            else:
+                download_item = DownloadItem(url, batch_id=batch_id, priority=priority)
+                download_item.bandwidth_weight = weight
+                added.append(download_item)
+                self.manager.add_download(download_item, settings)
+        self.track(added)
+        self.items_added.emit(added, settings)
+        return {'batch_id': batch_id, 'added': [{'id': item.id, 'url': item.url} for item in added],
+                'duplicates': duplicates, 'archived': archived}
+
+    def list_items(self, statuses: Set[str], batch_id: str, parent_id: str,
+                   offset: int, limit: int) -> Dict[str, Any]:
+        matches = [download_id for download_id, item in self.items.items()
+                   if (not statuses or self.states[download_id]['status'] in statuses)
+                   and (not batch_id or item.batch_id == batch_id)
+                   and (not parent_id or item.parent_id == parent_id)]
+        return {'total': len(matches), 'items': [self.describe(i) for i in matches[offset:offset + limit]]}
+
+    def get_item(self, download_id: str) -> Dict[str, Any]:
+        if download_id not in self.items:
+            raise ControlError(404, f"no item {download_id}")
+        return self.describe(download_id)
+
+    def apply_action(self, action: str, download_ids: Optional[List[str]]) -> Dict[str, Any]:
+        """pause, resume, cancel or retry the given items, or every item when download_ids is None"""
+        if download_ids is None:
+            if action in ('pause', 'resume'):
+                getattr(self.manager, f"{action}_all")()
+                return {'count': len(self.items)}
+            download_ids = list(self.items)
+        unknown = [download_id for download_id in download_ids if download_id not in self.items]
+        if unknown:
+            raise ControlError(404, f"no item {unknown[0]}")
+        method = {'pause': self.manager.pause_download, 'resume': self.manager.resume_download,
+                  'cancel': self.manager.cancel_download, 'retry': self.manager.retry_download}[action]
+        for download_id in download_ids:
+            method(download_id)
+        return {'count': len(download_ids)}
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        speed = 0
+        for state in self.states.values():
+            counts[state['status']] = counts.get(state['status'], 0) + 1
+            if state['status'] == 'downloading':
+                speed += state.get('speed') or 0
+        cache = self.manager.info_cache
+        return {'items': len(self.items), 'counts': counts, 'speed': speed,
+                'active': len(self.manager.active_downloads), 'queued': self.manager.queued_count(),
+                'info_cache': cache.stats() if cache is not None else None}
+
+
+def _drain(subscriber: queue.Queue):
+    while True:
+        try:
+            subscriber.get_nowait()
+        except queue.Empty:
+            return
+
+
+class _ControlHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    actions = ('pause', 'resume', 'cancel', 'retry')
+
+    @property
+    def control(self) -> ControlServer:
+        return self.server.control
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(self._get)
+
+    def do_POST(self):
+        self._handle(self._post)
+
+    def _handle(self, route: Callable[[List[str], Dict[str, List[str]]], Optional[Dict[str, Any]]]):
+        try:
+            self._check_request()
+            parts = urlsplit(self.path)
+            result = route([part for part in parts.path.split('/') if part], parse_qs(parts.query))
+        except ControlError as e:
+            self._send_json(e.status, {'error': str(e)})
+            return
+        except Exception as e:
+            logger.exception("control API request %s %s failed", self.command, self.path)
+            self._send_json(500, {'error': f"internal error: {e}"})
+            return
+        if result is not None:
+            self._send_json(200, result)
+
+    def _check_request(self):
+        # Pages in a browser can reach loopback too; a rebound DNS name or a
+        # form post (which cannot send application/json) is refused
+        # Compared whole, so localhost.evil.example is not taken for localhost
+        host = urlsplit('//' + self.headers.get('Host', '')).hostname
+        if host not in _LOOPBACK_HOSTS:
+            raise ControlError(403, "requests must be addressed to a loopback host")
+        token = self.control.token
+        if token and self.headers.get('Authorization', '') != f"Bearer {token}":
+            raise ControlError(401, "missing or wrong token")
+
+    def _get(self, path: List[str], query: Dict[str, List[str]]) -> Optional[Dict[str, Any]]:
+        control = self.control
+        if path == ['status']:
+            return control.call(control.summary)
+        if path == ['items']:
+            statuses = {status for value in query.get('status', []) for status in value.split(',') if status}
+            try:
+                offset = int(query.get('offset', ['0'])[0])
+                limit = int(query.get('limit', ['1000'])[0])
+            except ValueError:
+                raise ControlError(400, "offset and limit must be integers")
+            return control.call(control.list_items, statuses, query.get('batch', [''])[0],
+                                query.get('parent', [''])[0], max(0, offset), max(0, limit))
+        if len(path) == 2 and path[0] == 'items':
+            return control.call(control.get_item, path[1])
+        if path == ['events']:
+            self._stream_events()
+            return None
+        raise ControlError(404, f"no endpoint {self.path}")
+
+    def _post(self, path: List[str], query: Dict[str, List[str]]) -> Dict[str, Any]:
+        control = self.control
+        body = self._read_json()
+        if path == ['items']:
+            urls = body.get('urls')
+            if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+                raise ControlError(400, "urls must be a list of strings")
+            settings = body.get('settings', {})
+            if not isinstance(settings, dict):
+                raise ControlError(400, "settings must be an object")
+            self._check_settings(settings)
+            priority = body.get('priority', 0)
+            if not isinstance(priority, int):
+                raise ControlError(400, "priority must be an integer")
+            weight = body.get('weight', 1.0)
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not 0 < weight <= 100:
+                raise ControlError(400, "weight must be a number above 0 and at most 100")
+            urls = [url.strip() for url in urls if url.strip()]
+            # Working out each URL's video key is most of the cost of queueing;
+            # doing it here (it is cached) leaves the Qt thread only the queueing
+            playlist = DownloadManager.playlist_mode(settings)
+            for url in urls:
+                canonical_key(url, playlist)
+            return control.call(control.enqueue, urls, settings, priority, float(weight))
+        if len(path) == 2 and path[0] == 'items' and path[1] in self.actions:
+            ids = body.get('ids')
+            if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, str) for i in ids)):
+                raise ControlError(400, "ids must be a list of strings")
+            return control.call(control.apply_action, path[1], ids)
+        if len(path) == 3 and path[0] == 'items' and path[2] in self.actions:
+            return control.call(control.apply_action, path[2], [path[1]])
+        raise ControlError(404, f"no endpoint {self.path}")
+
+    def _check_settings(self, settings: Dict[str, Any]):
+        for key in settings:
+            if key in _PATH_SETTINGS:
+                if not self.control.token:
+                    raise ControlError(403, f"{key} can only be set when the API has a token")
+            elif key not in _CLIENT_SETTINGS:
+                raise ControlError(400, f"setting {key} cannot be overridden")
+
+    def _read_json(self) -> Dict[str, Any]:
+        if self.headers.get_content_type() != 'application/json':
+            raise ControlError(415, "POST bodies must be application/json")
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, UnicodeDecodeError):
+            raise ControlError(400, "body is not valid JSON")
+        if not isinstance(body, dict):
+            raise ControlError(400, "body must be a JSON object")
+        return body
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream_events(self):
+        subscriber = self.control.subscribe()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                try:
+                    payload = subscriber.get(timeout=15)
+                except queue.Empty:
+                    # Keeps proxies and idle clients from closing the stream
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                if payload is None:
+                    return
+                self.wfile.write(f"event: items\ndata: {payload}\n\n".encode('utf-8'))
+                self.wfile.flush()
+        except OSError:
+            # The client went away
+            pass
+        finally:
+            self.control.unsubscribe(subscriber)
@@ -0,0 +1,84 @@
+"""
+Canonical video keys for spotting the same video behind different URLs
+"""
+
+import functools
+from typing import List, Optional, Tuple
+from urllib.parse import urldefrag, urlparse
+from yt_dlp.extractor import gen_extractor_classes
+from .host_limiter import host_key
+
+
+@functools.lru_cache(maxsize=None)
+def _extractors() -> tuple:
+    # The generic extractor matches everything and only knows ids after a download
+    return tuple(ie for ie in gen_extractor_classes() if ie.ie_key() != 'Generic')
+
+
+@functools.lru_cache(maxsize=1024)
+def _candidates(label: str) -> List[type]:
+    """Extractors whose URL pattern mentions the site label, in yt-dlp's order.
+
+    Checking ~1800 patterns per URL is too slow for bulk pastes; a site's
+    extractor names its domain in _VALID_URL, or in one of them when it
+    has a list. Extractors without a pattern decide in their own
+    suitable() and are always kept.
+    """
+    def mentions_label(ie) -> bool:
+        patterns = getattr(ie, '_VALID_URL', None)
+        if isinstance(patterns, str):
+            return label in patterns
+        if isinstance(patterns, (list, tuple)):
+            return any(label in pattern for pattern in patterns)
+        return True
+    return [ie for ie in _extractors() if mentions_label(ie)]
+
+
+def _video_in_list(candidates: List[type], url: str) -> Optional[Tuple[str, str]]:
+    """Key of the video a link into a list names (watch?v=X&list=L), if any.
+
+    A video extractor's suitable() leaves such links to the list
+    extractor, but its URL pattern still matches them.
+    """
+    for ie in candidates:
+        if getattr(ie, '_RETURN_TYPE', None) == 'video' and getattr(ie, '_VALID_URL', None):
+            if ie._match_valid_url(url):
+                video_id = ie.get_temp_id(url)
+                if video_id:
+                    return ie.ie_key(), str(video_id)
+    return None
+
+
+def _list_id(url: str, list_id: str) -> str:
+    """list_id plus the path after it, so a channel's /videos and /streams tabs differ"""
+    _, found, rest = urlparse(url).path.partition(list_id)
+    rest = rest.strip('/')
+    return f"{list_id}/{rest}" if found and rest else list_id
+
+
+@functools.lru_cache(maxsize=65536)
+def canonical_key(url: str, playlist: bool = False) -> Tuple[str, str]:
+    """Return (extractor, video id) for url, worked out from the URL alone.
+
+    youtu.be/X, youtube.com/watch?v=X&t=10 and m.youtube.com/watch?v=X all
+    give ('Youtube', 'X'). A link to a video in a list (watch?v=X&list=L)
+    names the video X, or the list L when playlist is set, as yt-dlp's
+    noplaylist option decides. URLs no extractor can take apart without
+    network access fall back to ('url', url without its #fragment).
+    """
+    label = host_key(url).split('.')[0]
+    candidates = _candidates(label)
+    for ie in candidates:
+        if ie.suitable(url):
+            returns = getattr(ie, '_RETURN_TYPE', None)
+            if returns in ('playlist', 'any') and not playlist:
+                video_key = _video_in_list(candidates, url)
+                if video_key:
+                    return video_key
+            video_id = ie.get_temp_id(url)
+            if video_id:
+                if returns in ('playlist', 'any'):
+                    return ie.ie_key(), _list_id(url, str(video_id))
+                return ie.ie_key(), str(video_id)
+            break
+    return 'url', urldefrag(url.strip())[0]
@@ -0,0 +1,106 @@
+"""
+Disk space admission control, so downloads never start into a volume they would fill
+"""
+
+import os
+import shutil
+from typing import Any, Callable, Dict, Hashable, List
+
+
+def existing_ancestor(path: str) -> str:
+    """path, or its nearest parent that exists; output directories are created on first download"""
+    path = os.path.abspath(os.path.expanduser(path))
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def free_bytes(path: str) -> int:
+    return shutil.disk_usage(existing_ancestor(path)).free
+
+
+def volume_of(path: str) -> Hashable:
+    """Identifies the filesystem path is on, so directories on one volume share its space"""
+    return os.stat(existing_ancestor(path)).st_dev
+
+
+class DiskSpaceGuard:
+    """Reserves the expected size of running downloads against their volume's free space.
+
+    A download reserves its estimated size times a post-processing
+    headroom: merging streams into mkv writes the output next to the
+    downloaded streams, and extracting audio writes it next to the source.
+    Bytes a download has written already show up in the free space, so its
+    reservation shrinks by them. A download may start when the free space
+    less the outstanding reservations on its volume leaves at least
+    min_free after its own. Downloads of unknown size reserve nothing but
+    still need min_free.
+    """
+
+    video_headroom = 2.0
+    audio_headroom = 1.5
+
+    def __init__(self, min_free: int = 256 * 1024 * 1024, free_space: Callable[[str], int] = free_bytes,
+                 volume: Callable[[str], Hashable] = volume_of):
+        self.min_free = min_free
+        self.free_space = free_space
+        self.volume = volume
+        # download_id -> [volume, bytes reserved, bytes written so far]
+        self._reservations: Dict[str, List[Any]] = {}
+
+    def reservation(self, estimated_size: int, settings: Dict[str, Any]) -> int:
+        headroom = self.audio_headroom if settings.get('extract_audio', False) else self.video_headroom
+        return int(max(0, estimated_size) * headroom)
+
+    def outstanding(self, volume: Hashable) -> int:
+        """Bytes still reserved on volume by running downloads"""
+        return sum(max(0, reserved - written) for key, reserved, written in self._reservations.values()
+                   if key == volume)
+
+    def available(self, output_dir: str) -> int:
+        """Free bytes on output_dir's volume not yet reserved, less min_free"""
+        try:
+            free = self.free_space(output_dir)
+            volume = self.volume(output_dir)
+        except OSError:
+            # Unreadable volume; let the download report the real error
+            return self.min_free
+        return free - self.outstanding(volume) - self.min_free
+
+    def can_start(self, output_dir: str, nbytes: int) -> bool:
+        return self.available(output_dir) >= nbytes
+
+    def never_fits(self, output_dir: str, nbytes: int) -> bool:
+        """Whether nbytes does not fit although no download holds space on output_dir's volume.
+
+        Waiting for other downloads to finish would not help then.
+        """
+        try:
+            volume = self.volume(output_dir)
+        except OSError:
+            return False
+        if any(key == volume for key, _, _ in self._reservations.values()):
+            return False
+        return not self.can_start(output_dir, nbytes)
+
+    def acquire(self, download_id: str, output_dir: str, nbytes: int):
+        try:
+            volume = self.volume(output_dir)
+        except OSError:
+            return
+        self._reservations[download_id] = [volume, nbytes, 0]
+
+    def record_written(self, download_id: str, nbytes: int):
+        """nbytes more were written by download_id"""
+        reservation = self._reservations.get(download_id)
+        if reservation is not None:
+            reservation[2] += nbytes
+
+    def release(self, download_id: str):
+        self._reservations.pop(download_id, None)
+
+    def clear(self):
+        self._reservations.clear()
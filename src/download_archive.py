@@ -0,0 +1,199 @@
+"""
+Download archive shared by all workers, for skipping videos downloaded before
+"""
+
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+from typing import Iterable, Optional, Set
+from PyQt6.QtCore import QStandardPaths
+from yt_dlp.utils import make_archive_id
+from .dedup import canonical_key
+
+
+def default_archive_path() -> str:
+    """archive.txt in the per-user application data directory"""
+    directory = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, "archive.txt")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings; no false negatives"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001, bits: Optional[bytes] = None):
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        self.size = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class DownloadArchive:
+    """yt-dlp download archive held in memory and shared by every worker.
+
+    The file keeps yt-dlp's format, one "extractor id" per line, so it also
+    works with the yt-dlp command line. Passed as the download_archive
+    option, yt-dlp checks it before downloading and add()s finished
+    videos, each appended with a single O_APPEND write so lines never
+    interleave.
+
+    Up to memory_limit ids live in a set. Beyond that they move to an
+    SQLite index next to the file, with a Bloom filter in front so the
+    usual answer for new videos ("not archived") never touches disk. The
+    index remembers how much of the file it has read; later sessions
+    only read lines appended since.
+    """
+
+    def __init__(self, path: str, memory_limit: int = 1_000_000):
+        self.path = path
+        self.memory_limit = memory_limit
+        self._lock = threading.Lock()
+        self._ids: Optional[Set[str]] = set()
+        self._index: Optional[sqlite3.Connection] = None
+        self._bloom: Optional[BloomFilter] = None
+        self._count = 0
+        with self._lock:
+            offset = self._open_index() if os.path.exists(self.index_path) else 0
+            self._read_file(offset)
+
+    @property
+    def index_path(self) -> str:
+        return self.path + ".index"
+
+    def __repr__(self) -> str:
+        # Part of the pool's options key, so reused YoutubeDL instances share it
+        return f"DownloadArchive({self.path!r})"
+
+    def __len__(self) -> int:
+        return len(self._ids) if self._ids is not None else self._count
+
+    def __contains__(self, archive_id: str) -> bool:
+        with self._lock:
+            return self._contains(archive_id)
+
+    def contains_url(self, url: str, playlist: bool = False) -> bool:
+        """Whether url's video is archived, judged from the URL alone (see canonical_key for playlist)"""
+        extractor, video_id = canonical_key(url, playlist)
+        return extractor != 'url' and make_archive_id(extractor, video_id) in self
+
+    def add(self, archive_id: str):
+        """Record a finished video; called by yt-dlp from worker threads"""
+        archive_id = archive_id.strip()
+        with self._lock:
+            if not archive_id or self._contains(archive_id):
+                return
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (archive_id + "\n").encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._remember([archive_id])
+
+    def close(self):
+        with self._lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+    def _contains(self, archive_id: str) -> bool:
+        if self._ids is not None:
+            return archive_id in self._ids
+        if archive_id not in self._bloom:
+            return False
+        return self._index.execute("SELECT 1 FROM ids WHERE id = ?", (archive_id,)).fetchone() is not None
+
+    def _remember(self, archive_ids: Iterable[str]):
+        if self._ids is not None:
+            self._ids.update(archive_ids)
+            if len(self._ids) > self.memory_limit:
+                self._move_to_index()
+            return
+        archive_ids = list(archive_ids)
+        with self._index:
+            before = self._index.total_changes
+            self._index.executemany("INSERT OR IGNORE INTO ids (id) VALUES (?)", ((i,) for i in archive_ids))
+            self._count += self._index.total_changes - before
+        for archive_id in archive_ids:
+            self._bloom.add(archive_id)
+        if self._count > self._bloom.capacity:
+            self._rebuild_bloom()
+
+    def _read_file(self, offset: int):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size < offset:
+            # The file was replaced or truncated; start the index over
+            self._index.execute("DELETE FROM ids")
+            self._count = 0
+            self._bloom = BloomFilter(self._bloom.capacity)
+            offset = 0
+        with open(self.path, 'rb') as archive_file:
+            archive_file.seek(offset)
+            batch = []
+            for line in archive_file:
+                archive_id = line.decode('utf-8', 'replace').strip()
+                if archive_id:
+                    batch.append(archive_id)
+                if len(batch) >= 10000:
+                    self._remember(batch)
+                    batch = []
+            self._remember(batch)
+        if self._index is not None:
+            self._save_index_state(size)
+
+    def _open_index(self) -> int:
+        """Open the on-disk index; returns the file offset it has read up to"""
+        self._connect_index()
+        state = dict(self._index.execute("SELECT key, value FROM state"))
+        self._count = self._index.execute("SELECT COUNT(*) FROM ids").fetchone()[0]
+        self._ids = None
+        if 'bloom' in state and state.get('capacity', 0) >= self._count:
+            self._bloom = BloomFilter(state['capacity'], bits=state['bloom'])
+        else:
+            self._rebuild_bloom()
+        return int(state.get('offset', 0))
+
+    def _connect_index(self):
+        # Workers add from their own threads; every use is under self._lock
+        self._index = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._index.execute("CREATE TABLE IF NOT EXISTS ids (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self._index.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value)")
+
+    def _move_to_index(self):
+        ids, self._ids = self._ids, None
+        if self._index is None:
+            self._connect_index()
+        self._bloom = BloomFilter(max(2 * len(ids), self.memory_limit))
+        self._count = 0
+        self._remember(ids)
+        # Nothing of the file is recorded as read yet; the end of loading saves the offset
+        self._save_index_state(0)
+
+    def _rebuild_bloom(self):
+        self._bloom = BloomFilter(max(2 * self._count, self.memory_limit))
+        for (archive_id,) in self._index.execute("SELECT id FROM ids"):
+            self._bloom.add(archive_id)
+
+    def _save_index_state(self, offset: int):
+        with self._index:
+            self._index.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", [
+                ('offset', offset), ('capacity', self._bloom.capacity), ('bloom', bytes(self._bloom.bits))])
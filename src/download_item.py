@@ -6,6 +6,7 @@ import uuid
 from typing import Optional
 from enum import Enum
 
+
 class DownloadStatus(Enum):
     QUEUED = "queued"
     FETCHING_INFO = "fetching_info"
@@ -14,11 +15,19 @@ class DownloadStatus(Enum):
     COMPLETED = "completed"
     ERROR = "error"
     PAUSED = "paused"
+    CANCELLED = "cancelled"
+
 
 class DownloadItem:
-    def __init__(self, url: str):
+    def __init__(self, url: str, batch_id: str = "", priority: int = 0):
         self.id = str(uuid.uuid4())
         self.url = url
+        self.batch_id = batch_id  # items added together (one paste, import or playlist)
+        self.parent_id = ""  # playlist item this entry was expanded from
+        self.priority = priority  # higher starts first with the priority scheduler
+        self.bandwidth_weight = 1.0  # share of the bandwidth limit relative to other items
+        self.estimated_size = 0  # expected bytes from the extracted formats, 0 if unknown
+        self.info: Optional[dict] = None  # resolved yt-dlp info, kept until the download finishes
         self.title = ""
         self.uploader = ""
         self.status = DownloadStatus.QUEUED
@@ -42,7 +51,8 @@ class DownloadItem:
                 'downloading': DownloadStatus.DOWNLOADING,
                 'finished': DownloadStatus.COMPLETED,
                 'error': DownloadStatus.ERROR,
-                'paused': DownloadStatus.PAUSED
+                'paused': DownloadStatus.PAUSED,
+                'cancelled': DownloadStatus.CANCELLED
             }
             self.status = status_map.get(progress_data['status'], DownloadStatus.QUEUED)
             
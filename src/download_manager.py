@@ -2,13 +2,31 @@
 Download manager handling yt-dlp integration
 """
 
+import logging
 import os
 import threading
 import queue
-from typing import Dict, Any, Optional, List, Tuple
-from PyQt6.QtCore import QObject, pyqtSignal, QThread, QTimer
+import sys
+import time
+from collections import deque
+from typing import Callable, Dict, Any, Optional, List, Set, Tuple
+from PyQt6.QtCore import QObject, pyqtSignal, QTimer
 import yt_dlp
+from yt_dlp.utils import DownloadCancelled
+from .bandwidth import TokenBucket
+from .concurrency_tuner import ConcurrencyTuner
+from .dedup import canonical_key
+from .disk_space import DiskSpaceGuard
+from .download_archive import DownloadArchive
+from .fragment_tuner import FragmentTuner
+from .info_cache import InfoCache
 from .download_item import DownloadItem, DownloadStatus
+from .host_limiter import HostLimiter, host_key
+from .retry import ErrorKind, RetryPolicy, classify_error
+from .scheduler import QueueScheduler, create_scheduler
+from .session_pool import SessionPool
+from .sync_store import SyncStore, source_key
+from .worker_pool import WorkerPool, youtube_dl_session
 
 # Optional imports for muxing functionality
 try:
@@ -19,12 +37,86 @@ try:
 except ImportError:
     MUXING_AVAILABLE = False
 
-class DownloadWorker(QThread):
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(info: dict) -> int:
+    """Expected download size in bytes from the selected formats, 0 if unknown"""
+    formats = info.get('requested_formats') or [info]
+    total = 0
+    for fmt in formats:
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if not size:
+            return 0
+        total += int(size)
+    return total
+
+
+class DownloadPaused(DownloadCancelled):
+    """Raised from the progress hook to stop a transfer, keeping its .part file"""
+    msg = 'The download was paused'
+
+
+class DownloadAborted(DownloadCancelled):
+    """Raised from the progress hook to stop a cancelled transfer"""
+    msg = 'The download was cancelled'
+
+
+class JobLogger:
+    """yt-dlp logger for one job; keeps the errors yt-dlp would otherwise only print"""
+    
+    # Whether yt-dlp's messages are printed; the headless runner turns this off
+    echo = True
+    
+    def __init__(self):
+        self.errors: List[str] = []
+        # Set when yt-dlp skipped the video because the download archive has it
+        self.archived = False
+        
+    @property
+    def last_error(self) -> str:
+        return self.errors[-1] if self.errors else ""
+        
+    def debug(self, msg):
+        if msg.endswith('has already been recorded in the archive'):
+            self.archived = True
+        if self.echo and not msg.startswith('[debug] '):
+            print(msg)
+            
+    def info(self, msg):
+        if self.echo:
+            print(msg)
+        
+    def warning(self, msg):
+        if self.echo:
+            print(f"WARNING: {msg}", file=sys.stderr)
+        
+    def error(self, msg):
+        if self.echo:
+            print(msg, file=sys.stderr)
+        self.errors.append(msg[len('ERROR: '):] if msg.startswith('ERROR: ') else msg)
+
+
+class DownloadWorker(QObject):
+    """A single download job, executed on a WorkerPool thread via run()"""
     progress_updated = pyqtSignal(str, dict)
     info_extracted = pyqtSignal(str, str, str)
     download_completed = pyqtSignal(str, str)
     download_error = pyqtSignal(str, str)
+    download_paused = pyqtSignal(str)  # download_id
     muxing_status = pyqtSignal(str, str)  # download_id, status message
+    finished = pyqtSignal(str)  # download_id
+    
+    # Shared bandwidth limit, set by DownloadManager; None means unlimited
+    rate_limiter: Optional[TokenBucket] = None
+    # Fragment workers granted by DownloadManager; None uses the item's setting
+    fragment_workers: Optional[int] = None
+    # Learns fragment worker counts from finished downloads, set by DownloadManager
+    fragment_tuner: Optional[FragmentTuner] = None
+    # Videos downloaded in any session, set by DownloadManager; None keeps no archive
+    download_archive: Optional[DownloadArchive] = None
+    # Recently extracted info, set by DownloadManager; None always extracts
+    info_cache: Optional[InfoCache] = None
     
     def __init__(self, download_item: DownloadItem, settings: Dict[str, Any]):
         super().__init__()
@@ -32,48 +124,152 @@ class DownloadWorker(QThread):
         self.settings = settings
         self.is_paused = False
         self.is_cancelled = False
+        self.logger = JobLogger()
+        # (filename, tmpfilename) pairs seen in progress updates, removed on cancel
+        self.partial_files = set()
+        # Bytes already charged to the rate limiter, per file being written
+        self._charged_bytes: Dict[str, int] = {}
+        self._charge_lock = threading.Lock()
+        # Fragmented streams: file -> (fragments done, bytes), and when the first began
+        self._fragment_progress: Dict[str, Tuple[int, int]] = {}
+        self._fragments_started: Optional[float] = None
         
     def run(self):
+        try:
+            # Jobs cancelled while still waiting for a pool thread never start
+            if not self.is_cancelled:
+                self.download()
+        finally:
+            self.finished.emit(self.download_item.id)
+            
+    def download(self):
         try:
             # Configure yt-dlp options
             ydl_opts = self.build_ydl_options()
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Extract info first
-                self.progress_updated.emit(self.download_item.id, {'status': 'fetching_info'})
-                
-                try:
-                    info = ydl.extract_info(self.download_item.url, download=False)
-                    if info:
-                        title = info.get('title', 'Unknown')
-                        uploader = info.get('uploader', 'Unknown')
-                        thumbnail = info.get('thumbnail', '')
-                        
-                        self.download_item.update_info(title, uploader, thumbnail)
-                        self.info_extracted.emit(self.download_item.id, title, uploader)
+            # Pool threads hand out their reusable YoutubeDL for these options
+            with youtube_dl_session(ydl_opts) as ydl:
+                # Items that went through the info stage are already resolved
+                info = self.download_item.info
+                if info is None:
+                    info = self.extract_info(ydl)
+                    if info is None:
+                        return
                         
-                except Exception as e:
-                    self.download_error.emit(self.download_item.id, f"Info extraction failed: {str(e)}")
-                    return
-                
                 # Download the video
-                if not self.is_cancelled:
-                    self.progress_updated.emit(self.download_item.id, {'status': 'downloading'})
-                    try:
-                        ydl.download([self.download_item.url])
-                        
-                        if not self.is_cancelled:
-                            # Get final output path - yt-dlp handles merging
-                            output_path = self.get_output_path(info)
-                            self.download_completed.emit(self.download_item.id, output_path)
-                            
-                    except Exception as e:
-                        if not self.is_cancelled:
-                            self.download_error.emit(self.download_item.id, f"Download failed: {str(e)}")
-                            
+                if self.is_paused:
+                    self.download_paused.emit(self.download_item.id)
+                elif not self.is_cancelled:
+                    self.download_resolved(ydl, info)
+                    
         except Exception as e:
             self.download_error.emit(self.download_item.id, f"Unexpected error: {str(e)}")
             
+    def extract_info(self, ydl: yt_dlp.YoutubeDL, unprocessed: Optional[dict] = None) -> Optional[dict]:
+        """Resolve title, formats and expected size; reports errors and returns None on failure.
+        
+        unprocessed is a result of extract_info(process=False) to finish
+        resolving instead of extracting the URL again.
+        """
+        self.progress_updated.emit(self.download_item.id, {'status': 'fetching_info'})
+        
+        try:
+            if unprocessed is None and self.uses_info_cache:
+                info = self.extract_through_cache(ydl)
+            elif unprocessed is None:
+                info = ydl.extract_info(self.download_item.url, download=False)
+            else:
+                info = ydl.process_ie_result(unprocessed, download=False) if unprocessed else None
+        except Exception as e:
+            self.download_error.emit(self.download_item.id, f"Info extraction failed: {str(e)}")
+            return None
+            
+        if not info and self.logger.archived:
+            # Downloaded in an earlier session; yt-dlp stopped before extracting
+            self.download_completed.emit(self.download_item.id, "")
+            return None
+        if not info:
+            reason = self.logger.last_error or "no video information returned"
+            self.download_error.emit(self.download_item.id, f"Info extraction failed: {reason}")
+            return None
+            
+        title = info.get('title', 'Unknown')
+        uploader = info.get('uploader', 'Unknown')
+        thumbnail = info.get('thumbnail', '')
+        
+        self.download_item.update_info(title, uploader, thumbnail)
+        self.download_item.estimated_size = estimate_size(info)
+        self.info_extracted.emit(self.download_item.id, title, uploader)
+        return info
+        
+    @property
+    def uses_info_cache(self) -> bool:
+        # "use_info_cache": False bypasses the cache both ways
+        return self.info_cache is not None and self.settings.get('use_info_cache', True)
+        
+    def extract_through_cache(self, ydl: yt_dlp.YoutubeDL) -> Optional[dict]:
+        """extract_info that reuses the cached, unprocessed info of the video when there is one.
+        
+        Only format selection and the like run again for a cached entry. If
+        they fail, the formats are stale: the entry is dropped and the video
+        extracted afresh.
+        """
+        url = self.download_item.url
+        cached = self.info_cache.get(url)
+        if cached is not None:
+            try:
+                info = ydl.process_ie_result(cached, download=False)
+                if info:
+                    return info
+            except Exception:
+                pass
+            self.info_cache.invalidate(url)
+            
+        unprocessed = ydl.extract_info(url, download=False, process=False)
+        if not unprocessed:
+            return None
+        # Playlists and redirects are resolved every time
+        if unprocessed.get('_type', 'video') == 'video':
+            self.info_cache.put(url, unprocessed)
+        return ydl.process_ie_result(unprocessed, download=False)
+        
+    def download_resolved(self, ydl: yt_dlp.YoutubeDL, info: dict):
+        self.progress_updated.emit(self.download_item.id, {'status': 'downloading'})
+        try:
+            # Download from the already resolved info dict rather than
+            # ydl.download([url]), which would extract the page again
+            if self.download_archive is not None and ydl.in_download_archive(info):
+                # Downloaded in an earlier session; nothing to fetch again
+                self.download_completed.emit(self.download_item.id, self.get_output_path(info))
+                return
+            errors_before = len(self.logger.errors)
+            ydl.process_ie_result(info, download=True)
+            
+            # ignoreerrors makes yt-dlp log failures instead of raising
+            if len(self.logger.errors) > errors_before and not self.is_cancelled:
+                self.forget_cached_info()
+                self.download_error.emit(self.download_item.id, f"Download failed: {self.logger.last_error}")
+            elif not self.is_cancelled:
+                self.report_fragment_stats(ydl.params.get('concurrent_fragment_downloads') or 1)
+                # Get final output path - yt-dlp handles merging
+                output_path = self.get_output_path(info)
+                self.download_completed.emit(self.download_item.id, output_path)
+                
+        except DownloadPaused:
+            # The .part file stays on disk; yt-dlp continues from it on resume
+            self.download_paused.emit(self.download_item.id)
+        except DownloadAborted:
+            self.remove_partial_files()
+        except Exception as e:
+            if not self.is_cancelled:
+                self.forget_cached_info()
+                self.download_error.emit(self.download_item.id, f"Download failed: {str(e)}")
+                
+    def forget_cached_info(self):
+        """Drop the item's cached info after a failed download; its format URLs may be what failed"""
+        if self.info_cache is not None:
+            self.info_cache.invalidate(self.download_item.url)
+                
     def build_ydl_options(self) -> Dict[str, Any]:
         output_dir = self.settings.get('output_dir', os.path.expanduser('~/Downloads'))
         output_template = self.settings.get('output_template', '%(title)s.%(ext)s')
@@ -81,23 +277,21 @@ class DownloadWorker(QThread):
         
         # Get bundled ffmpeg path
         ffmpeg_path = self.get_bundled_ffmpeg_path()
-        print(f"DEBUG: ffmpeg_path = {ffmpeg_path}")
-        print(f"DEBUG: format_selector = {format_selector}")
-        if ffmpeg_path:
-            print(f"DEBUG: ffmpeg exists = {os.path.exists(ffmpeg_path)}")
-            print(f"DEBUG: ffmpeg executable = {os.access(ffmpeg_path, os.X_OK)}")
-            # Test if we can actually run it
+        logger.debug("ffmpeg_path = %s, format_selector = %s", ffmpeg_path, format_selector)
+        # Running ffmpeg costs a process per job; only worth it when debugging
+        if ffmpeg_path and logger.isEnabledFor(logging.DEBUG):
             try:
-                import subprocess
                 result = subprocess.run([ffmpeg_path, '-version'], capture_output=True, text=True, timeout=3)
-                print(f"DEBUG: ffmpeg test run = {result.returncode == 0}")
+                logger.debug("ffmpeg test run = %s", result.returncode == 0)
             except Exception as e:
-                print(f"DEBUG: ffmpeg test failed = {e}")
+                logger.debug("ffmpeg test failed = %s", e)
         
         ydl_opts = {
             'outtmpl': os.path.join(output_dir, output_template),
             'format': format_selector,
             'progress_hooks': [self.progress_hook],
+            'logger': self.logger,
+            'concurrent_fragment_downloads': self.fragment_workers or max(1, int(self.settings.get('concurrent_fragments') or 1)),
             'noplaylist': not self.settings.get('download_playlist', False),
             'ignoreerrors': True,
             'no_warnings': False,
@@ -106,6 +300,10 @@ class DownloadWorker(QThread):
             'audioquality': self.settings.get('audio_quality', '192'),
         }
         
+        # yt-dlp records finished videos through DownloadArchive.add
+        if self.download_archive is not None and self.settings.get('use_download_archive', True):
+            ydl_opts['download_archive'] = self.download_archive
+        
         # Force ffmpeg usage and set location
         if ffmpeg_path:
             ydl_opts['ffmpeg_location'] = ffmpeg_path
@@ -173,6 +371,17 @@ class DownloadWorker(QThread):
         return None
         
     def progress_hook(self, d):
+        if d.get('status') == 'downloading':
+            self.partial_files.add((d.get('filename'), d.get('tmpfilename')))
+            # Runs on the worker thread, so this is where pause/cancel interrupt yt-dlp
+            if self.is_cancelled:
+                raise DownloadAborted()
+            if self.is_paused:
+                raise DownloadPaused()
+            if d.get('fragment_count'):
+                self.record_fragment_progress(d)
+            if self.rate_limiter is not None:
+                self.throttle(d)
         if self.is_cancelled:
             return
             
@@ -194,6 +403,47 @@ class DownloadWorker(QThread):
             
         self.progress_updated.emit(self.download_item.id, progress_data)
         
+    def throttle(self, d):
+        """Block this transfer until the bytes received since the last update fit the shared limit"""
+        path = d.get('tmpfilename') or d.get('filename') or ''
+        downloaded = d.get('downloaded_bytes') or 0
+        with self._charge_lock:
+            # The first update of a file (possibly resumed) only sets the baseline
+            previous = self._charged_bytes.get(path, downloaded)
+            self._charged_bytes[path] = max(previous, downloaded)
+        self.rate_limiter.consume(downloaded - previous, consumer=self.download_item.id,
+                                  weight=self.download_item.bandwidth_weight,
+                                  abort=lambda: self.is_cancelled or self.is_paused)
+        
+    def record_fragment_progress(self, d):
+        if self._fragments_started is None:
+            self._fragments_started = time.monotonic()
+        path = d.get('tmpfilename') or d.get('filename') or ''
+        done, _ = self._fragment_progress.get(path, (0, 0))
+        self._fragment_progress[path] = (max(done, d.get('fragment_index') or 0), d.get('downloaded_bytes') or 0)
+        
+    def report_fragment_stats(self, workers: int):
+        """Tell the fragment tuner how a finished fragmented download went"""
+        if self.fragment_tuner is None or self._fragments_started is None:
+            return
+        fragments = sum(done for done, _ in self._fragment_progress.values())
+        nbytes = sum(size for _, size in self._fragment_progress.values())
+        elapsed = time.monotonic() - self._fragments_started
+        self.fragment_tuner.observe(host_key(self.download_item.url), workers, fragments, elapsed, nbytes)
+        
+    def remove_partial_files(self):
+        """Delete the .part, fragment and .ytdl files of a cancelled download"""
+        for filename, tmpfilename in self.partial_files:
+            candidates = glob.glob(glob.escape(tmpfilename) + '-Frag*') if tmpfilename else []
+            candidates += [tmpfilename, filename and filename + '.ytdl']
+            for path in candidates:
+                if path and path != filename and os.path.exists(path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+        self.partial_files.clear()
+        
     def get_output_path(self, info: dict) -> str:
         output_dir = self.settings.get('output_dir', os.path.expanduser('~/Downloads'))
         template = self.settings.get('output_template', '%(title)s.%(ext)s')
@@ -256,7 +506,7 @@ class DownloadWorker(QThread):
         import re
         clean_title = re.sub(r'[<>:"/\\|?*]', '_', video_title)
         
-        print(f"DEBUG: Looking for separate files with title: {clean_title}")
+        logger.debug("Looking for separate files with title: %s", clean_title)
         
         # Find video and audio files
         video_file = None
@@ -264,23 +514,23 @@ class DownloadWorker(QThread):
         
         try:
             files = os.listdir(output_dir)
-            print(f"DEBUG: Files in output dir: {files}")
+            logger.debug("Files in output dir: %s", files)
             
             for file in files:
                 if clean_title.lower() in file.lower():
-                    print(f"DEBUG: Checking file: {file}")
+                    logger.debug("Checking file: %s", file)
                     if '.f401.' in file or '.f137.' in file or file.endswith('.mp4'):
                         video_file = os.path.join(output_dir, file)
-                        print(f"DEBUG: Found video file: {video_file}")
+                        logger.debug("Found video file: %s", video_file)
                     elif '.f251.' in file or file.endswith('.webm'):
                         audio_file = os.path.join(output_dir, file)
-                        print(f"DEBUG: Found audio file: {audio_file}")
+                        logger.debug("Found audio file: %s", audio_file)
                         
             if video_file and audio_file:
-                print(f"DEBUG: Attempting to mux {video_file} + {audio_file}")
+                logger.debug("Attempting to mux %s + %s", video_file, audio_file)
                 output_file = os.path.join(output_dir, f"{clean_title}.mkv")
                 if self.simple_ffmpeg_mux(video_file, audio_file, output_file):
-                    print(f"DEBUG: Successfully muxed to {output_file}")
+                    logger.debug("Successfully muxed to %s", output_file)
                     # Clean up separate files
                     try:
                         os.remove(video_file)
@@ -290,7 +540,7 @@ class DownloadWorker(QThread):
                     return output_file
                         
         except Exception as e:
-            print(f"DEBUG: Mux error: {e}")
+            logger.warning("Mux error: %s", e)
             
         return expected_path
         
@@ -298,20 +548,20 @@ class DownloadWorker(QThread):
         """Simple ffmpeg mux using bundled binary"""
         ffmpeg_path = self.get_bundled_ffmpeg_path()
         if not ffmpeg_path:
-            print("DEBUG: No ffmpeg found for muxing")
+            logger.debug("No ffmpeg found for muxing")
             return False
             
         import subprocess
         try:
             cmd = [ffmpeg_path, '-i', video_file, '-i', audio_file, '-c', 'copy', '-y', output_file]
-            print(f"DEBUG: Running ffmpeg command: {' '.join(cmd)}")
+            logger.debug("Running ffmpeg command: %s", ' '.join(cmd))
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
             success = result.returncode == 0
             if not success:
-                print(f"DEBUG: ffmpeg failed: {result.stderr}")
+                logger.warning("ffmpeg failed: %s", result.stderr)
             return success
         except Exception as e:
-            print(f"DEBUG: ffmpeg exception: {e}")
+            logger.warning("ffmpeg exception: %s", e)
             return False
         
     def simple_mux(self, video_file: str, audio_file: str, output_file: str) -> bool:
@@ -368,83 +618,944 @@ class DownloadWorker(QThread):
         
     def cancel(self):
         self.is_cancelled = True
-        self.quit()
-        self.wait()
+
+
+class InfoWorker(DownloadWorker):
+    """Info stage job: resolves a queued item's title, formats and size without downloading.
+    
+    With "download_playlist" set, a playlist is not resolved as a whole:
+    its entries are reported one by one as yt-dlp pages them in, to be
+    queued as items of their own.
+    """
+    info_resolved = pyqtSignal(str)  # download_id
+    playlist_entry = pyqtSignal(str, dict)  # playlist's download_id, flat entry
+    playlist_expanded = pyqtSignal(str, int)  # playlist's download_id, entries reported
+    
+    def run(self):
+        try:
+            if not self.is_cancelled:
+                self.resolve()
+        finally:
+            self.finished.emit(self.download_item.id)
+            
+    def resolve(self):
+        try:
+            with youtube_dl_session(self.build_ydl_options()) as ydl:
+                if self.settings.get('download_playlist', False):
+                    info = self.extract_or_expand(ydl)
+                else:
+                    info = self.extract_info(ydl)
+        except Exception as e:
+            self.download_error.emit(self.download_item.id, f"Unexpected error: {str(e)}")
+            return
+            
+        if info is not None and not self.is_cancelled:
+            self.download_item.info = info
+            if self.is_paused:
+                self.download_paused.emit(self.download_item.id)
+            else:
+                self.info_resolved.emit(self.download_item.id)
+                
+    def extract_or_expand(self, ydl: yt_dlp.YoutubeDL) -> Optional[dict]:
+        """Like extract_info, but playlists are expanded instead; returns None for them"""
+        if self.download_item.parent_id and self.uses_info_cache:
+            # A playlist's entries are videos, so the cache may answer for them; for
+            # other items a video link can stand for its playlist (watch?v=...&list=...)
+            return self.extract_info(ydl)
+        self.progress_updated.emit(self.download_item.id, {'status': 'fetching_info'})
+        try:
+            # Unprocessed, a playlist's entries stay a lazy generator of flat entries
+            result = ydl.extract_info(self.download_item.url, download=False, process=False)
+            # Video pages that link to their playlist (watch?v=...&list=...) redirect to it
+            for _ in range(3):
+                if not result or result.get('_type') != 'url':
+                    break
+                result = ydl.extract_info(result['url'], ie_key=result.get('ie_key'),
+                                          download=False, process=False)
+            if result and result.get('_type') in ('playlist', 'multi_video'):
+                self.expand_playlist(result)
+                return None
+        except Exception as e:
+            self.download_error.emit(self.download_item.id, f"Info extraction failed: {str(e)}")
+            return None
+            
+        return self.extract_info(ydl, result or {})
+        
+    @property
+    def entry_settings(self) -> Dict[str, Any]:
+        """Settings the playlist's entries are queued with"""
+        return self.settings
+        
+    def flat_entries(self, playlist: dict):
+        """Yield url, id, title and uploader of each entry, paging lazily; stops when cancelled"""
+        for entry in playlist.get('entries') or ():
+            if self.is_cancelled:
+                return
+            if not entry:
+                continue
+            if entry.get('_type') in ('url', 'url_transparent'):
+                url = entry.get('url')
+            else:
+                url = entry.get('webpage_url') or entry.get('original_url') or entry.get('url')
+            if not url:
+                continue
+            yield {
+                'url': url,
+                'id': str(entry.get('id') or url),
+                'title': entry.get('title') or "",
+                'uploader': entry.get('uploader') or entry.get('channel') or "",
+            }
+            
+    def expand_playlist(self, playlist: dict):
+        count = 0
+        for entry in self.flat_entries(playlist):
+            self.playlist_entry.emit(self.download_item.id, entry)
+            count += 1
+        if self.is_cancelled:
+            return
+        self.update_playlist_info(playlist)
+        self.playlist_expanded.emit(self.download_item.id, count)
+        
+    def update_playlist_info(self, playlist: dict):
+        self.download_item.update_info(playlist.get('title') or self.download_item.url,
+                                       playlist.get('uploader') or playlist.get('channel') or "")
+
+
+class SyncWorker(InfoWorker):
+    """Sync job: queues only the entries of a channel or playlist added since its last sync.
+    
+    Sources list newest first, so paging stops at the first entry in
+    known_ids (yt-dlp's break-on-existing) and older pages are never
+    fetched, unless some of retry_ids, entries whose downloads failed, are
+    still to be listed again. Reports the new ids, pages fetched and time
+    taken through sync_finished for the manager to record.
+    """
+    sync_finished = pyqtSignal(str, dict)  # download_id, {'new_ids', 'pages', 'duration'}
+    
+    def __init__(self, download_item: DownloadItem, settings: Dict[str, Any], known_ids: Set[str] = frozenset(),
+                 retry_ids: Set[str] = frozenset()):
+        super().__init__(download_item, settings)
+        self.known_ids = known_ids
+        self.retry_ids = retry_ids
+        # Entries whose downloads failed before the sync was recorded; set on the Qt thread
+        self.failed_ids: Set[str] = set()
+        self.pages = 0
+        self._started = time.monotonic()
+        self._entry_settings = {key: value for key, value in settings.items() if key != 'sync'}
+        
+    @property
+    def entry_settings(self) -> Dict[str, Any]:
+        # Entries are plain downloads
+        return self._entry_settings
+        
+    def extract_or_expand(self, ydl: yt_dlp.YoutubeDL) -> Optional[dict]:
+        # Every request the extractor makes while listing the source is one page
+        urlopen = ydl.urlopen
+        
+        def counting_urlopen(request):
+            self.pages += 1
+            return urlopen(request)
+            
+        ydl.urlopen = counting_urlopen
+        try:
+            return super().extract_or_expand(ydl)
+        finally:
+            del ydl.urlopen
+            
+    def expand_playlist(self, playlist: dict):
+        new_ids = []
+        retries = set(self.retry_ids)
+        for entry in self.flat_entries(playlist):
+            if entry['id'] in self.known_ids:
+                if not retries:
+                    # Everything from here on was listed by an earlier sync
+                    break
+                continue
+            retries.discard(entry['id'])
+            self.playlist_entry.emit(self.download_item.id, entry)
+            new_ids.append(entry['id'])
+        if self.is_cancelled:
+            return
+        self.update_playlist_info(playlist)
+        self.sync_finished.emit(self.download_item.id, {
+            'new_ids': new_ids,
+            'pages': self.pages,
+            'duration': time.monotonic() - self._started,
+        })
+
 
 class DownloadManager(QObject):
     download_progress = pyqtSignal(str, dict)
     download_completed = pyqtSignal(str, str)
     download_error = pyqtSignal(str, str)
     info_extracted = pyqtSignal(str, str, str)
+    host_backoff_changed = pyqtSignal(str, float)  # host, seconds of backoff left (0 = cleared)
+    concurrency_changed = pyqtSignal(int, bool)  # download slots, chosen automatically
+    playlist_entry_added = pyqtSignal(object, dict)  # entry's DownloadItem, its settings
+    playlist_expanded = pyqtSignal(str, int)  # playlist's download_id, entries found
+    sync_finished = pyqtSignal(str, dict)  # sync's download_id, {'new_ids', 'pages', 'duration'}
+    disk_space_waiting = pyqtSignal(int)  # items held until their volume has room (0 = none)
     
-    def __init__(self):
+    # Length of one auto-concurrency measurement window
+    tuning_interval_ms = 5000
+    
+    # How often items held for disk space check the free space again
+    space_recheck_ms = 10000
+    
+    # How often a throttled item goes back to the queue before it is reported as failed
+    max_throttle_requeues = 5
+    
+    # Automatic retries of network failures; other failures are reported straight away
+    retry_policy = RetryPolicy()
+    
+    def __init__(self, max_concurrent_limit: int = 10, process_workers: bool = False):
         super().__init__()
         self.active_downloads: Dict[str, DownloadWorker] = {}
+        self.max_concurrent_limit = max_concurrent_limit
         self.max_concurrent_downloads = 3
-        self.download_queue = queue.Queue()
+        self.download_queue: QueueScheduler = create_scheduler('priority')
+        # Jobs run on threads, or with process_workers in recycled child processes
+        if process_workers:
+            # Imported here: process_pool builds on the workers defined in this module
+            from .process_pool import ProcessPool
+            pool_class = ProcessPool
+        else:
+            pool_class = WorkerPool
+        self.process_workers = process_workers
+        # Cookies and keep-alive connections shared by both pools' threads;
+        # worker processes cannot share them and keep sessions of their own
+        self.sessions = SessionPool()
+        pool_options = {} if process_workers else {'sessions': self.sessions}
+        self.worker_pool = pool_class(self.max_concurrent_downloads, name="download", **pool_options)
+        # Info stage: URLs waiting for extraction, resolved ahead of the download slots
+        # in the order of the same scheduling policy as the download queue
+        self.max_concurrent_extractions = 4
+        self.max_resolved_ahead = 50
+        self.info_queue: QueueScheduler = create_scheduler('priority')
+        # Unresolved items whose host is backed off, per host, until the backoff is over
+        self.parked_extractions: Dict[str, deque] = {}
+        self.active_extractions: Dict[str, InfoWorker] = {}
+        self.info_pool = pool_class(self.max_concurrent_extractions, name="info", **pool_options)
+        # Paused items hold no slot; resuming queues them again, in pause order
+        self.paused_downloads: Dict[str, Tuple[DownloadItem, Dict[str, Any]]] = {}
+        self.host_limiter = HostLimiter()
+        self.bandwidth_limiter = TokenBucket()
+        self.auto_concurrency = False
+        self.concurrency_tuner = ConcurrencyTuner(max_slots=max_concurrent_limit)
+        # Fragment connections all running downloads may open together
+        self.fragment_budget = 32
+        self.fragment_tuner = FragmentTuner()
+        self._fragment_allocations: Dict[str, int] = {}
+        self._tuning_timer: Optional[QTimer] = None
+        self._reported_bytes: Dict[str, int] = {}
+        # Queued items whose host is at its limit or backed off, per host
+        self.parked_downloads: Dict[str, deque] = {}
+        self._active_hosts: Dict[str, str] = {}
+        # Resolved items that would not fit on their output volume yet, in arrival order
+        self.disk_guard = DiskSpaceGuard()
+        self.space_waiting: deque = deque()
+        self._space_recheck_pending = False
+        # Automatic requeues per item, for throttling and network failures
+        self._retry_attempts: Dict[str, int] = {}
+        # Items waiting out their retry delay, and failed items kept for a manual retry
+        self.retrying_downloads: Dict[str, Tuple[DownloadItem, Dict[str, Any]]] = {}
+        self.failed_downloads: Dict[str, Tuple[DownloadItem, Dict[str, Any]]] = {}
+        # Canonical (extractor, video id) of every item still to download, to catch duplicates
+        self._pending_keys: Dict[Tuple[str, str], str] = {}
+        self._item_keys: Dict[str, Tuple[str, str]] = {}
+        self._announced_backoffs = set()
+        self.download_archive: Optional[DownloadArchive] = None
+        self.sync_store: Optional[SyncStore] = None
+        # Sync source key and entry id of each item a sync queued
+        self._sync_entries: Dict[str, Tuple[str, str]] = {}
+        self.info_cache: Optional[InfoCache] = None
+        
+    def set_max_concurrent(self, max_concurrent: int):
+        """Apply a new concurrency limit, clamped to 1..max_concurrent_limit.
+        
+        Raising the limit starts queued downloads straight away. Lowering it
+        never stops running workers; the pool drains down as they finish.
+        """
+        self.max_concurrent_downloads = max(1, min(int(max_concurrent), self.max_concurrent_limit))
+        self.worker_pool.resize(self.max_concurrent_downloads)
+        self.concurrency_changed.emit(self.max_concurrent_downloads, self.auto_concurrency)
+        self.start_queued_downloads()
+        
+    def set_auto_concurrency(self, enabled: bool):
+        """Let ConcurrencyTuner pick the slot count from measured throughput"""
+        self.auto_concurrency = bool(enabled)
+        if self.auto_concurrency:
+            if self._tuning_timer is None:
+                self._tuning_timer = QTimer(self)
+                self._tuning_timer.timeout.connect(self.tune_concurrency)
+            self.concurrency_tuner.reset()
+            self._tuning_timer.start(self.tuning_interval_ms)
+        elif self._tuning_timer is not None:
+            self._tuning_timer.stop()
+        slots = self.max_concurrent_downloads
+        if self.auto_concurrency:
+            slots = self.concurrency_tuner.clamp(slots)
+        self.set_max_concurrent(slots)
+        
+    def set_auto_concurrency_bounds(self, min_slots: int, max_slots: int):
+        self.concurrency_tuner.set_bounds(min(min_slots, self.max_concurrent_limit),
+                                          min(max_slots, self.max_concurrent_limit))
+        if self.auto_concurrency:
+            self.set_max_concurrent(self.concurrency_tuner.clamp(self.max_concurrent_downloads))
+            
+    def tune_concurrency(self):
+        """Close one measurement window and apply the tuner's slot count"""
+        demand = (self.queued_count() > 0
+                  and len(self.active_downloads) >= self.max_concurrent_downloads)
+        slots = self.concurrency_tuner.evaluate(self.max_concurrent_downloads, demand)
+        if slots != self.max_concurrent_downloads:
+            self.set_max_concurrent(slots)
+        
+    def set_max_concurrent_extractions(self, max_concurrent: int):
+        self.max_concurrent_extractions = max(1, int(max_concurrent))
+        self.info_pool.resize(self.max_concurrent_extractions)
+        self.start_info_jobs()
+        
+    def set_bandwidth_limit(self, bytes_per_second: int):
+        """Cap the combined rate of all downloads (0 = unlimited), including running ones"""
+        self.bandwidth_limiter.set_rate(max(0, int(bytes_per_second)))
+        
+    def set_max_per_host(self, max_per_host: int):
+        self.host_limiter.max_per_host = max(1, int(max_per_host))
+        self.start_queued_downloads()
         
+    def set_scheduling_policy(self, policy: str):
+        """Switch queue ordering ('priority', 'fair_share' or 'shortest_first'), keeping queued items"""
+        if policy == self.download_queue.name:
+            return
+        self.download_queue = self._rescheduled(self.download_queue, policy)
+        self.info_queue = self._rescheduled(self.info_queue, policy)
+        
+    @staticmethod
+    def _rescheduled(current: QueueScheduler, policy: str) -> QueueScheduler:
+        scheduler = create_scheduler(policy)
+        for entry in current.entries():
+            scheduler.put(entry)
+        return scheduler
+        
+    def set_priority(self, download_item: DownloadItem, priority: int):
+        """Give an item a new priority; a queued item changes its place in line at once"""
+        download_item.priority = int(priority)
+        self.download_queue.reprioritize(download_item.id)
+        self.info_queue.reprioritize(download_item.id)
+        
+    def move_to_top(self, download_id: str) -> bool:
+        if self.download_queue.move_to_top(download_id):
+            return True
+        # Unresolved items are extracted next, ahead of the rest of the info stage
+        if self.info_queue.move_to_top(download_id):
+            return True
+        # Items parked behind a busy host go to the front of that host's line
+        for parked in list(self.parked_downloads.values()) + list(self.parked_extractions.values()):
+            for index, entry in enumerate(parked):
+                if entry[0].id == download_id:
+                    del parked[index]
+                    parked.appendleft(entry)
+                    return True
+        return False
+        
+    def set_download_archive(self, archive: Optional[DownloadArchive]):
+        """Share archive with downloads started from now on (None turns it off)"""
+        self.download_archive = archive
+        
+    def set_info_cache(self, cache: Optional[InfoCache]):
+        """Reuse extracted info from cache in jobs started from now on (None turns it off)"""
+        self.info_cache = cache
+        
+    def set_sync_store(self, store: Optional[SyncStore]):
+        """Where sync jobs look up and record the entries they have seen"""
+        self.sync_store = store
+        
+    @staticmethod
+    def playlist_mode(settings: Optional[Dict[str, Any]]) -> bool:
+        """Whether a link to a video in a list stands for the list under settings"""
+        return bool(settings and settings.get('download_playlist', False))
+        
+    def is_archived(self, url: str, settings: Optional[Dict[str, Any]] = None) -> bool:
+        """Whether url's video was downloaded before, judged without network access"""
+        return (self.download_archive is not None
+                and self.download_archive.contains_url(url, self.playlist_mode(settings)))
+        
+    def find_duplicate(self, url: str, settings: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Id of a queued, paused or running item for the same video as url, if any.
+        
+        settings are those url would be added with: with "download_playlist"
+        off, watch?v=X&list=L is the video X rather than the list L.
+        """
+        return self._pending_keys.get(canonical_key(url, self.playlist_mode(settings)))
+        
+    def _track_key(self, download_item: DownloadItem, settings: Dict[str, Any]):
+        # Playlist entries are videos, whatever mode their playlist was added in
+        playlist = not download_item.parent_id and self.playlist_mode(settings)
+        key = canonical_key(download_item.url, playlist)
+        self._pending_keys.setdefault(key, download_item.id)
+        self._item_keys[download_item.id] = key
+        
+    def _untrack_key(self, download_id: str):
+        key = self._item_keys.pop(download_id, None)
+        if key is not None and self._pending_keys.get(key) == download_id:
+            del self._pending_keys[key]
+            
     def add_download(self, download_item: DownloadItem, settings: Dict[str, Any]):
-        if len(self.active_downloads) < self.max_concurrent_downloads:
-            self.start_download(download_item, settings)
-        else:
+        """Queue an item; unresolved URLs go through the info stage first"""
+        self._track_key(download_item, settings)
+        if download_item.info is not None:
             self.download_queue.put((download_item, settings))
+            self.start_queued_downloads()
+        else:
+            self.info_queue.put((download_item, settings))
+            self.start_info_jobs()
+            
+    def add_sync(self, download_item: DownloadItem, settings: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a sync job for the channel or playlist at download_item's URL.
+        
+        Only entries new since its last sync are queued. Returns the
+        settings the job runs with.
+        """
+        settings = dict(settings, sync=True, download_playlist=True)
+        self.add_download(download_item, settings)
+        return settings
+        
+    def restore_download(self, download_item: DownloadItem, settings: Dict[str, Any]):
+        """Take back an item journalled by an earlier session, by its last recorded status.
+        
+        Items that were queued or running are queued again; yt-dlp continues
+        their .part files. Finished and cancelled items are left alone.
+        """
+        status = download_item.status
+        if status in (DownloadStatus.COMPLETED, DownloadStatus.CANCELLED):
+            return
+        if status == DownloadStatus.ERROR:
+            self.failed_downloads[download_item.id] = (download_item, settings)
+        elif status == DownloadStatus.PAUSED:
+            self._track_key(download_item, settings)
+            self._hold_paused((download_item, settings))
+        else:
+            self.add_download(download_item, settings)
+            
+    def start_info_jobs(self):
+        """Extract queued URLs while the download queue is short of max_resolved_ahead.
+        
+        Keeps titles and sizes (which the shortest_first policy needs) ahead
+        of the download slots without resolving a whole import up front.
+        """
+        while (len(self.active_extractions) < self.max_concurrent_extractions
+               and self.queued_count() + len(self.active_extractions) < self.max_resolved_ahead):
+            try:
+                entry = self.info_queue.get_nowait()
+            except queue.Empty:
+                break
+            host = host_key(entry[0].url)
+            # Hosts that are backed off are not asked for metadata either
+            if host in self.parked_extractions or self.host_limiter.backoff_remaining(host) > 0:
+                self.parked_extractions.setdefault(host, deque()).append(entry)
+            else:
+                self.start_info_job(*entry)
+                
+    def _unpark_extractions(self):
+        """Put the unresolved items of hosts whose backoff is over back in the info stage"""
+        for host in list(self.parked_extractions):
+            if self.host_limiter.backoff_remaining(host) <= 0:
+                for entry in self.parked_extractions.pop(host):
+                    self.info_queue.put(entry)
+                    
+    def start_info_job(self, download_item: DownloadItem, settings: Dict[str, Any]):
+        if settings.get('sync'):
+            source = source_key(download_item.url)
+            if self.sync_store is not None:
+                worker = SyncWorker(download_item, settings, self.sync_store.seen_ids(source),
+                                    self.sync_store.retry_ids(source))
+            else:
+                worker = SyncWorker(download_item, settings)
+            worker.sync_finished.connect(self.on_sync_finished)
+        else:
+            worker = InfoWorker(download_item, settings)
+        worker.info_cache = self.info_cache
+            
+        worker.progress_updated.connect(self.on_progress_updated)
+        worker.info_extracted.connect(self.on_info_extracted)
+        worker.info_resolved.connect(self.on_info_resolved)
+        worker.playlist_entry.connect(self.on_playlist_entry)
+        worker.playlist_expanded.connect(self.on_playlist_expanded)
+        worker.download_error.connect(self.on_info_error)
+        worker.download_paused.connect(self.on_download_paused)
+        worker.finished.connect(self.info_worker_finished)
+        
+        self.active_extractions[download_item.id] = worker
+        self.info_pool.submit(worker)
+        
+    def on_info_resolved(self, download_id: str):
+        worker = self.active_extractions.get(download_id)
+        if worker is None:
+            return
+        item = worker.download_item
+        self.download_progress.emit(download_id, {'status': 'queued', 'total_bytes': item.estimated_size})
+        self.download_queue.put((item, worker.settings))
+        self.start_queued_downloads()
+        
+    def on_playlist_entry(self, playlist_id: str, entry: dict):
+        """Queue one entry of an expanding playlist as an item of its own"""
+        worker = self.active_extractions.get(playlist_id)
+        if worker is None or worker.is_cancelled:
+            return
+        playlist, settings = worker.download_item, worker.entry_settings
+        if self.find_duplicate(entry['url']):
+            return
+        if settings.get('use_download_archive', True) and self.is_archived(entry['url']):
+            return
+        item = DownloadItem(entry['url'], batch_id=playlist.batch_id or playlist.id, priority=playlist.priority)
+        item.parent_id = playlist.id
+        item.bandwidth_weight = playlist.bandwidth_weight
+        item.update_info(entry['title'], entry['uploader'])
+        if isinstance(worker, SyncWorker):
+            # Forgotten by the sync store again if its download fails
+            self._sync_entries[item.id] = (source_key(playlist.url), entry['id'])
+        self.playlist_entry_added.emit(item, settings)
+        self.add_download(item, settings)
+        
+    def on_playlist_expanded(self, playlist_id: str, count: int):
+        """The playlist's entries are all queued; its own item is done"""
+        self._untrack_key(playlist_id)
+        self._retry_attempts.pop(playlist_id, None)
+        self.playlist_expanded.emit(playlist_id, count)
+        
+    def on_sync_finished(self, download_id: str, stats: dict):
+        """Remember the entries a sync found, so the next one stops where this one started"""
+        worker = self.active_extractions.get(download_id)
+        if worker is not None and self.sync_store is not None:
+            source = source_key(worker.download_item.url)
+            self.sync_store.record_sync(source, stats['new_ids'], stats['pages'], stats['duration'])
+            for entry_id in worker.failed_ids:
+                self.sync_store.record_failure(source, entry_id)
+        self._untrack_key(download_id)
+        self._retry_attempts.pop(download_id, None)
+        self.sync_finished.emit(download_id, stats)
+        
+    def on_info_error(self, download_id: str, error: str):
+        worker = self.active_extractions.get(download_id)
+        if worker is None:
+            self.download_error.emit(download_id, error)
+            return
+        host = host_key(worker.download_item.url)
+        if self._requeue_failed(worker, error, host, lambda entry: self.info_queue.put(entry)):
+            return
+        self._report_failed((worker.download_item, worker.settings), error)
+        
+    def info_worker_finished(self, download_id: str):
+        # Only dropped, not deleteLater()'d: see worker_finished
+        self.active_extractions.pop(download_id, None)
+        self.start_info_jobs()
+            
+    def start_queued_downloads(self):
+        while len(self.active_downloads) < self.max_concurrent_downloads:
+            entry = self._next_admissible_download()
+            if entry is None:
+                break
+            self.start_download(*entry)
+            
+    def _next_admissible_download(self) -> Optional[Tuple[DownloadItem, Dict[str, Any]]]:
+        """Take the next download whose host may start now and that fits on its volume.
+        
+        Items for a host that is at its limit or backed off are parked per
+        host, so one busy site never holds up the queue for the others.
+        Items too large for the free space left are held in space_waiting;
+        they get the first look whenever space frees up. Items too large
+        even with nothing else running on their volume fail instead.
+        """
+        for entry in [entry for entry in self.space_waiting if self._never_fits(entry)]:
+            self.space_waiting.remove(entry)
+            self.disk_space_waiting.emit(len(self.space_waiting))
+            self._fail_for_space(entry)
+        for index, entry in enumerate(self.space_waiting):
+            if self.host_limiter.can_start(host_key(entry[0].url)) and self._fits_on_disk(entry):
+                del self.space_waiting[index]
+                self.disk_space_waiting.emit(len(self.space_waiting))
+                return entry
+                
+        for host, parked in list(self.parked_downloads.items()):
+            while parked and self.host_limiter.can_start(host):
+                entry = parked.popleft()
+                if not parked:
+                    del self.parked_downloads[host]
+                if self._fits_on_disk(entry):
+                    return entry
+                self._hold_for_space(entry)
+                
+        while True:
+            try:
+                entry = self.download_queue.get_nowait()
+            except queue.Empty:
+                return None
+            host = host_key(entry[0].url)
+            if host in self.parked_downloads or not self.host_limiter.can_start(host):
+                self.parked_downloads.setdefault(host, deque()).append(entry)
+            elif self._fits_on_disk(entry):
+                return entry
+            else:
+                self._hold_for_space(entry)
+                
+    def _space_needed(self, entry: Tuple[DownloadItem, Dict[str, Any]]) -> Tuple[str, int]:
+        item, settings = entry
+        output_dir = settings.get('output_dir', os.path.expanduser('~/Downloads'))
+        return output_dir, self.disk_guard.reservation(item.estimated_size, settings)
+        
+    def _fits_on_disk(self, entry: Tuple[DownloadItem, Dict[str, Any]]) -> bool:
+        return self.disk_guard.can_start(*self._space_needed(entry))
+        
+    def _never_fits(self, entry: Tuple[DownloadItem, Dict[str, Any]]) -> bool:
+        return self.disk_guard.never_fits(*self._space_needed(entry))
+        
+    def _fail_for_space(self, entry: Tuple[DownloadItem, Dict[str, Any]]):
+        output_dir, needed = self._space_needed(entry)
+        available = max(0, self.disk_guard.available(output_dir))
+        self._report_failed(entry, f"Not enough disk space in {output_dir}: needs {needed / 1024 ** 2:.0f} MB, "
+                                   f"{available / 1024 ** 2:.0f} MB available")
+        
+    def _hold_for_space(self, entry: Tuple[DownloadItem, Dict[str, Any]]):
+        if self._never_fits(entry):
+            self._fail_for_space(entry)
+            return
+        self.space_waiting.append(entry)
+        self.download_progress.emit(entry[0].id, {'status': 'waiting_for_space'})
+        self.disk_space_waiting.emit(len(self.space_waiting))
+        if not self._space_recheck_pending:
+            # Space also frees up outside the app, so look again now and then
+            self._space_recheck_pending = True
+            QTimer.singleShot(self.space_recheck_ms, self.on_space_recheck)
+            
+    def on_space_recheck(self):
+        self._space_recheck_pending = False
+        self.start_queued_downloads()
+        if self.space_waiting and not self._space_recheck_pending:
+            self._space_recheck_pending = True
+            QTimer.singleShot(self.space_recheck_ms, self.on_space_recheck)
+            
+    def queued_count(self) -> int:
+        """Resolved items waiting for a download slot"""
+        return (self.download_queue.qsize() + sum(len(parked) for parked in self.parked_downloads.values())
+                + len(self.space_waiting))
             
     def start_download(self, download_item: DownloadItem, settings: Dict[str, Any]):
         worker = DownloadWorker(download_item, settings)
+        worker.rate_limiter = self.bandwidth_limiter
+        worker.fragment_tuner = self.fragment_tuner
+        worker.download_archive = self.download_archive
+        worker.info_cache = self.info_cache
+        worker.fragment_workers = self.allocate_fragment_workers(download_item, settings)
         
         # Connect signals
         worker.progress_updated.connect(self.on_progress_updated)
         worker.info_extracted.connect(self.on_info_extracted)
         worker.download_completed.connect(self.on_download_completed)
         worker.download_error.connect(self.on_download_error)
-        worker.finished.connect(lambda: self.worker_finished(download_item.id))
+        worker.download_paused.connect(self.on_download_paused)
+        worker.finished.connect(self.worker_finished)
+        
+        host = host_key(download_item.url)
+        self.host_limiter.acquire(host)
+        self._active_hosts[download_item.id] = host
+        self.disk_guard.acquire(download_item.id, *self._space_needed((download_item, settings)))
         
         self.active_downloads[download_item.id] = worker
-        worker.start()
+        self.worker_pool.submit(worker)
+        
+    def allocate_fragment_workers(self, download_item: DownloadItem, settings: Dict[str, Any]) -> int:
+        """Grant a download its fragment workers out of fragment_budget.
+        
+        The item's 'concurrent_fragments' setting is used as asked, 0 means
+        auto (learned per host). Each download gets at most an even share of
+        the budget for the current slot count, and never less than one.
+        """
+        requested = int(settings.get('concurrent_fragments') or 0)
+        if requested <= 0:
+            requested = self.fragment_tuner.workers_for(host_key(download_item.url))
+        share = self.fragment_budget // max(1, self.max_concurrent_downloads)
+        free = self.fragment_budget - sum(self._fragment_allocations.values())
+        workers = max(1, min(requested, share, free))
+        self._fragment_allocations[download_item.id] = workers
+        return workers
         
     def on_progress_updated(self, download_id: str, progress: dict):
+        downloaded = progress.get('downloaded_bytes')
+        if downloaded:
+            # Reports are cumulative per file; a drop means the next file started
+            previous = self._reported_bytes.get(download_id, downloaded)
+            self._reported_bytes[download_id] = downloaded
+            if downloaded > previous:
+                self.concurrency_tuner.record_bytes(downloaded - previous)
+                self.disk_guard.record_written(download_id, downloaded - previous)
         self.download_progress.emit(download_id, progress)
         
     def on_info_extracted(self, download_id: str, title: str, uploader: str):
         self.info_extracted.emit(download_id, title, uploader)
         
     def on_download_completed(self, download_id: str, filepath: str):
+        self.concurrency_tuner.record_outcome(error=False)
+        self._sync_entries.pop(download_id, None)
+        self._retry_attempts.pop(download_id, None)
+        self._untrack_key(download_id)
+        self._release_info(download_id)
+        host = self._active_hosts.get(download_id)
+        if host and self.host_limiter.record_success(host):
+            self._announced_backoffs.discard(host)
+            self.host_backoff_changed.emit(host, 0.0)
+            self._unpark_extractions()
         self.download_completed.emit(download_id, filepath)
         
     def on_download_error(self, download_id: str, error: str):
-        self.download_error.emit(download_id, error)
+        self.concurrency_tuner.record_outcome(error=True)
+        host = self._active_hosts.get(download_id)
+        worker = self.active_downloads.get(download_id)
+        if host is None or worker is None:
+            self.download_error.emit(download_id, error)
+            return
+        if self._requeue_failed(worker, error, host,
+                                lambda entry: self.parked_downloads.setdefault(host, deque()).append(entry)):
+            return
+        # Format URLs are signed and expire; a retry extracts afresh
+        self._release_info(download_id)
+        self._report_failed((worker.download_item, worker.settings), error)
+        
+    def _requeue_failed(self, worker: DownloadWorker, error: str, host: str,
+                        park: Callable[[Tuple[DownloadItem, Dict[str, Any]]], None]) -> bool:
+        """Put a failed item back in line if its error may go away; True if it was.
+        
+        Throttled items are handed to park and wait out the host's backoff.
+        Network failures are queued again after retry_policy's delay. Either
+        way the item is extracted afresh: its format URLs are signed and
+        expire, and a 403 often means they have.
+        """
+        item = worker.download_item
+        attempts = self._retry_attempts.get(item.id, 0)
+        kind = classify_error(error)
+        if kind == ErrorKind.RATE_LIMITED:
+            self.back_off_host(host)
+            if attempts >= self.max_throttle_requeues:
+                return False
+            self._retry_attempts[item.id] = attempts + 1
+            self._forget_info(item)
+            park((item, worker.settings))
+            self.download_progress.emit(item.id, {'status': 'rate_limited'})
+            return True
+            
+        if not self.retry_policy.should_retry(kind, attempts):
+            return False
+        self._retry_attempts[item.id] = attempts + 1
+        delay = self.retry_policy.delay(attempts + 1)
+        self._forget_info(item)
+        self.retrying_downloads[item.id] = (item, worker.settings)
+        self.download_progress.emit(item.id, {'status': 'retrying', 'attempt': attempts + 1, 'retry_in': delay})
+        QTimer.singleShot(int(delay * 1000), lambda: self.on_retry_due(item.id))
+        return True
+        
+    def _forget_info(self, item: DownloadItem):
+        item.info = None
+        if self.info_cache is not None:
+            self.info_cache.invalidate(item.url)
+            
+    def on_retry_due(self, download_id: str):
+        # Gone if it was paused, cancelled or cleared while waiting
+        entry = self.retrying_downloads.pop(download_id, None)
+        if entry is not None:
+            self.download_progress.emit(download_id, {'status': 'queued'})
+            self.add_download(*entry)
+            
+    def _report_failed(self, entry: Tuple[DownloadItem, Dict[str, Any]], error: str):
+        item = entry[0]
+        self._retry_attempts.pop(item.id, None)
+        self._untrack_key(item.id)
+        sync_entry = self._sync_entries.pop(item.id, None)
+        if sync_entry is not None and self.sync_store is not None:
+            self.sync_store.record_failure(*sync_entry)
+            sync = self.active_extractions.get(item.parent_id)
+            if isinstance(sync, SyncWorker):
+                # Still expanding; recording the sync would mark the entry seen again
+                sync.failed_ids.add(sync_entry[1])
+        self.failed_downloads[item.id] = entry
+        self.download_error.emit(item.id, error)
+        
+    def retry_download(self, download_id: str) -> bool:
+        """Queue a failed item again with the settings it was added with.
+        
+        Returns False if the manager does not know the item as failed.
+        """
+        entry = self.failed_downloads.pop(download_id, None)
+        if entry is None:
+            return False
+        self.download_progress.emit(download_id, {'status': 'queued'})
+        self.add_download(*entry)
+        return True
+        
+    def requeue(self, download_item: DownloadItem, settings: Dict[str, Any]) -> bool:
+        """Queue a finished or cancelled item again, extracting it afresh.
+        
+        Returns False, doing nothing, while the item is still queued, paused
+        or running, or when the same video is.
+        """
+        if download_item.id in self._item_keys or self.find_duplicate(download_item.url, settings):
+            return False
+        download_item.info = None
+        self.download_progress.emit(download_item.id, {'status': 'queued'})
+        self.add_download(download_item, settings)
+        return True
+        
+    def _release_info(self, download_id: str):
+        worker = self.active_downloads.get(download_id)
+        if worker is not None:
+            worker.download_item.info = None
+            
+    def back_off_host(self, host: str):
+        delay = self.host_limiter.record_throttled(host)
+        self._announced_backoffs.add(host)
+        self.host_backoff_changed.emit(host, delay)
+        QTimer.singleShot(int(delay * 1000) + 50, self.on_backoff_expired)
+        
+    def on_backoff_expired(self):
+        for host in list(self._announced_backoffs):
+            if self.host_limiter.backoff_remaining(host) <= 0:
+                self._announced_backoffs.discard(host)
+                self.host_backoff_changed.emit(host, 0.0)
+        self._unpark_extractions()
+        self.start_queued_downloads()
+        self.start_info_jobs()
         
     def worker_finished(self, download_id: str):
-        if download_id in self.active_downloads:
-            del self.active_downloads[download_id]
+        # Not deleteLater(): the pool thread may still be inside the emit that
+        # got here. The worker goes once that thread drops it too; PyQt hands
+        # a QObject released on another thread back to this one to delete
+        self.active_downloads.pop(download_id, None)
+        self._reported_bytes.pop(download_id, None)
+        self._fragment_allocations.pop(download_id, None)
+        self.disk_guard.release(download_id)
             
-        # Start next download from queue
-        if not self.download_queue.empty():
-            try:
-                download_item, settings = self.download_queue.get_nowait()
-                self.start_download(download_item, settings)
-            except queue.Empty:
-                pass
+        host = self._active_hosts.pop(download_id, None)
+        if host is not None:
+            self.host_limiter.release(host)
+            
+        # Start next downloads from queue, if the limit still allows it,
+        # then top the resolved queue back up
+        self.start_queued_downloads()
+        self.start_info_jobs()
                 
     def pause_download(self, download_id: str):
-        if download_id in self.active_downloads:
-            self.active_downloads[download_id].pause()
+        """Stop an item without losing progress; it stops holding a download slot"""
+        worker = self.active_downloads.get(download_id) or self.active_extractions.get(download_id)
+        if worker is not None:
+            # Stops at the next progress update, reported through on_download_paused
+            worker.pause()
+            return
+        entry = self._take_queued(download_id)
+        if entry is not None:
+            self._hold_paused(entry)
             
     def resume_download(self, download_id: str):
-        if download_id in self.active_downloads:
+        entry = self.paused_downloads.pop(download_id, None)
+        if entry is not None:
+            self.download_progress.emit(download_id, {'status': 'queued'})
+            self.add_download(*entry)
+        elif download_id in self.active_downloads:
             self.active_downloads[download_id].resume()
+        elif download_id in self.active_extractions:
+            self.active_extractions[download_id].resume()
             
-    def cancel_download(self, download_id: str):
-        if download_id in self.active_downloads:
-            self.active_downloads[download_id].cancel()
+    def on_download_paused(self, download_id: str):
+        worker = self.active_downloads.get(download_id)
+        if worker is not None:
+            # Signed format URLs may have expired by the time it resumes;
+            # the item is extracted again and yt-dlp continues the .part file
+            worker.download_item.info = None
+        else:
+            worker = self.active_extractions.get(download_id)
+        if worker is None:
+            return
+        if worker.is_paused:
+            self._hold_paused((worker.download_item, worker.settings))
+        else:
+            # Resumed before the pause took effect
+            self.add_download(worker.download_item, worker.settings)
             
+    def _hold_paused(self, entry: Tuple[DownloadItem, Dict[str, Any]]):
+        self.paused_downloads[entry[0].id] = entry
+        self.download_progress.emit(entry[0].id, {'status': 'paused'})
+        
+    def _take_queued(self, download_id: str) -> Optional[Tuple[DownloadItem, Dict[str, Any]]]:
+        """Remove an item that is waiting in any stage's queue and return its entry"""
+        entry = self.download_queue.remove(download_id)
+        if entry is not None:
+            return entry
+        for host, parked in list(self.parked_downloads.items()):
+            for index, entry in enumerate(parked):
+                if entry[0].id == download_id:
+                    del parked[index]
+                    if not parked:
+                        del self.parked_downloads[host]
+                    return entry
+        for index, entry in enumerate(self.space_waiting):
+            if entry[0].id == download_id:
+                del self.space_waiting[index]
+                self.disk_space_waiting.emit(len(self.space_waiting))
+                return entry
+        entry = self.info_queue.remove(download_id)
+        if entry is not None:
+            return entry
+        for host, parked in list(self.parked_extractions.items()):
+            for index, entry in enumerate(parked):
+                if entry[0].id == download_id:
+                    del parked[index]
+                    if not parked:
+                        del self.parked_extractions[host]
+                    return entry
+        return self.retrying_downloads.pop(download_id, None)
+        
+    def cancel_download(self, download_id: str):
+        """Cancel an item without blocking.
+        
+        Running jobs stop at their next progress update and clean up their
+        partial files on their own thread; the slot is freed once they exit.
+        """
+        worker = self.active_downloads.get(download_id) or self.active_extractions.get(download_id)
+        if worker is not None:
+            worker.cancel()
+        elif self._take_queued(download_id) is None and self.paused_downloads.pop(download_id, None) is None:
+            self.failed_downloads.pop(download_id, None)
+            return
+        self._retry_attempts.pop(download_id, None)
+        self._untrack_key(download_id)
+        self.download_progress.emit(download_id, {'status': 'cancelled'})
+        
     def pause_all(self):
-        for worker in self.active_downloads.values():
+        for worker in list(self.active_downloads.values()) + list(self.active_extractions.values()):
             worker.pause()
+        # Hold everything still waiting as well, or it would take the freed slots
+        waiting = self.download_queue.entries()
+        for parked in self.parked_downloads.values():
+            waiting.extend(parked)
+        waiting.extend(self.space_waiting)
+        waiting.extend(self.info_queue.entries())
+        for parked in self.parked_extractions.values():
+            waiting.extend(parked)
+        waiting.extend(self.retrying_downloads.values())
+        self.download_queue.clear()
+        self.parked_downloads.clear()
+        if self.space_waiting:
+            self.space_waiting.clear()
+            self.disk_space_waiting.emit(0)
+        self.info_queue.clear()
+        self.parked_extractions.clear()
+        self.retrying_downloads.clear()
+        for entry in waiting:
+            self._hold_paused(entry)
             
     def resume_all(self):
-        for worker in self.active_downloads.values():
+        for worker in list(self.active_downloads.values()) + list(self.active_extractions.values()):
             worker.resume()
+        for download_id in list(self.paused_downloads):
+            self.resume_download(download_id)
             
     def clear_all(self):
         # Cancel all active downloads
@@ -453,12 +1564,51 @@ class DownloadManager(QObject):
             
         self.active_downloads.clear()
         
+        for worker in self.active_extractions.values():
+            worker.cancel()
+        self.active_extractions.clear()
+        self.info_queue.clear()
+        self.parked_extractions.clear()
+        
         # Clear the queue
         while not self.download_queue.empty():
             try:
                 self.download_queue.get_nowait()
             except queue.Empty:
                 break
+        self.parked_downloads.clear()
+        if self.space_waiting:
+            self.space_waiting.clear()
+            self.disk_space_waiting.emit(0)
+        self.disk_guard.clear()
+        self.paused_downloads.clear()
+        self.retrying_downloads.clear()
+        self.failed_downloads.clear()
+        self._retry_attempts.clear()
+        self._pending_keys.clear()
+        self._item_keys.clear()
+        self._fragment_allocations.clear()
                 
-    def cleanup(self):
-        self.clear_all()
\ No newline at end of file
+    def cleanup(self, timeout: float = 5.0, keep_partial_files: bool = False) -> bool:
+        """Cancel everything and stop both pools, waiting at most timeout seconds overall.
+        
+        All jobs are cancelled before any thread is joined, so they wind
+        down in parallel. With keep_partial_files running jobs are paused
+        instead, leaving their .part files to continue from later. Returns
+        False if some thread outlived the deadline.
+        """
+        if keep_partial_files:
+            for worker in list(self.active_downloads.values()) + list(self.active_extractions.values()):
+                worker.pause()
+            self.active_downloads.clear()
+            self.active_extractions.clear()
+        self.clear_all()
+        pools = (self.worker_pool, self.info_pool)
+        for pool in pools:
+            pool.stop()
+        deadline = time.monotonic() + timeout
+        stopped = all([pool.join(max(0.0, deadline - time.monotonic())) for pool in pools])
+        if stopped:
+            # Threads still running past the deadline may be using them
+            self.sessions.close()
+        return stopped
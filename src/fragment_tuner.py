@@ -0,0 +1,76 @@
+"""
+Per-host tuning of concurrent fragment downloads for HLS/DASH streams
+"""
+
+import math
+import threading
+from typing import Dict, Optional
+
+
+class _HostFragments:
+    def __init__(self):
+        self.latency = 0.0  # seconds one fragment takes on one connection (EWMA)
+        self.best_workers = 0
+        self.best_throughput = 0.0
+        self.next_workers: Optional[int] = None
+        self.settled = False
+
+
+class FragmentTuner:
+    """Chooses concurrent_fragment_downloads per host from finished downloads.
+
+    yt-dlp fixes the fragment worker count when a download starts, so the
+    tuner learns between downloads. The first fragmented download from a
+    host starts with enough workers to hide its per-fragment latency
+    (latency / target_fragment_seconds). Later downloads double the count
+    while that raises throughput by at least min_gain, then settle on the
+    best count seen. Thread-safe: workers report from their own threads.
+    """
+
+    def __init__(self, min_workers: int = 1, max_workers: int = 16, initial_workers: int = 4,
+                 target_fragment_seconds: float = 0.25, min_gain: float = 0.15):
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.initial_workers = initial_workers
+        self.target_fragment_seconds = target_fragment_seconds
+        self.min_gain = min_gain
+        self._hosts: Dict[str, _HostFragments] = {}
+        self._lock = threading.Lock()
+
+    def workers_for(self, host: str) -> int:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.next_workers is None:
+                return self.initial_workers
+            return state.next_workers
+
+    def observe(self, host: str, workers: int, fragments: int, elapsed: float, nbytes: int):
+        """Record a finished fragmented download made with the given worker count"""
+        if fragments < 2 or elapsed <= 0:
+            return
+        throughput = nbytes / elapsed
+        latency = elapsed * workers / fragments
+        with self._lock:
+            state = self._hosts.setdefault(host, _HostFragments())
+            state.latency = latency if not state.latency else 0.7 * state.latency + 0.3 * latency
+            # Workers needed to keep a fragment finishing every target_fragment_seconds
+            wanted = self._clamp(math.ceil(state.latency / self.target_fragment_seconds))
+
+            if state.best_workers == 0:
+                state.best_workers, state.best_throughput = workers, throughput
+            elif workers == state.best_workers:
+                state.best_throughput = 0.7 * state.best_throughput + 0.3 * throughput
+            elif throughput >= state.best_throughput * (1 + self.min_gain):
+                state.best_workers, state.best_throughput = workers, throughput
+                state.settled = False
+            elif workers > state.best_workers:
+                # More connections bought nothing; stay at the best count
+                state.settled = True
+
+            if state.settled or state.best_workers >= wanted:
+                state.next_workers = state.best_workers
+            else:
+                state.next_workers = self._clamp(max(state.best_workers * 2, 2))
+
+    def _clamp(self, workers: int) -> int:
+        return max(self.min_workers, min(int(workers), self.max_workers))
@@ -0,0 +1,397 @@
+"""
+Headless runner: downloads URL lists through DownloadManager without the GUI
+
+    python main.py --headless [-c settings.json] [-a urls.txt | -a -] [URL ...]
+    python main.py --headless --serve PORT [...]
+    python main.py --headless --shared-queue backlog.db [-a urls.txt] [URL ...]
+
+Settings come from a JSON config file with the keys SettingsWidget
+produces (see DEFAULT_SETTINGS); command line options override them.
+Only QtCore is used, so it runs on machines without a display. With
+--serve it keeps running as a daemon until interrupted, taking URLs
+through the control API (src/control_api.py) as well. With --shared-queue
+the URLs go into a backlog file other machines drain too
+(src/shared_queue.py), and the run ends once the whole backlog is done.
+
+Exit status: 0 when every URL was downloaded or skipped as already
+downloaded, 1 when any download failed, 2 for usage and config errors,
+130 when interrupted.
+"""
+
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer
+from .control_api import ControlServer
+from .download_archive import DownloadArchive
+from .info_cache import InfoCache
+from .download_item import DownloadItem
+from .download_manager import DownloadManager, JobLogger
+from .shared_queue import SharedQueue, SharedQueueNode
+from .url_import import UrlFileReader, UrlImport, parse_batch_lines
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+# What SettingsWidget gives on a fresh install
+DEFAULT_SETTINGS: Dict[str, Any] = {
+    'output_dir': os.path.expanduser('~/Downloads'),
+    'output_template': '%(title)s.%(ext)s',
+    'format': 'bestvideo+bestaudio/best',
+    'extract_audio': False,
+    'audio_format': 'mp3',
+    'audio_quality': '192',
+    'download_subtitles': False,
+    'embed_subtitles': False,
+    'subtitle_languages': 'en',
+    'write_thumbnail': False,
+    'add_metadata': False,
+    'download_playlist': False,
+    'use_download_archive': True,
+    'use_info_cache': True,
+    'process_workers': False,
+    'archive_file': '',
+    'info_cache_file': '',
+    'max_concurrent': 3,
+    'auto_concurrency': False,
+    'auto_concurrency_min': 1,
+    'auto_concurrency_max': 10,
+    'max_per_host': 3,
+    'bandwidth_limit': 0,
+    'concurrent_fragments': 0,
+    'scheduling_policy': 'priority',
+    'custom_args': '',
+}
+
+# How load_settings() names the JSON type a setting must have
+JSON_TYPE_NAMES = {bool: "true or false", int: "a whole number", float: "a number", str: "a string"}
+
+
+def load_settings(path: Optional[str]) -> Dict[str, Any]:
+    """DEFAULT_SETTINGS overridden by the JSON object in path; raises ValueError if it is unusable"""
+    settings = dict(DEFAULT_SETTINGS)
+    if not path:
+        return settings
+    try:
+        with open(path, encoding='utf-8') as config_file:
+            config = json.load(config_file)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"cannot read config {path}: {e}")
+    if not isinstance(config, dict):
+        raise ValueError(f"config {path} must hold a JSON object")
+    unknown = sorted(set(config) - set(DEFAULT_SETTINGS))
+    if unknown:
+        raise ValueError(f"unknown setting{'s' if len(unknown) != 1 else ''} in {path}: {', '.join(unknown)}")
+    for key, value in config.items():
+        expected = type(DEFAULT_SETTINGS[key])
+        # bool is an int to isinstance(); a whole number does for a float
+        accepted = (int, float) if expected is float else expected
+        if isinstance(value, bool) != (expected is bool) or not isinstance(value, accepted):
+            raise ValueError(f"setting {key} in {path} must be {JSON_TYPE_NAMES[expected]}, "
+                             f"not {json.dumps(value)}")
+    settings.update(config)
+    settings['output_dir'] = os.path.expanduser(settings['output_dir'])
+    return settings
+
+
+def apply_settings(manager: DownloadManager, settings: Dict[str, Any]):
+    """Configure manager as MainWindow does from the settings panel"""
+    manager.set_max_concurrent(settings['max_concurrent'])
+    manager.set_max_per_host(settings['max_per_host'])
+    manager.set_scheduling_policy(settings['scheduling_policy'])
+    manager.set_bandwidth_limit(settings['bandwidth_limit'])
+    manager.set_auto_concurrency_bounds(settings['auto_concurrency_min'], settings['auto_concurrency_max'])
+    if settings['auto_concurrency']:
+        manager.set_auto_concurrency(True)
+
+
+def format_rate(bytes_per_second: float) -> str:
+    for unit in ('B/s', 'KiB/s', 'MiB/s'):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.1f} {unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} GiB/s"
+
+
+class HeadlessRun(QObject):
+    """Feeds URLs to a DownloadManager, prints a progress line every interval
+    seconds and quits the application once every item has finished.
+    """
+
+    # URLs queued per event loop pass, as MainWindow.import_chunk_size
+    chunk_size = 500
+    # Set when serving the control API; the run then only ends when interrupted
+    serving = False
+    # Set to drain a shared backlog: URLs are added to it, and this node downloads what it claims
+    shared_node: Optional[SharedQueueNode] = None
+
+    def __init__(self, manager: DownloadManager, urls: Iterable[str], settings: Dict[str, Any],
+                 interval: float = 1.0, out: Optional[TextIO] = None):
+        super().__init__()
+        self.manager = manager
+        self.url_import = UrlImport(urls, settings)
+        self.out = out or sys.stderr
+        self.items: Dict[str, DownloadItem] = {}
+        self.pending = set()  # ids neither completed nor failed yet
+        self.completed = 0
+        self.failed: List[DownloadItem] = []
+        self.speeds: Dict[str, float] = {}
+        self.started = time.monotonic()
+        self.interrupted = False
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(max(1, int(interval * 1000)))
+        self.progress_timer.timeout.connect(self.print_progress)
+
+        manager.download_progress.connect(self.on_progress)
+        manager.download_completed.connect(self.on_completed)
+        manager.download_error.connect(self.on_error)
+        manager.playlist_entry_added.connect(self.on_entry_added)
+        manager.playlist_expanded.connect(lambda download_id, count: self.on_completed(download_id, ""))
+        manager.sync_finished.connect(lambda download_id, stats: self.on_completed(download_id, ""))
+
+    def start(self):
+        self.progress_timer.start()
+        if self.shared_node is not None:
+            self.shared_node.start()
+        self.enqueue_next_chunk()
+
+    def enqueue_next_chunk(self):
+        url_import = self.url_import
+        use_archive = url_import.settings.get('use_download_archive', True)
+        if self.shared_node is not None:
+            self.add_to_shared_queue(url_import.take(self.chunk_size), use_archive)
+            urls = ()
+        else:
+            urls = url_import.take(self.chunk_size)
+        for url in urls:
+            if self.manager.find_duplicate(url, url_import.settings):
+                url_import.duplicates += 1
+            elif use_archive and self.manager.is_archived(url, url_import.settings):
+                url_import.archived += 1
+            else:
+                download_item = DownloadItem(url, batch_id=url_import.batch_id)
+                self.track(download_item)
+                self.manager.add_download(download_item, url_import.settings)
+                url_import.added += 1
+        if url_import.done:
+            self.check_finished()
+        else:
+            QTimer.singleShot(0, self.enqueue_next_chunk)
+
+    def add_to_shared_queue(self, urls: Iterable[str], use_archive: bool):
+        url_import = self.url_import
+        fresh = []
+        for url in urls:
+            if use_archive and self.manager.is_archived(url, url_import.settings):
+                url_import.archived += 1
+            else:
+                fresh.append(url)
+        added = self.shared_node.store.add(fresh, url_import.settings)
+        # Already in the backlog, added here or by another node
+        url_import.duplicates += len(fresh) - added
+        url_import.added += added
+
+    def track(self, download_item: DownloadItem):
+        self.items[download_item.id] = download_item
+        self.pending.add(download_item.id)
+
+    def on_entry_added(self, download_item: DownloadItem, settings: dict):
+        self.track(download_item)
+
+    def on_items_added(self, download_items: List[DownloadItem], settings: dict):
+        for download_item in download_items:
+            self.track(download_item)
+
+    def on_progress(self, download_id: str, progress: dict):
+        if progress.get('status') == 'cancelled':
+            # Through the control API, or dropped by the shared queue node
+            self.forget(download_id)
+        elif download_id in self.items:
+            self.speeds[download_id] = progress.get('speed') or self.speeds.get(download_id, 0)
+
+    def on_completed(self, download_id: str, filepath: str):
+        if download_id in self.pending:
+            self.pending.discard(download_id)
+            self.speeds.pop(download_id, None)
+            self.completed += 1
+            self.check_finished()
+
+    def on_error(self, download_id: str, error: str):
+        if download_id in self.pending:
+            self.pending.discard(download_id)
+            self.speeds.pop(download_id, None)
+            item = self.items[download_id]
+            item.set_error(error)
+            self.failed.append(item)
+            self.check_finished()
+
+    def forget(self, download_id: str):
+        """Stop waiting for an item this run no longer downloads"""
+        self.pending.discard(download_id)
+        self.speeds.pop(download_id, None)
+        self.check_finished()
+
+    def check_finished(self):
+        if self.url_import.done and not self.pending and not self.serving:
+            if self.shared_node is None or self.shared_node.is_drained():
+                QCoreApplication.quit()
+
+    def interrupt(self):
+        self.interrupted = True
+        QCoreApplication.quit()
+
+    def print_progress(self):
+        elapsed = int(time.monotonic() - self.started)
+        speed = sum(self.speeds.values())
+        print(f"[{elapsed // 60:02d}:{elapsed % 60:02d}] {len(self.manager.active_downloads)} downloading, "
+              f"{len(self.pending) - len(self.manager.active_downloads)} waiting, {self.completed} done, "
+              f"{len(self.failed)} failed, {format_rate(speed)}", file=self.out, flush=True)
+
+    def print_summary(self):
+        for item in self.failed:
+            print(f"FAILED {item.url}: {item.error_message}", file=self.out)
+        skipped = self.url_import.duplicates + self.url_import.archived
+        cache = ""
+        if self.manager.info_cache is not None:
+            stats = self.manager.info_cache.stats()
+            cache = f"; info cache {stats['hits']} hits, {stats['misses']} misses"
+        print(f"{self.completed} done, {len(self.failed)} failed, {skipped} skipped "
+              f"in {time.monotonic() - self.started:.0f}s{cache}", file=self.out, flush=True)
+
+    def exit_code(self) -> int:
+        if self.interrupted:
+            return EXIT_INTERRUPTED
+        return EXIT_FAILED if self.failed else EXIT_OK
+
+
+def parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="yt-leechr --headless",
+                                     description="Download URLs with YT Leechr without the GUI.")
+    parser.add_argument('urls', nargs='*', metavar='URL', help="URLs to download")
+    parser.add_argument('-a', '--batch-file', action='append', default=[], metavar='FILE',
+                        help="text, CSV or yt-dlp batch file of URLs; '-' reads standard input")
+    parser.add_argument('-c', '--config', metavar='FILE', help="JSON settings file")
+    parser.add_argument('-o', '--output-dir', help="download directory")
+    parser.add_argument('-f', '--format', help="yt-dlp format selector")
+    parser.add_argument('-j', '--max-concurrent', type=int, metavar='N', help="parallel downloads")
+    parser.add_argument('--archive', metavar='FILE', help="download archive to record to and skip from")
+    parser.add_argument('--info-cache', metavar='FILE',
+                        help="cache of extracted video info to reuse across runs")
+    parser.add_argument('--interval', type=float, default=1.0, metavar='SECONDS',
+                        help="seconds between progress lines (default 1)")
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help="keep running and serve the control API on 127.0.0.1:PORT "
+                             "(token from YT_LEECHR_CONTROL_TOKEN)")
+    parser.add_argument('--shared-queue', metavar='FILE',
+                        help="SQLite backlog shared with other machines: URLs given are added to it "
+                             "and this node downloads items until it is drained")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print yt-dlp's output too")
+    return parser.parse_args(argv)
+
+
+def read_urls(urls: List[str], batch_files: List[str]) -> Iterable[str]:
+    """URLs from the command line, then each batch file in turn, read as they are needed"""
+    yield from urls
+    for path in batch_files:
+        if path == '-':
+            yield from parse_batch_lines(sys.stdin)
+        else:
+            yield from UrlFileReader(path)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        settings = load_settings(args.config)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    for key in ('output_dir', 'format', 'max_concurrent'):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    if args.archive:
+        settings['archive_file'] = args.archive
+    if args.info_cache:
+        settings['info_cache_file'] = args.info_cache
+    if not args.urls and not args.batch_file and args.serve is None and args.shared_queue is None:
+        print("error: no URLs given; pass URLs, -a FILE or -a - for standard input", file=sys.stderr)
+        return EXIT_USAGE
+    for path in args.batch_file:
+        if path != '-' and not os.path.isfile(path):
+            print(f"error: batch file {path} not found", file=sys.stderr)
+            return EXIT_USAGE
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    app.setApplicationName("YT Leechr")
+    app.setOrganizationName("YT Leechr")
+    JobLogger.echo = args.verbose
+
+    # The GUI's spin boxes stop at 10; -j or a config may ask for more
+    limit = max(10, int(settings['max_concurrent']), int(settings['auto_concurrency_max']))
+    manager = DownloadManager(max_concurrent_limit=limit, process_workers=settings['process_workers'])
+    apply_settings(manager, settings)
+    archive = None
+    if settings['archive_file']:
+        archive = DownloadArchive(os.path.expanduser(settings['archive_file']))
+        manager.set_download_archive(archive)
+    if settings['info_cache_file']:
+        manager.set_info_cache(InfoCache(os.path.expanduser(settings['info_cache_file'])))
+
+    run = HeadlessRun(manager, read_urls(args.urls, args.batch_file), settings, args.interval)
+    store = None
+    if args.shared_queue:
+        try:
+            store = SharedQueue(args.shared_queue)
+        except sqlite3.Error as e:
+            print(f"error: cannot open shared queue {args.shared_queue}: {e}", file=sys.stderr)
+            manager.cleanup()
+            return EXIT_USAGE
+        run.shared_node = SharedQueueNode(manager, store, {'output_dir': settings['output_dir']})
+        run.shared_node.item_claimed.connect(run.on_entry_added)
+        run.shared_node.item_lost.connect(run.forget)
+        run.shared_node.drained.connect(run.check_finished)
+    control_server = None
+    if args.serve is not None:
+        control_server = ControlServer(manager, lambda: settings, args.serve,
+                                       os.environ.get('YT_LEECHR_CONTROL_TOKEN', ''))
+        control_server.items_added.connect(run.on_items_added)
+        try:
+            control_server.start()
+        except OSError as e:
+            print(f"error: cannot serve on port {args.serve}: {e}", file=sys.stderr)
+            manager.cleanup()
+            if store is not None:
+                store.close()
+            return EXIT_USAGE
+        run.serving = True
+        print(f"Control API listening on 127.0.0.1:{control_server.port}", file=sys.stderr, flush=True)
+    # Qt only hands control back to Python between events; the progress timer provides them
+    previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: run.interrupt())
+    try:
+        QTimer.singleShot(0, run.start)
+        app.exec()
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        run.progress_timer.stop()
+        if run.shared_node is not None:
+            # Unfinished items go back to the backlog for the other nodes
+            run.shared_node.stop()
+        if control_server is not None:
+            control_server.stop()
+        # Interrupted downloads keep their .part files for the next run
+        manager.cleanup(keep_partial_files=True)
+        if archive is not None:
+            archive.close()
+        if store is not None:
+            store.close()
+    run.print_summary()
+    if manager.info_cache is not None:
+        manager.info_cache.close()
+    return run.exit_code()
@@ -0,0 +1,98 @@
+"""
+Per-host admission control with exponential backoff for throttled hosts
+"""
+
+import re
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+# HTTP statuses that mean the host wants us to slow down
+THROTTLE_STATUSES = (429, 403)
+
+_HTTP_ERROR_RE = re.compile(r'HTTP Error (\d{3})')
+
+# Short hosts that redirect to a site with a different domain
+HOST_ALIASES = {
+    'youtu.be': 'youtube.com',
+}
+
+
+def host_key(url: str) -> str:
+    """Group a URL by site, so www./m./music. variants share one limit"""
+    hostname = (urlparse(url).hostname or '').lower().rstrip('.')
+    if not hostname:
+        return url
+    if hostname in HOST_ALIASES:
+        return HOST_ALIASES[hostname]
+    labels = hostname.split('.')
+    # Keep three labels for second-level registries such as example.co.uk
+    keep = 3 if len(labels) > 2 and len(labels[-1]) == 2 and len(labels[-2]) <= 3 else 2
+    return '.'.join(labels[-keep:])
+
+
+def throttle_status(error: str) -> Optional[int]:
+    """Return 429/403 if an error message reports that HTTP status, else None"""
+    for match in _HTTP_ERROR_RE.finditer(error or ''):
+        status = int(match.group(1))
+        if status in THROTTLE_STATUSES:
+            return status
+    return None
+
+
+class HostLimiter:
+    """Caps in-flight jobs per host and backs hosts off after 429/403.
+
+    Each throttled response doubles the host's backoff, from base_backoff
+    up to max_backoff seconds; a successful download resets it.
+    """
+
+    def __init__(self, max_per_host: int = 3, base_backoff: float = 30.0,
+                 max_backoff: float = 900.0, clock: Callable[[], float] = time.monotonic):
+        self.max_per_host = max(1, max_per_host)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.in_flight: Dict[str, int] = {}
+        self._backoff_level: Dict[str, int] = {}
+        self._backoff_until: Dict[str, float] = {}
+
+    def can_start(self, host: str) -> bool:
+        return (self.in_flight.get(host, 0) < self.max_per_host
+                and self.backoff_remaining(host) <= 0)
+
+    def acquire(self, host: str):
+        self.in_flight[host] = self.in_flight.get(host, 0) + 1
+
+    def release(self, host: str):
+        count = self.in_flight.get(host, 0) - 1
+        if count > 0:
+            self.in_flight[host] = count
+        else:
+            self.in_flight.pop(host, None)
+
+    def record_throttled(self, host: str) -> float:
+        """Back the host off and return the delay in seconds"""
+        level = self._backoff_level.get(host, 0)
+        delay = min(self.base_backoff * (2 ** level), self.max_backoff)
+        self._backoff_level[host] = level + 1
+        self._backoff_until[host] = self.clock() + delay
+        return delay
+
+    def record_success(self, host: str) -> bool:
+        """Clear the host's backoff; returns True if it was backed off"""
+        was_backed_off = host in self._backoff_level
+        self._backoff_level.pop(host, None)
+        self._backoff_until.pop(host, None)
+        return was_backed_off
+
+    def backoff_remaining(self, host: str) -> float:
+        until = self._backoff_until.get(host)
+        if until is None:
+            return 0.0
+        return max(0.0, until - self.clock())
+
+    def backed_off_hosts(self) -> Dict[str, float]:
+        """Hosts currently backed off, with seconds remaining"""
+        remaining = {host: self.backoff_remaining(host) for host in self._backoff_until}
+        return {host: seconds for host, seconds in remaining.items() if seconds > 0}
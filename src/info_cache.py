@@ -0,0 +1,194 @@
+"""
+Extracted video info kept between sessions, so retries and re-adds skip extraction
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+from PyQt6.QtCore import QStandardPaths
+
+import yt_dlp
+
+from .dedup import canonical_key
+
+# Signed CDN URLs carry their expiry as a Unix time: ?expire=... (YouTube),
+# /expire/.../ in manifest paths, ?Expires=... (CloudFront, S3) or exp=...
+# inside an Akamai token
+EXPIRY_PARAMS = ('expire', 'expires', 'exp')
+_PATH_EXPIRY = re.compile(r'/expire/(\d{9,11})(?:/|$)')
+_TOKEN_EXPIRY = re.compile(r'(?:^|[~&])exp=(\d{9,11})(?:[~&]|$)')
+
+
+def default_info_cache_path() -> str:
+    """info_cache.db in the per-user application data directory"""
+    directory = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, "info_cache.db")
+
+
+def url_expiry(url: str) -> Optional[float]:
+    """Unix time a signed URL stops working, None if it carries no expiry"""
+    if not url:
+        return None
+    parts = urlparse(url)
+    times = [int(match) for match in _PATH_EXPIRY.findall(parts.path)]
+    for name, values in parse_qs(parts.query).items():
+        for value in values:
+            if name.lower() in EXPIRY_PARAMS and value.isdigit():
+                times.append(int(value))
+            times += [int(match) for match in _TOKEN_EXPIRY.findall(value)]
+    return float(min(times)) if times else None
+
+
+def info_expiry(info: Dict[str, Any]) -> Optional[float]:
+    """Earliest expiry among the URLs info's formats are downloaded from"""
+    times = []
+    for fmt in info.get('formats') or [info]:
+        for url in (fmt.get('url'), fmt.get('manifest_url'), fmt.get('fragment_base_url')):
+            expiry = url_expiry(url)
+            if expiry is not None:
+                times.append(expiry)
+    return min(times) if times else None
+
+
+def slim_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of an unprocessed info dict without what caching it would not need.
+
+    Internal and runtime keys go as for an .info.json, as do the
+    storyboard formats and viewer heatmap no download uses.
+    """
+    slim = yt_dlp.YoutubeDL.sanitize_info(dict(info), remove_private_keys=True)
+    slim.pop('heatmap', None)
+    if slim.get('formats'):
+        slim['formats'] = [fmt for fmt in slim['formats'] if fmt.get('protocol') != 'mhtml']
+    return slim
+
+
+class InfoCache:
+    """SQLite cache of unprocessed info dicts, keyed by canonical video id.
+
+    Entries are stored before format selection, so an item added again at
+    another quality reuses them too: yt-dlp only picks formats again, which
+    needs no network. An entry lives default_ttl seconds, but never past
+    expiry_margin seconds before the first of its format URLs expires, so
+    a cached item still has time to start downloading. Past max_bytes of
+    compressed entries, the least recently used ones are dropped.
+
+    hits, misses, expired, invalidated and evicted count what the cache
+    did since it was opened; stats() reports them with its size. Safe to
+    use from any thread.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 6 * 3600,
+                 expiry_margin: float = 600, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.expiry_margin = expiry_margin
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                              "key TEXT PRIMARY KEY, info BLOB NOT NULL, size INTEGER NOT NULL, "
+                              "expires_at REAL NOT NULL, last_used REAL NOT NULL)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_by_use ON entries (last_used)")
+
+    @staticmethod
+    def key(url: str) -> str:
+        """Cache key of url's video: the same for every link form of it"""
+        extractor, video_id = canonical_key(url)
+        return f"{extractor} {video_id}"
+
+    def expires_at(self, info: Dict[str, Any]) -> float:
+        now = self.clock()
+        expiry = info_expiry(info)
+        if expiry is None:
+            return now + self.default_ttl
+        return min(now + self.default_ttl, expiry - self.expiry_margin)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """url's cached unprocessed info, or None if it has none or it expired"""
+        key = self.key(url)
+        now = self.clock()
+        with self._lock:
+            row = self.conn.execute("SELECT info, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if row[1] <= now:
+                with self.conn:
+                    self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, url: str, info: Dict[str, Any]):
+        """Cache url's unprocessed info, unless its format URLs are about to expire"""
+        expires_at = self.expires_at(info)
+        now = self.clock()
+        if expires_at <= now:
+            return
+        try:
+            data = json.dumps(slim_info(info))
+        except (TypeError, AttributeError):
+            # Keys or values JSON cannot hold (sanitize_info trips over non-string keys);
+            # stored as strings they would come back changed
+            return
+        blob = zlib.compress(data.encode())
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO entries (key, info, size, expires_at, last_used) "
+                              "VALUES (?, ?, ?, ?, ?)", (self.key(url), blob, len(blob), expires_at, now))
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+            stale.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self.conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+        self.evicted += len(stale)
+
+    def invalidate(self, url: str):
+        """Forget url's entry, so its next extraction goes to the network"""
+        with self._lock, self.conn:
+            if self.conn.execute("DELETE FROM entries WHERE key = ?", (self.key(url),)).rowcount:
+                self.invalidated += 1
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM entries")
+
+    def stats(self) -> Dict[str, int]:
+        """Counters since opening, plus the entries and compressed bytes held now"""
+        with self._lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return {'hits': self.hits, 'misses': self.misses, 'expired': self.expired,
+                    'invalidated': self.invalidated, 'evicted': self.evicted,
+                    'entries': entries, 'bytes': size}
+
+    def close(self):
+        self.conn.close()
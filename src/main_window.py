@@ -3,7 +3,9 @@ Main window for YT Leechr GUI
 """
 
 import os
-from typing import Optional
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, 
     QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
@@ -14,22 +16,53 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSettings, QTimer
 from PyQt6.QtGui import QAction, QPixmap, QIcon
 from PyQt6.QtWidgets import QMenu
+from .control_api import ControlServer
 from .download_manager import DownloadManager
 from .settings_widget import SettingsWidget
-from .download_item import DownloadItem
+from .sync_store import SyncStore, default_sync_path
+from .download_archive import DownloadArchive, default_archive_path
+from .info_cache import InfoCache, default_info_cache_path
+from .download_item import DownloadItem, DownloadStatus
+from .queue_store import QueueStore
 from .theme_manager import ThemeManager
+from .url_import import UrlFileReader, UrlImport, parse_batch_lines
+
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # Journalled rows restored before the window shows, enough to fill the table;
+    # the rest follow in pages of restore_page_size from the event loop
+    restore_first_page = 100
+    restore_page_size = 2000
+    # URLs queued per event loop pass while importing, so the window stays responsive
+    import_chunk_size = 250
+    # Context menu choices for an item's share of the bandwidth limit
+    bandwidth_shares = (("Low (half)", 0.5), ("Normal", 1.0), ("High (double)", 2.0))
+    
+    def __init__(self, queue_store: Optional[QueueStore] = None,
+                 download_archive: Optional[DownloadArchive] = None,
+                 sync_store: Optional[SyncStore] = None,
+                 info_cache: Optional[InfoCache] = None):
         super().__init__()
         self.settings = QSettings()
-        self.download_manager = DownloadManager()
+        self.download_manager = DownloadManager(process_workers=self.settings.value('process_workers', False, bool))
+        self.queue_store = queue_store or QueueStore.open_default()
+        self.download_archive = download_archive or DownloadArchive(default_archive_path())
+        self.download_manager.set_download_archive(self.download_archive)
+        self.sync_store = sync_store or SyncStore(default_sync_path())
+        self.download_manager.set_sync_store(self.sync_store)
+        self.info_cache = info_cache or InfoCache(default_info_cache_path())
+        self.download_manager.set_info_cache(self.info_cache)
         self.download_items = []
+        self._restore_position = 0
         self.theme_manager = ThemeManager()
+        self.host_backoffs: Dict[str, float] = {}  # host -> monotonic time the backoff ends
+        self.imports: deque = deque()  # UrlImports in progress, the first one running
+        self.control_server: Optional[ControlServer] = None
         
         self.init_ui()
         self.setup_connections()
         self.load_settings()
+        self.restore_queue()
         
     def init_ui(self):
         self.setWindowTitle("YT Leechr - yt-dlp GUI")
@@ -61,6 +94,11 @@ class MainWindow(QMainWindow):
         url_layout.addWidget(self.paste_button)
         url_layout.addWidget(self.download_button)
         
+        self.sync_button = QPushButton("Sync")
+        self.sync_button.setToolTip("Queue only the videos added to a channel or playlist since its last sync")
+        self.sync_button.clicked.connect(self.add_sync)
+        url_layout.addWidget(self.sync_button)
+        
         main_layout.addLayout(url_layout)
         
         # Create splitter for main content
@@ -127,18 +165,53 @@ class MainWindow(QMainWindow):
         self.active_downloads_label = QLabel("Active Downloads: 0")
         self.queue_size_label = QLabel("Queue Size: 0")
         
+        self.backoff_label = QLabel("")
+        self.backoff_label.setVisible(False)
+        
+        # Slot count picked by auto concurrency, only shown in auto mode
+        self.concurrency_label = QLabel("")
+        self.concurrency_label.setVisible(False)
+        
+        # Items held because their output volume is too full
+        self.disk_space_label = QLabel("")
+        self.disk_space_label.setVisible(False)
+        
+        # Shown while a URL import is running; busy when its length is unknown
+        self.import_progress = QProgressBar()
+        self.import_progress.setMaximumWidth(150)
+        self.import_progress.setVisible(False)
+        
+        self.status_bar.addPermanentWidget(self.import_progress)
+        self.status_bar.addPermanentWidget(self.backoff_label)
+        self.status_bar.addPermanentWidget(self.disk_space_label)
+        self.status_bar.addPermanentWidget(self.concurrency_label)
         self.status_bar.addPermanentWidget(self.active_downloads_label)
         self.status_bar.addPermanentWidget(self.queue_size_label)
         
+        # Counts down host backoffs in the status bar while any are active
+        self.backoff_timer = QTimer(self)
+        self.backoff_timer.setInterval(1000)
+        self.backoff_timer.timeout.connect(self.update_backoff_label)
+        
         # Create menu bar
         self.create_menu_bar()
         
+        # URL list files and links can be dropped anywhere on the window
+        self.setAcceptDrops(True)
+        
     def create_menu_bar(self):
         menubar = self.menuBar()
         
         # File menu
         file_menu = menubar.addMenu("File")
         
+        import_action = QAction("Import URLs...", self)
+        import_action.setShortcut("Ctrl+O")
+        import_action.triggered.connect(self.choose_import_file)
+        file_menu.addAction(import_action)
+        
+        file_menu.addSeparator()
+        
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -179,6 +252,18 @@ class MainWindow(QMainWindow):
         self.download_manager.download_completed.connect(self.download_completed)
         self.download_manager.download_error.connect(self.download_error)
         self.download_manager.info_extracted.connect(self.info_extracted)
+        self.settings_widget.max_concurrent_changed.connect(self.download_manager.set_max_concurrent)
+        self.settings_widget.max_per_host_changed.connect(self.download_manager.set_max_per_host)
+        self.settings_widget.scheduling_policy_changed.connect(self.download_manager.set_scheduling_policy)
+        self.settings_widget.bandwidth_limit_changed.connect(self.download_manager.set_bandwidth_limit)
+        self.settings_widget.auto_concurrency_changed.connect(self.set_auto_concurrency)
+        self.settings_widget.auto_concurrency_bounds_changed.connect(self.download_manager.set_auto_concurrency_bounds)
+        self.download_manager.host_backoff_changed.connect(self.host_backoff_changed)
+        self.download_manager.concurrency_changed.connect(self.update_concurrency_label)
+        self.download_manager.disk_space_waiting.connect(self.update_disk_space_label)
+        self.download_manager.playlist_entry_added.connect(self.add_playlist_entry)
+        self.download_manager.playlist_expanded.connect(self.playlist_expanded)
+        self.download_manager.sync_finished.connect(self.sync_finished)
         
     def paste_from_clipboard(self):
         clipboard = QApplication.clipboard()
@@ -191,42 +276,271 @@ class MainWindow(QMainWindow):
         if not url:
             return
             
-        urls = [u.strip() for u in url.split('\n') if u.strip()]
-        
-        for single_url in urls:
-            if single_url:
-                self.add_single_download(single_url)
-                
         self.url_input.clear()
-        self.update_status()
+        # URLs pasted together form one batch for fair-share scheduling
+        self.import_urls(parse_batch_lines(url.split('\n')))
+        
+    def choose_import_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import URLs", "",
+            "URL lists (*.txt *.csv *.list *.conf);;All files (*)")
+        if path:
+            self.import_file(path)
+            
+    def import_file(self, path: str):
+        """Queue the URLs in a text, CSV or yt-dlp batch file, reading it as it goes"""
+        try:
+            reader = UrlFileReader(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Import URLs", f"Could not read {path}: {e}")
+            return
+        self.import_urls(reader, source=os.path.basename(path), reader=reader)
         
-    def add_single_download(self, url: str):
-        download_item = DownloadItem(url)
-        self.download_items.append(download_item)
+    def import_urls(self, urls: Iterable[str], source: str = "", reader: Optional[UrlFileReader] = None):
+        """Queue urls in chunks of import_chunk_size, one chunk per event loop pass.
         
-        row = self.queue_table.rowCount()
-        self.queue_table.insertRow(row)
+        The first chunk is queued straight away. Imports started while one
+        is running wait for it to finish.
+        """
+        self.imports.append(UrlImport(urls, self.settings_widget.get_settings(), source, reader))
+        if len(self.imports) == 1:
+            self.import_next_chunk()
+            
+    def import_next_chunk(self):
+        url_import = self.imports[0]
+        try:
+            urls = url_import.take(self.import_chunk_size)
+        except OSError as e:
+            urls = []
+            url_import.done = True
+            QMessageBox.warning(self, "Import URLs", f"Could not read {url_import.source}: {e}")
+            
+        use_archive = url_import.settings.get('use_download_archive', True)
+        items = []
+        for url in urls:
+            # The same video under another URL form, already queued or running
+            if self.download_manager.find_duplicate(url, url_import.settings):
+                url_import.duplicates += 1
+                continue
+            # Downloaded in an earlier session
+            if use_archive and self.download_manager.is_archived(url, url_import.settings):
+                url_import.archived += 1
+                continue
+            download_item = DownloadItem(url, batch_id=url_import.batch_id)
+            items.append(download_item)
+            # Queued one by one so later URLs of the chunk see it as a duplicate
+            self.download_manager.add_download(download_item, url_import.settings)
+            
+        # Journalled in one transaction; nothing reaches the event loop before it
+        self.queue_store.add_many((item, url_import.settings) for item in items)
+        self.download_items.extend(items)
+        self.append_rows(items)
+        url_import.added += len(items)
+        self.update_status()
         
-        self.queue_table.setItem(row, 0, QTableWidgetItem("Fetching info..."))
-        self.queue_table.setItem(row, 1, QTableWidgetItem(url))
-        self.queue_table.setItem(row, 2, QTableWidgetItem("Queued"))
+        if not url_import.done:
+            self.show_import_progress(url_import)
+            QTimer.singleShot(0, self.import_next_chunk)
+            return
+        self.imports.popleft()
+        self.finish_import(url_import)
+        if self.imports:
+            QTimer.singleShot(0, self.import_next_chunk)
+        else:
+            self.import_progress.setVisible(False)
+            
+    def show_import_progress(self, url_import: UrlImport):
+        fraction = url_import.fraction_done
+        if fraction is None:
+            self.import_progress.setRange(0, 0)
+        else:
+            self.import_progress.setRange(0, 100)
+            self.import_progress.setValue(int(fraction * 100))
+        self.import_progress.setVisible(True)
+        self.status_bar.showMessage(f"Importing URLs... {url_import.added} added")
+        
+    def finish_import(self, url_import: UrlImport):
+        skipped = []
+        if url_import.duplicates:
+            plural = "s" if url_import.duplicates != 1 else ""
+            skipped.append(f"{url_import.duplicates} duplicate{plural} already in the queue")
+        if url_import.archived:
+            skipped.append(f"{url_import.archived} already downloaded")
+        skipped = ' and '.join(skipped)
+        if url_import.source:
+            plural = "s" if url_import.added != 1 else ""
+            message = f"Imported {url_import.added} URL{plural} from {url_import.source}"
+            if skipped:
+                message += f"; skipped {skipped}"
+            self.status_bar.showMessage(message, 5000)
+        elif skipped:
+            self.status_bar.showMessage(f"Skipped {skipped}", 5000)
+        elif not self.import_progress.isHidden():
+            # Replace the "Importing URLs..." message
+            self.status_bar.clearMessage()
+            
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls() or event.mimeData().hasText():
+            event.acceptProposedAction()
+            
+    def dropEvent(self, event):
+        """Import dropped URL list files; dropped links and text are queued as pasted URLs"""
+        mime_data = event.mimeData()
+        if mime_data.hasUrls():
+            links = []
+            for url in mime_data.urls():
+                if url.isLocalFile():
+                    self.import_file(url.toLocalFile())
+                else:
+                    links.append(url.toString())
+            if links:
+                self.import_urls(links)
+        else:
+            self.import_urls(parse_batch_lines(mime_data.text().split('\n')))
+        event.acceptProposedAction()
+        
+    def add_sync(self):
+        urls = [u.strip() for u in self.url_input.text().split('\n') if u.strip()]
+        for url in urls:
+            # A sync of this source is already queued or running
+            if self.download_manager.find_duplicate(url, {'download_playlist': True}):
+                continue
+            download_item = DownloadItem(url)
+            self.download_items.append(download_item)
+            self.insert_row(download_item)
+            settings = self.download_manager.add_sync(download_item, self.settings_widget.get_settings())
+            self.queue_store.add(download_item, settings)
+            
+        self.url_input.clear()
+        self.update_status()
         
-        progress_bar = QProgressBar()
-        progress_bar.setMinimum(0)
-        progress_bar.setMaximum(100)
-        progress_bar.setValue(0)
-        self.queue_table.setCellWidget(row, 3, progress_bar)
+    def start_control_server(self, port: int, token: str = ""):
+        """Serve the local control API on port; raises OSError if it cannot listen"""
+        server = ControlServer(self.download_manager, self.settings_widget.get_settings, port, token)
+        server.track(self.download_items)
+        # Queued, so an API request is answered before its rows are drawn
+        server.items_added.connect(self.add_control_items, Qt.ConnectionType.QueuedConnection)
+        server.start()
+        self.control_server = server
+        self.status_bar.showMessage(f"Control API listening on 127.0.0.1:{server.port}", 5000)
+        
+    def add_control_items(self, download_items: List[DownloadItem], settings: dict):
+        """Show and journal items queued through the control API"""
+        self.queue_store.add_many((item, settings) for item in download_items)
+        self.download_items.extend(download_items)
+        self.append_rows(download_items)
+        self.update_status()
         
-        self.queue_table.setItem(row, 4, QTableWidgetItem("--"))
-        self.queue_table.setItem(row, 5, QTableWidgetItem("--"))
+    def add_playlist_entry(self, download_item: DownloadItem, settings: dict):
+        """Show and journal an entry the manager queued from an expanding playlist"""
+        # Entries go below their playlist's row, after the entries found before them
+        row = len(self.download_items)
+        for i, item in enumerate(self.download_items):
+            if item.id == download_item.parent_id:
+                row = i + 1
+                while row < len(self.download_items) and self.download_items[row].parent_id == item.id:
+                    row += 1
+                break
+        self.download_items.insert(row, download_item)
+        self.insert_row(download_item, row)
+        self.queue_store.add(download_item, settings)
+        self.update_status()
         
-        # Start download
-        self.download_manager.add_download(download_item, self.settings_widget.get_settings())
+    def playlist_expanded(self, download_id: str, count: int):
+        for i, item in enumerate(self.download_items):
+            if item.id == download_id:
+                item.set_completed("")
+                self.queue_store.update(item)
+                self.queue_table.setItem(i, 0, QTableWidgetItem(item.title))
+                self.queue_table.setItem(i, 2, QTableWidgetItem(f"Playlist: {count} videos"))
+                self.progress_bar(i).setValue(100)
+                break
+                
+        self.update_status()
         
+    def sync_finished(self, download_id: str, stats: dict):
+        new = len(stats['new_ids'])
+        self.playlist_expanded(download_id, new)
+        for i, item in enumerate(self.download_items):
+            if item.id == download_id:
+                plural = "s" if new != 1 else ""
+                self.queue_table.setItem(i, 2, QTableWidgetItem(f"Synced: {new} new video{plural}"))
+                break
+                
+    def insert_row(self, download_item: DownloadItem, row: Optional[int] = None):
+        if row is None:
+            row = self.queue_table.rowCount()
+        self.queue_table.insertRow(row)
+        self.fill_row(row, download_item)
+        if self.control_server is not None:
+            self.control_server.track([download_item])
+        
+    def append_rows(self, download_items: List[DownloadItem]):
+        """Add rows for download_items at the end of the table in one step"""
+        first = self.queue_table.rowCount()
+        self.queue_table.setRowCount(first + len(download_items))
+        for offset, download_item in enumerate(download_items):
+            self.fill_row(first + offset, download_item)
+        if self.control_server is not None:
+            self.control_server.track(download_items)
+            
+    def fill_row(self, row: int, download_item: DownloadItem):
+        if download_item.status == DownloadStatus.COMPLETED:
+            status = "Completed"
+        elif download_item.status == DownloadStatus.ERROR:
+            status = f"Error: {download_item.error_message}"
+        else:
+            status = "Queued"
+        self.queue_table.setItem(row, 0, QTableWidgetItem(download_item.title or "Fetching info..."))
+        self.queue_table.setItem(row, 1, QTableWidgetItem(download_item.url))
+        self.queue_table.setItem(row, 2, QTableWidgetItem(status))
+        
+        if download_item.status == DownloadStatus.COMPLETED:
+            self.progress_bar(row).setValue(100)
+            
+        self.queue_table.setItem(row, 4, QTableWidgetItem("--"))
+        total_bytes = download_item.total_bytes
+        self.queue_table.setItem(row, 5, QTableWidgetItem(f"{total_bytes / 1024 / 1024:.1f} MB" if total_bytes else "--"))
+        
+    def progress_bar(self, row: int) -> QProgressBar:
+        """The row's progress bar, created on first use.
+        
+        Rows still waiting in the queue have none: every cell widget makes
+        adding rows and laying out the table slower, which long imports feel.
+        """
+        progress_bar = self.queue_table.cellWidget(row, 3)
+        if progress_bar is None:
+            progress_bar = QProgressBar()
+            progress_bar.setMinimum(0)
+            progress_bar.setMaximum(100)
+            self.queue_table.setCellWidget(row, 3, progress_bar)
+        return progress_bar
+        
+    def restore_queue(self):
+        """Bring back the queue journalled by the previous session.
+        
+        Items that were queued or running when it ended are queued again
+        and continue from their .part files.
+        """
+        self._restore_position = 0
+        self.restore_next_page(self.restore_first_page)
+        
+    def restore_next_page(self, limit: Optional[int] = None):
+        entries, self._restore_position = self.queue_store.load_page(
+            self._restore_position, limit or self.restore_page_size)
+        self.download_items.extend(item for item, _ in entries)
+        self.append_rows([item for item, _ in entries])
+        for download_item, settings in entries:
+            self.download_manager.restore_download(download_item, settings)
+        if entries:
+            self.update_status()
+            QTimer.singleShot(0, self.restore_next_page)
+            
     def info_extracted(self, download_id: str, title: str, uploader: str):
         for i, item in enumerate(self.download_items):
             if item.id == download_id:
                 self.queue_table.setItem(i, 0, QTableWidgetItem(title))
+                self.queue_store.update(item)
                 break
                 
     def update_download_progress(self, download_id: str, progress: dict):
@@ -234,11 +548,10 @@ class MainWindow(QMainWindow):
             if item.id == download_id:
                 if 'status' in progress:
                     self.queue_table.setItem(i, 2, QTableWidgetItem(progress['status']))
+                    self.record_status(item, progress['status'])
                     
                 if 'percent' in progress:
-                    progress_bar = self.queue_table.cellWidget(i, 3)
-                    if progress_bar:
-                        progress_bar.setValue(int(progress['percent']))
+                    self.progress_bar(i).setValue(int(progress['percent']))
                         
                 if 'speed' in progress:
                     speed = progress['speed']
@@ -254,13 +567,23 @@ class MainWindow(QMainWindow):
                         
                 break
                 
+    def record_status(self, download_item: DownloadItem, status: str):
+        """Journal a status change; repeated progress reports are not written"""
+        if status == 'finished':
+            # One file is done, but merging or a second format may follow
+            return
+        previous = download_item.status
+        download_item.update_progress({'status': status})
+        if download_item.status != previous:
+            self.queue_store.update(download_item)
+            
     def download_completed(self, download_id: str, filepath: str):
         for i, item in enumerate(self.download_items):
             if item.id == download_id:
+                item.set_completed(filepath)
+                self.queue_store.update(item)
                 self.queue_table.setItem(i, 2, QTableWidgetItem("Completed"))
-                progress_bar = self.queue_table.cellWidget(i, 3)
-                if progress_bar:
-                    progress_bar.setValue(100)
+                self.progress_bar(i).setValue(100)
                 break
                 
         self.update_status()
@@ -268,11 +591,54 @@ class MainWindow(QMainWindow):
     def download_error(self, download_id: str, error: str):
         for i, item in enumerate(self.download_items):
             if item.id == download_id:
+                item.set_error(error)
+                self.queue_store.update(item)
                 self.queue_table.setItem(i, 2, QTableWidgetItem(f"Error: {error}"))
                 break
                 
         self.update_status()
         
+    def host_backoff_changed(self, host: str, seconds: float):
+        if seconds > 0:
+            self.host_backoffs[host] = time.monotonic() + seconds
+        else:
+            self.host_backoffs.pop(host, None)
+        self.update_backoff_label()
+        
+    def update_backoff_label(self):
+        now = time.monotonic()
+        self.host_backoffs = {host: end for host, end in self.host_backoffs.items() if end > now}
+        
+        if not self.host_backoffs:
+            self.backoff_timer.stop()
+            self.backoff_label.setVisible(False)
+            return
+            
+        parts = []
+        for host, end in sorted(self.host_backoffs.items(), key=lambda entry: entry[1]):
+            minutes, seconds = divmod(int(end - now) + 1, 60)
+            remaining = f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+            parts.append(f"{host} ({remaining})")
+            
+        self.backoff_label.setText("Backoff: " + ", ".join(parts))
+        self.backoff_label.setVisible(True)
+        if not self.backoff_timer.isActive():
+            self.backoff_timer.start()
+        
+    def set_auto_concurrency(self, enabled: bool):
+        self.download_manager.set_auto_concurrency(enabled)
+        if not enabled:
+            # Back to the hand-picked limit
+            self.download_manager.set_max_concurrent(self.settings_widget.max_concurrent_spinbox.value())
+            
+    def update_concurrency_label(self, slots: int, auto: bool):
+        self.concurrency_label.setText(f"Concurrency: {slots} (auto)")
+        self.concurrency_label.setVisible(auto)
+        
+    def update_disk_space_label(self, waiting: int):
+        self.disk_space_label.setText(f"Waiting for disk space: {waiting}")
+        self.disk_space_label.setVisible(waiting > 0)
+        
     def pause_all_downloads(self):
         self.download_manager.pause_all()
         
@@ -285,6 +651,9 @@ class MainWindow(QMainWindow):
         while i < len(self.download_items):
             status_item = self.queue_table.item(i, 2)
             if status_item and status_item.text() == "Completed":
+                self.queue_store.remove(self.download_items[i].id)
+                if self.control_server is not None:
+                    self.control_server.forget([self.download_items[i].id])
                 self.queue_table.removeRow(i)
                 del self.download_items[i]
             else:
@@ -294,7 +663,10 @@ class MainWindow(QMainWindow):
         
     def clear_all(self):
         self.download_manager.clear_all()
+        self.queue_store.clear()
         self.queue_table.setRowCount(0)
+        if self.control_server is not None:
+            self.control_server.forget([item.id for item in self.download_items])
         self.download_items.clear()
         self.update_status()
         
@@ -325,6 +697,14 @@ class MainWindow(QMainWindow):
             
         # Load other settings
         self.settings_widget.load_settings()
+        self.download_manager.set_max_concurrent(self.settings_widget.max_concurrent_spinbox.value())
+        self.download_manager.set_max_per_host(self.settings_widget.max_per_host_spinbox.value())
+        self.download_manager.set_scheduling_policy(self.settings_widget.get_settings()['scheduling_policy'])
+        self.download_manager.set_bandwidth_limit(self.settings_widget.get_settings()['bandwidth_limit'])
+        self.download_manager.set_auto_concurrency_bounds(self.settings_widget.auto_min_spinbox.value(),
+                                                          self.settings_widget.auto_max_spinbox.value())
+        if self.settings_widget.auto_concurrency_checkbox.isChecked():
+            self.download_manager.set_auto_concurrency(True)
         
         # Apply saved theme
         self.theme_manager.apply_theme()
@@ -353,6 +733,14 @@ class MainWindow(QMainWindow):
         pause_action = menu.addAction("Pause Download")
         resume_action = menu.addAction("Resume Download")
         retry_action = menu.addAction("Retry Download")
+        move_to_top_action = menu.addAction("Move to Top")
+        raise_priority_action = menu.addAction("Raise Priority")
+        lower_priority_action = menu.addAction("Lower Priority")
+        share_menu = menu.addMenu("Bandwidth Share")
+        for label, weight in self.bandwidth_shares:
+            share_action = share_menu.addAction(label)
+            share_action.triggered.connect(
+                lambda checked, weight=weight: self.set_selected_bandwidth_share(selected_rows, weight))
         menu.addSeparator()
         copy_url_action = menu.addAction("Copy URL")
         open_folder_action = menu.addAction("Open Containing Folder")
@@ -363,6 +751,9 @@ class MainWindow(QMainWindow):
         pause_action.triggered.connect(lambda: self.pause_selected_downloads(selected_rows))
         resume_action.triggered.connect(lambda: self.resume_selected_downloads(selected_rows))
         retry_action.triggered.connect(lambda: self.retry_selected_downloads(selected_rows))
+        move_to_top_action.triggered.connect(lambda: self.move_selected_to_top(selected_rows))
+        raise_priority_action.triggered.connect(lambda: self.change_selected_priority(selected_rows, 1))
+        lower_priority_action.triggered.connect(lambda: self.change_selected_priority(selected_rows, -1))
         copy_url_action.triggered.connect(lambda: self.copy_selected_urls(selected_rows))
         open_folder_action.triggered.connect(lambda: self.open_containing_folder(selected_rows))
         remove_action.triggered.connect(lambda: self.remove_selected_downloads(selected_rows))
@@ -385,8 +776,36 @@ class MainWindow(QMainWindow):
         for row in rows:
             if row < len(self.download_items):
                 download_item = self.download_items[row]
-                # Restart the download
-                self.download_manager.add_download(download_item, self.settings_widget.get_settings())
+                # Failed items go again with the settings they were added with
+                if self.download_manager.retry_download(download_item.id):
+                    continue
+                # As do finished and cancelled ones; queued, paused and running items are left alone
+                if download_item.status in (DownloadStatus.COMPLETED, DownloadStatus.CANCELLED, DownloadStatus.ERROR):
+                    settings = self.queue_store.settings_for(download_item.id)
+                    if settings is not None:
+                        self.download_manager.requeue(download_item, settings)
+                
+    def move_selected_to_top(self, rows):
+        # Promote bottom-up so the top selected row ends up first in the queue
+        for row in sorted(rows, reverse=True):
+            if row < len(self.download_items):
+                self.download_manager.move_to_top(self.download_items[row].id)
+                
+    def change_selected_priority(self, rows, step: int):
+        # Only orders the priority scheduler; the other policies keep the value for later
+        for row in rows:
+            if row < len(self.download_items):
+                download_item = self.download_items[row]
+                self.download_manager.set_priority(download_item, download_item.priority + step)
+                self.queue_store.update(download_item)
+                
+    def set_selected_bandwidth_share(self, rows, weight: float):
+        # Running downloads take the new share from their next chunk on
+        for row in rows:
+            if row < len(self.download_items):
+                download_item = self.download_items[row]
+                download_item.bandwidth_weight = weight
+                self.queue_store.update(download_item)
                 
     def copy_selected_urls(self, rows):
         urls = []
@@ -422,6 +841,9 @@ class MainWindow(QMainWindow):
             if row < len(self.download_items):
                 download_item = self.download_items[row]
                 self.download_manager.cancel_download(download_item.id)
+                self.queue_store.remove(download_item.id)
+                if self.control_server is not None:
+                    self.control_server.forget([download_item.id])
                 self.queue_table.removeRow(row)
                 del self.download_items[row]
                 
@@ -429,5 +851,12 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         self.save_settings()
-        self.download_manager.cleanup()
+        if self.control_server is not None:
+            self.control_server.stop()
+        # Running downloads keep their .part files and continue next session
+        self.download_manager.cleanup(keep_partial_files=True)
+        self.queue_store.close()
+        self.download_archive.close()
+        self.sync_store.close()
+        self.info_cache.close()
         event.accept()
\ No newline at end of file
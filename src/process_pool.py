@@ -0,0 +1,587 @@
+"""
+Worker processes for download and info jobs, an alternative to WorkerPool's threads
+
+Each pool slot owns one child process and relays jobs to it over a pipe.
+The child runs the real DownloadWorker/InfoWorker/SyncWorker, so extraction
+and post-processing never hold the GUI process's GIL. Children are replaced
+after max_jobs_per_process jobs or once their resident memory passes
+max_rss, which bounds what leaky extractors can accumulate.
+
+Messages are bytes led by a one-byte kind. Progress updates, the frequent
+ones, are a fixed 41-byte struct coalesced in the child to one per
+progress_interval; everything else is JSON. The shared bandwidth limit,
+download archive, info cache and fragment tuner stay in the parent and
+are reached through small calls over the same pipe.
+"""
+
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import yt_dlp
+
+from .download_item import DownloadItem
+from .download_manager import DownloadWorker, InfoWorker, JobLogger, SyncWorker
+from .info_cache import slim_info
+from .session_pool import SessionPool
+from .worker_pool import PoolThread, WorkerPool, report_job_error
+
+# Parent to child
+JOB = b'J'
+PAUSE = b'P'
+RESUME = b'R'
+CANCEL = b'C'
+REPLY = b'A'
+EXIT = b'X'
+# Child to parent
+PROGRESS = b'p'
+SIGNAL = b'e'
+CALL = b'c'
+NOTIFY = b'n'
+DONE = b'd'
+
+# status code, downloaded bytes, total bytes, eta (-1 for None), speed, percent (NaN for None)
+_PROGRESS_STRUCT = struct.Struct('<Bqqqdd')
+_PROGRESS_KEYS = frozenset(('status', 'downloaded_bytes', 'total_bytes', 'speed', 'eta', 'percent'))
+_PROGRESS_STATUSES = ('downloading', 'finished', 'error', 'processing')
+_DONE_STRUCT = struct.Struct('<Q')
+
+# Signals a child may emit on the parent's job, by job kind
+_SIGNALS = {
+    'download': ('info_extracted', 'download_completed', 'download_error', 'download_paused',
+                 'muxing_status', 'progress_updated'),
+    'info': ('info_extracted', 'download_error', 'download_paused', 'progress_updated',
+             'info_resolved', 'playlist_entry', 'playlist_expanded'),
+}
+_SIGNALS['sync'] = _SIGNALS['info'] + ('sync_finished',)
+
+# DownloadItem attributes the child reports back with each signal
+_ITEM_FIELDS = ('title', 'uploader', 'thumbnail_url', 'estimated_size')
+
+
+def pack_progress(progress: Dict[str, Any]) -> Optional[bytes]:
+    """Encode a DownloadWorker progress dict, or None if it does not fit the struct"""
+    if progress.keys() != _PROGRESS_KEYS or progress['status'] not in _PROGRESS_STATUSES:
+        return None
+    try:
+        return _PROGRESS_STRUCT.pack(
+            _PROGRESS_STATUSES.index(progress['status']),
+            int(progress['downloaded_bytes'] or 0),
+            int(progress['total_bytes'] or 0),
+            -1 if progress['eta'] is None else int(progress['eta']),
+            math.nan if progress['speed'] is None else float(progress['speed']),
+            float(progress['percent'] or 0),
+        )
+    except (TypeError, ValueError, OverflowError, struct.error):
+        return None
+
+
+def unpack_progress(body: bytes) -> Dict[str, Any]:
+    status, downloaded, total, eta, speed, percent = _PROGRESS_STRUCT.unpack(body)
+    return {
+        'status': _PROGRESS_STATUSES[status],
+        'downloaded_bytes': downloaded,
+        'total_bytes': total,
+        'speed': None if math.isnan(speed) else speed,
+        'eta': None if eta < 0 else eta,
+        'percent': percent,
+    }
+
+
+def resident_memory() -> int:
+    """Resident set size of this process in bytes; the peak where only that is known, 0 if neither is"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def job_kind(job) -> Optional[str]:
+    if isinstance(job, SyncWorker):
+        return 'sync'
+    if isinstance(job, InfoWorker):
+        return 'info'
+    if isinstance(job, DownloadWorker):
+        return 'download'
+    return None
+
+
+def job_spec(job: DownloadWorker, kind: str) -> Dict[str, Any]:
+    """What the child needs to rebuild job"""
+    item = job.download_item
+    return {
+        'kind': kind,
+        'item': {
+            'id': item.id,
+            'url': item.url,
+            'batch_id': item.batch_id,
+            'parent_id': item.parent_id,
+            'priority': item.priority,
+            'bandwidth_weight': item.bandwidth_weight,
+            **{name: getattr(item, name) for name in _ITEM_FIELDS},
+        },
+        'info': item.info,
+        'settings': job.settings,
+        'known_ids': sorted(job.known_ids) if kind == 'sync' else [],
+        'retry_ids': sorted(job.retry_ids) if kind == 'sync' else [],
+        'fragment_workers': job.fragment_workers,
+        'rate_limited': job.rate_limiter is not None,
+        'archive': job.download_archive is not None,
+        'info_cache': job.info_cache is not None,
+        'fragment_tuner': job.fragment_tuner is not None,
+        'echo': JobLogger.echo,
+    }
+
+
+class RemoteRateLimiter:
+    """Child side of the parent's TokenBucket.
+
+    consume() waits for the parent's bucket, except while the parent last
+    reported no limit: then the bytes are only reported, and the limit is
+    checked again every recheck_interval seconds.
+    """
+
+    recheck_interval = 0.5
+
+    def __init__(self, runner: '_ChildRunner'):
+        self.runner = runner
+        self._unlimited_until = 0.0
+
+    def consume(self, nbytes: int, consumer=None, weight: float = 1.0, abort=None) -> bool:
+        # consumer, weight and abort are the job's; the parent applies its own copies
+        if nbytes <= 0:
+            return True
+        if time.monotonic() < self._unlimited_until:
+            self.runner.notify('consume', [nbytes])
+            return True
+        allowed, limited = self.runner.call('consume', [nbytes])
+        if not limited:
+            self._unlimited_until = time.monotonic() + self.recheck_interval
+        return allowed
+
+
+class RemoteArchive:
+    """Child side of the parent's DownloadArchive, as yt-dlp's download_archive"""
+
+    def __init__(self, runner: '_ChildRunner'):
+        self.runner = runner
+
+    def __repr__(self) -> str:
+        # Part of the options key of reused YoutubeDL instances
+        return "RemoteArchive()"
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __contains__(self, archive_id: str) -> bool:
+        return self.runner.call('archive_contains', [archive_id])
+
+    def add(self, archive_id: str):
+        self.runner.call('archive_add', [archive_id])
+
+
+class RemoteInfoCache:
+    """Child side of the parent's InfoCache; entries travel slimmed, as they are stored"""
+
+    def __init__(self, runner: '_ChildRunner'):
+        self.runner = runner
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        return self.runner.call('info_cache_get', [url])
+
+    def put(self, url: str, info: Dict[str, Any]):
+        self.runner.notify('info_cache_put', [url, slim_info(info)])
+
+    def invalidate(self, url: str):
+        self.runner.notify('info_cache_invalidate', [url])
+
+
+class RemoteFragmentTuner:
+    """Child side of the parent's FragmentTuner; observations need no answer"""
+
+    def __init__(self, runner: '_ChildRunner'):
+        self.runner = runner
+
+    def observe(self, *args):
+        self.runner.notify('fragment_observe', list(args))
+
+
+class _JobThread(PoolThread):
+    """The child's only job thread; a PoolThread so YoutubeDL instances are reused across jobs"""
+
+    def __init__(self, runner: '_ChildRunner'):
+        super().__init__(None, "process-job")
+        self.runner = runner
+        # Instances for other options still share the connections of earlier jobs
+        self.sessions = SessionPool()
+
+    def run(self):
+        try:
+            while True:
+                spec = self.runner.jobs.get()
+                if spec is None:
+                    break
+                try:
+                    self.runner.run_job(spec)
+                except Exception as e:
+                    # Relayed like the job's own signals, so the parent reports it
+                    self.runner.send(SIGNAL, json.dumps({'signal': 'download_error',
+                                                         'args': [spec['item']['id'], f"Unexpected error: {e}"]},
+                                                        default=repr).encode())
+                finally:
+                    self._progress_hooks = []
+                    self._logger = None
+                    self.jobs_run += 1
+                    self.runner.send(DONE, _DONE_STRUCT.pack(resident_memory()))
+        finally:
+            self.close_youtube_dl()
+            self.sessions.close()
+
+
+class _ChildRunner:
+    """Runs in the child: reads the pipe on the main thread, runs jobs on a _JobThread"""
+
+    # Least time between two progress messages of the same status
+    progress_interval = 0.1
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.jobs: queue.Queue = queue.Queue()
+        self._send_lock = threading.Lock()
+        self._pending_progress: Optional[bytes] = None
+        self._last_progress = (None, 0.0)
+        self._calls = itertools.count()
+        self._replies: Dict[int, queue.Queue] = {}
+        # Pause/cancel received for the current job, and its worker once built
+        self._control_lock = threading.Lock()
+        self._flags = (False, False)
+        self._worker: Optional[DownloadWorker] = None
+        self._sent_info = None
+
+    def serve(self):
+        thread = _JobThread(self)
+        thread.start()
+        try:
+            while True:
+                try:
+                    message = self.conn.recv_bytes()
+                except (EOFError, OSError):
+                    # The parent is gone
+                    break
+                kind, body = message[:1], message[1:]
+                if kind == JOB:
+                    with self._control_lock:
+                        self._flags = (False, False)
+                    self.jobs.put(json.loads(body))
+                elif kind in (PAUSE, RESUME, CANCEL):
+                    self.control(kind)
+                elif kind == REPLY:
+                    call_id, result = json.loads(body)
+                    self._replies.pop(call_id).put(result)
+                elif kind == EXIT:
+                    break
+        finally:
+            self.control(CANCEL)
+            self.jobs.put(None)
+            thread.join(5.0)
+
+    def control(self, kind: bytes):
+        with self._control_lock:
+            paused, cancelled = self._flags
+            if kind == CANCEL:
+                cancelled = True
+            else:
+                paused = kind == PAUSE
+            self._flags = (paused, cancelled)
+            if self._worker is not None:
+                self._worker.is_paused, self._worker.is_cancelled = self._flags
+
+    def run_job(self, spec: Dict[str, Any]):
+        JobLogger.echo = spec['echo']
+        fields = spec['item']
+        item = DownloadItem(fields['url'], batch_id=fields['batch_id'], priority=fields['priority'])
+        for name, value in fields.items():
+            setattr(item, name, value)
+        item.info = self._sent_info = spec['info']
+
+        kind = spec['kind']
+        if kind == 'sync':
+            worker = SyncWorker(item, spec['settings'], set(spec['known_ids']), set(spec['retry_ids']))
+        elif kind == 'info':
+            worker = InfoWorker(item, spec['settings'])
+        else:
+            worker = DownloadWorker(item, spec['settings'])
+        worker.fragment_workers = spec['fragment_workers']
+        if spec['rate_limited']:
+            worker.rate_limiter = RemoteRateLimiter(self)
+        if spec['archive']:
+            worker.download_archive = RemoteArchive(self)
+        if spec['info_cache']:
+            worker.info_cache = RemoteInfoCache(self)
+        if spec['fragment_tuner']:
+            worker.fragment_tuner = RemoteFragmentTuner(self)
+
+        # Connected here, on the job thread, so the signals are delivered directly
+        for name in _SIGNALS[kind]:
+            if name != 'progress_updated':
+                getattr(worker, name).connect(lambda *args, name=name: self.emit(worker, name, args))
+        worker.progress_updated.connect(self.send_progress)
+
+        self._last_progress = (None, 0.0)
+        with self._control_lock:
+            worker.is_paused, worker.is_cancelled = self._flags
+            self._worker = worker
+        try:
+            worker.run()
+        finally:
+            with self._control_lock:
+                self._worker = None
+
+    def emit(self, worker: DownloadWorker, name: str, args: Sequence[Any]):
+        item = worker.download_item
+        payload = {'signal': name, 'args': list(args), 'item': {field: getattr(item, field) for field in _ITEM_FIELDS}}
+        if item.info is not None and item.info is not self._sent_info:
+            # Resolved by an info job; the download job will get it back in its spec
+            payload['info'] = yt_dlp.YoutubeDL.sanitize_info(item.info, remove_private_keys=True)
+            self._sent_info = item.info
+        self.send(SIGNAL, json.dumps(payload, default=repr).encode())
+
+    def send_progress(self, download_id: str, progress: dict):
+        body = pack_progress(progress)
+        if body is None:
+            self.send(SIGNAL, json.dumps({'signal': 'progress_updated', 'args': [download_id, progress]},
+                                         default=repr).encode())
+            return
+        now = time.monotonic()
+        with self._send_lock:
+            status, last = self._last_progress
+            if status == progress['status'] and now - last < self.progress_interval:
+                # Superseded by the next update, or flushed ahead of the next message
+                self._pending_progress = body
+                return
+            self._pending_progress = None
+            self._last_progress = (progress['status'], now)
+            self.conn.send_bytes(PROGRESS + body)
+
+    def send(self, kind: bytes, body: bytes = b''):
+        with self._send_lock:
+            if self._pending_progress is not None:
+                self.conn.send_bytes(PROGRESS + self._pending_progress)
+                self._pending_progress = None
+            self.conn.send_bytes(kind + body)
+
+    def call(self, method: str, args: list):
+        """Run method in the parent and wait for its result; safe from any thread"""
+        call_id = next(self._calls)
+        reply: queue.Queue = queue.Queue(maxsize=1)
+        self._replies[call_id] = reply
+        self.send(CALL, json.dumps([call_id, method, args]).encode())
+        return reply.get()
+
+    def notify(self, method: str, args: list):
+        self.send(NOTIFY, json.dumps([method, args]).encode())
+
+
+def serve_jobs(conn, initializer: Optional[Callable] = None, initargs: Sequence[Any] = ()):
+    """Entry point of a worker process"""
+    if initializer is not None:
+        initializer(*initargs)
+    _ChildRunner(conn).serve()
+
+
+class ProcessSlot(threading.Thread):
+    """Pool thread that hands its jobs to a child process and relays what comes back"""
+
+    def __init__(self, pool: 'ProcessPool', name: str):
+        super().__init__(name=name, daemon=True)
+        self.pool = pool
+        self.jobs_run = 0
+        self.process = None
+        self.conn = None
+        self.process_jobs = 0  # jobs run by the current child
+
+    def run(self):
+        try:
+            while True:
+                job = self.pool._next_job(self)
+                if job is None:
+                    break
+                try:
+                    self.run_job(job)
+                except Exception as e:
+                    report_job_error(job, e)
+                finally:
+                    # Released now rather than when the next job arrives
+                    job = None
+                    self.jobs_run += 1
+                    self.pool._job_done()
+        finally:
+            self.stop_process()
+
+    def run_job(self, job):
+        kind = job_kind(job)
+        if kind is None:
+            # Not a download job; nothing to isolate
+            job.run()
+            return
+        download_id = job.download_item.id
+        rss = 0
+        try:
+            # Jobs cancelled while still waiting for a slot never start
+            if not job.is_cancelled:
+                rss = self.relay(job, kind)
+                self.process_jobs += 1
+        except (EOFError, OSError):
+            self.kill_process()
+            if not job.is_cancelled:
+                job.download_error.emit(download_id, "Download failed: worker process exited unexpectedly")
+        finally:
+            job.finished.emit(download_id)
+        if self.process_jobs >= self.pool.max_jobs_per_process or (self.pool.max_rss and rss > self.pool.max_rss):
+            self.stop_process()
+
+    def relay(self, job: DownloadWorker, kind: str) -> int:
+        """Run job in the child; returns the child's resident memory once it is done"""
+        conn = self.ensure_process()
+        conn.send_bytes(JOB + json.dumps(job_spec(job, kind), default=repr).encode())
+        signals = _SIGNALS[kind]
+        paused = cancelled = False
+        while True:
+            if job.is_cancelled and not cancelled:
+                cancelled = True
+                conn.send_bytes(CANCEL)
+            if job.is_paused != paused:
+                paused = job.is_paused
+                conn.send_bytes(PAUSE if paused else RESUME)
+            if not conn.poll(self.pool.poll_interval):
+                if not self.process.is_alive():
+                    raise EOFError("worker process exited")
+                continue
+
+            message = conn.recv_bytes()
+            kind_byte, body = message[:1], message[1:]
+            if kind_byte == PROGRESS:
+                job.progress_updated.emit(job.download_item.id, unpack_progress(body))
+            elif kind_byte == SIGNAL:
+                payload = json.loads(body)
+                for name, value in payload.get('item', {}).items():
+                    setattr(job.download_item, name, value)
+                if 'info' in payload:
+                    job.download_item.info = payload['info']
+                if payload['signal'] in signals:
+                    getattr(job, payload['signal']).emit(*payload['args'])
+            elif kind_byte == CALL:
+                call_id, method, args = json.loads(body)
+                conn.send_bytes(REPLY + json.dumps([call_id, self.answer(job, method, args)]).encode())
+            elif kind_byte == NOTIFY:
+                method, args = json.loads(body)
+                self.answer(job, method, args)
+            elif kind_byte == DONE:
+                return _DONE_STRUCT.unpack(body)[0]
+
+    def answer(self, job: DownloadWorker, method: str, args: list):
+        """Serve a child's call on the parent's shared limiter, archive, info cache or tuner"""
+        if method == 'consume':
+            limiter = job.rate_limiter
+            allowed = limiter.consume(args[0], consumer=job.download_item.id,
+                                      weight=job.download_item.bandwidth_weight,
+                                      abort=lambda: job.is_cancelled or job.is_paused)
+            return [allowed, bool(limiter.rate)]
+        if method == 'archive_contains':
+            return args[0] in job.download_archive
+        if method == 'archive_add':
+            job.download_archive.add(args[0])
+        elif method == 'info_cache_get':
+            return job.info_cache.get(args[0])
+        elif method == 'info_cache_put':
+            job.info_cache.put(*args)
+        elif method == 'info_cache_invalidate':
+            job.info_cache.invalidate(args[0])
+        elif method == 'fragment_observe':
+            job.fragment_tuner.observe(*args)
+        return None
+
+    def ensure_process(self):
+        if self.process is not None and self.process.is_alive():
+            return self.conn
+        self.kill_process()
+        context = self.pool.context
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(target=serve_jobs, name=f"{self.name}-process", daemon=True,
+                                  args=(child_conn, self.pool.initializer, self.pool.initargs))
+        process.start()
+        child_conn.close()
+        self.process, self.conn, self.process_jobs = process, parent_conn, 0
+        self.pool._process_started()
+        return parent_conn
+
+    def stop_process(self):
+        """Ask the child to exit; kill it if it does not within exit_timeout"""
+        if self.process is None:
+            return
+        try:
+            self.conn.send_bytes(EXIT)
+        except OSError:
+            pass
+        self.process.join(self.pool.exit_timeout)
+        self.kill_process()
+
+    def kill_process(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = self.conn = None
+
+
+class ProcessPool(WorkerPool):
+    """WorkerPool whose slots run download, info and sync jobs in child processes.
+
+    Children are started with "spawn" (forking a process that runs Qt is
+    unsafe) and replaced after max_jobs_per_process jobs or when their
+    resident memory passes max_rss bytes after a job. initializer(*initargs)
+    runs in every new child before its first job.
+    """
+
+    # Seconds between checks of the running job's pause/cancel flags
+    poll_interval = 0.05
+    # Seconds a child gets to exit after being asked to
+    exit_timeout = 2.0
+
+    def __init__(self, max_workers: int, name: str = "worker", max_jobs_per_process: int = 50,
+                 max_rss: int = 512 * 1024 * 1024, initializer: Optional[Callable] = None,
+                 initargs: Sequence[Any] = ()):
+        super().__init__(max_workers, name)
+        self.max_jobs_per_process = max(1, max_jobs_per_process)
+        self.max_rss = max_rss
+        self.initializer = initializer
+        self.initargs = tuple(initargs)
+        self.context = multiprocessing.get_context('spawn')
+        self.processes_started = 0
+
+    def _start_thread(self):
+        self._counter += 1
+        thread = ProcessSlot(self, f"{self.name}-{self._counter}")
+        self._threads.add(thread)
+        thread.start()
+
+    def _process_started(self):
+        with self._cond:
+            self.processes_started += 1
@@ -0,0 +1,149 @@
+"""
+Crash-safe record of the download queue, restored on the next start
+"""
+
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from PyQt6.QtCore import QStandardPaths
+from .download_item import DownloadItem, DownloadStatus
+
+# Stored as PRAGMA user_version, for telling journal layouts apart
+SCHEMA_VERSION = 1
+
+# Columns written from DownloadItem attributes of the same name
+_ITEM_COLUMNS = ('url', 'batch_id', 'parent_id', 'priority', 'bandwidth_weight', 'title', 'uploader',
+                 'thumbnail_url', 'status', 'filepath', 'error_message', 'total_bytes')
+
+
+def default_journal_path() -> str:
+    """queue.db in the per-user application data directory"""
+    directory = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, "queue.db")
+
+
+class QueueStore:
+    """SQLite journal (WAL mode) of queued items and the settings they were added with.
+
+    Only state transitions are written - additions, status changes, titles,
+    removals - never per-chunk progress: byte progress lives in the .part
+    files yt-dlp continues from. Each write is its own transaction, so a
+    crash loses at most the transition in flight and never corrupts the
+    journal. Settings snapshots are stored once and shared by the items
+    that were queued with them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL stays consistent without an fsync per commit
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._settings_ids: Dict[str, int] = {}
+
+    @classmethod
+    def open_default(cls) -> 'QueueStore':
+        return cls(default_journal_path())
+
+    def _create_schema(self):
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS settings ("
+                              "id INTEGER PRIMARY KEY, snapshot TEXT UNIQUE NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS items ("
+                              "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, "
+                              "url TEXT NOT NULL, batch_id TEXT, parent_id TEXT, priority INTEGER, "
+                              "bandwidth_weight REAL, title TEXT, uploader TEXT, thumbnail_url TEXT, status TEXT, "
+                              "filepath TEXT, error_message TEXT, total_bytes INTEGER, settings_id INTEGER)")
+            self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def _settings_id(self, settings: Dict[str, Any]) -> int:
+        snapshot = json.dumps(settings, sort_keys=True, default=str)
+        settings_id = self._settings_ids.get(snapshot)
+        if settings_id is None:
+            self.conn.execute("INSERT OR IGNORE INTO settings (snapshot) VALUES (?)", (snapshot,))
+            settings_id = self.conn.execute("SELECT id FROM settings WHERE snapshot = ?",
+                                            (snapshot,)).fetchone()[0]
+            self._settings_ids[snapshot] = settings_id
+        return settings_id
+
+    @staticmethod
+    def _item_values(item: DownloadItem) -> List[Any]:
+        values = [getattr(item, column) for column in _ITEM_COLUMNS]
+        values[_ITEM_COLUMNS.index('status')] = item.status.value
+        return values
+
+    def add(self, item: DownloadItem, settings: Dict[str, Any]):
+        self.add_many([(item, settings)])
+
+    def add_many(self, entries: Iterable[Tuple[DownloadItem, Dict[str, Any]]]):
+        """Record new items in one transaction"""
+        columns = ('id',) + _ITEM_COLUMNS + ('settings_id',)
+        sql = (f"INSERT OR REPLACE INTO items ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        # A batch usually shares one settings dict; serialise it once
+        batch_ids: Dict[int, Tuple[Dict[str, Any], int]] = {}
+        rows = []
+        with self.conn:
+            for item, settings in entries:
+                if id(settings) not in batch_ids:
+                    batch_ids[id(settings)] = (settings, self._settings_id(settings))
+                rows.append([item.id] + self._item_values(item) + [batch_ids[id(settings)][1]])
+            self.conn.executemany(sql, rows)
+
+    def update(self, item: DownloadItem):
+        """Record the item's current status, title and result"""
+        assignments = ', '.join(f"{column} = ?" for column in _ITEM_COLUMNS)
+        with self.conn:
+            self.conn.execute(f"UPDATE items SET {assignments} WHERE id = ?",
+                              self._item_values(item) + [item.id])
+
+    def remove(self, download_id: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM items WHERE id = ?", (download_id,))
+
+    def clear(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM items")
+            self.conn.execute("DELETE FROM settings")
+        self._settings_ids.clear()
+
+    def settings_for(self, download_id: str) -> Optional[Dict[str, Any]]:
+        """Settings the item was added with, or None if it is not journalled"""
+        row = self.conn.execute("SELECT settings.snapshot FROM items JOIN settings ON settings.id = items.settings_id "
+                                "WHERE items.id = ?", (download_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def load_page(self, after: int = 0, limit: int = 1000) -> Tuple[List[Tuple[DownloadItem, Dict[str, Any]]], int]:
+        """Return up to limit items in queue order after position after, and the last position.
+
+        Pages are read by position rather than OFFSET, so each costs the
+        same however deep into a long queue it is.
+        """
+        rows = self.conn.execute(
+            f"SELECT items.seq, items.id, {', '.join('items.' + c for c in _ITEM_COLUMNS)}, settings.snapshot "
+            "FROM items LEFT JOIN settings ON settings.id = items.settings_id "
+            "WHERE items.seq > ? ORDER BY items.seq LIMIT ?", (after, limit)).fetchall()
+        snapshots: Dict[Optional[str], Dict[str, Any]] = {}
+        entries = []
+        for row in rows:
+            item = DownloadItem(row[2])
+            item.id = row[1]
+            for column, value in zip(_ITEM_COLUMNS[1:], row[3:-1]):
+                if value is not None:
+                    setattr(item, column, value)
+            item.status = DownloadStatus(item.status) if item.status else DownloadStatus.QUEUED
+            snapshot = row[-1]
+            if snapshot not in snapshots:
+                snapshots[snapshot] = json.loads(snapshot) if snapshot else {}
+            # Items added together share one settings dict, as they did when queued
+            entries.append((item, snapshots[snapshot]))
+        return entries, (rows[-1][0] if rows else after)
+
+    def close(self):
+        self.conn.close()
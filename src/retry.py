@@ -0,0 +1,78 @@
+"""
+Failure classification and backoff for automatic retries
+"""
+
+import random
+import re
+from enum import Enum
+from typing import Callable
+
+from .host_limiter import throttle_status
+
+
+class ErrorKind(Enum):
+    NETWORK = "network"  # timeouts, resets, DNS hiccups, 5xx responses
+    RATE_LIMITED = "rate_limited"  # 429/403, handled by the per-host backoff
+    UNAVAILABLE = "unavailable"  # geo-blocked, private, removed or needs a login
+    EXTRACTOR = "extractor"  # the site changed or yt-dlp has a bug
+    UNKNOWN = "unknown"
+
+
+# Failures that may go away on their own
+TRANSIENT_KINDS = (ErrorKind.NETWORK, ErrorKind.RATE_LIMITED)
+
+# Checked in order; the first kind with a matching pattern wins
+_PATTERNS = (
+    (ErrorKind.UNAVAILABLE, re.compile(
+        r'available (in|from) your (country|location)|geo.?restrict|'
+        r'private video|video is private|sign in to confirm|login required|'
+        r'members.only|requires (authentication|payment|login)|has been removed|'
+        r'video (is )?unavailable|account (has been )?terminated|'
+        r'HTTP Error (401|404|410)', re.IGNORECASE)),
+    (ErrorKind.NETWORK, re.compile(
+        r'timed? ?out|connection (reset|refused|aborted)|remote end closed|'
+        r'temporary failure in name resolution|name or service not known|'
+        r'network is unreachable|incompleteread|broken pipe|eof occurred|'
+        r'unable to download (webpage|video data|json)|urlopen error|'
+        r'HTTP Error 5\d\d|giving up after \d+ (fragment )?retries', re.IGNORECASE)),
+    (ErrorKind.EXTRACTOR, re.compile(
+        r'unable to extract|unsupported url|please report this issue|'
+        r'no video formats found|requested format is not available|'
+        r'extractorerror', re.IGNORECASE)),
+)
+
+
+def classify_error(error: str) -> ErrorKind:
+    """Sort a yt-dlp error message into an ErrorKind"""
+    if throttle_status(error):
+        return ErrorKind.RATE_LIMITED
+    for kind, pattern in _PATTERNS:
+        if pattern.search(error or ''):
+            return kind
+    return ErrorKind.UNKNOWN
+
+
+class RetryPolicy:
+    """Decides whether and when a failed item goes back to the queue.
+
+    Only network failures are retried here (rate limits wait on the host's
+    backoff instead). Attempt n waits base_delay * 2**(n-1) seconds, capped
+    at max_delay, with the upper half jittered so a batch that failed
+    together does not come back together.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 10.0,
+                 max_delay: float = 600.0, rng: Callable[[], float] = random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng
+
+    def should_retry(self, kind: ErrorKind, attempts: int) -> bool:
+        """attempts is the number of automatic retries already made"""
+        return kind == ErrorKind.NETWORK and attempts < self.max_attempts
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number attempt (1-based)"""
+        ceiling = min(self.base_delay * (2 ** max(0, attempt - 1)), self.max_delay)
+        return ceiling / 2 + self.rng() * ceiling / 2
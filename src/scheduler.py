@@ -0,0 +1,206 @@
+"""
+Queue schedulers deciding which queued download starts next
+"""
+
+import heapq
+import itertools
+import queue
+from typing import Any, Dict, List, Optional, Tuple
+
+from .download_item import DownloadItem
+
+QueueEntry = Tuple[DownloadItem, Dict[str, Any]]
+
+
+class QueueScheduler:
+    """Heap-backed download queue; subclasses only define the ordering.
+
+    Keeps the put()/get_nowait()/empty()/qsize() surface of queue.Queue so
+    it can stand in for the old FIFO. Every operation is O(log n): removed
+    or re-keyed entries are left in the heap as tombstones and skipped when
+    they surface.
+
+    "Move to top" works for every policy: promoted items are served before
+    everything else, the most recently promoted first.
+    """
+
+    name = ""
+
+    def __init__(self):
+        self._heap: List[list] = []
+        self._live: Dict[str, list] = {}
+        self._seq = itertools.count()
+        self._promotions = itertools.count()
+
+    def sort_key(self, item: DownloadItem) -> tuple:
+        """Ordering key within the normal tier; lower starts first"""
+        return ()
+
+    def put(self, entry: QueueEntry):
+        self._push(entry, (1,) + self.sort_key(entry[0]))
+
+    def get_nowait(self) -> QueueEntry:
+        while self._heap:
+            record = heapq.heappop(self._heap)
+            entry = record[-1]
+            if entry is None:
+                continue
+            del self._live[entry[0].id]
+            self.on_dequeue(record)
+            return entry
+        raise queue.Empty
+
+    def empty(self) -> bool:
+        return not self._live
+
+    def qsize(self) -> int:
+        return len(self._live)
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._live
+
+    def entries(self) -> List[QueueEntry]:
+        """All queued entries in dequeue order (O(n log n), for UI/migration use)"""
+        live = sorted(record for record in self._heap if record[-1] is not None)
+        return [record[-1] for record in live]
+
+    def remove(self, item_id: str) -> Optional[QueueEntry]:
+        entry = self._unlink(item_id)
+        if entry is not None:
+            self.on_remove(entry)
+        return entry
+
+    def move_to_top(self, item_id: str) -> bool:
+        entry = self._unlink(item_id)
+        if entry is None:
+            return False
+        self._push(entry, (0, -next(self._promotions)))
+        return True
+
+    def reprioritize(self, item_id: str) -> bool:
+        """Recompute an item's position after its priority or size changed"""
+        record = self._live.get(item_id)
+        if record is None or record[0] == 0:
+            return False
+        key = (1,) + self.sort_key(record[-1][0])
+        if tuple(record[:-2]) != key:
+            # Joins the end of its new key's line
+            self._push(self._unlink(item_id), key)
+        return True
+
+    def clear(self):
+        self._heap.clear()
+        self._live.clear()
+
+    def on_dequeue(self, record: list):
+        pass
+
+    def on_remove(self, entry: QueueEntry):
+        pass
+
+    def _unlink(self, item_id: str) -> Optional[QueueEntry]:
+        # Leaves a tombstone in the heap; the entry keeps what it was enqueued with
+        record = self._live.pop(item_id, None)
+        if record is None:
+            return None
+        entry = record[-1]
+        record[-1] = None
+        return entry
+
+    def _push(self, entry: QueueEntry, key: tuple):
+        record = list(key) + [next(self._seq), entry]
+        self._live[entry[0].id] = record
+        heapq.heappush(self._heap, record)
+
+
+class PriorityScheduler(QueueScheduler):
+    """Highest DownloadItem.priority first; FIFO among equal priorities"""
+
+    name = "priority"
+
+    def sort_key(self, item: DownloadItem) -> tuple:
+        return (-item.priority,)
+
+
+class FairShareScheduler(QueueScheduler):
+    """Round-robin between batches (one paste, import or playlist each).
+
+    The n-th queued item of a batch is scheduled in round n. A batch that
+    arrives late starts at the current round, so it shares the queue with
+    an 800-entry playlist instead of waiting behind it or starving it.
+    """
+
+    name = "fair_share"
+
+    def __init__(self):
+        super().__init__()
+        self._current_round = 0
+        self._next_round: Dict[str, int] = {}
+        self._batch_sizes: Dict[str, int] = {}
+        # Round of each queued item, assigned once when it is put
+        self._rounds: Dict[str, int] = {}
+
+    def put(self, entry: QueueEntry):
+        item = entry[0]
+        batch = item.batch_id or item.id
+        round_number = max(self._next_round.get(batch, 0), self._current_round)
+        self._next_round[batch] = round_number + 1
+        self._batch_sizes[batch] = self._batch_sizes.get(batch, 0) + 1
+        self._rounds[item.id] = round_number
+        super().put(entry)
+
+    def sort_key(self, item: DownloadItem) -> tuple:
+        return (self._rounds.get(item.id, self._current_round),)
+
+    def on_dequeue(self, record: list):
+        if record[0] == 1:
+            self._current_round = max(self._current_round, record[1])
+        self._forget(record[-1])
+
+    def on_remove(self, entry: QueueEntry):
+        self._forget(entry)
+
+    def _forget(self, entry: QueueEntry):
+        self._rounds.pop(entry[0].id, None)
+        batch = entry[0].batch_id or entry[0].id
+        remaining = self._batch_sizes.get(batch, 0) - 1
+        if remaining > 0:
+            self._batch_sizes[batch] = remaining
+        else:
+            self._batch_sizes.pop(batch, None)
+            self._next_round.pop(batch, None)
+
+    def clear(self):
+        super().clear()
+        self._next_round.clear()
+        self._batch_sizes.clear()
+        self._rounds.clear()
+
+
+class ShortestJobFirstScheduler(QueueScheduler):
+    """Smallest expected download first.
+
+    Sizes come from the extracted formats (DownloadItem.total_bytes or
+    estimated_size). Items whose size is still unknown go after all sized
+    ones, in FIFO order; call reprioritize() once their size is known.
+    """
+
+    name = "shortest_first"
+
+    def sort_key(self, item: DownloadItem) -> tuple:
+        size = item.total_bytes or item.estimated_size
+        return (size if size else float('inf'),)
+
+
+SCHEDULERS = {
+    PriorityScheduler.name: PriorityScheduler,
+    FairShareScheduler.name: FairShareScheduler,
+    ShortestJobFirstScheduler.name: ShortestJobFirstScheduler,
+}
+
+
+def create_scheduler(policy: str) -> QueueScheduler:
+    return SCHEDULERS.get(policy, PriorityScheduler)()
@@ -0,0 +1,116 @@
+"""
+Network sessions shared by the YoutubeDL instances of all worker threads
+"""
+
+import functools
+import json
+import threading
+from typing import Any, Dict, Tuple
+
+import yt_dlp
+from yt_dlp import YoutubeDL
+
+# yt-dlp options that shape the request handlers and cookie jar; instances
+# that agree on these can share both, whatever their output options
+NETWORK_OPTIONS = (
+    'proxy', 'geo_verification_proxy', 'source_address', 'socket_timeout',
+    'nocheckcertificate', 'legacyserverconnect', 'prefer_insecure', 'enable_file_urls',
+    'client_certificate', 'client_certificate_key', 'client_certificate_password',
+    'cookiefile', 'cookiesfrombrowser', 'http_headers', 'impersonate', 'compat_opts',
+    'debug_printtraffic',
+)
+
+
+def session_key(params: Dict[str, Any]) -> str:
+    """Stable key for the network options in a set of yt-dlp options"""
+    network = {k: params[k] for k in NETWORK_OPTIONS if k in params}
+    return json.dumps(network, sort_keys=True, default=repr)
+
+
+@functools.lru_cache(maxsize=None)
+def can_share(ydl_class: type) -> bool:
+    """Whether ydl_class builds its cookie jar and request director lazily, so attach() can swap them.
+
+    Both are yt-dlp internals. Releases without them, or that build them
+    in __init__, leave every instance with a session of its own.
+    """
+    return all(isinstance(getattr(ydl_class, name, None), functools.cached_property)
+               for name in ('cookiejar', '_request_director'))
+
+
+def serialize_instance_creation(director):
+    """Make director's handlers build their sessions one thread at a time.
+
+    Handlers create their requests session or urllib opener on first use
+    without a lock, so threads racing on a new director would each build
+    one, with its own connection pool.
+    """
+    for handler in (getattr(director, 'handlers', None) or {}).values():
+        get_instance = getattr(handler, '_get_instance', None)
+        if get_instance is None:
+            continue
+        lock = threading.Lock()
+
+        def locked_get_instance(*args, get_instance=get_instance, lock=lock, **kwargs):
+            with lock:
+                return get_instance(*args, **kwargs)
+
+        handler._get_instance = locked_get_instance
+
+
+class SessionPool:
+    """One cookie jar and request director per set of network options, shared across threads.
+
+    attach() points a YoutubeDL at the shared session for its options, so
+    every job keeps the cookies earlier jobs were given and reuses their
+    idle keep-alive connections instead of opening new ones. The director
+    and jar belong to an instance the pool creates for the purpose; the
+    cookie jar locks itself, the connection pools are thread-safe and the
+    handlers build them under a lock, so any number of threads may use a
+    session at once. Call detach() before closing an attached instance,
+    which would otherwise close the shared director with it. With a yt-dlp
+    that can_share() rules out, attach() and detach() do nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, YoutubeDL] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def session(self, params: Dict[str, Any]) -> Tuple[Any, Any]:
+        """(cookie jar, request director) for params' network options, created on first use"""
+        key = session_key(params)
+        with self._lock:
+            owner = self._sessions.get(key)
+            if owner is None:
+                network = {k: params[k] for k in NETWORK_OPTIONS if k in params}
+                # Only its network layer is used, so no extractors are loaded
+                owner = YoutubeDL({**network, 'quiet': True}, auto_init=False)
+                serialize_instance_creation(owner._request_director)
+                self._sessions[key] = owner
+            return owner.cookiejar, owner._request_director
+
+    def attach(self, ydl: yt_dlp.YoutubeDL):
+        if not can_share(type(ydl)):
+            return
+        # Both are cached properties; setting them first means ydl never builds its own
+        ydl.__dict__['cookiejar'], ydl.__dict__['_request_director'] = self.session(ydl.params)
+
+    def detach(self, ydl: yt_dlp.YoutubeDL):
+        """Undo attach(), so closing ydl leaves the shared director open"""
+        if can_share(type(ydl)):
+            ydl.__dict__.pop('_request_director', None)
+
+    def close(self):
+        """Close every session's connections, saving cookies to their cookie files"""
+        with self._lock:
+            owners = list(self._sessions.values())
+            self._sessions.clear()
+        for owner in owners:
+            try:
+                owner.close()
+            except Exception:
+                pass
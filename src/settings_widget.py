@@ -9,9 +9,24 @@ from PyQt6.QtWidgets import (
     QLineEdit, QPushButton, QComboBox, QCheckBox, QSpinBox,
     QFileDialog, QTabWidget, QTextEdit, QGridLayout, QFrame
 )
-from PyQt6.QtCore import QSettings, Qt
+from PyQt6.QtCore import QSettings, Qt, pyqtSignal
+
 
 class SettingsWidget(QWidget):
+    max_concurrent_changed = pyqtSignal(int)
+    max_per_host_changed = pyqtSignal(int)
+    scheduling_policy_changed = pyqtSignal(str)
+    bandwidth_limit_changed = pyqtSignal(int)  # bytes per second, 0 = unlimited
+    auto_concurrency_changed = pyqtSignal(bool)
+    auto_concurrency_bounds_changed = pyqtSignal(int, int)  # min, max
+    
+    # Queue order choices shown in the UI -> DownloadManager scheduling policy
+    SCHEDULING_POLICIES = {
+        "Priority (first in, first out)": "priority",
+        "Fair share between batches": "fair_share",
+        "Smallest downloads first": "shortest_first",
+    }
+    
     def __init__(self):
         super().__init__()
         self.settings = QSettings()
@@ -196,16 +211,97 @@ class SettingsWidget(QWidget):
         self.download_playlist_checkbox = QCheckBox("Download entire playlist")
         advanced_layout.addWidget(self.download_playlist_checkbox)
         
+        self.use_archive_checkbox = QCheckBox("Skip videos already downloaded (archive)")
+        self.use_archive_checkbox.setChecked(True)
+        advanced_layout.addWidget(self.use_archive_checkbox)
+        
+        self.use_info_cache_checkbox = QCheckBox("Reuse recently extracted video info (cache)")
+        self.use_info_cache_checkbox.setChecked(True)
+        advanced_layout.addWidget(self.use_info_cache_checkbox)
+        
+        # Read by MainWindow when it creates the download manager
+        self.process_workers_checkbox = QCheckBox("Run downloads in separate processes (applies after restart)")
+        advanced_layout.addWidget(self.process_workers_checkbox)
+        
         # Concurrent downloads
         concurrent_layout = QHBoxLayout()
         concurrent_layout.addWidget(QLabel("Max concurrent downloads:"))
         self.max_concurrent_spinbox = QSpinBox()
         self.max_concurrent_spinbox.setRange(1, 10)
         self.max_concurrent_spinbox.setValue(3)
+        self.max_concurrent_spinbox.valueChanged.connect(self.max_concurrent_changed.emit)
         concurrent_layout.addWidget(self.max_concurrent_spinbox)
         
         advanced_layout.addLayout(concurrent_layout)
         
+        # Let the download manager pick the count from measured throughput
+        auto_layout = QHBoxLayout()
+        self.auto_concurrency_checkbox = QCheckBox("Auto-tune concurrent downloads between")
+        self.auto_concurrency_checkbox.toggled.connect(self.on_auto_concurrency_toggled)
+        auto_layout.addWidget(self.auto_concurrency_checkbox)
+        self.auto_min_spinbox = QSpinBox()
+        self.auto_min_spinbox.setRange(1, 10)
+        self.auto_min_spinbox.setValue(1)
+        auto_layout.addWidget(self.auto_min_spinbox)
+        auto_layout.addWidget(QLabel("and"))
+        self.auto_max_spinbox = QSpinBox()
+        self.auto_max_spinbox.setRange(1, 10)
+        self.auto_max_spinbox.setValue(10)
+        auto_layout.addWidget(self.auto_max_spinbox)
+        self.auto_min_spinbox.valueChanged.connect(self.on_auto_bounds_changed)
+        self.auto_max_spinbox.valueChanged.connect(self.on_auto_bounds_changed)
+        
+        advanced_layout.addLayout(auto_layout)
+        
+        # Per-site limit, so one site can't take every slot
+        per_host_layout = QHBoxLayout()
+        per_host_layout.addWidget(QLabel("Max downloads per site:"))
+        self.max_per_host_spinbox = QSpinBox()
+        self.max_per_host_spinbox.setRange(1, 10)
+        self.max_per_host_spinbox.setValue(3)
+        self.max_per_host_spinbox.valueChanged.connect(self.max_per_host_changed.emit)
+        per_host_layout.addWidget(self.max_per_host_spinbox)
+        
+        advanced_layout.addLayout(per_host_layout)
+        
+        # Combined limit for all downloads
+        bandwidth_layout = QHBoxLayout()
+        bandwidth_layout.addWidget(QLabel("Bandwidth limit:"))
+        self.bandwidth_limit_spinbox = QSpinBox()
+        self.bandwidth_limit_spinbox.setRange(0, 10_000_000)
+        self.bandwidth_limit_spinbox.setSingleStep(256)
+        self.bandwidth_limit_spinbox.setSuffix(" KB/s")
+        self.bandwidth_limit_spinbox.setSpecialValueText("Unlimited")
+        self.bandwidth_limit_spinbox.valueChanged.connect(
+            lambda kilobytes: self.bandwidth_limit_changed.emit(kilobytes * 1024)
+        )
+        bandwidth_layout.addWidget(self.bandwidth_limit_spinbox)
+        
+        advanced_layout.addLayout(bandwidth_layout)
+        
+        # Parallel fragments for HLS/DASH streams
+        fragments_layout = QHBoxLayout()
+        fragments_layout.addWidget(QLabel("Fragments per download:"))
+        self.concurrent_fragments_spinbox = QSpinBox()
+        self.concurrent_fragments_spinbox.setRange(0, 16)
+        self.concurrent_fragments_spinbox.setSpecialValueText("Auto")
+        self.concurrent_fragments_spinbox.setValue(0)
+        fragments_layout.addWidget(self.concurrent_fragments_spinbox)
+        
+        advanced_layout.addLayout(fragments_layout)
+        
+        # Queue order
+        queue_order_layout = QHBoxLayout()
+        queue_order_layout.addWidget(QLabel("Queue order:"))
+        self.queue_order_combo = QComboBox()
+        self.queue_order_combo.addItems(list(self.SCHEDULING_POLICIES))
+        self.queue_order_combo.currentTextChanged.connect(
+            lambda text: self.scheduling_policy_changed.emit(self.SCHEDULING_POLICIES.get(text, "priority"))
+        )
+        queue_order_layout.addWidget(self.queue_order_combo)
+        
+        advanced_layout.addLayout(queue_order_layout)
+        
         layout.addWidget(advanced_group)
         
         # Custom arguments
@@ -226,6 +322,20 @@ class SettingsWidget(QWidget):
     def on_format_changed(self, text: str):
         self.custom_format_edit.setEnabled(text == "Custom Format")
         
+    def on_auto_concurrency_toggled(self, enabled: bool):
+        self.max_concurrent_spinbox.setEnabled(not enabled)
+        self.auto_concurrency_changed.emit(enabled)
+        
+    def on_auto_bounds_changed(self):
+        # Keep min <= max by moving the other end
+        if self.auto_min_spinbox.value() > self.auto_max_spinbox.value():
+            if self.sender() is self.auto_min_spinbox:
+                self.auto_max_spinbox.setValue(self.auto_min_spinbox.value())
+            else:
+                self.auto_min_spinbox.setValue(self.auto_max_spinbox.value())
+            return
+        self.auto_concurrency_bounds_changed.emit(self.auto_min_spinbox.value(), self.auto_max_spinbox.value())
+        
     def browse_output_dir(self):
         dir_path = QFileDialog.getExistingDirectory(
             self, "Select Download Directory", 
@@ -261,7 +371,17 @@ class SettingsWidget(QWidget):
             'write_thumbnail': self.write_thumbnail_checkbox.isChecked(),
             'add_metadata': self.add_metadata_checkbox.isChecked(),
             'download_playlist': self.download_playlist_checkbox.isChecked(),
+            'use_download_archive': self.use_archive_checkbox.isChecked(),
+            'use_info_cache': self.use_info_cache_checkbox.isChecked(),
+            'process_workers': self.process_workers_checkbox.isChecked(),
             'max_concurrent': self.max_concurrent_spinbox.value(),
+            'auto_concurrency': self.auto_concurrency_checkbox.isChecked(),
+            'auto_concurrency_min': self.auto_min_spinbox.value(),
+            'auto_concurrency_max': self.auto_max_spinbox.value(),
+            'max_per_host': self.max_per_host_spinbox.value(),
+            'bandwidth_limit': self.bandwidth_limit_spinbox.value() * 1024,
+            'concurrent_fragments': self.concurrent_fragments_spinbox.value(),
+            'scheduling_policy': self.SCHEDULING_POLICIES.get(self.queue_order_combo.currentText(), "priority"),
             'custom_args': self.custom_args_edit.toPlainText()
         }
         
@@ -310,10 +430,40 @@ class SettingsWidget(QWidget):
         self.download_playlist_checkbox.setChecked(
             self.settings.value('download_playlist', False, bool)
         )
+        self.use_archive_checkbox.setChecked(
+            self.settings.value('use_download_archive', True, bool)
+        )
+        self.use_info_cache_checkbox.setChecked(
+            self.settings.value('use_info_cache', True, bool)
+        )
+        self.process_workers_checkbox.setChecked(
+            self.settings.value('process_workers', False, bool)
+        )
         
         self.max_concurrent_spinbox.setValue(
             self.settings.value('max_concurrent', 3, int)
         )
+        self.auto_concurrency_checkbox.setChecked(
+            self.settings.value('auto_concurrency', False, bool)
+        )
+        self.auto_min_spinbox.setValue(
+            self.settings.value('auto_concurrency_min', 1, int)
+        )
+        self.auto_max_spinbox.setValue(
+            self.settings.value('auto_concurrency_max', 10, int)
+        )
+        self.max_per_host_spinbox.setValue(
+            self.settings.value('max_per_host', 3, int)
+        )
+        self.bandwidth_limit_spinbox.setValue(
+            self.settings.value('bandwidth_limit_kb', 0, int)
+        )
+        self.concurrent_fragments_spinbox.setValue(
+            self.settings.value('concurrent_fragments', 0, int)
+        )
+        self.queue_order_combo.setCurrentText(
+            self.settings.value('queue_order', 'Priority (first in, first out)')
+        )
         self.custom_args_edit.setPlainText(
             self.settings.value('custom_args', '')
         )
@@ -333,7 +483,17 @@ class SettingsWidget(QWidget):
         self.settings.setValue('write_thumbnail', self.write_thumbnail_checkbox.isChecked())
         self.settings.setValue('add_metadata', self.add_metadata_checkbox.isChecked())
         self.settings.setValue('download_playlist', self.download_playlist_checkbox.isChecked())
+        self.settings.setValue('use_download_archive', self.use_archive_checkbox.isChecked())
+        self.settings.setValue('use_info_cache', self.use_info_cache_checkbox.isChecked())
+        self.settings.setValue('process_workers', self.process_workers_checkbox.isChecked())
         self.settings.setValue('max_concurrent', self.max_concurrent_spinbox.value())
+        self.settings.setValue('auto_concurrency', self.auto_concurrency_checkbox.isChecked())
+        self.settings.setValue('auto_concurrency_min', self.auto_min_spinbox.value())
+        self.settings.setValue('auto_concurrency_max', self.auto_max_spinbox.value())
+        self.settings.setValue('max_per_host', self.max_per_host_spinbox.value())
+        self.settings.setValue('bandwidth_limit_kb', self.bandwidth_limit_spinbox.value())
+        self.settings.setValue('concurrent_fragments', self.concurrent_fragments_spinbox.value())
+        self.settings.setValue('queue_order', self.queue_order_combo.currentText())
         self.settings.setValue('custom_args', self.custom_args_edit.toPlainText())
         
     def apply_settings(self):
@@ -0,0 +1,318 @@
+"""
+Work queue shared by several machines, each draining it with its own DownloadManager
+"""
+
+import contextlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from .dedup import canonical_key
+from .download_item import DownloadItem
+from .download_manager import DownloadManager
+
+# Stored as PRAGMA user_version, for telling queue layouts apart
+SCHEMA_VERSION = 1
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def backlog_key(url: str, playlist: bool = False) -> str:
+    """Key of the video (or list, with playlist set) at url, the same for every URL form that names it"""
+    extractor, video_id = canonical_key(url, playlist)
+    return f"{extractor}:{video_id}"
+
+
+class SharedQueue:
+    """Backlog of URLs in an SQLite file that any number of nodes claim work from.
+
+    A node claims items with a lease of lease_seconds and keeps it by
+    calling renew() (its heartbeat) while the items are queued or running.
+    Items whose lease ran out - their node crashed or lost the file - are
+    claimed again by whichever node asks next; after max_attempts claims an
+    item is marked failed instead, so one item that kills its node cannot
+    take down every node in turn. complete() and fail() only apply while
+    the caller still holds the lease, which is what keeps a node that lost
+    an item from recording it. Items are unique by backlog_key(url), so
+    youtu.be/X and youtube.com/watch?v=X&t=1 are one item.
+
+    Every claim is one IMMEDIATE transaction, so two nodes never claim the
+    same item. The file uses the rollback journal rather than WAL, which
+    needs shared memory that network filesystems do not provide. Leases
+    compare wall clock times, so the nodes' clocks should be in sync to
+    well within lease_seconds.
+    """
+
+    def __init__(self, path: str, node_id: Optional[str] = None, lease_seconds: float = 60.0,
+                 max_attempts: int = 5, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.node_id = node_id or default_node_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self._create_schema()
+        self._settings_ids: Dict[str, int] = {}
+
+    def _create_schema(self):
+        with self._write() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS settings ("
+                         "id INTEGER PRIMARY KEY, snapshot TEXT UNIQUE NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS items ("
+                         "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, "
+                         "key TEXT UNIQUE NOT NULL, url TEXT NOT NULL, settings_id INTEGER NOT NULL, "
+                         "state TEXT NOT NULL DEFAULT 'pending', node TEXT, "
+                         "lease_until REAL NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, "
+                         "error TEXT NOT NULL DEFAULT '', finished REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS items_by_state ON items (state, seq)")
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    @contextlib.contextmanager
+    def _write(self):
+        """One IMMEDIATE transaction: other nodes wait (up to the connect timeout) until it ends"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def _settings_id(self, conn: sqlite3.Connection, settings: Dict[str, Any]) -> int:
+        snapshot = json.dumps(settings, sort_keys=True, default=str)
+        settings_id = self._settings_ids.get(snapshot)
+        if settings_id is None:
+            conn.execute("INSERT OR IGNORE INTO settings (snapshot) VALUES (?)", (snapshot,))
+            settings_id = conn.execute("SELECT id FROM settings WHERE snapshot = ?", (snapshot,)).fetchone()[0]
+            self._settings_ids[snapshot] = settings_id
+        return settings_id
+
+    def add(self, urls: Iterable[str], settings: Dict[str, Any]) -> int:
+        """Add URLs to the backlog in one transaction; returns how many were new.
+
+        A URL for a video the backlog already has, in any URL form, is a duplicate.
+        """
+        playlist = DownloadManager.playlist_mode(settings)
+        with self._write() as conn:
+            settings_id = self._settings_id(conn, settings)
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO items (id, key, url, settings_id) VALUES (?, ?, ?, ?)",
+                             ((str(uuid.uuid4()), backlog_key(url, playlist), url, settings_id) for url in urls))
+            return conn.total_changes - before
+
+    def adopt(self, items: Iterable[Tuple[str, str]], settings: Dict[str, Any]) -> Set[str]:
+        """Add (id, url) items already claimed by this node, such as a playlist's entries.
+
+        Returns the ids added; videos the backlog already has are left to it.
+        """
+        items = list(items)
+        now = self.clock()
+        with self._write() as conn:
+            settings_id = self._settings_id(conn, settings)
+            added = set()
+            for item_id, url in items:
+                # Entries are videos, whatever mode their playlist was added in
+                cursor = conn.execute("INSERT OR IGNORE INTO items (id, key, url, settings_id, state, node, "
+                                      "lease_until, attempts) VALUES (?, ?, ?, ?, 'claimed', ?, ?, 1)",
+                                      (item_id, backlog_key(url), url, settings_id, self.node_id,
+                                       now + self.lease_seconds))
+                if cursor.rowcount == 1:
+                    added.add(item_id)
+        return added
+
+    def claim(self, limit: int) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Lease up to limit pending or expired items to this node, oldest first.
+
+        Returns (id, url, settings) for each.
+        """
+        if limit <= 0:
+            return []
+        now = self.clock()
+        with self._write() as conn:
+            conn.execute("UPDATE items SET state = 'failed', node = NULL, finished = ?, "
+                         "error = 'Lease expired ' || attempts || ' times' "
+                         "WHERE state = 'claimed' AND lease_until < ? AND attempts >= ?",
+                         (now, now, self.max_attempts))
+            rows = conn.execute("SELECT items.id, url, snapshot FROM items JOIN settings ON settings.id = settings_id "
+                                "WHERE state = 'pending' OR (state = 'claimed' AND lease_until < ?) "
+                                "ORDER BY seq LIMIT ?", (now, limit)).fetchall()
+            conn.executemany("UPDATE items SET state = 'claimed', node = ?, lease_until = ?, "
+                             "attempts = attempts + 1 WHERE id = ?",
+                             [(self.node_id, now + self.lease_seconds, row[0]) for row in rows])
+        return [(item_id, url, json.loads(snapshot)) for item_id, url, snapshot in rows]
+
+    def renew(self, item_ids: Iterable[str]) -> Set[str]:
+        """Extend this node's leases on item_ids; returns the ids it no longer holds"""
+        item_ids = list(item_ids)
+        if not item_ids:
+            return set()
+        now = self.clock()
+        with self._write() as conn:
+            conn.executemany("UPDATE items SET lease_until = ? WHERE id = ? AND node = ? AND state = 'claimed'",
+                             [(now + self.lease_seconds, item_id, self.node_id) for item_id in item_ids])
+            held = {row[0] for row in conn.execute(
+                f"SELECT id FROM items WHERE node = ? AND state = 'claimed' AND id IN ({', '.join('?' * len(item_ids))})",
+                [self.node_id] + item_ids)}
+        return set(item_ids) - held
+
+    def complete(self, item_id: str) -> bool:
+        """Record item_id as done; False if this node no longer held it"""
+        return self._finish(item_id, 'done', '')
+
+    def fail(self, item_id: str, error: str) -> bool:
+        """Record item_id as failed for good; False if this node no longer held it"""
+        return self._finish(item_id, 'failed', error)
+
+    def _finish(self, item_id: str, state: str, error: str) -> bool:
+        with self._write() as conn:
+            cursor = conn.execute("UPDATE items SET state = ?, error = ?, finished = ?, lease_until = 0 "
+                                  "WHERE id = ? AND node = ? AND state = 'claimed'",
+                                  (state, error, self.clock(), item_id, self.node_id))
+            return cursor.rowcount == 1
+
+    def release(self, item_ids: Iterable[str]):
+        """Hand items this node will not finish back to the backlog, without counting the claim"""
+        with self._write() as conn:
+            conn.executemany("UPDATE items SET state = 'pending', node = NULL, lease_until = 0, "
+                             "attempts = MAX(attempts - 1, 0) WHERE id = ? AND node = ? AND state = 'claimed'",
+                             [(item_id, self.node_id) for item_id in item_ids])
+
+    def counts(self) -> Dict[str, int]:
+        """Number of items per state: pending, claimed, done and failed"""
+        counts = dict.fromkeys(('pending', 'claimed', 'done', 'failed'), 0)
+        with self._lock:
+            counts.update(self.conn.execute("SELECT state, COUNT(*) FROM items GROUP BY state"))
+        return counts
+
+    def is_drained(self) -> bool:
+        """True once every item is done or failed"""
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM items WHERE state IN ('pending', 'claimed') LIMIT 1").fetchone() is None
+
+    def close(self):
+        self.conn.close()
+
+
+class SharedQueueNode(QObject):
+    """Keeps a DownloadManager supplied with items claimed from a SharedQueue.
+
+    Claims enough items to keep the download slots busy plus as many again
+    waiting, renews their leases every third of the lease time while they
+    are queued or running, and records each one's result. A playlist's
+    entries are added to the queue already claimed by this node, so another
+    node picks up the ones left unfinished if this one dies; the playlist's
+    own item is done once it has been expanded. overrides replace settings
+    the items were added with, such as the output directory, which is
+    usually per machine.
+    """
+    item_claimed = pyqtSignal(object, dict)  # DownloadItem, its settings
+    item_lost = pyqtSignal(str)  # download_id this node dropped: reclaimed by another node, or already queued
+    drained = pyqtSignal()
+
+    poll_interval_ms = 2000
+
+    def __init__(self, manager: DownloadManager, store: SharedQueue, overrides: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.manager = manager
+        self.store = store
+        self.overrides = overrides or {}
+        self.held: Set[str] = set()
+        # Settings each held item has in the queue, before overrides
+        self.shared_settings: Dict[str, Dict[str, Any]] = {}
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.poll_interval_ms)
+        self.poll_timer.timeout.connect(self.fill)
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.setInterval(max(1, int(store.lease_seconds * 1000 / 3)))
+        self.heartbeat_timer.timeout.connect(self.heartbeat)
+
+        manager.download_completed.connect(self.on_completed)
+        manager.download_error.connect(self.on_error)
+        manager.playlist_entry_added.connect(self.on_playlist_entry)
+        manager.playlist_expanded.connect(lambda download_id, count: self.on_completed(download_id, ""))
+        manager.sync_finished.connect(lambda download_id, stats: self.on_completed(download_id, ""))
+
+    def start(self):
+        self.poll_timer.start()
+        self.heartbeat_timer.start()
+        self.fill()
+
+    def stop(self):
+        """Stop claiming and hand back the items not finished yet"""
+        self.poll_timer.stop()
+        self.heartbeat_timer.stop()
+        if self.held:
+            self.store.release(self.held)
+            self.held.clear()
+            self.shared_settings.clear()
+
+    def wanted(self) -> int:
+        return max(0, 2 * self.manager.max_concurrent_downloads - len(self.held))
+
+    def fill(self):
+        for item_id, url, settings in self.store.claim(self.wanted()):
+            download_item = DownloadItem(url)
+            # The queue's id, so results map straight back to its row
+            download_item.id = item_id
+            self.shared_settings[item_id] = settings
+            settings = {**settings, **self.overrides}
+            self.held.add(item_id)
+            self.item_claimed.emit(download_item, settings)
+            self.manager.add_download(download_item, settings)
+        if not self.held and self.store.is_drained():
+            self.drained.emit()
+
+    def is_drained(self) -> bool:
+        return not self.held and self.store.is_drained()
+
+    def heartbeat(self):
+        for item_id in self.store.renew(self.held):
+            # Reclaimed by another node after this one missed its renewals
+            self.held.discard(item_id)
+            self.shared_settings.pop(item_id, None)
+            self.drop(item_id)
+
+    def drop(self, download_id: str):
+        """Cancel an item this node will not download after all"""
+        self.manager.cancel_download(download_id)
+        self.item_lost.emit(download_id)
+
+    def on_playlist_entry(self, download_item: DownloadItem, settings: Dict[str, Any]):
+        """Record an entry of a held playlist in the queue before the manager queues it"""
+        parent_settings = self.shared_settings.get(download_item.parent_id)
+        if parent_settings is None:
+            return
+        # The entry's settings as the queue would have them, without this node's overrides
+        shared = {key: value for key, value in settings.items() if key not in self.overrides}
+        shared.update((key, parent_settings[key]) for key in self.overrides if key in parent_settings)
+        if self.store.adopt([(download_item.id, download_item.url)], shared):
+            self.held.add(download_item.id)
+            self.shared_settings[download_item.id] = shared
+        else:
+            # Already in the queue, from another playlist or an expansion of this one that
+            # a crashed node started; whoever claims that row downloads it
+            QTimer.singleShot(0, lambda: self.drop(download_item.id))
+
+    def on_completed(self, download_id: str, filepath: str):
+        if download_id in self.held:
+            self.held.discard(download_id)
+            self.shared_settings.pop(download_id, None)
+            self.store.complete(download_id)
+            self.fill()
+
+    def on_error(self, download_id: str, error: str):
+        if download_id in self.held:
+            self.held.discard(download_id)
+            self.shared_settings.pop(download_id, None)
+            self.store.fail(download_id, error)
+            self.fill()
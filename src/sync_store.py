@@ -0,0 +1,113 @@
+"""
+Entries seen by earlier syncs of a channel or playlist, and how each sync went
+"""
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Optional, Set
+from PyQt6.QtCore import QStandardPaths
+from .dedup import canonical_key
+
+
+def default_sync_path() -> str:
+    """sync.db in the per-user application data directory"""
+    directory = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, "sync.db")
+
+
+def source_key(url: str) -> str:
+    """Key of the channel or playlist at url, the same for every URL form that names it"""
+    extractor, list_id = canonical_key(url, True)
+    return f"{extractor}:{list_id}"
+
+
+class SyncStore:
+    """SQLite record of the entry ids each synced source has listed so far.
+
+    A sync pages through a source newest first and stops at the first id
+    recorded here, so only new uploads are fetched and queued. An entry
+    whose download failed is forgotten and kept as a retry id instead; the
+    next sync pages on past known entries until it has listed every retry
+    id again. Retry ids it does not list are gone from the source and
+    dropped. An entry queued again by max_retry_syncs syncs that still
+    fails is given up on and stays seen, so later syncs stop paging down
+    to it. Sources are keyed by source_key(url). Each source also keeps
+    the time, duration, pages fetched and new entry count of its last sync.
+    """
+
+    max_retry_syncs = 3
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS seen ("
+                              "source TEXT NOT NULL, entry_id TEXT NOT NULL, "
+                              "PRIMARY KEY (source, entry_id)) WITHOUT ROWID")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS retry ("
+                              "source TEXT NOT NULL, entry_id TEXT NOT NULL, "
+                              "PRIMARY KEY (source, entry_id)) WITHOUT ROWID")
+            # Syncs that have queued each failed entry again
+            self.conn.execute("CREATE TABLE IF NOT EXISTS retried ("
+                              "source TEXT NOT NULL, entry_id TEXT NOT NULL, syncs INTEGER NOT NULL, "
+                              "PRIMARY KEY (source, entry_id)) WITHOUT ROWID")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sources ("
+                              "source TEXT PRIMARY KEY, synced_at REAL, duration REAL, "
+                              "pages INTEGER, new_entries INTEGER)")
+
+    @classmethod
+    def open_default(cls) -> 'SyncStore':
+        return cls(default_sync_path())
+
+    def seen_ids(self, source: str) -> Set[str]:
+        return {row[0] for row in self.conn.execute("SELECT entry_id FROM seen WHERE source = ?", (source,))}
+
+    def retry_ids(self, source: str) -> Set[str]:
+        return {row[0] for row in self.conn.execute("SELECT entry_id FROM retry WHERE source = ?", (source,))}
+
+    def record_failure(self, source: str, entry_id: str):
+        """Forget an entry whose download failed, so the next sync queues it again.
+
+        Entries already queued again by max_retry_syncs syncs stay seen instead.
+        """
+        row = self.conn.execute("SELECT syncs FROM retried WHERE source = ? AND entry_id = ?",
+                                (source, entry_id)).fetchone()
+        with self.conn:
+            if row is not None and row[0] >= self.max_retry_syncs:
+                self.conn.execute("DELETE FROM retry WHERE source = ? AND entry_id = ?", (source, entry_id))
+                self.conn.execute("INSERT OR IGNORE INTO seen (source, entry_id) VALUES (?, ?)", (source, entry_id))
+                return
+            self.conn.execute("DELETE FROM seen WHERE source = ? AND entry_id = ?", (source, entry_id))
+            self.conn.execute("INSERT OR IGNORE INTO retry (source, entry_id) VALUES (?, ?)", (source, entry_id))
+
+    def record_sync(self, source: str, new_ids: Iterable[str], pages: int, duration: float):
+        """Remember a finished sync's new entries and statistics in one transaction.
+
+        A finished sync has listed every retry id still in the source, so
+        they are cleared; the ones it queued again count one more retry.
+        """
+        new_ids = list(new_ids)
+        requeued = self.retry_ids(source).intersection(new_ids)
+        with self.conn:
+            self.conn.executemany("INSERT INTO retried (source, entry_id, syncs) VALUES (?, ?, 1) "
+                                  "ON CONFLICT (source, entry_id) DO UPDATE SET syncs = syncs + 1",
+                                  ((source, entry_id) for entry_id in requeued))
+            self.conn.execute("DELETE FROM retry WHERE source = ?", (source,))
+            self.conn.executemany("INSERT OR IGNORE INTO seen (source, entry_id) VALUES (?, ?)",
+                                  ((source, entry_id) for entry_id in new_ids))
+            self.conn.execute("INSERT OR REPLACE INTO sources (source, synced_at, duration, pages, new_entries) "
+                              "VALUES (?, ?, ?, ?, ?)", (source, time.time(), duration, pages, len(new_ids)))
+
+    def last_sync(self, source: str) -> Optional[Dict[str, Any]]:
+        """synced_at, duration, pages and new_entries of source's last sync, None if never synced"""
+        row = self.conn.execute("SELECT synced_at, duration, pages, new_entries FROM sources WHERE source = ?",
+                                (source,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('synced_at', 'duration', 'pages', 'new_entries'), row))
+
+    def close(self):
+        self.conn.close()
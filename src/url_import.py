@@ -0,0 +1,95 @@
+"""
+Streaming readers for URL lists: plain text, yt-dlp batch files and CSV
+"""
+
+import csv
+import itertools
+import os
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Batch file comment markers, as yt-dlp's --batch-file understands them
+_COMMENT_PREFIXES = ('#', ';', ']')
+
+
+def _looks_like_url(text: str) -> bool:
+    return '://' in text and not text.startswith(_COMMENT_PREFIXES)
+
+
+def parse_batch_lines(lines: Iterable[str]) -> Iterator[str]:
+    """URLs in text or yt-dlp batch file lines: one per line, comments and blanks skipped"""
+    for line in lines:
+        url = line.strip()
+        if url and not url.startswith(_COMMENT_PREFIXES):
+            yield url
+
+
+def parse_csv_lines(lines: Iterable[str]) -> Iterator[str]:
+    """URLs in CSV lines: the first cell of each row that holds one; header rows fall out"""
+    for row in csv.reader(lines):
+        for cell in row:
+            cell = cell.strip()
+            if _looks_like_url(cell):
+                yield cell
+                break
+
+
+class UrlFileReader:
+    """Iterates the URLs in a file as they are read, never holding the whole file.
+
+    .csv files are read as CSV; anything else as a text or yt-dlp batch
+    file. fraction_read tells how far through the file reading has got,
+    for progress display.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._position = 0
+
+    @property
+    def fraction_read(self) -> float:
+        return min(1.0, self._position / self.size) if self.size else 1.0
+
+    def _lines(self) -> Iterator[str]:
+        # Binary reads keep tell() usable while iterating; utf-8-sig drops a BOM
+        with open(self.path, 'rb') as url_file:
+            first = True
+            for raw in url_file:
+                self._position = url_file.tell()
+                line = raw.decode('utf-8-sig' if first else 'utf-8', 'replace')
+                first = False
+                yield line
+
+    def __iter__(self) -> Iterator[str]:
+        if self.path.lower().endswith('.csv'):
+            return parse_csv_lines(self._lines())
+        return parse_batch_lines(self._lines())
+
+
+class UrlImport:
+    """One import in progress: the URLs still to read and what became of those read so far"""
+
+    def __init__(self, urls: Iterable[str], settings: Dict[str, Any], source: str = "",
+                 reader: Optional[UrlFileReader] = None):
+        self.urls = iter(urls)
+        self.settings = settings  # shared by every item of the import
+        self.source = source  # file name shown when done, "" for pasted URLs
+        self.reader = reader
+        self.batch_id = uuid.uuid4().hex  # one import is one batch for fair-share scheduling
+        self.added = 0
+        self.duplicates = 0
+        self.archived = 0
+        self.done = False
+
+    @property
+    def fraction_done(self) -> Optional[float]:
+        """How far through its file the import is, None when that is unknown"""
+        return self.reader.fraction_read if self.reader is not None else None
+
+    def take(self, count: int) -> List[str]:
+        """Read up to count more URLs; done is set once they run out"""
+        chunk = list(itertools.islice(self.urls, count))
+        if len(chunk) < count:
+            self.done = True
+        return chunk
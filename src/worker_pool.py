@@ -0,0 +1,285 @@
+"""
+Bounded pool of long-lived worker threads for download jobs
+"""
+
+import contextlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+
+import yt_dlp
+
+from .session_pool import SessionPool
+
+logger = logging.getLogger(__name__)
+
+
+def report_job_error(job, error: Exception):
+    """Report an error that escaped job.run() on the job's own download_error signal"""
+    item = getattr(job, 'download_item', None)
+    signal = getattr(job, 'download_error', None)
+    if item is None or signal is None:
+        logger.error("Unhandled error in pool job", exc_info=error)
+        return
+    signal.emit(item.id, f"Unexpected error: {error}")
+
+
+# Options that hold per-job callables; they are routed through the pool
+# thread instead of being baked into a reused YoutubeDL instance
+PER_JOB_OPTIONS = ('progress_hooks', 'logger')
+
+# Plain options that are tuned per job; yt-dlp reads them from ydl.params
+# when the download starts, so they are set on the reused instance
+PER_JOB_PARAMS = ('concurrent_fragment_downloads',)
+
+
+def options_key(params: Dict[str, Any]) -> str:
+    """Stable key for a set of yt-dlp options, ignoring per-job values"""
+    shared = {k: v for k, v in params.items() if k not in PER_JOB_OPTIONS + PER_JOB_PARAMS}
+    return json.dumps(shared, sort_keys=True, default=repr)
+
+
+class _DispatchLogger:
+    """yt-dlp logger that forwards to the logger of the thread's current job"""
+
+    def __init__(self, thread: 'PoolThread'):
+        self.thread = thread
+
+    def debug(self, msg):
+        self._forward('debug', msg)
+
+    def info(self, msg):
+        self._forward('info', msg)
+
+    def warning(self, msg):
+        self._forward('warning', msg)
+
+    def error(self, msg):
+        self._forward('error', msg)
+
+    def _forward(self, level: str, msg: str):
+        logger = self.thread._logger
+        if logger is not None:
+            getattr(logger, level)(msg)
+        elif level in ('warning', 'error'):
+            print(msg, file=sys.stderr)
+        elif not msg.startswith('[debug] '):
+            print(msg)
+
+
+class PoolThread(threading.Thread):
+    """Worker thread that keeps pulling jobs until the pool retires it"""
+
+    # YoutubeDL instances kept per thread, one per distinct option set
+    max_cached_instances = 4
+
+    def __init__(self, pool: 'WorkerPool', name: str):
+        super().__init__(name=name, daemon=True)
+        self.pool = pool
+        # Network sessions shared with the pool's other threads; None gives each instance its own
+        self.sessions: Optional[SessionPool] = pool.sessions if pool is not None else None
+        self.jobs_run = 0
+        self._ydl_cache: 'OrderedDict[str, yt_dlp.YoutubeDL]' = OrderedDict()
+        self._progress_hooks = []
+        self._logger = None
+        self._dispatch_logger = _DispatchLogger(self)
+
+    def run(self):
+        try:
+            while True:
+                job = self.pool._next_job(self)
+                if job is None:
+                    break
+                try:
+                    job.run()
+                except Exception as e:
+                    # Jobs report their own errors; never let one kill the thread
+                    report_job_error(job, e)
+                finally:
+                    self._progress_hooks = []
+                    self._logger = None
+                    # Released now rather than when the next job arrives
+                    job = None
+                    self.jobs_run += 1
+                    self.pool._job_done()
+        finally:
+            self.close_youtube_dl()
+
+    def youtube_dl(self, params: Dict[str, Any]) -> yt_dlp.YoutubeDL:
+        """Return this thread's YoutubeDL for params, creating it on first use.
+
+        Only ever used by the owning thread, one job at a time, so reusing
+        the instance (loaded extractors, cookie jar, request handlers) is safe.
+        With a SessionPool its cookie jar and request handlers are the ones
+        every thread uses for the same network options.
+        """
+        self._progress_hooks = list(params.get('progress_hooks', []))
+        self._logger = params.get('logger')
+
+        key = options_key(params)
+        ydl = self._ydl_cache.get(key)
+        if ydl is not None:
+            self._ydl_cache.move_to_end(key)
+            for name in PER_JOB_PARAMS:
+                if name in params:
+                    ydl.params[name] = params[name]
+            return ydl
+
+        while len(self._ydl_cache) >= self.max_cached_instances:
+            _, stale = self._ydl_cache.popitem(last=False)
+            self._close(stale)
+
+        ydl = yt_dlp.YoutubeDL({
+            **params,
+            'progress_hooks': [self._dispatch_progress],
+            'logger': self._dispatch_logger,
+        })
+        if self.sessions is not None:
+            self.sessions.attach(ydl)
+        self._ydl_cache[key] = ydl
+        return ydl
+
+    def close_youtube_dl(self):
+        while self._ydl_cache:
+            _, ydl = self._ydl_cache.popitem()
+            try:
+                self._close(ydl)
+            except Exception:
+                pass
+
+    def _close(self, ydl: yt_dlp.YoutubeDL):
+        if self.sessions is not None:
+            self.sessions.detach(ydl)
+        ydl.close()
+
+    def _dispatch_progress(self, d):
+        for hook in self._progress_hooks:
+            hook(d)
+
+
+@contextlib.contextmanager
+def youtube_dl_session(params: Dict[str, Any]):
+    """Yield a YoutubeDL for params.
+
+    Inside a pool thread the thread's cached instance is reused across jobs;
+    anywhere else a fresh instance is created and closed afterwards.
+    """
+    thread = threading.current_thread()
+    if isinstance(thread, PoolThread):
+        yield thread.youtube_dl(params)
+    else:
+        with yt_dlp.YoutubeDL(params) as ydl:
+            yield ydl
+
+
+class WorkerPool:
+    """Fixed-size set of reusable threads that run submitted jobs.
+
+    A job is any object with a run() method. Threads are started lazily up
+    to max_workers and stay alive between jobs. Shrinking the pool never
+    interrupts a running job: surplus threads exit once they are idle.
+    With sessions, the threads' YoutubeDL instances share its network
+    sessions; several pools may share one SessionPool.
+    """
+
+    def __init__(self, max_workers: int, name: str = "worker", sessions: Optional[SessionPool] = None):
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self.sessions = sessions
+        self._cond = threading.Condition()
+        self._jobs = deque()
+        self._threads = set()
+        self._idle = 0
+        self._running = 0
+        self._shutdown = False
+        self._counter = 0
+
+    def submit(self, job):
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit jobs to a pool that has been shut down")
+            self._jobs.append(job)
+            if self._idle < len(self._jobs) and len(self._threads) < self.max_workers:
+                self._start_thread()
+            self._cond.notify()
+
+    def resize(self, max_workers: int):
+        with self._cond:
+            self.max_workers = max(1, max_workers)
+            while self._idle < len(self._jobs) and len(self._threads) < self.max_workers:
+                self._start_thread()
+            # Wake idle threads so surplus ones can retire
+            self._cond.notify_all()
+
+    @property
+    def thread_count(self) -> int:
+        with self._cond:
+            return len(self._threads)
+
+    @property
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._jobs)
+
+    @property
+    def running_count(self) -> int:
+        with self._cond:
+            return self._running
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Stop accepting jobs, drop pending ones and wait for threads to exit.
+
+        Returns True if every thread finished within timeout. Threads are
+        daemonic, so ones still busy after the deadline do not block exit.
+        """
+        self.stop()
+        return self.join(timeout)
+
+    def stop(self):
+        """Stop accepting jobs and drop pending ones without waiting"""
+        with self._cond:
+            self._shutdown = True
+            self._jobs.clear()
+            self._cond.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait for threads to exit after stop(); True if all did within timeout"""
+        with self._cond:
+            threads = list(self._threads)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in threads:
+            if thread is threading.current_thread():
+                continue
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            thread.join(remaining)
+        return not any(thread.is_alive() for thread in threads)
+
+    def _start_thread(self):
+        self._counter += 1
+        thread = PoolThread(self, f"{self.name}-{self._counter}")
+        self._threads.add(thread)
+        thread.start()
+
+    def _next_job(self, thread: PoolThread):
+        with self._cond:
+            self._idle += 1
+            try:
+                while True:
+                    if self._shutdown or len(self._threads) > self.max_workers:
+                        self._threads.discard(thread)
+                        return None
+                    if self._jobs:
+                        self._running += 1
+                        return self._jobs.popleft()
+                    self._cond.wait()
+            finally:
+                self._idle -= 1
+
+    def _job_done(self):
+        with self._cond:
+            self._running -= 1
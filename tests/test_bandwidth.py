@@ -0,0 +1,119 @@
+"""
+Tests for bandwidth module
+"""
+
+import threading
+import time
+
+import pytest
+from src.bandwidth import TokenBucket
+from src.download_item import DownloadItem
+from src.download_manager import DownloadWorker
+
+
+def drain(bucket, seconds, chunk=16 * 1024, **kwargs):
+    """Consume chunks from a thread for the given time, returns a dict with the byte count"""
+    result = {'bytes': 0}
+    
+    def run():
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            bucket.consume(chunk, **kwargs)
+            result['bytes'] += chunk
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, result
+
+
+@pytest.mark.unit
+class TestTokenBucket:
+    def test_unlimited_never_blocks(self):
+        """Test that a zero rate lets everything through"""
+        bucket = TokenBucket()
+        start = time.monotonic()
+        for _ in range(1000):
+            assert bucket.consume(1024 * 1024)
+        assert time.monotonic() - start < 0.5
+    
+    def test_caps_combined_rate_of_all_consumers(self):
+        """Test that several threads together stay at the configured rate"""
+        rate = 512 * 1024
+        bucket = TokenBucket(rate)
+        start = time.monotonic()
+        runs = [drain(bucket, 1.0, consumer=i) for i in range(4)]
+        for thread, _ in runs:
+            thread.join()
+        elapsed = time.monotonic() - start
+        
+        total = sum(result['bytes'] for _, result in runs)
+        # Allow the initial burst plus one chunk per thread
+        assert total <= rate * elapsed + bucket._burst + 4 * 16 * 1024
+        assert total >= rate * 0.8
+    
+    def test_weights_split_the_rate(self):
+        """Test that a consumer with weight 3 gets about three times the bytes"""
+        # A small burst, so the first-come share before both threads wait stays negligible
+        bucket = TokenBucket(1024 * 1024, burst=16 * 1024)
+        light_thread, light = drain(bucket, 1.0, consumer="light", weight=1)
+        heavy_thread, heavy = drain(bucket, 1.0, consumer="heavy", weight=3)
+        light_thread.join()
+        heavy_thread.join()
+        
+        assert 2.0 < heavy['bytes'] / light['bytes'] < 4.5
+    
+    def test_rate_change_applies_to_waiting_consumers(self):
+        """Test that lifting the limit releases a blocked caller"""
+        bucket = TokenBucket(1024)
+        bucket.consume(64 * 1024)
+        released = threading.Event()
+        
+        def consume():
+            bucket.consume(64 * 1024)
+            released.set()
+        
+        threading.Thread(target=consume, daemon=True).start()
+        assert not released.wait(0.2)
+        bucket.set_rate(0)
+        assert released.wait(1.0)
+    
+    def test_abort_stops_waiting(self):
+        """Test that a cancelled download does not sit out its wait"""
+        bucket = TokenBucket(1024)
+        bucket.consume(64 * 1024)
+        start = time.monotonic()
+        
+        assert bucket.consume(64 * 1024, abort=lambda: time.monotonic() - start > 0.1) is False
+        assert time.monotonic() - start < 1.0
+
+
+@pytest.mark.slow
+class TestBandwidthLimitDownloads:
+    def test_achieved_rate_tracks_target(self, counting_extractor, local_media_server, tmp_path):
+        """Test concurrent real downloads against the local server stay near the limit"""
+        from conftest import CountingIE
+        size = 1536 * 1024
+        rate = 2 * 1024 * 1024
+        CountingIE.media_url = f"{local_media_server}/media/{size}"
+        bucket = TokenBucket(rate)
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        
+        workers = []
+        for i in range(3):
+            worker = DownloadWorker(DownloadItem(f"https://counting.invalid/limited{i}"), settings)
+            worker.rate_limiter = bucket
+            workers.append(worker)
+        
+        start = time.monotonic()
+        threads = [threading.Thread(target=worker.run) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        elapsed = time.monotonic() - start
+        
+        achieved = 3 * size / elapsed
+        print(f"\ntarget {rate / 1024:.0f} KiB/s, achieved {achieved / 1024:.0f} KiB/s over {elapsed:.2f}s")
+        assert sorted(path.stat().st_size for path in tmp_path.iterdir()) == [size] * 3
+        # The first burst lets a little more through; the per-file baseline a little less
+        assert rate * 0.8 <= achieved <= rate * 1.2
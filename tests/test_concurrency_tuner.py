@@ -0,0 +1,82 @@
+"""
+Tests for concurrency_tuner module
+"""
+
+import pytest
+from src.concurrency_tuner import ConcurrencyTuner
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        
+    def __call__(self):
+        return self.now
+
+
+def run_window(tuner, clock, slots, throughput, completed=0, errors=0, demand=True):
+    """Feed one 5 second window of traffic and return the tuner's decision"""
+    tuner.record_bytes(int(throughput * 5))
+    for _ in range(completed):
+        tuner.record_outcome(error=False)
+    for _ in range(errors):
+        tuner.record_outcome(error=True)
+    clock.now += 5
+    return tuner.evaluate(slots, demand)
+
+
+@pytest.mark.unit
+class TestConcurrencyTuner:
+    def test_adds_slots_while_throughput_rises(self):
+        """Test additive increase while each extra slot adds throughput"""
+        clock = FakeClock()
+        tuner = ConcurrencyTuner(clock=clock)
+        
+        slots = 1
+        for _ in range(4):
+            # Each slot adds 1 MB/s, the link is not saturated yet
+            slots = run_window(tuner, clock, slots, throughput=slots * 1_000_000)
+            
+        assert slots == 5
+        
+    def test_backs_off_on_plateau(self):
+        """Test that a slot which adds no throughput is taken back and probing pauses"""
+        clock = FakeClock()
+        tuner = ConcurrencyTuner(hold_windows=2, clock=clock)
+        link = 3_000_000
+        
+        slots = 3
+        slots = run_window(tuner, clock, slots, throughput=link)
+        assert slots == 4
+        slots = run_window(tuner, clock, slots, throughput=link)
+        assert slots == 3
+        
+        # Held for hold_windows, then probes again
+        assert run_window(tuner, clock, slots, throughput=link) == 3
+        assert run_window(tuner, clock, slots, throughput=link) == 3
+        assert run_window(tuner, clock, slots, throughput=link) == 4
+        
+    def test_halves_on_errors(self):
+        """Test multiplicative decrease when too many downloads fail"""
+        clock = FakeClock()
+        tuner = ConcurrencyTuner(clock=clock)
+        
+        assert run_window(tuner, clock, 8, throughput=1_000_000, completed=2, errors=2) == 4
+        
+    def test_no_increase_without_demand(self):
+        """Test that slots are only added when items are waiting for one"""
+        clock = FakeClock()
+        tuner = ConcurrencyTuner(clock=clock)
+        
+        assert run_window(tuner, clock, 2, throughput=1_000_000, demand=False) == 2
+        
+    def test_bounds(self):
+        """Test that decisions stay within the configured bounds"""
+        clock = FakeClock()
+        tuner = ConcurrencyTuner(min_slots=2, max_slots=4, clock=clock)
+        
+        assert run_window(tuner, clock, 4, throughput=1_000_000) == 4
+        assert run_window(tuner, clock, 3, throughput=0, errors=5) == 2
+        
+        tuner.set_bounds(5, 3)
+        assert (tuner.min_slots, tuner.max_slots) == (5, 5)
@@ -0,0 +1,215 @@
+"""
+Tests for control_api module
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import pytest
+from src.control_api import ControlServer
+from src.download_item import DownloadItem
+from src.download_manager import DownloadManager
+
+
+@pytest.fixture
+def control_server(qt_app):
+    """ControlServer on a free port for a DownloadManager whose jobs never run"""
+    with patch('src.download_manager.WorkerPool'):
+        manager = DownloadManager()
+        server = ControlServer(manager, lambda: {'format': 'best'})
+        server.start()
+        yield server
+        server.stop()
+
+
+@pytest.fixture
+def api(control_server, process_events_until):
+    """Return a helper that makes a request from another thread while the Qt loop runs"""
+    
+    def request(method, path, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(f"http://127.0.0.1:{control_server.port}{path}", data=data, method=method,
+                                     headers=dict({'Content-Type': 'application/json'}, **(headers or {})))
+        result = {}
+        
+        def send():
+            try:
+                with urllib.request.urlopen(req, timeout=30) as response:
+                    result['response'] = (response.status, json.loads(response.read()))
+            except urllib.error.HTTPError as e:
+                result['response'] = (e.code, json.loads(e.read()))
+                
+        thread = threading.Thread(target=send)
+        thread.start()
+        assert process_events_until(lambda: not thread.is_alive(), timeout=30)
+        return result['response']
+        
+    return request
+
+
+@pytest.mark.gui
+class TestControlServer:
+    def test_batch_enqueue_skips_duplicates_and_lists_items(self, control_server, api):
+        """Test that a batch is queued as one batch, duplicates reported and items listed by filter"""
+        added = []
+        control_server.items_added.connect(lambda items, settings: added.append((items, settings)))
+        status, result = api('POST', '/items', {'urls': ["https://youtu.be/aaaaaaaaaaa",
+                                                         "https://www.youtube.com/watch?v=aaaaaaaaaaa",
+                                                         "https://youtu.be/bbbbbbbbbbb"],
+                                                'settings': {'extract_audio': True}, 'priority': 5,
+                                                'weight': 2})
+        
+        assert status == 200
+        assert [entry['url'] for entry in result['added']] == ["https://youtu.be/aaaaaaaaaaa", "https://youtu.be/bbbbbbbbbbb"]
+        assert result['duplicates'] == ["https://www.youtube.com/watch?v=aaaaaaaaaaa"]
+        [(items, settings)] = added
+        assert settings == {'format': 'best', 'extract_audio': True}
+        assert {item.batch_id for item in items} == {result['batch_id']}
+        assert {item.priority for item in items} == {5}
+        assert {item.bandwidth_weight for item in items} == {2.0}
+        
+        control_server.track([DownloadItem("https://example.com/elsewhere")])
+        status, listing = api('GET', f"/items?batch={result['batch_id']}&status=queued")
+        assert status == 200
+        assert listing['total'] == 2
+        assert [item['url'] for item in listing['items']] == ["https://youtu.be/aaaaaaaaaaa", "https://youtu.be/bbbbbbbbbbb"]
+        assert api('GET', '/items?limit=1')[1]['total'] == 3
+        status, item = api('GET', f"/items/{result['added'][0]['id']}")
+        assert (status, item['status'], item['priority'], item['weight']) == (200, 'queued', 5, 2.0)
+        assert api('GET', '/items/missing')[0] == 404
+        for weight in (0, -1, "2", True):
+            assert api('POST', '/items', {'urls': ["https://youtu.be/ccccccccccc"], 'weight': weight})[0] == 400
+        
+    def test_actions_reach_the_manager(self, control_server, api):
+        """Test that pause, resume, cancel and retry act on the named items, or all of them"""
+        # The first few are taken by the info stage; the last two wait in its queue
+        _, result = api('POST', '/items', {'urls': [f"https://youtu.be/{n:011d}" for n in range(6)]})
+        first, second = (entry['id'] for entry in result['added'][-2:])
+        manager = control_server.manager
+        
+        assert api('POST', f"/items/{first}/pause")[1] == {'count': 1}
+        assert first in manager.paused_downloads
+        assert api('GET', f"/items/{first}")[1]['status'] == 'paused'
+        assert api('POST', '/items/resume', {'ids': [first]})[0] == 200
+        assert first not in manager.paused_downloads
+        assert api('POST', '/items/cancel', {'ids': [first, second]})[1] == {'count': 2}
+        assert api('GET', '/status')[1]['counts'] == {'queued': 4, 'cancelled': 2}
+        assert api('POST', '/items/explode', {})[0] == 404
+        assert api('POST', '/items/pause', {'ids': ['missing']})[0] == 404
+        
+    def test_events_coalesce_updates_per_interval(self, control_server):
+        """Test that many progress reports for one item between two intervals give one entry"""
+        item = DownloadItem("https://example.com/video")
+        control_server.track([item])
+        subscriber = control_server.subscribe()
+        for downloaded in range(0, 1000, 10):
+            control_server.on_progress(item.id, {'status': 'downloading', 'downloaded_bytes': downloaded,
+                                                 'total_bytes': 1000, 'speed': 100})
+        control_server.flush_events()
+        control_server.flush_events()
+        
+        [entry] = json.loads(subscriber.get_nowait())['items']
+        assert (entry['id'], entry['status'], entry['downloaded_bytes']) == (item.id, 'downloading', 990)
+        assert subscriber.empty()
+        
+    def test_event_stream_delivers_updates(self, control_server, process_events_until):
+        """Test that /events streams item updates as server-sent events"""
+        item = DownloadItem("https://example.com/video")
+        control_server.track([item])
+        received = []
+        
+        def listen():
+            with urllib.request.urlopen(f"http://127.0.0.1:{control_server.port}/events", timeout=10) as stream:
+                for line in stream:
+                    received.append(line.decode('utf-8').rstrip('\n'))
+                    if line.startswith(b'data: '):
+                        return
+                        
+        thread = threading.Thread(target=listen, daemon=True)
+        thread.start()
+        assert process_events_until(lambda: control_server._subscribers, timeout=5)
+        control_server.on_completed(item.id, "/tmp/video.mp4")
+        assert process_events_until(lambda: not thread.is_alive(), timeout=5)
+        
+        assert received[0] == "event: items"
+        [entry] = json.loads(received[1][len('data: '):])['items']
+        assert (entry['status'], entry['filepath']) == ('completed', "/tmp/video.mp4")
+        
+    def test_refuses_requests_a_web_page_could_make(self, control_server, api):
+        """Test that form posts, foreign Host headers and missing tokens are refused"""
+        assert api('GET', '/status', headers={'Host': 'evil.example:80'})[0] == 403
+        # DNS rebinding names that merely start with a loopback host
+        assert api('GET', '/status', headers={'Host': 'localhost.evil.example'})[0] == 403
+        assert api('GET', '/status', headers={'Host': '127.0.0.1.attacker.example:8080'})[0] == 403
+        assert api('GET', '/status', headers={'Host': '[::1]:8080'})[0] == 200
+        assert api('GET', '/status', headers={'Host': 'LocalHost:8080'})[0] == 200
+        assert api('POST', '/items', {'urls': []}, headers={'Content-Type': 'text/plain'})[0] == 415
+        assert api('POST', '/items', {'urls': "https://youtu.be/aaaaaaaaaaa"})[0] == 400
+        control_server.token = "secret"
+        assert api('GET', '/status')[0] == 401
+        assert api('GET', '/status', headers={'Authorization': 'Bearer secret'})[0] == 200
+    
+    def test_unexpected_errors_answer_500(self, control_server, api):
+        """Test that a malformed Host header or a failing Qt-thread call gets a JSON 500"""
+        status, result = api('GET', '/status', headers={'Host': '[::1'})
+        assert status == 500 and 'error' in result
+        with patch.object(control_server, 'summary', side_effect=RuntimeError("boom")):
+            assert api('GET', '/status') == (500, {'error': "internal error: boom"})
+        assert api('GET', '/status')[0] == 200
+        
+    def test_timed_out_call_is_not_run_later(self, control_server, process_events_until):
+        """Test that a call the busy Qt thread never got to is dropped, and a started one is waited for"""
+        control_server.call_timeout = 0.2
+        results = []
+        
+        def call(*args):
+            try:
+                results.append(control_server.call(*args))
+            except Exception as e:
+                results.append(getattr(e, 'status', e))
+                
+        # The Qt thread is blocked (no events processed) until the call has timed out
+        thread = threading.Thread(target=call, args=(control_server.enqueue, ["https://youtu.be/aaaaaaaaaaa"], {}, 0))
+        thread.start()
+        thread.join(5)
+        assert results == [503]
+        # Once the Qt thread gets to the queued call, it skips it
+        process_events_until(lambda: False, timeout=0.2)
+        assert control_server.items == {}
+        assert control_server.manager.find_duplicate("https://youtu.be/aaaaaaaaaaa") is None
+        
+        # A call that started before the timeout runs to the end and answers
+        thread = threading.Thread(target=call, args=(lambda: time.sleep(0.5) or "done",))
+        thread.start()
+        assert process_events_until(lambda: not thread.is_alive(), timeout=5)
+        assert results[-1] == "done"
+        
+    def test_clients_only_override_whitelisted_settings(self, control_server, api):
+        """Test that unknown settings are refused and paths only accepted with a token"""
+        url = {'urls': ["https://youtu.be/aaaaaaaaaaa"]}
+        assert api('POST', '/items', dict(url, settings={'custom_args': "--exec rm"}))[0] == 400
+        assert api('POST', '/items', dict(url, settings={'output_dir': "/etc"}))[0] == 403
+        assert control_server.manager.queued_count() == 0
+        control_server.token = "secret"
+        status, result = api('POST', '/items', dict(url, settings={'output_dir': "/srv/videos"}),
+                             headers={'Authorization': 'Bearer secret'})
+        assert (status, len(result['added'])) == (200, 1)
+
+
+@pytest.mark.slow
+class TestControlServerBenchmark:
+    def test_enqueueing_10k_urls(self, control_server, api):
+        """Benchmark: one POST of 10k URLs, measured from the client"""
+        urls = [f"https://www.youtube.com/watch?v={i:011d}" for i in range(10_000)]
+        start = time.monotonic()
+        status, result = api('POST', '/items', {'urls': urls})
+        elapsed = time.monotonic() - start
+        
+        print(f"\nqueued 10k URLs over the API in {elapsed * 1000:.0f} ms")
+        assert status == 200
+        assert len(result['added']) == 10_000
+        assert elapsed < 1.0
@@ -0,0 +1,70 @@
+"""
+Tests for dedup module
+"""
+
+import time
+
+import pytest
+from src.dedup import canonical_key
+
+
+@pytest.mark.unit
+class TestCanonicalKey:
+    def test_youtube_url_forms_share_a_key(self):
+        """Test that short, mobile, music and timestamped links name the same video"""
+        urls = [
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10",
+            "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://music.youtube.com/watch?v=dQw4w9WgXcQ",
+            "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+        ]
+        assert {canonical_key(url) for url in urls} == {('Youtube', 'dQw4w9WgXcQ')}
+        
+    def test_other_sites_and_videos_differ(self):
+        """Test that different videos and sites get different keys"""
+        assert canonical_key("https://vimeo.com/123456") == ('Vimeo', '123456')
+        assert canonical_key("https://youtu.be/aaaaaaaaaaa") != canonical_key("https://youtu.be/bbbbbbbbbbb")
+        
+    def test_sites_with_several_url_patterns_are_found(self):
+        """Test that extractors with a list of URL patterns are still matched by site"""
+        assert canonical_key("https://bsky.app/profile/alice.bsky.social/post/3l3vmxaeiv22k") == ('Bluesky', '3l3vmxaeiv22k')
+        
+    def test_video_links_into_a_list_name_the_video(self):
+        """Test that watch?v=X&list=L is the video X unless the whole playlist is wanted"""
+        first = "https://www.youtube.com/watch?v=aaaaaaaaaaa&list=PLabc"
+        second = "https://www.youtube.com/watch?v=bbbbbbbbbbb&list=PLabc"
+        
+        assert canonical_key(first) == ('Youtube', 'aaaaaaaaaaa')
+        assert canonical_key(first) != canonical_key(second)
+        assert canonical_key(first, playlist=True) == canonical_key(second, playlist=True)
+        assert canonical_key(first, playlist=True) == canonical_key("https://www.youtube.com/playlist?list=PLabc")
+        
+    def test_channel_tabs_differ(self):
+        """Test that a channel's tabs are different lists"""
+        videos = canonical_key("https://www.youtube.com/@chan/videos")
+        streams = canonical_key("https://www.youtube.com/@chan/streams")
+        
+        assert videos == ('YoutubeTab', '@chan/videos')
+        assert videos != streams
+        assert canonical_key("https://www.youtube.com/@chan/videos/", playlist=True) == videos
+        
+    def test_unknown_sites_fall_back_to_the_url(self):
+        """Test that URLs no extractor understands offline are compared as URLs"""
+        assert canonical_key("https://example.com/video.mp4#t=5") == ('url', "https://example.com/video.mp4")
+        assert canonical_key("https://example.com/a.mp4") != canonical_key("https://example.com/b.mp4")
+
+
+@pytest.mark.slow
+class TestCanonicalKeyBenchmark:
+    def test_bulk_paste_is_fast(self):
+        """Benchmark: keys for a 5000-line paste take well under a second per thousand"""
+        urls = [f"https://www.youtube.com/watch?v=bulk{i:07d}" for i in range(2500)]
+        urls += [f"https://example.com/videos/{i}.mp4" for i in range(2500)]
+        start = time.monotonic()
+        keys = {canonical_key(url) for url in urls}
+        elapsed = time.monotonic() - start
+        
+        print(f"\n5000 keys in {elapsed:.2f}s")
+        assert len(keys) == 5000
+        assert elapsed < 5
@@ -0,0 +1,185 @@
+"""
+Tests for disk_space module
+"""
+
+import pytest
+from unittest.mock import Mock, patch
+from src.disk_space import DiskSpaceGuard, existing_ancestor, free_bytes
+from src.download_item import DownloadItem
+from src.download_manager import DownloadManager
+
+MB = 1024 * 1024
+
+
+class FakeVolumes:
+    """Free space per volume; directories under /big are on one volume, everything else on another"""
+    
+    def __init__(self, free):
+        self.free = free
+    
+    def volume(self, path):
+        return 'big' if path.startswith('/big') else 'small'
+    
+    def free_space(self, path):
+        return self.free[self.volume(path)]
+
+
+def sized_item(url, size):
+    item = DownloadItem(url)
+    item.info = {'id': item.id, 'title': 'Test', 'url': url}
+    item.estimated_size = size
+    return item
+
+
+@pytest.mark.unit
+class TestDiskSpaceGuard:
+    def test_reservation_includes_post_processing_headroom(self):
+        """Test that video reserves room for the merged copy and audio for the extracted file"""
+        guard = DiskSpaceGuard()
+        
+        assert guard.reservation(100 * MB, {'format': 'best'}) == 200 * MB
+        assert guard.reservation(100 * MB, {'extract_audio': True}) == 150 * MB
+        assert guard.reservation(0, {}) == 0
+    
+    def test_reservations_count_against_their_volume(self):
+        """Test that reservations add up per volume and shrink as their bytes are written"""
+        volumes = FakeVolumes({'big': 10_000 * MB, 'small': 1000 * MB})
+        guard = DiskSpaceGuard(min_free=100 * MB, free_space=volumes.free_space, volume=volumes.volume)
+        
+        assert guard.can_start('/small/videos', 900 * MB)
+        assert not guard.can_start('/small/videos', 901 * MB)
+        guard.acquire('a', '/small/videos', 600 * MB)
+        
+        assert guard.available('/small/music') == 300 * MB
+        assert not guard.can_start('/small/music', 400 * MB)
+        assert guard.can_start('/big/videos', 400 * MB)
+        
+        # 200 MB landed on disk: free space and the reservation both drop by it
+        volumes.free['small'] -= 200 * MB
+        guard.record_written('a', 200 * MB)
+        assert guard.available('/small/music') == 300 * MB
+        
+        guard.release('a')
+        assert guard.can_start('/small/music', 700 * MB)
+    
+    def test_unknown_size_still_needs_min_free(self):
+        """Test that a download of unknown size waits while the volume is below min_free"""
+        volumes = FakeVolumes({'big': 0, 'small': 50 * MB})
+        guard = DiskSpaceGuard(min_free=100 * MB, free_space=volumes.free_space, volume=volumes.volume)
+        
+        assert not guard.can_start('/small', 0)
+        volumes.free['small'] = 150 * MB
+        assert guard.can_start('/small', 0)
+    
+    def test_missing_output_dir_uses_its_parent(self, tmp_path):
+        """Test that an output directory that does not exist yet is measured on its nearest parent"""
+        missing = tmp_path / 'not' / 'yet'
+        
+        assert existing_ancestor(str(missing)) == str(tmp_path)
+        assert free_bytes(str(missing)) > 0
+
+
+@pytest.mark.unit
+class TestDiskSpaceAdmission:
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_items_wait_for_space_and_resume(self, mock_worker_class, mock_pool_class):
+        """Test that an item too large for the free space is held, others pass it, and it starts once space frees"""
+        volumes = FakeVolumes({'big': 10_000 * MB, 'small': 1000 * MB})
+        manager = DownloadManager()
+        manager.set_max_concurrent(4)
+        manager.disk_guard = DiskSpaceGuard(min_free=0, free_space=volumes.free_space, volume=volumes.volume)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        statuses = []
+        waiting = []
+        manager.download_progress.connect(lambda download_id, progress: statuses.append((download_id, progress)))
+        manager.disk_space_waiting.connect(waiting.append)
+        
+        first = sized_item("https://a.com/first", 300 * MB)
+        second = sized_item("https://b.com/second", 300 * MB)
+        elsewhere = sized_item("https://c.com/elsewhere", 300 * MB)
+        for item, output_dir in ((first, '/small'), (second, '/small'), (elsewhere, '/big')):
+            manager.add_download(item, {'output_dir': output_dir})
+        
+        # 600 MB reserved for first leaves too little for second's 600 MB
+        assert set(manager.active_downloads) == {first.id, elsewhere.id}
+        assert [entry[0] for entry in manager.space_waiting] == [second]
+        assert (second.id, {'status': 'waiting_for_space'}) in statuses
+        assert waiting == [1]
+        assert manager.queued_count() == 1
+        
+        # Freeing space outside the app is noticed on the next recheck
+        volumes.free['small'] = 1300 * MB
+        manager.on_space_recheck()
+        assert second.id in manager.active_downloads
+        assert waiting == [1, 0]
+        
+        manager.worker_finished(first.id)
+        manager.worker_finished(second.id)
+        assert manager.disk_guard.outstanding('small') == 0
+    
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_finished_download_makes_room(self, mock_worker_class, mock_pool_class):
+        """Test that a held item starts when a running download on its volume finishes"""
+        volumes = FakeVolumes({'big': 0, 'small': 1000 * MB})
+        manager = DownloadManager()
+        manager.disk_guard = DiskSpaceGuard(min_free=0, free_space=volumes.free_space, volume=volumes.volume)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        first = sized_item("https://a.com/first", 400 * MB)
+        second = sized_item("https://a.com/second", 400 * MB)
+        manager.add_download(first, {'output_dir': '/small', 'extract_audio': True})
+        manager.add_download(second, {'output_dir': '/small', 'extract_audio': True})
+        assert list(manager.active_downloads) == [first.id]
+        
+        manager.cancel_download(second.id)
+        assert not manager.space_waiting
+        manager.add_download(second, {'output_dir': '/small', 'extract_audio': True})
+        
+        manager.worker_finished(first.id)
+        assert list(manager.active_downloads) == [second.id]
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_item_too_large_for_an_idle_volume_fails(self, mock_worker_class, mock_pool_class):
+        """Test that an item that cannot fit with nothing running on its volume fails instead of waiting"""
+        volumes = FakeVolumes({'big': 10_000 * MB, 'small': 1000 * MB})
+        manager = DownloadManager()
+        manager.disk_guard = DiskSpaceGuard(min_free=100 * MB, free_space=volumes.free_space, volume=volumes.volume)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        errors = []
+        manager.download_error.connect(lambda download_id, error: errors.append((download_id, error)))
+        
+        huge = sized_item("https://a.com/huge", 600 * MB)
+        manager.add_download(huge, {'output_dir': '/small'})
+        
+        assert manager.active_downloads == {}
+        assert not manager.space_waiting
+        assert errors == [(huge.id, "Not enough disk space in /small: needs 1200 MB, 900 MB available")]
+        assert huge.id in manager.failed_downloads
+        assert manager.queued_count() == 0
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_held_item_fails_once_its_volume_is_idle(self, mock_worker_class, mock_pool_class):
+        """Test that an item held behind a running download fails if it still does not fit when that finishes"""
+        volumes = FakeVolumes({'big': 0, 'small': 1000 * MB})
+        manager = DownloadManager()
+        manager.disk_guard = DiskSpaceGuard(min_free=0, free_space=volumes.free_space, volume=volumes.volume)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        errors = []
+        manager.download_error.connect(lambda download_id, error: errors.append(download_id))
+        
+        first = sized_item("https://a.com/first", 400 * MB)
+        second = sized_item("https://b.com/second", 400 * MB)
+        manager.add_download(first, {'output_dir': '/small'})
+        manager.add_download(second, {'output_dir': '/small'})
+        assert [entry[0] for entry in manager.space_waiting] == [second]
+        
+        # first's file now takes most of the volume
+        volumes.free['small'] = 500 * MB
+        manager.worker_finished(first.id)
+        
+        assert errors == [second.id]
+        assert not manager.space_waiting
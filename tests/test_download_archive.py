@@ -0,0 +1,128 @@
+"""
+Tests for download_archive module
+"""
+
+import os
+import threading
+import time
+
+import pytest
+from src.download_archive import BloomFilter, DownloadArchive
+
+
+@pytest.mark.unit
+class TestDownloadArchive:
+    def test_records_persist_in_yt_dlp_format(self, tmp_path):
+        """Test that added ids are written one per line and found again after reopening"""
+        path = str(tmp_path / 'archive.txt')
+        archive = DownloadArchive(path)
+        archive.add("youtube aaaaaaaaaaa")
+        archive.add("youtube aaaaaaaaaaa")
+        archive.add("vimeo 123456")
+        
+        assert open(path).read() == "youtube aaaaaaaaaaa\nvimeo 123456\n"
+        reopened = DownloadArchive(path)
+        assert len(reopened) == 2
+        assert "vimeo 123456" in reopened
+        assert "youtube bbbbbbbbbbb" not in reopened
+    
+    def test_contains_url_matches_other_url_forms(self, tmp_path):
+        """Test that a video is recognised from any of its URL forms"""
+        archive = DownloadArchive(str(tmp_path / 'archive.txt'))
+        archive.add("youtube dQw4w9WgXcQ")
+        
+        assert archive.contains_url("https://youtu.be/dQw4w9WgXcQ")
+        assert archive.contains_url("https://m.youtube.com/watch?v=dQw4w9WgXcQ&t=10")
+        assert not archive.contains_url("https://youtu.be/ccccccccccc")
+        assert not archive.contains_url("https://example.com/dQw4w9WgXcQ")
+    
+    def test_large_archive_moves_to_index_and_reads_only_new_lines(self, tmp_path):
+        """Test that past memory_limit ids live in the index, which later sessions extend"""
+        path = str(tmp_path / 'archive.txt')
+        with open(path, 'w') as archive_file:
+            archive_file.writelines(f"youtube {i:011d}\n" for i in range(50))
+        archive = DownloadArchive(path, memory_limit=20)
+        assert os.path.exists(archive.index_path)
+        assert len(archive) == 50
+        archive.add("youtube new")
+        archive.close()
+        
+        # Appended by another program, e.g. the yt-dlp command line
+        with open(path, 'a') as archive_file:
+            archive_file.write("vimeo 42\n")
+        reopened = DownloadArchive(path, memory_limit=20)
+        assert len(reopened) == 52
+        assert "youtube 00000000049" in reopened
+        assert "youtube new" in reopened
+        assert "vimeo 42" in reopened
+        assert "youtube 00000000050" not in reopened
+    
+    def test_replaced_file_rebuilds_index(self, tmp_path):
+        """Test that an index left over from a longer file is not trusted"""
+        path = str(tmp_path / 'archive.txt')
+        with open(path, 'w') as archive_file:
+            archive_file.writelines(f"youtube {i}\n" for i in range(30))
+        DownloadArchive(path, memory_limit=10).close()
+        with open(path, 'w') as archive_file:
+            archive_file.write("vimeo 1\n")
+        
+        archive = DownloadArchive(path, memory_limit=10)
+        assert len(archive) == 1
+        assert "youtube 0" not in archive
+        assert "vimeo 1" in archive
+    
+    def test_concurrent_adds_write_whole_lines(self, tmp_path):
+        """Test that workers adding at the same time never interleave lines"""
+        path = str(tmp_path / 'archive.txt')
+        archive = DownloadArchive(path, memory_limit=100)
+        
+        def add_many(worker):
+            for i in range(100):
+                archive.add(f"youtube w{worker}-{i}")
+        
+        threads = [threading.Thread(target=add_many, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        lines = open(path).read().splitlines()
+        assert sorted(lines) == sorted(f"youtube w{n}-{i}" for n in range(4) for i in range(100))
+        assert len(archive) == 400
+    
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Test that every added key is reported present and few others are"""
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"youtube {i}")
+        
+        assert all(f"youtube {i}" in bloom for i in range(1000))
+        false_positives = sum(f"vimeo {i}" in bloom for i in range(10000))
+        assert false_positives < 300
+
+
+@pytest.mark.slow
+class TestDownloadArchiveBenchmark:
+    def test_lookups_in_large_archive_are_fast(self, tmp_path):
+        """Benchmark: reopening a 200k-line archive and checking 10k new videos"""
+        path = str(tmp_path / 'archive.txt')
+        with open(path, 'w') as archive_file:
+            archive_file.writelines(f"youtube {i:011d}\n" for i in range(200_000))
+        start = time.monotonic()
+        DownloadArchive(path, memory_limit=50_000).close()
+        first_load = time.monotonic() - start
+        
+        start = time.monotonic()
+        archive = DownloadArchive(path, memory_limit=50_000)
+        reload_time = time.monotonic() - start
+        start = time.monotonic()
+        misses = sum(f"youtube new{i:08d}" in archive for i in range(10_000))
+        hits = sum(f"youtube {i:011d}" in archive for i in range(0, 200_000, 20))
+        lookup_time = time.monotonic() - start
+        
+        print(f"\nindexed 200k ids in {first_load:.2f}s, reopened in {reload_time * 1000:.1f} ms, "
+              f"20k lookups in {lookup_time * 1000:.1f} ms")
+        assert hits == 10_000
+        assert misses < 50
+        assert reload_time < 1
+        assert lookup_time < 2
@@ -5,6 +5,7 @@ Tests for download_item module
 import pytest
 from src.download_item import DownloadItem, DownloadStatus
 
+
 @pytest.mark.unit
 class TestDownloadItem:
     def test_init(self):
@@ -26,6 +27,16 @@ class TestDownloadItem:
         assert item.thumbnail_url == ""
         assert item.id is not None
         assert len(item.id) > 0
+        assert item.batch_id == ""
+        assert item.priority == 0
+        assert item.estimated_size == 0
+        
+    def test_init_scheduling_fields(self):
+        """Test DownloadItem batch and priority arguments"""
+        item = DownloadItem("https://example.com/video", batch_id="batch", priority=2)
+        
+        assert item.batch_id == "batch"
+        assert item.priority == 2
         
     def test_update_info(self):
         """Test updating video info"""
@@ -64,6 +75,7 @@ class TestDownloadItem:
             ('finished', DownloadStatus.COMPLETED),
             ('error', DownloadStatus.ERROR),
             ('paused', DownloadStatus.PAUSED),
+            ('cancelled', DownloadStatus.CANCELLED),
             ('unknown', DownloadStatus.QUEUED)  # Unknown status should default to queued
         ]
         
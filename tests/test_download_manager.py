@@ -2,11 +2,26 @@
 Tests for download_manager module
 """
 
+import logging
+import threading
+import time
+
 import pytest
 from unittest.mock import Mock, MagicMock, patch
 from PyQt6.QtCore import QObject
-from src.download_manager import DownloadManager, DownloadWorker
+from src.download_manager import DownloadManager, DownloadWorker, InfoWorker, SyncWorker, DownloadAborted
 from src.download_item import DownloadItem, DownloadStatus
+from src.download_archive import DownloadArchive
+from src.retry import RetryPolicy
+from src.sync_store import SyncStore, source_key
+
+
+def resolved_item(url, **kwargs):
+    """A DownloadItem that has already been through the info stage"""
+    item = DownloadItem(url, **kwargs)
+    item.info = {'id': item.id, 'title': 'Test', 'url': url}
+    return item
+
 
 @pytest.mark.unit
 class TestDownloadWorker:
@@ -69,6 +84,19 @@ class TestDownloadWorker:
         assert opts['extractaudio'] is False  # default
         assert 'writesubtitles' not in opts  # Should not be set when False
         
+    def test_build_ydl_options_is_quiet(self, capsys):
+        """Test that building options prints nothing and only runs ffmpeg when debug logging is on"""
+        worker = DownloadWorker(DownloadItem("https://example.com/video"), {})
+        with patch.object(worker, 'get_bundled_ffmpeg_path', return_value="/tools/ffmpeg"), \
+             patch('src.download_manager.subprocess.run') as run:
+            worker.build_ydl_options()
+            assert capsys.readouterr().out == ""
+            run.assert_not_called()
+            
+            with patch.object(logging.getLogger('src.download_manager'), 'isEnabledFor', return_value=True):
+                worker.build_ydl_options()
+            run.assert_called_once()
+            
     def test_progress_hook(self):
         """Test progress hook functionality"""
         item = DownloadItem("https://example.com/video")
@@ -132,11 +160,254 @@ class TestDownloadWorker:
         worker.is_cancelled = True
         
         progress_data = {'status': 'downloading'}
-        worker.progress_hook(progress_data)
+        # Interrupts yt-dlp instead of letting the transfer run on
+        with pytest.raises(DownloadAborted):
+            worker.progress_hook(progress_data)
         
         # Should not emit signal when cancelled
         worker.progress_updated.emit.assert_not_called()
         
+    def test_run_extracts_each_url_once(self, counting_extractor, tmp_path):
+        """Test that run() downloads from the first extraction instead of re-extracting"""
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        completed = []
+        errors = []
+        
+        for video_id in ('first', 'second'):
+            item = DownloadItem(f"https://counting.invalid/{video_id}")
+            worker = DownloadWorker(item, settings)
+            worker.download_completed.connect(lambda i, path: completed.append(i))
+            worker.download_error.connect(lambda i, error: errors.append(error))
+            worker.run()
+            
+            assert item.title == f"Video {video_id}"
+            
+        assert errors == []
+        assert len(completed) == 2
+        assert counting_extractor == {'first': 1, 'second': 1}
+        assert (tmp_path / 'Video first.mp4').stat().st_size == 4096
+        
+    def test_archived_video_is_not_downloaded_again(self, counting_extractor, tmp_path):
+        """Test that finished videos are recorded in the archive and skipped by later downloads"""
+        archive = DownloadArchive(str(tmp_path / 'archive.txt'))
+        settings = {'output_dir': str(tmp_path / 'videos'), 'format': 'best', 'extract_audio': True}
+        completed = []
+        
+        with patch.object(DownloadWorker, 'download_archive', archive):
+            for run in range(2):
+                if run:
+                    (tmp_path / 'videos' / 'Video once.mp4').unlink()
+                worker = DownloadWorker(DownloadItem("https://counting.invalid/once"), settings)
+                worker.download_completed.connect(lambda i, path: completed.append(path))
+                worker.run()
+                
+        assert len(completed) == 2
+        assert (tmp_path / 'archive.txt').read_text() == "counting once\n"
+        # The second run found the video in the archive and fetched nothing
+        assert not (tmp_path / 'videos' / 'Video once.mp4').exists()
+        
+    def test_run_reports_missing_info(self, counting_extractor, tmp_path):
+        """Test that an extraction returning nothing is reported as an error"""
+        item = DownloadItem("https://unsupported.invalid/video")
+        worker = DownloadWorker(item, {'output_dir': str(tmp_path), 'extract_audio': True})
+        errors = []
+        worker.download_error.connect(lambda i, error: errors.append(error))
+        
+        worker.run()
+        
+        assert len(errors) == 1
+        assert errors[0].startswith("Info extraction failed")
+        
+    def test_run_reports_logged_download_error(self, counting_extractor, local_media_server, tmp_path):
+        """Test that download errors yt-dlp only logs are reported with their HTTP status"""
+        from conftest import CountingIE
+        CountingIE.media_url = f"{local_media_server}/status/429"
+        item = DownloadItem("https://counting.invalid/throttled")
+        worker = DownloadWorker(item, {'output_dir': str(tmp_path), 'extract_audio': True})
+        completed = []
+        errors = []
+        worker.download_completed.connect(lambda i, path: completed.append(path))
+        worker.download_error.connect(lambda i, error: errors.append(error))
+        
+        worker.run()
+        
+        assert completed == []
+        assert len(errors) == 1
+        assert errors[0].startswith("Download failed")
+        assert "HTTP Error 429" in errors[0]
+        
+    def test_info_worker_resolves_without_downloading(self, counting_extractor, tmp_path):
+        """Test that the info stage extracts once and the download reuses its result"""
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        item = DownloadItem("https://counting.invalid/staged")
+        resolved = []
+        info_worker = InfoWorker(item, settings)
+        info_worker.info_resolved.connect(resolved.append)
+        
+        info_worker.run()
+        
+        assert resolved == [item.id]
+        assert item.title == "Video staged"
+        assert item.info['id'] == "staged"
+        assert list(tmp_path.iterdir()) == []
+        
+        completed = []
+        worker = DownloadWorker(item, settings)
+        worker.download_completed.connect(lambda i, path: completed.append(i))
+        worker.run()
+        
+        assert completed == [item.id]
+        assert counting_extractor == {'staged': 1}
+        
+    def test_info_worker_streams_playlist_entries(self, counting_extractor, tmp_path):
+        """Test that a playlist is reported entry by entry as it is paged in, not resolved whole"""
+        from conftest import CountingPlaylistIE
+        settings = {'output_dir': str(tmp_path), 'download_playlist': True, 'extract_audio': True}
+        item = DownloadItem("https://counting.invalid/playlist/mix3")
+        entries = []
+        expanded = []
+        worker = InfoWorker(item, settings)
+        worker.playlist_entry.connect(lambda i, entry: entries.append((entry, CountingPlaylistIE.yielded)))
+        worker.playlist_expanded.connect(lambda i, count: expanded.append(count))
+        
+        worker.run()
+        
+        assert [entry['url'] for entry, _ in entries] == [f"https://counting.invalid/mix{n}" for n in (2, 1, 0)]
+        # Each entry was passed on before the next one was fetched
+        assert [yielded for _, yielded in entries] == [1, 2, 3]
+        assert entries[0][0]['title'] == "Entry 2"
+        assert expanded == [3]
+        assert item.title == "Playlist mix"
+        assert item.info is None
+        assert counting_extractor == {}
+        
+    def test_sync_worker_stops_paging_at_known_entries(self, counting_extractor, tmp_path):
+        """Test that a sync only reports entries newer than those seen before and fetches no further pages"""
+        from conftest import CountingPlaylistIE
+        settings = {'output_dir': str(tmp_path), 'sync': True, 'download_playlist': True, 'extract_audio': True}
+        item = DownloadItem("https://counting.invalid/playlist/chan14")
+        known = {f"chan{n}" for n in range(12)}
+        entries = []
+        stats = []
+        worker = SyncWorker(item, settings, known)
+        worker.playlist_entry.connect(lambda i, entry: entries.append(entry['id']))
+        worker.sync_finished.connect(lambda i, result: stats.append(result))
+        
+        worker.run()
+        
+        assert entries == ["chan13", "chan12"]
+        assert stats[0]['new_ids'] == ["chan13", "chan12"]
+        # Stopped at chan11 on the first page of five; the other two were never requested
+        assert stats[0]['pages'] == 1
+        assert CountingPlaylistIE.yielded == 3
+        assert 'sync' not in worker.entry_settings
+        
+    def test_sync_worker_pages_on_to_failed_entries(self, counting_extractor, tmp_path):
+        """Test that a sync passes known entries until it has listed every retry id again"""
+        settings = {'output_dir': str(tmp_path), 'sync': True, 'download_playlist': True, 'extract_audio': True}
+        item = DownloadItem("https://counting.invalid/playlist/chan14")
+        known = {f"chan{n}" for n in range(12)} - {"chan5"}
+        entries = []
+        worker = SyncWorker(item, settings, known, {"chan5"})
+        worker.playlist_entry.connect(lambda i, entry: entries.append(entry['id']))
+        
+        worker.run()
+        
+        assert entries == ["chan13", "chan12", "chan5"]
+        # Stopped at chan4 on the second page
+        assert worker.pages == 2
+        
+    def test_info_worker_resolves_single_video_with_playlists_on(self, counting_extractor, tmp_path):
+        """Test that a plain video URL still resolves normally when playlists are expanded"""
+        settings = {'output_dir': str(tmp_path), 'download_playlist': True, 'extract_audio': True}
+        item = DownloadItem("https://counting.invalid/single")
+        resolved = []
+        worker = InfoWorker(item, settings)
+        worker.info_resolved.connect(resolved.append)
+        
+        worker.run()
+        
+        assert resolved == [item.id]
+        assert item.info['id'] == "single"
+        assert counting_extractor == {'single': 1}
+        
+    def test_pause_stops_transfer_and_resume_continues_part_file(self, counting_extractor, local_media_server, tmp_path):
+        """Test that pausing keeps the .part file and resuming requests only the rest"""
+        from conftest import CountingIE, _MediaRequestHandler
+        size = 2 * 1024 * 1024
+        CountingIE.media_url = f"{local_media_server}/media/{size}"
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        item = DownloadItem("https://counting.invalid/paused")
+        
+        worker = DownloadWorker(item, settings)
+        paused = []
+        worker.download_paused.connect(paused.append)
+        worker.progress_updated.connect(lambda i, progress: progress.get('downloaded_bytes') and worker.pause())
+        worker.run()
+        
+        assert paused == [item.id]
+        part_size = (tmp_path / 'Video paused.mp4.part').stat().st_size
+        assert 0 < part_size < size
+        
+        completed = []
+        resumed = DownloadWorker(item, settings)
+        resumed.download_completed.connect(lambda i, path: completed.append(i))
+        resumed.run()
+        
+        assert completed == [item.id]
+        assert _MediaRequestHandler.range_requests == [f"bytes={part_size}-"]
+        assert (tmp_path / 'Video paused.mp4').stat().st_size == size
+        
+    def test_cancel_interrupts_transfer_and_removes_part_file(self, counting_extractor, local_media_server, tmp_path):
+        """Test that cancelling stops yt-dlp mid-transfer without reporting an error"""
+        from conftest import CountingIE
+        CountingIE.media_url = f"{local_media_server}/media/{2 * 1024 * 1024}"
+        item = DownloadItem("https://counting.invalid/cancelled")
+        worker = DownloadWorker(item, {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True})
+        outcomes = []
+        worker.download_completed.connect(lambda i, path: outcomes.append('completed'))
+        worker.download_error.connect(lambda i, error: outcomes.append(error))
+        worker.progress_updated.connect(lambda i, progress: progress.get('downloaded_bytes') and worker.cancel())
+        
+        worker.run()
+        
+        assert outcomes == []
+        assert list(tmp_path.iterdir()) == []
+        
+    def test_cancelled_job_never_starts(self, counting_extractor, tmp_path):
+        """Test that a job cancelled while waiting for a thread does no work"""
+        item = DownloadItem("https://counting.invalid/skipped")
+        worker = DownloadWorker(item, {'output_dir': str(tmp_path), 'extract_audio': True})
+        finished = []
+        worker.finished.connect(finished.append)
+        
+        worker.cancel()
+        worker.run()
+        
+        assert finished == [item.id]
+        assert counting_extractor == {}
+        
+    def test_fragmented_download_uses_parallel_fragments(self, counting_extractor, local_media_server, tmp_path):
+        """Test that HLS fragments download in parallel and the tuner hears about it"""
+        from conftest import CountingIE, _MediaRequestHandler
+        from src.fragment_tuner import FragmentTuner
+        CountingIE.media_url = f"{local_media_server}/hls/12/10000.m3u8"
+        _MediaRequestHandler.fragment_delay = 0.1
+        tuner = FragmentTuner()
+        item = DownloadItem("https://counting.invalid/fragmented")
+        worker = DownloadWorker(item, {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True})
+        worker.fragment_workers = 4
+        worker.fragment_tuner = tuner
+        
+        with patch.object(tuner, 'observe', wraps=tuner.observe) as observe:
+            worker.run()
+            
+        assert (tmp_path / 'Video fragmented.mp4').stat().st_size == 12 * 10000
+        host, workers, fragments, elapsed, nbytes = observe.call_args[0]
+        assert (host, workers, fragments, nbytes) == ("counting.invalid", 4, 12, 120000)
+        # 12 fragments of 100 ms on 4 connections take about 0.3s, one after another 1.2s
+        assert elapsed < 12 * 0.1 * 0.75
+        
     def test_pause_resume_cancel(self):
         """Test pause, resume, and cancel functionality"""
         item = DownloadItem("https://example.com/video")
@@ -155,8 +426,109 @@ class TestDownloadWorker:
         worker.cancel()
         assert worker.is_cancelled is True
 
+
 @pytest.mark.unit
 class TestDownloadManager:
+    def test_pipeline_resolves_titles_ahead_of_downloads(self, counting_extractor, process_events_until, tmp_path):
+        """Test that queued URLs get titles while the only download slot is busy"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(1)
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        titles = {}
+        completed = []
+        manager.info_extracted.connect(lambda download_id, title, uploader: titles.update({download_id: title}))
+        manager.download_completed.connect(lambda download_id, path: completed.append(download_id))
+        
+        items = [DownloadItem(f"https://counting.invalid/p{i}") for i in range(6)]
+        for item in items:
+            manager.add_download(item, settings)
+            
+        assert process_events_until(lambda: len(completed) == len(items))
+        assert len(titles) == len(items)
+        assert counting_extractor == {f"p{i}": 1 for i in range(6)}
+        # Resolved info dicts are dropped once their download is done
+        assert all(item.info is None for item in items)
+        manager.cleanup()
+        
+    def test_sync_records_seen_entries_and_statistics(self, counting_extractor, process_events_until, tmp_path):
+        """Test that a second sync of an unchanged source queues nothing and fetches one page"""
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        manager = DownloadManager()
+        manager.set_sync_store(store)
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        added = []
+        synced = []
+        manager.playlist_entry_added.connect(lambda item, entry_settings: added.append((item, entry_settings)))
+        manager.sync_finished.connect(lambda download_id, stats: synced.append(stats))
+        
+        url = "https://counting.invalid/playlist/chan7"
+        manager.add_sync(DownloadItem(url), settings)
+        assert process_events_until(lambda: len(synced) == 1)
+        assert len(added) == 7
+        assert not added[0][1].get('sync')
+        assert store.last_sync(source_key(url))['pages'] == 2
+        assert store.last_sync(source_key(url))['new_entries'] == 7
+        
+        manager.add_sync(DownloadItem(url), settings)
+        assert process_events_until(lambda: len(synced) == 2)
+        assert len(added) == 7
+        assert synced[1]['new_ids'] == []
+        assert store.last_sync(source_key(url))['pages'] == 1
+        manager.cleanup()
+        
+    def test_sync_queues_failed_entries_again(self, counting_extractor, process_events_until, tmp_path):
+        """Test that an entry whose download failed is queued by the next sync of any URL form"""
+        from conftest import CountingIE
+        CountingIE.broken.add("chan3")
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        manager = DownloadManager()
+        manager.set_sync_store(store)
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        added = []
+        done = []
+        manager.playlist_entry_added.connect(lambda item, entry_settings: added.append(item.url))
+        manager.download_completed.connect(lambda download_id, path: done.append(download_id))
+        manager.download_error.connect(lambda download_id, error: done.append(download_id))
+        
+        manager.add_sync(DownloadItem("https://counting.invalid/playlist/chan7"), settings)
+        assert process_events_until(lambda: len(done) == 7)
+        assert "chan3" not in store.seen_ids(source_key("https://counting.invalid/playlist/chan7"))
+        
+        CountingIE.broken.clear()
+        added.clear()
+        manager.add_sync(DownloadItem("https://counting.invalid/playlist/chan7#latest"), settings)
+        assert process_events_until(lambda: len(done) == 8)
+        assert added == ["https://counting.invalid/chan3"]
+        assert len(store.seen_ids(source_key("https://counting.invalid/playlist/chan7"))) == 7
+        manager.cleanup()
+        
+    def test_playlist_entries_spread_across_download_slots(self, counting_extractor, process_events_until, tmp_path):
+        """Test that playlist entries become items of their own and one failing entry does not stop the rest"""
+        from conftest import CountingIE
+        CountingIE.broken.add("list1")
+        manager = DownloadManager()
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True, 'download_playlist': True}
+        added = []
+        expanded = []
+        completed = []
+        errors = []
+        manager.playlist_entry_added.connect(lambda item, entry_settings: added.append(item))
+        manager.playlist_expanded.connect(lambda download_id, count: expanded.append((download_id, count)))
+        manager.download_completed.connect(lambda download_id, path: completed.append(download_id))
+        manager.download_error.connect(lambda download_id, error: errors.append(download_id))
+        
+        playlist = DownloadItem("https://counting.invalid/playlist/list4", batch_id="paste")
+        manager.add_download(playlist, settings)
+        
+        assert process_events_until(lambda: len(completed) + len(errors) == 4)
+        assert expanded == [(playlist.id, 4)]
+        assert [item.url for item in added] == [f"https://counting.invalid/list{n}" for n in (3, 2, 1, 0)]
+        assert all(item.parent_id == playlist.id and item.batch_id == "paste" for item in added)
+        assert errors == [added[2].id]
+        assert sorted(completed) == sorted(item.id for item in added if item is not added[2])
+        assert len(list(tmp_path.glob('*.mp4'))) == 3
+        manager.cleanup()
+        
     def test_init(self):
         """Test DownloadManager initialization"""
         manager = DownloadManager()
@@ -165,11 +537,114 @@ class TestDownloadManager:
         assert manager.max_concurrent_downloads == 3
         assert manager.download_queue.empty()
         
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.InfoWorker')
+    def test_add_unresolved_download_goes_to_info_stage(self, mock_info_class, mock_pool_class):
+        """Test that a new URL is extracted on the info pool before it is queued"""
+        manager = DownloadManager()
+        item = DownloadItem("https://example.com/video")
+        settings = {'format': 'best'}
+        mock_info = Mock(download_item=item, settings=settings)
+        mock_info_class.return_value = mock_info
+        
+        manager.add_download(item, settings)
+        
+        mock_info_class.assert_called_once_with(item, settings)
+        manager.info_pool.submit.assert_called_once_with(mock_info)
+        assert manager.active_downloads == {}
+        
+        # Once resolved it moves on to the download stage
+        item.info = {'title': 'Test'}
+        manager.on_info_resolved(item.id)
+        assert item.id in manager.active_downloads
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.InfoWorker')
+    def test_info_stage_lookahead_is_bounded(self, mock_info_class, mock_pool_class):
+        """Test that extraction stops once enough items are resolved ahead"""
+        manager = DownloadManager()
+        manager.max_resolved_ahead = 3
+        mock_info_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        items = [DownloadItem(f"https://site{i}.com/video") for i in range(10)]
+        for item in items:
+            manager.add_download(item, {})
+        assert len(manager.active_extractions) == 3
+        assert len(manager.info_queue) == 7
+        
+        # Resolved items wait for slots: 3 downloading, 3 queued, none extracting
+        for item in items[:6]:
+            manager.on_info_resolved(item.id)
+            manager.info_worker_finished(item.id)
+        assert len(manager.active_downloads) == 3
+        assert manager.queued_count() == 3
+        assert manager.active_extractions == {}
+        
+        # A finished download makes room for one more extraction
+        manager.worker_finished(items[0].id)
+        assert len(manager.active_extractions) == 1
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.InfoWorker')
+    def test_info_stage_follows_scheduling_policy(self, mock_info_class, mock_pool_class):
+        """Test that a late URL is not extracted behind a large unresolved batch"""
+        manager = DownloadManager()
+        manager.set_scheduling_policy('fair_share')
+        mock_info_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        batch = [DownloadItem(f"https://example.com/{i}", batch_id="import") for i in range(800)]
+        for item in batch:
+            manager.add_download(item, {})
+        late = DownloadItem("https://example.com/late", batch_id="single")
+        manager.add_download(late, {})
+        
+        assert len(manager.info_queue) == 797
+        assert [item for item, settings in manager.info_queue.entries()].index(late) <= 1
+        
+        # Unresolved items can be moved to the top of the info stage as well
+        assert manager.move_to_top(batch[500].id)
+        manager.info_worker_finished(batch[0].id)
+        assert batch[500].id in manager.active_extractions
+        manager.info_worker_finished(batch[1].id)
+        manager.info_worker_finished(batch[2].id)
+        assert late.id in manager.active_extractions
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.InfoWorker')
+    def test_backed_off_host_parks_unresolved_items(self, mock_info_class, mock_pool_class, qt_app):
+        """Test that a bulk import during a 429 backoff stays fast and is extracted once it is over"""
+        manager = DownloadManager()
+        mock_info_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        manager.back_off_host("youtube.com")
+        
+        items = [DownloadItem(f"https://www.youtube.com/watch?v={i:011d}") for i in range(5000)]
+        start = time.perf_counter()
+        for item in items:
+            manager.add_download(item, {})
+        other = DownloadItem("https://example.com/video")
+        manager.add_download(other, {})
+        elapsed = time.perf_counter() - start
+        
+        assert elapsed < 2
+        assert list(manager.active_extractions) == [other.id]
+        assert len(manager.parked_extractions["youtube.com"]) == 5000
+        
+        # A parked item can still be promoted and cancelled
+        assert manager.move_to_top(items[10].id)
+        manager.cancel_download(items[20].id)
+        assert len(manager.parked_extractions["youtube.com"]) == 4999
+        
+        manager.host_limiter.clock = lambda: float('inf')
+        manager.on_backoff_expired()
+        assert manager.parked_extractions == {}
+        assert list(manager.active_extractions)[1:] == [items[10].id, items[0].id, items[1].id]
+        
+    @patch('src.download_manager.WorkerPool')
     @patch('src.download_manager.DownloadWorker')
-    def test_add_download_immediate(self, mock_worker_class):
+    def test_add_download_immediate(self, mock_worker_class, mock_pool_class):
         """Test adding download when under concurrent limit"""
         manager = DownloadManager()
-        item = DownloadItem("https://example.com/video")
+        item = resolved_item("https://example.com/video")
         settings = {'format': 'best'}
         
         # Mock worker instance
@@ -180,17 +655,18 @@ class TestDownloadManager:
         
         # Should start download immediately
         mock_worker_class.assert_called_once_with(item, settings)
-        mock_worker.start.assert_called_once()
+        manager.worker_pool.submit.assert_called_once_with(mock_worker)
         assert item.id in manager.active_downloads
         
+    @patch('src.download_manager.WorkerPool')
     @patch('src.download_manager.DownloadWorker')
-    def test_add_download_queue(self, mock_worker_class):
+    def test_add_download_queue(self, mock_worker_class, mock_pool_class):
         """Test adding download when at concurrent limit"""
         manager = DownloadManager()
         manager.max_concurrent_downloads = 1
         
         # Add first download (should start immediately)
-        item1 = DownloadItem("https://example.com/video1")
+        item1 = resolved_item("https://example.com/video1")
         settings = {'format': 'best'}
         
         mock_worker1 = Mock()
@@ -200,7 +676,7 @@ class TestDownloadManager:
         assert len(manager.active_downloads) == 1
         
         # Add second download (should be queued)
-        item2 = DownloadItem("https://example.com/video2")
+        item2 = resolved_item("https://example.com/video2")
         mock_worker_class.reset_mock()
         
         manager.add_download(item2, settings)
@@ -209,6 +685,562 @@ class TestDownloadManager:
         assert len(manager.active_downloads) == 1
         assert not manager.download_queue.empty()
         
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_raising_max_concurrent_starts_queued(self, mock_worker_class, mock_pool_class):
+        """Test that raising the limit immediately starts queued downloads"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(1)
+        mock_worker_class.side_effect = lambda item, settings: Mock()
+        
+        items = [resolved_item(f"https://example.com/video{i}") for i in range(4)]
+        for item in items:
+            manager.add_download(item, {})
+            
+        assert len(manager.active_downloads) == 1
+        assert manager.download_queue.qsize() == 3
+        
+        manager.set_max_concurrent(3)
+        
+        assert len(manager.active_downloads) == 3
+        assert manager.download_queue.qsize() == 1
+        manager.worker_pool.resize.assert_called_with(3)
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_lowering_max_concurrent_drains_gracefully(self, mock_worker_class, mock_pool_class):
+        """Test that lowering the limit lets running workers finish first"""
+        manager = DownloadManager()
+        workers = []
+        
+        def make_worker(item, settings):
+            worker = Mock()
+            workers.append(worker)
+            return worker
+            
+        mock_worker_class.side_effect = make_worker
+        
+        items = [resolved_item(f"https://example.com/video{i}") for i in range(5)]
+        for item in items:
+            manager.add_download(item, {})
+            
+        manager.set_max_concurrent(1)
+        
+        # Running workers are left alone
+        assert len(manager.active_downloads) == 3
+        for worker in workers:
+            worker.cancel.assert_not_called()
+            
+        # Nothing new starts until the pool is below the new limit
+        manager.worker_finished(items[0].id)
+        manager.worker_finished(items[1].id)
+        assert len(manager.active_downloads) == 1
+        assert manager.download_queue.qsize() == 2
+        
+        manager.worker_finished(items[2].id)
+        assert len(manager.active_downloads) == 1
+        assert manager.download_queue.qsize() == 1
+        
+    def test_max_concurrent_limit(self):
+        """Test clamping to the configurable upper bound"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(50)
+        assert manager.max_concurrent_downloads == 10
+        
+        manager.set_max_concurrent(0)
+        assert manager.max_concurrent_downloads == 1
+        
+        headless_manager = DownloadManager(max_concurrent_limit=64)
+        headless_manager.set_max_concurrent(50)
+        assert headless_manager.max_concurrent_downloads == 50
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_per_host_limit_keeps_other_hosts_moving(self, mock_worker_class, mock_pool_class):
+        """Test that a busy host's items are parked while other hosts still start"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(4)
+        manager.set_max_per_host(2)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        busy = [resolved_item(f"https://www.busy.com/watch?v={i}") for i in range(5)]
+        other = resolved_item("https://other.org/video")
+        for item in busy + [other]:
+            manager.add_download(item, {})
+            
+        started = [worker.download_item for worker in manager.active_downloads.values()]
+        assert busy[0] in started and busy[1] in started
+        assert other in started
+        assert len(manager.active_downloads) == 3
+        assert len(manager.parked_downloads["busy.com"]) == 3
+        assert manager.queued_count() == 3
+        
+        # A finished busy.com item makes room for the next parked one
+        manager.worker_finished(busy[0].id)
+        assert busy[2].id in manager.active_downloads
+        assert len(manager.parked_downloads["busy.com"]) == 2
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_throttled_host_backs_off_and_requeues(self, mock_worker_class, mock_pool_class, qt_app):
+        """Test that a 429 backs the host off, requeues the item and keeps other hosts going"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(2)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        backoffs = []
+        errors = []
+        manager.host_backoff_changed.connect(lambda host, seconds: backoffs.append((host, seconds)))
+        manager.download_error.connect(lambda download_id, error: errors.append(error))
+        
+        throttled = resolved_item("https://busy.com/a")
+        waiting = resolved_item("https://busy.com/b")
+        other = resolved_item("https://other.org/c")
+        manager.add_download(throttled, {'format': 'best'})
+        manager.add_download(waiting, {})
+        manager.add_download(other, {})
+        assert set(manager.active_downloads) == {throttled.id, waiting.id}
+        
+        manager.on_download_error(throttled.id, "Download failed: HTTP Error 429: Too Many Requests")
+        manager.worker_finished(throttled.id)
+        
+        # Not reported as a failure; busy.com is backed off, other.org gets the slot
+        assert errors == []
+        assert backoffs == [("busy.com", manager.host_limiter.base_backoff)]
+        assert other.id in manager.active_downloads
+        assert manager.parked_downloads["busy.com"][0] == (throttled, {'format': 'best'})
+        
+        # Once the backoff is over the parked item runs again
+        manager.worker_finished(waiting.id)
+        assert throttled.id not in manager.active_downloads
+        manager.host_limiter.clock = lambda: float('inf')
+        manager.on_backoff_expired()
+        assert throttled.id in manager.active_downloads
+        assert backoffs[-1] == ("busy.com", 0.0)
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_throttled_item_is_extracted_afresh(self, mock_worker_class, mock_pool_class, qt_app):
+        """Test that a 403'd item is parked without its info, and its cached info is dropped"""
+        manager = DownloadManager()
+        manager.set_info_cache(Mock())
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        item = resolved_item("https://busy.com/a")
+        manager.add_download(item, {})
+        manager.on_download_error(item.id, "HTTP Error 403: Forbidden")
+        
+        assert manager.parked_downloads["busy.com"][0] == (item, {})
+        assert item.info is None
+        manager.info_cache.invalidate.assert_called_once_with("https://busy.com/a")
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_throttled_item_fails_after_max_requeues(self, mock_worker_class, mock_pool_class, qt_app):
+        """Test that an item that keeps getting throttled is eventually reported"""
+        manager = DownloadManager()
+        manager.max_throttle_requeues = 0
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        errors = []
+        manager.download_error.connect(lambda download_id, error: errors.append(error))
+        
+        item = resolved_item("https://busy.com/a")
+        manager.add_download(item, {})
+        manager.on_download_error(item.id, "HTTP Error 403: Forbidden")
+        
+        assert errors == ["HTTP Error 403: Forbidden"]
+        assert "busy.com" not in manager.parked_downloads
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.InfoWorker')
+    @patch('src.download_manager.DownloadWorker')
+    def test_network_failure_retries_with_backoff(self, mock_worker_class, mock_info_class, mock_pool_class, qt_app):
+        """Test that a transient failure is requeued after a delay, then reported once attempts run out"""
+        manager = DownloadManager()
+        manager.retry_policy = RetryPolicy(max_attempts=1, base_delay=30, rng=lambda: 1.0)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        mock_info_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        progress = []
+        errors = []
+        manager.download_progress.connect(lambda download_id, update: progress.append(update))
+        manager.download_error.connect(lambda download_id, error: errors.append(error))
+        
+        item = resolved_item("https://flaky.com/a")
+        manager.add_download(item, {'format': 'worst'})
+        manager.on_download_error(item.id, "Download failed: The read operation timed out")
+        manager.worker_finished(item.id)
+        
+        assert errors == []
+        assert progress[-1] == {'status': 'retrying', 'attempt': 1, 'retry_in': 30}
+        assert item.id in manager.retrying_downloads
+        assert manager.active_downloads == {}
+        
+        # After the delay it is extracted afresh with the settings it was added with
+        manager.on_retry_due(item.id)
+        assert item.info is None
+        mock_info_class.assert_called_once_with(item, {'format': 'worst'})
+        
+        manager.on_info_error(item.id, "Unable to download webpage: <urlopen error timed out>")
+        assert errors == ["Unable to download webpage: <urlopen error timed out>"]
+        assert manager.retrying_downloads == {}
+        assert item.id in manager.failed_downloads
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_permanent_failure_is_not_requeued(self, mock_worker_class, mock_pool_class, qt_app):
+        """Test that geo/permission errors are reported at once and can be retried by hand"""
+        manager = DownloadManager()
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        errors = []
+        manager.download_error.connect(lambda download_id, error: errors.append(error))
+        
+        item = resolved_item("https://example.com/private")
+        manager.add_download(item, {'format': 'best'})
+        manager.on_download_error(item.id, "Private video. Sign in if you've been granted access")
+        manager.worker_finished(item.id)
+        
+        assert len(errors) == 1
+        assert manager.retrying_downloads == {}
+        assert manager.queued_count() == 0
+        
+        # A manual retry uses the original settings, not whatever is current
+        item.info = {'title': 'Test'}
+        assert manager.retry_download(item.id) is True
+        assert mock_worker_class.call_args[0] == (item, {'format': 'best'})
+        assert manager.retry_download(item.id) is False
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_pause_and_cancel_waiting_retry(self, mock_worker_class, mock_pool_class, qt_app):
+        """Test that an item waiting for its retry can be paused, resumed and cancelled"""
+        manager = DownloadManager()
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        item = resolved_item("https://flaky.com/a")
+        manager.add_download(item, {})
+        manager.on_download_error(item.id, "Download failed: Connection reset by peer")
+        manager.worker_finished(item.id)
+        
+        manager.pause_download(item.id)
+        assert item.id in manager.paused_downloads
+        assert manager.retrying_downloads == {}
+        # The timer firing later finds nothing to do
+        manager.on_retry_due(item.id)
+        assert len(manager.info_queue) == 0 and manager.active_extractions == {}
+        
+        manager.cancel_download(item.id)
+        assert manager.paused_downloads == {}
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_move_to_top_and_policy_switch(self, mock_worker_class, mock_pool_class):
+        """Test promoting a queued item and switching policy without losing items"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(1)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        items = [resolved_item(f"https://site{i}.com/video") for i in range(4)]
+        for item in items:
+            manager.add_download(item, {})
+            
+        assert manager.move_to_top(items[3].id)
+        manager.set_scheduling_policy('fair_share')
+        assert manager.download_queue.name == 'fair_share'
+        assert manager.download_queue.qsize() == 3
+        
+        manager.worker_finished(items[0].id)
+        assert items[3].id in manager.active_downloads
+        assert manager.move_to_top("missing") is False
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_move_to_top_parked_item(self, mock_worker_class, mock_pool_class):
+        """Test promoting an item that waits behind its host limit"""
+        manager = DownloadManager()
+        manager.set_max_per_host(1)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        items = [resolved_item(f"https://busy.com/{i}") for i in range(3)]
+        for item in items:
+            manager.add_download(item, {})
+            
+        assert manager.move_to_top(items[2].id)
+        manager.worker_finished(items[0].id)
+        assert items[2].id in manager.active_downloads
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_set_priority_reorders_queued_item(self, mock_worker_class, mock_pool_class):
+        """Test that a queued item with raised priority starts next"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(1)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        
+        items = [resolved_item(f"https://site{i}.com/video") for i in range(4)]
+        for item in items:
+            manager.add_download(item, {})
+            
+        manager.set_priority(items[3], 2)
+        assert items[3].priority == 2
+        
+        manager.worker_finished(items[0].id)
+        assert items[3].id in manager.active_downloads
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_paused_download_frees_its_slot(self, mock_worker_class, mock_pool_class):
+        """Test that a paused item stops counting against the limit until resumed"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(1)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings, is_paused=True)
+        statuses = []
+        manager.download_progress.connect(lambda download_id, progress: statuses.append((download_id, progress['status'])))
+        
+        first = resolved_item("https://site1.com/video")
+        second = resolved_item("https://site2.com/video")
+        manager.add_download(first, {})
+        manager.add_download(second, {})
+        
+        manager.pause_download(first.id)
+        manager.active_downloads[first.id].pause.assert_called_once()
+        manager.on_download_paused(first.id)
+        manager.worker_finished(first.id)
+        
+        assert second.id in manager.active_downloads
+        assert first.id in manager.paused_downloads
+        assert (first.id, 'paused') in statuses
+        
+        # Resuming queues it behind the running download
+        manager.resume_download(first.id)
+        assert first.id not in manager.paused_downloads
+        assert (first.id, 'queued') in statuses
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_pause_all_holds_queued_items(self, mock_worker_class, mock_pool_class):
+        """Test that Pause All keeps queued items from taking the freed slots"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(1)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings, is_paused=True)
+        
+        items = [resolved_item(f"https://site{i}.com/video") for i in range(3)]
+        for item in items:
+            manager.add_download(item, {})
+            
+        manager.pause_all()
+        manager.on_download_paused(items[0].id)
+        manager.worker_finished(items[0].id)
+        
+        assert manager.active_downloads == {}
+        assert manager.queued_count() == 0
+        assert list(manager.paused_downloads) == [items[1].id, items[2].id, items[0].id]
+        
+        manager.resume_all()
+        assert manager.paused_downloads == {}
+        assert items[1].id in manager.active_downloads
+        assert manager.queued_count() == 1
+        # The item paused mid-transfer is extracted again before it continues
+        assert items[0].id in manager.active_extractions
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_cancel_queued_and_paused_items(self, mock_worker_class, mock_pool_class):
+        """Test that cancelling waiting items drops them without touching running ones"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(1)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        statuses = []
+        manager.download_progress.connect(lambda download_id, progress: statuses.append((download_id, progress['status'])))
+        
+        running, queued, paused = [resolved_item(f"https://site{i}.com/video") for i in range(3)]
+        for item in (running, queued, paused):
+            manager.add_download(item, {})
+        manager.pause_download(paused.id)
+        
+        manager.cancel_download(queued.id)
+        manager.cancel_download(paused.id)
+        manager.cancel_download(running.id)
+        
+        assert manager.queued_count() == 0
+        assert manager.paused_downloads == {}
+        manager.active_downloads[running.id].cancel.assert_called_once()
+        assert [status for _, status in statuses if status == 'cancelled'] == ['cancelled'] * 3
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_find_duplicate_covers_pending_items_only(self, mock_worker_class, mock_pool_class):
+        """Test that a video counts as a duplicate while queued or running, not once it is done"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(1)
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        running = resolved_item("https://youtu.be/aaaaaaaaaaa")
+        queued = resolved_item("https://www.youtube.com/watch?v=bbbbbbbbbbb")
+        manager.add_download(running, {})
+        manager.add_download(queued, {})
+        
+        assert manager.find_duplicate("https://m.youtube.com/watch?v=aaaaaaaaaaa") == running.id
+        assert manager.find_duplicate("https://youtu.be/bbbbbbbbbbb?t=3") == queued.id
+        assert manager.find_duplicate("https://youtu.be/ccccccccccc") is None
+        
+        manager.on_download_completed(running.id, "/videos/a.mp4")
+        manager.cancel_download(queued.id)
+        assert manager.find_duplicate("https://youtu.be/aaaaaaaaaaa") is None
+        assert manager.find_duplicate("https://youtu.be/bbbbbbbbbbb") is None
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.InfoWorker')
+    def test_requeue_only_finished_items(self, mock_info_class, mock_pool_class):
+        """Test that requeue takes back a finished item but not one still pending or a duplicate"""
+        manager = DownloadManager()
+        pending = DownloadItem("https://youtu.be/aaaaaaaaaaa")
+        manager.add_download(pending, {})
+        done = resolved_item("https://youtu.be/bbbbbbbbbbb")
+        same_video = DownloadItem("https://www.youtube.com/watch?v=aaaaaaaaaaa")
+        
+        assert not manager.requeue(pending, {})
+        assert not manager.requeue(same_video, {})
+        assert manager.requeue(done, {'format': 'worst'})
+        
+        assert done.info is None
+        mock_info_class.assert_called_with(done, {'format': 'worst'})
+        assert manager.find_duplicate(done.url) == done.id
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.InfoWorker')
+    def test_find_duplicate_follows_playlist_mode(self, mock_info_class, mock_pool_class):
+        """Test that videos from the same playlist are separate items unless the playlist is downloaded"""
+        manager = DownloadManager()
+        first = DownloadItem("https://www.youtube.com/watch?v=aaaaaaaaaaa&list=PLabc")
+        manager.add_download(first, {'download_playlist': False})
+        
+        assert manager.find_duplicate("https://www.youtube.com/watch?v=bbbbbbbbbbb&list=PLabc", {}) is None
+        assert manager.find_duplicate("https://youtu.be/aaaaaaaaaaa") == first.id
+        
+        whole = DownloadItem("https://www.youtube.com/watch?v=ccccccccccc&list=PLxyz")
+        manager.add_download(whole, {'download_playlist': True})
+        
+        assert manager.find_duplicate("https://www.youtube.com/playlist?list=PLxyz", {'download_playlist': True}) == whole.id
+        assert manager.find_duplicate("https://youtu.be/ccccccccccc") is None
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.InfoWorker')
+    def test_restore_download_by_recorded_status(self, mock_info_class, mock_pool_class):
+        """Test that journalled items come back in the stage their status says"""
+        manager = DownloadManager()
+        mock_info_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        items = {}
+        for status in DownloadStatus:
+            items[status] = DownloadItem(f"https://site.com/{status.value}")
+            items[status].status = status
+            manager.restore_download(items[status], {'format': 'best'})
+            
+        # Interrupted items are extracted again and continue their .part files
+        restarted = {item.id for item in (items[DownloadStatus.QUEUED], items[DownloadStatus.FETCHING_INFO],
+                                          items[DownloadStatus.DOWNLOADING], items[DownloadStatus.PROCESSING])}
+        assert set(manager.active_extractions) == restarted
+        assert set(manager.paused_downloads) == {items[DownloadStatus.PAUSED].id}
+        assert set(manager.failed_downloads) == {items[DownloadStatus.ERROR].id}
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_cleanup_can_keep_partial_files(self, mock_worker_class, mock_pool_class):
+        """Test that shutting down for a restart pauses running jobs instead of cancelling them"""
+        manager = DownloadManager()
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        manager.add_download(resolved_item("https://site.com/video"), {})
+        [worker] = manager.active_downloads.values()
+        
+        manager.cleanup(keep_partial_files=True)
+        
+        worker.pause.assert_called_once()
+        worker.cancel.assert_not_called()
+        
+    def test_cleanup_cancels_workers_in_parallel(self):
+        """Test that shutdown with many busy workers finishes within one deadline"""
+        class BlockingJob:
+            """Stands in for a transfer that only stops when cancelled"""
+
+            def __init__(self, item, settings):
+                self.download_item = item
+                self.settings = settings
+                self.stopped = threading.Event()
+                for name in ('progress_updated', 'info_extracted', 'download_completed',
+                             'download_error', 'download_paused', 'finished'):
+                    setattr(self, name, Mock())
+                    
+            def run(self):
+                # Winds down with a short delay of its own once cancelled
+                self.stopped.wait(30)
+                time.sleep(0.2)
+                
+            def cancel(self):
+                self.stopped.set()
+                
+        manager = DownloadManager()
+        manager.set_max_concurrent(10)
+        with patch('src.download_manager.DownloadWorker', BlockingJob):
+            for i in range(10):
+                manager.add_download(resolved_item(f"https://site{i}.com/video"), {})
+                
+        assert manager.worker_pool.running_count == 10 or manager.worker_pool.thread_count == 10
+        start = time.monotonic()
+        assert manager.cleanup(timeout=5) is True
+        # Serially this would take 10 x 0.2s
+        assert time.monotonic() - start < 1.0
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_auto_concurrency_follows_tuner(self, mock_worker_class, mock_pool_class, qt_app):
+        """Test that auto mode applies the tuner's slot count and announces it"""
+        manager = DownloadManager()
+        mock_worker_class.side_effect = lambda item, settings: Mock(download_item=item, settings=settings)
+        announced = []
+        manager.concurrency_changed.connect(lambda slots, auto: announced.append((slots, auto)))
+        
+        manager.set_auto_concurrency_bounds(2, 6)
+        manager.set_auto_concurrency(True)
+        assert manager._tuning_timer.isActive()
+        
+        items = [resolved_item(f"https://site{i}.com/video") for i in range(8)]
+        for item in items:
+            manager.add_download(item, {})
+        assert len(manager.active_downloads) == 3
+        
+        # Progress reports are cumulative; only the growth counts as throughput
+        manager.on_progress_updated(items[0].id, {'downloaded_bytes': 1000})
+        manager.on_progress_updated(items[0].id, {'downloaded_bytes': 5000})
+        assert manager.concurrency_tuner._bytes == 4000
+        
+        manager.tune_concurrency()
+        assert manager.max_concurrent_downloads == 4
+        assert len(manager.active_downloads) == 4
+        assert announced[-1] == (4, True)
+        
+        manager.set_auto_concurrency(False)
+        assert not manager._tuning_timer.isActive()
+        assert announced[-1] == (4, False)
+        
+    @patch('src.download_manager.WorkerPool')
+    @patch('src.download_manager.DownloadWorker')
+    def test_fragment_workers_respect_global_budget(self, mock_worker_class, mock_pool_class):
+        """Test that 10 downloads asking for 16 fragments each stay within the budget"""
+        manager = DownloadManager()
+        manager.set_max_concurrent(10)
+        workers = []
+        mock_worker_class.side_effect = lambda item, settings: workers.append(Mock()) or workers[-1]
+        
+        for i in range(10):
+            manager.add_download(resolved_item(f"https://site{i}.com/video"), {'concurrent_fragments': 16})
+            
+        granted = [worker.fragment_workers for worker in workers]
+        assert sum(granted) <= manager.fragment_budget
+        assert min(granted) >= 1
+        
+        # With one slot the whole budget share goes to that download
+        manager.clear_all()
+        manager.set_max_concurrent(1)
+        manager.add_download(resolved_item("https://solo.com/video"), {'concurrent_fragments': 16})
+        assert workers[-1].fragment_workers == 16
+        
     def test_signal_forwarding(self):
         """Test that manager forwards signals correctly"""
         manager = DownloadManager()
@@ -230,15 +1262,16 @@ class TestDownloadManager:
         manager.download_completed.emit.assert_called_once_with("test_id", "/path/to/file.mp4")
         manager.download_error.emit.assert_called_once_with("test_id", "Test error")
         
+    @patch('src.download_manager.WorkerPool')
     @patch('src.download_manager.DownloadWorker')
-    def test_worker_finished_starts_next(self, mock_worker_class):
+    def test_worker_finished_starts_next(self, mock_worker_class, mock_pool_class):
         """Test that finishing a worker starts the next queued download"""
         manager = DownloadManager()
         manager.max_concurrent_downloads = 1
         
         # Add two downloads
-        item1 = DownloadItem("https://example.com/video1")
-        item2 = DownloadItem("https://example.com/video2")
+        item1 = resolved_item("https://example.com/video1")
+        item2 = resolved_item("https://example.com/video2")
         settings = {'format': 'best'}
         
         mock_worker1 = Mock()
@@ -254,10 +1287,11 @@ class TestDownloadManager:
         # Simulate first worker finishing
         manager.worker_finished(item1.id)
         
-        # Should start second worker
+        # Should start second worker and release the first one
         assert len(manager.active_downloads) == 1
         assert manager.download_queue.empty()
-        mock_worker2.start.assert_called_once()
+        manager.worker_pool.submit.assert_called_with(mock_worker2)
+        assert item1.id not in manager.active_downloads
         
     def test_pause_resume_cancel_operations(self):
         """Test pause, resume, and cancel operations"""
@@ -0,0 +1,48 @@
+"""
+Tests for fragment_tuner module
+"""
+
+import pytest
+from src.fragment_tuner import FragmentTuner
+
+
+@pytest.mark.unit
+class TestFragmentTuner:
+    def test_unknown_host_uses_initial_workers(self):
+        """Test the starting point before anything is known about a host"""
+        tuner = FragmentTuner(initial_workers=4)
+        assert tuner.workers_for("cdn.example") == 4
+        
+    def test_high_latency_host_gets_more_workers(self):
+        """Test that slow fragments lead to doubling the worker count"""
+        tuner = FragmentTuner(target_fragment_seconds=0.25)
+        
+        # 40 fragments of 4 s each on 4 connections took 40 s
+        tuner.observe("slow.example", workers=4, fragments=40, elapsed=40.0, nbytes=40_000_000)
+        assert tuner.workers_for("slow.example") == 8
+        
+        # Twice the throughput with 8: keep going
+        tuner.observe("slow.example", workers=8, fragments=40, elapsed=20.0, nbytes=40_000_000)
+        assert tuner.workers_for("slow.example") == 16
+        
+    def test_settles_when_more_workers_do_not_help(self):
+        """Test that a saturated link settles on the best count seen"""
+        tuner = FragmentTuner(target_fragment_seconds=0.25)
+        tuner.observe("busy.example", workers=4, fragments=40, elapsed=40.0, nbytes=40_000_000)
+        tuner.observe("busy.example", workers=8, fragments=40, elapsed=38.0, nbytes=40_000_000)
+        
+        assert tuner.workers_for("busy.example") == 4
+        
+    def test_low_latency_host_stays_put(self):
+        """Test that fast fragments do not get extra connections"""
+        tuner = FragmentTuner(initial_workers=2, target_fragment_seconds=0.25)
+        tuner.observe("fast.example", workers=2, fragments=100, elapsed=5.0, nbytes=100_000_000)
+        
+        assert tuner.workers_for("fast.example") == 2
+        
+    def test_ignores_unfragmented_downloads(self):
+        """Test that single-file downloads tell the tuner nothing"""
+        tuner = FragmentTuner(initial_workers=4)
+        tuner.observe("plain.example", workers=1, fragments=0, elapsed=3.0, nbytes=1000)
+        
+        assert tuner.workers_for("plain.example") == 4
@@ -0,0 +1,176 @@
+"""
+Tests for headless module
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from PyQt6.QtCore import QCoreApplication, QTimer
+from src.download_manager import DownloadManager, JobLogger
+from src.headless import (DEFAULT_SETTINGS, EXIT_FAILED, EXIT_OK, EXIT_USAGE, load_settings,
+                          main as headless_main)
+from src.shared_queue import SharedQueue
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.unit
+class TestHeadlessSettings:
+    def test_config_overrides_defaults(self, tmp_path):
+        """Test that a config file's keys replace the defaults and the rest stay"""
+        path = tmp_path / 'settings.json'
+        path.write_text(json.dumps({'format': 'worst', 'max_concurrent': 8}))
+        settings = load_settings(str(path))
+        
+        assert settings['format'] == 'worst'
+        assert settings['max_concurrent'] == 8
+        assert settings['output_template'] == DEFAULT_SETTINGS['output_template']
+        
+    def test_bad_config_is_a_usage_error(self, tmp_path, capsys):
+        """Test that unreadable configs and unknown keys exit with the usage status"""
+        (tmp_path / 'broken.json').write_text("{not json")
+        (tmp_path / 'typo.json').write_text(json.dumps({'max_concurent': 2}))
+        
+        for name in ('broken.json', 'typo.json', 'missing.json'):
+            assert headless_main(['-c', str(tmp_path / name), 'https://counting.invalid/a']) == EXIT_USAGE
+        assert "max_concurent" in capsys.readouterr().err
+        assert headless_main([]) == EXIT_USAGE
+        
+    def test_wrong_typed_setting_is_a_usage_error(self, tmp_path, capsys):
+        """Test that a value of the wrong JSON type is rejected by name instead of crashing the run"""
+        for name, config in (('count.json', {'max_concurrent': "x"}),
+                             ('bound.json', {'auto_concurrency_max': 2.5}),
+                             ('flag.json', {'max_per_host': True}),
+                             ('text.json', {'format': 5})):
+            (tmp_path / name).write_text(json.dumps(config))
+            with pytest.raises(ValueError, match=next(iter(config))):
+                load_settings(str(tmp_path / name))
+            
+        assert headless_main(['-c', str(tmp_path / 'count.json'), 'https://counting.invalid/a']) == EXIT_USAGE
+        assert "max_concurrent" in capsys.readouterr().err
+        # Whole numbers and true/false are fine where the defaults have them
+        (tmp_path / 'good.json').write_text(json.dumps({'bandwidth_limit': 1000, 'extract_audio': True}))
+        assert load_settings(str(tmp_path / 'good.json'))['bandwidth_limit'] == 1000
+        
+    def test_startup_does_not_import_qtwidgets(self):
+        """Test that the --headless entry point never loads QtWidgets"""
+        script = ("import sys, main\n"
+                  "sys.argv = ['main.py', '--headless']\n"
+                  "try:\n"
+                  "    main.main()\n"
+                  "except SystemExit as e:\n"
+                  "    print(e.code, sorted(m for m in sys.modules if m.startswith('PyQt6.QtWidgets')))\n")
+        result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True,
+                                env=dict(os.environ, QT_QPA_PLATFORM='offscreen'), timeout=60)
+        assert result.stdout.split() == [str(EXIT_USAGE), '[]'], result.stderr
+
+
+@pytest.mark.gui
+class TestHeadlessRun:
+    def test_downloads_urls_from_args_and_batch_file(self, qt_app, counting_extractor, tmp_path, monkeypatch, capsys):
+        """Test that every URL is downloaded once, duplicates skipped, with progress and summary lines"""
+        monkeypatch.setattr(JobLogger, 'echo', True)
+        batch = tmp_path / 'urls.txt'
+        batch.write_text("# queued from the command line\nhttps://counting.invalid/second\n"
+                         "https://counting.invalid/first\n")
+        config = tmp_path / 'settings.json'
+        # extract_audio leaves out the ffmpeg conversion step, which needs ffmpeg installed
+        config.write_text(json.dumps({'output_dir': str(tmp_path / 'videos'), 'format': 'best', 'extract_audio': True}))
+        
+        status = headless_main(['-c', str(config), '-a', str(batch), '--interval', '0.05',
+                                '--archive', str(tmp_path / 'archive.txt'), 'https://counting.invalid/first'])
+        
+        assert status == EXIT_OK
+        assert sorted(os.listdir(tmp_path / 'videos')) == ['Video first.mp4', 'Video second.mp4']
+        assert counting_extractor == {'first': 1, 'second': 1}
+        assert sorted((tmp_path / 'archive.txt').read_text().splitlines()) == ["counting first", "counting second"]
+        captured = capsys.readouterr()
+        # yt-dlp's own output stays quiet unless --verbose
+        assert "[download]" not in captured.out
+        assert captured.err.strip().splitlines()[-1].startswith("2 done, 0 failed, 1 skipped")
+        
+    def test_failed_download_sets_exit_status(self, qt_app, counting_extractor, tmp_path, monkeypatch, capsys):
+        """Test that a failing URL is listed in the summary and exits with the failure status"""
+        monkeypatch.setattr(JobLogger, 'echo', True)
+        from conftest import CountingIE
+        CountingIE.broken.add('gone')
+        
+        config = tmp_path / 'settings.json'
+        config.write_text(json.dumps({'extract_audio': True}))
+        
+        status = headless_main(['-c', str(config), '-o', str(tmp_path / 'videos'), '-f', 'best',
+                                'https://counting.invalid/gone', 'https://counting.invalid/here'])
+        
+        assert status == EXIT_FAILED
+        err = capsys.readouterr().err
+        assert "FAILED https://counting.invalid/gone: " in err
+        assert "1 done, 1 failed, 0 skipped" in err
+        assert os.listdir(tmp_path / 'videos') == ['Video here.mp4']
+        
+    def test_info_cache_carries_over_between_runs(self, qt_app, counting_extractor, tmp_path, capsys):
+        """Test that a second run with the same --info-cache does not extract again and reports the hit"""
+        cache_file = str(tmp_path / 'info_cache.db')
+        config = tmp_path / 'settings.json'
+        config.write_text(json.dumps({'extract_audio': True}))
+        for quality in ('best', 'worst'):
+            status = headless_main(['-c', str(config), '-o', str(tmp_path / quality), '-f', quality,
+                                    '--info-cache', cache_file, '--interval', '0.05', 'https://counting.invalid/again'])
+            assert status == EXIT_OK
+            
+        assert "; info cache 1 hits, 0 misses" in capsys.readouterr().err
+        
+        assert counting_extractor == {'again': 1}
+        assert os.listdir(tmp_path / 'worst') == ['Video again.mp4']
+        
+    def test_max_concurrent_above_the_gui_limit(self, qt_app, counting_extractor, tmp_path, monkeypatch):
+        """Test that -j 20 runs 20 download slots instead of being cut to the GUI's 10"""
+        managers = []
+        
+        class RecordingManager(DownloadManager):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                managers.append(self)
+                
+        monkeypatch.setattr('src.headless.DownloadManager', RecordingManager)
+        config = tmp_path / 'settings.json'
+        config.write_text(json.dumps({'extract_audio': True}))
+        
+        status = headless_main(['-c', str(config), '-o', str(tmp_path), '-j', '20', '--interval', '0.05',
+                                'https://counting.invalid/wide'])
+        
+        assert status == EXIT_OK
+        assert managers[0].max_concurrent_downloads == 20
+        assert managers[0].worker_pool.max_workers == 20
+        
+    def test_shared_playlist_entry_already_in_backlog(self, qt_app, counting_extractor, tmp_path):
+        """Test that a run finishes when an expanded entry is left to the backlog row it already has"""
+        path = str(tmp_path / 'backlog.db')
+        settings = {'extract_audio': True, 'format': 'best', 'download_playlist': True}
+        queue = SharedQueue(path)
+        # With -j 1 the node claims two rows, the playlist and the filler; heavy1 waits for a slot.
+        # heavy ids extract slowly, so the node drops the playlist's heavy1 before it is downloaded
+        queue.add(["https://counting.invalid/playlist/heavy3", "https://counting.invalid/filler",
+                   "https://counting.invalid/heavy1"], settings)
+        queue.close()
+        config = tmp_path / 'settings.json'
+        config.write_text(json.dumps({'extract_audio': True}))
+        # Fails the test instead of hanging it if the run never finishes
+        guard = QTimer()
+        guard.setSingleShot(True)
+        guard.timeout.connect(QCoreApplication.quit)
+        guard.start(30000)
+        
+        status = headless_main(['--shared-queue', path, '-c', str(config), '-o', str(tmp_path / 'videos'),
+                                '-j', '1', '--interval', '0.05'])
+        
+        assert guard.isActive()
+        guard.stop()
+        assert status == EXIT_OK
+        assert sorted(os.listdir(tmp_path / 'videos')) == ['Video filler.mp4', 'Video heavy0.mp4',
+                                                          'Video heavy1.mp4', 'Video heavy2.mp4']
+        queue = SharedQueue(path)
+        assert queue.counts() == {'pending': 0, 'claimed': 0, 'done': 5, 'failed': 0}
+        queue.close()
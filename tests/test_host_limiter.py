@@ -0,0 +1,90 @@
+"""
+Tests for host_limiter module
+"""
+
+import pytest
+from src.host_limiter import HostLimiter, host_key, throttle_status
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestHostKey:
+    def test_subdomains_share_a_key(self):
+        """Test that www./m./music. variants map to the same site"""
+        assert host_key("https://www.youtube.com/watch?v=x") == "youtube.com"
+        assert host_key("https://m.youtube.com/watch?v=x") == "youtube.com"
+        assert host_key("https://music.youtube.com/watch?v=x") == "youtube.com"
+        assert host_key("https://youtu.be/x") == "youtube.com"
+        
+    def test_second_level_registries(self):
+        """Test that example.co.uk style domains keep three labels"""
+        assert host_key("https://www.bbc.co.uk/iplayer") == "bbc.co.uk"
+        assert host_key("https://vimeo.com/123") == "vimeo.com"
+        
+    def test_url_without_host(self):
+        """Test that URLs without a host fall back to the URL itself"""
+        assert host_key("not a url") == "not a url"
+
+
+@pytest.mark.unit
+class TestThrottleStatus:
+    def test_detects_throttle_statuses(self):
+        """Test detection of 429 and 403 in yt-dlp error messages"""
+        assert throttle_status("[youtube] x: Unable to download webpage: HTTP Error 429: Too Many Requests") == 429
+        assert throttle_status("unable to download video data: HTTP Error 403: Forbidden") == 403
+        
+    def test_ignores_other_errors(self):
+        """Test that other errors are not treated as throttling"""
+        assert throttle_status("HTTP Error 404: Not Found") is None
+        assert throttle_status("Unsupported URL") is None
+        assert throttle_status("") is None
+
+
+@pytest.mark.unit
+class TestHostLimiter:
+    def test_per_host_cap(self):
+        """Test that in-flight jobs are capped per host only"""
+        limiter = HostLimiter(max_per_host=2)
+        limiter.acquire("a.com")
+        limiter.acquire("a.com")
+        
+        assert not limiter.can_start("a.com")
+        assert limiter.can_start("b.com")
+        
+        limiter.release("a.com")
+        assert limiter.can_start("a.com")
+        
+    def test_exponential_backoff(self):
+        """Test that repeated throttling doubles the backoff up to the maximum"""
+        clock = FakeClock()
+        limiter = HostLimiter(base_backoff=10, max_backoff=35, clock=clock)
+        
+        assert limiter.record_throttled("a.com") == 10
+        assert limiter.record_throttled("a.com") == 20
+        assert limiter.record_throttled("a.com") == 35
+        assert not limiter.can_start("a.com")
+        assert limiter.can_start("b.com")
+        assert limiter.backed_off_hosts() == {"a.com": 35}
+        
+        clock.now += 35
+        assert limiter.can_start("a.com")
+        assert limiter.backed_off_hosts() == {}
+        
+    def test_success_resets_backoff(self):
+        """Test that a success resets the backoff level"""
+        clock = FakeClock()
+        limiter = HostLimiter(base_backoff=10, clock=clock)
+        limiter.record_throttled("a.com")
+        limiter.record_throttled("a.com")
+        
+        assert limiter.record_success("a.com") is True
+        assert limiter.can_start("a.com")
+        assert limiter.record_throttled("a.com") == 10
+        assert limiter.record_success("b.com") is False
@@ -0,0 +1,263 @@
+"""
+Tests for info_cache module
+"""
+
+import os
+import time
+import pytest
+from src.info_cache import InfoCache, info_expiry, slim_info, url_expiry
+from src.download_manager import DownloadWorker
+from src.download_item import DownloadItem
+from src.worker_pool import youtube_dl_session
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def video_info(video_id, expire=None, padding=0):
+    url = f"https://cdn.example.com/{video_id}.mp4"
+    if expire is not None:
+        url += f"?expire={int(expire)}&sig=abc"
+    return {'id': video_id, 'title': f'Video {video_id}', 'extractor': 'Youtube',
+            'formats': [{'format_id': '18', 'url': url, 'ext': 'mp4'}],
+            'description': os.urandom(padding).hex()}
+
+
+def run_worker(url, settings, cache):
+    """Run a DownloadWorker on this thread; returns (completed paths, errors)"""
+    worker = DownloadWorker(DownloadItem(url), settings)
+    worker.info_cache = cache
+    completed = []
+    errors = []
+    worker.download_completed.connect(lambda download_id, path: completed.append(path))
+    worker.download_error.connect(lambda download_id, error: errors.append(error))
+    worker.run()
+    return completed, errors
+
+
+@pytest.mark.unit
+class TestExpiry:
+    def test_signed_url_expiry(self):
+        """Test that expiry times are read from the query, the path and Akamai tokens"""
+        assert url_expiry("https://rr1.googlevideo.com/videoplayback?expire=1700003600&ei=x") == 1700003600
+        assert url_expiry("https://manifest.googlevideo.com/api/manifest/dash/expire/1700007200/ei/x") == 1700007200
+        assert url_expiry("https://d1.cloudfront.net/v.mp4?Expires=1700001800&Signature=x") == 1700001800
+        assert url_expiry("https://akamai.example.com/v.m3u8?hdnts=st=1699990000~exp=1700000900~acl=/*") == 1700000900
+        assert url_expiry("https://example.com/video.mp4?quality=720") is None
+        assert url_expiry(None) is None
+    
+    def test_earliest_format_expiry_wins(self):
+        """Test that an info dict expires with the first of its format URLs"""
+        info = video_info('a', expire=1700003600)
+        info['formats'].append({'format_id': '22', 'url': "https://cdn.example.com/a.mp4?expire=1700001000"})
+        
+        assert info_expiry(info) == 1700001000
+        assert info_expiry({'url': "https://example.com/a.mp4"}) is None
+
+
+@pytest.mark.unit
+class TestInfoCache:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        clock = FakeClock()
+        cache = InfoCache(str(tmp_path / 'info_cache.db'), clock=clock)
+        yield cache, clock
+        cache.close()
+    
+    def test_link_forms_share_an_entry(self, cache):
+        """Test that every link form of a video finds its entry, and hits and misses are counted"""
+        cache, _ = cache
+        assert cache.get("https://www.youtube.com/watch?v=dQw4w9WgXcQ") is None
+        
+        cache.put("https://www.youtube.com/watch?v=dQw4w9WgXcQ", video_info('dQw4w9WgXcQ'))
+        
+        assert cache.get("https://youtu.be/dQw4w9WgXcQ")['title'] == 'Video dQw4w9WgXcQ'
+        assert cache.get("https://m.youtube.com/watch?v=dQw4w9WgXcQ&t=42")['formats'][0]['format_id'] == '18'
+        assert cache.stats() == {'hits': 2, 'misses': 1, 'expired': 0, 'invalidated': 0, 'evicted': 0,
+                                 'entries': 1, 'bytes': cache.stats()['bytes']}
+    
+    def test_entries_expire_before_their_format_urls(self, cache):
+        """Test that signed entries expire expiry_margin before their URLs and others after default_ttl"""
+        cache, clock = cache
+        signed = "https://youtu.be/aaaaaaaaaaa"
+        plain = "https://youtu.be/bbbbbbbbbbb"
+        cache.put(signed, video_info('aaaaaaaaaaa', expire=clock.now + 3600))
+        cache.put(plain, video_info('bbbbbbbbbbb'))
+        # Too close to expiring to be worth keeping
+        cache.put("https://youtu.be/ccccccccccc", video_info('ccccccccccc', expire=clock.now + 300))
+        
+        clock.now += 3600 - cache.expiry_margin - 1
+        assert cache.get(signed) is not None
+        assert cache.get("https://youtu.be/ccccccccccc") is None
+        clock.now += 2
+        assert cache.get(signed) is None
+        assert cache.get(plain) is not None
+        
+        clock.now += cache.default_ttl
+        assert cache.get(plain) is None
+        stats = cache.stats()
+        assert (stats['expired'], stats['entries']) == (2, 0)
+    
+    def test_least_recently_used_entries_are_evicted(self, tmp_path):
+        """Test that past max_bytes the entries used longest ago are dropped"""
+        clock = FakeClock()
+        cache = InfoCache(str(tmp_path / 'info_cache.db'), clock=clock)
+        urls = [f"https://youtu.be/{letter * 11}" for letter in 'abcd']
+        for url in urls[:3]:
+            clock.now += 1
+            # Random padding keeps every entry several KB after compression
+            cache.put(url, video_info(url[-11:], padding=8000))
+        # Room for the three entries but not a fourth
+        cache.max_bytes = cache.stats()['bytes'] + 1000
+        clock.now += 1
+        assert cache.get(urls[0]) is not None
+        
+        clock.now += 1
+        cache.put(urls[3], video_info(urls[3][-11:], padding=8000))
+        
+        assert cache.get(urls[1]) is None
+        assert all(cache.get(url) is not None for url in (urls[0], urls[2], urls[3]))
+        assert cache.stats()['evicted'] == 1
+        assert cache.stats()['bytes'] <= cache.max_bytes
+        cache.close()
+    
+    def test_entries_are_slimmed(self, cache):
+        """Test that private keys, the heatmap and storyboard formats are not stored"""
+        cache, _ = cache
+        info = video_info('aaaaaaaaaaa')
+        info['__post_extractor'] = lambda: {}
+        info['heatmap'] = [{'start_time': 0, 'value': 1.0}] * 100
+        info['formats'].append({'format_id': 'sb0', 'url': "https://i.ytimg.com/sb/0.jpg", 'protocol': 'mhtml'})
+        
+        assert set(slim_info(info)) >= {'id', 'title', 'formats'}
+        cache.put("https://youtu.be/aaaaaaaaaaa", info)
+        cached = cache.get("https://youtu.be/aaaaaaaaaaa")
+        
+        assert '__post_extractor' not in cached and 'heatmap' not in cached
+        assert [fmt['format_id'] for fmt in cached['formats']] == ['18']
+        assert '__post_extractor' in info
+    
+    def test_info_json_cannot_hold_is_not_cached(self, cache):
+        """Test that an entry that would not survive a JSON round trip is skipped"""
+        cache, _ = cache
+        info = video_info('aaaaaaaaaaa')
+        info['chapters_by_start'] = {0: "Intro", 60: "Outro"}
+        
+        cache.put("https://youtu.be/aaaaaaaaaaa", info)
+        
+        assert cache.get("https://youtu.be/aaaaaaaaaaa") is None
+        assert cache.stats()['entries'] == 0
+    
+    def test_invalidate_and_clear(self, cache):
+        """Test that invalidated entries are gone and counted"""
+        cache, _ = cache
+        cache.put("https://youtu.be/aaaaaaaaaaa", video_info('aaaaaaaaaaa'))
+        cache.put("https://youtu.be/bbbbbbbbbbb", video_info('bbbbbbbbbbb'))
+        
+        cache.invalidate("https://www.youtube.com/watch?v=aaaaaaaaaaa")
+        cache.invalidate("https://youtu.be/ccccccccccc")
+        
+        assert cache.get("https://youtu.be/aaaaaaaaaaa") is None
+        assert cache.stats()['invalidated'] == 1
+        cache.clear()
+        assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.unit
+class TestInfoCacheWorkers:
+    @pytest.fixture
+    def cache(self, tmp_path):
+        cache = InfoCache(str(tmp_path / 'info_cache.db'))
+        yield cache
+        cache.close()
+    
+    def test_retry_and_readd_skip_extraction(self, counting_extractor, cache, tmp_path):
+        """Test that running a video again, at another quality, uses the cached info without extracting"""
+        url = "https://counting.invalid/cached"
+        completed, errors = run_worker(url, {'output_dir': str(tmp_path / 'best'), 'format': 'best',
+                                             'extract_audio': True}, cache)
+        assert errors == [] and len(completed) == 1
+        
+        completed, errors = run_worker(url, {'output_dir': str(tmp_path / 'worst'), 'format': 'worst',
+                                             'extract_audio': True}, cache)
+        
+        assert errors == []
+        assert completed[0].endswith("Video cached.mp4")
+        assert (tmp_path / 'worst' / "Video cached.mp4").stat().st_size == 4096
+        assert counting_extractor == {'cached': 1}
+        assert (cache.hits, cache.misses) == (1, 1)
+    
+    def test_bypass_always_extracts(self, counting_extractor, cache, tmp_path):
+        """Test that use_info_cache set to False neither reads nor fills the cache"""
+        settings = {'output_dir': str(tmp_path), 'extract_audio': True, 'use_info_cache': False}
+        for _ in range(2):
+            completed, errors = run_worker("https://counting.invalid/bypassed", settings, cache)
+            assert errors == []
+        
+        assert counting_extractor == {'bypassed': 2}
+        assert cache.stats()['entries'] == 0
+        assert (cache.hits, cache.misses) == (0, 0)
+    
+    def test_failed_download_drops_the_entry(self, counting_extractor, local_media_server, cache, tmp_path):
+        """Test that a download whose format URL is refused makes the retry extract again"""
+        from conftest import CountingIE
+        CountingIE.media_url = f"{local_media_server}/status/403"
+        settings = {'output_dir': str(tmp_path), 'extract_audio': True}
+        
+        _, errors = run_worker("https://counting.invalid/refused", settings, cache)
+        assert errors and cache.stats()['invalidated'] == 1
+        
+        CountingIE.media_url = f"{local_media_server}/media/4096"
+        completed, errors = run_worker("https://counting.invalid/refused", settings, cache)
+        
+        assert errors == [] and len(completed) == 1
+        assert counting_extractor == {'refused': 2}
+    
+    def test_stale_formats_are_extracted_again(self, counting_extractor, cache, tmp_path):
+        """Test that a cached entry whose formats no longer select is replaced from the network"""
+        url = "https://counting.invalid/stale"
+        cache.put(url, {'id': 'stale', 'title': 'Video stale', 'extractor': 'Counting', 'formats': []})
+        
+        completed, errors = run_worker(url, {'output_dir': str(tmp_path), 'extract_audio': True}, cache)
+        
+        assert errors == [] and len(completed) == 1
+        assert counting_extractor == {'stale': 1}
+        assert cache.stats()['invalidated'] == 1
+        assert cache.get(url)['url'].endswith('/media/4096')
+
+
+@pytest.mark.slow
+class TestInfoCacheBenchmark:
+    def test_readding_at_another_quality(self, counting_extractor, tmp_path):
+        """Benchmark: extraction time for 20 CPU-heavy videos added again at another quality"""
+        from conftest import CountingIE
+        cache = InfoCache(str(tmp_path / 'info_cache.db'))
+        urls = [f"https://counting.invalid/heavy{n}" for n in range(20)]
+        
+        def extract_all(info_cache, format_selector):
+            start = time.monotonic()
+            for url in urls:
+                worker = DownloadWorker(DownloadItem(url), {'output_dir': str(tmp_path), 'format': format_selector,
+                                                           'extract_audio': True})
+                worker.info_cache = info_cache
+                with youtube_dl_session(worker.build_ydl_options()) as ydl:
+                    assert worker.extract_info(ydl) is not None
+            return time.monotonic() - start
+        
+        uncached = extract_all(None, 'worst')
+        extract_all(cache, 'best')
+        CountingIE.calls.clear()
+        cached = extract_all(cache, 'worst')
+        
+        stats = cache.stats()
+        print(f"\n20 heavy videos added again: extracting {uncached:.2f}s, from the cache {cached:.2f}s "
+              f"({stats['hits']} hits, {stats['misses']} misses, {stats['bytes'] / 1024:.0f} KiB)")
+        assert sum(CountingIE.calls.values()) == 0
+        assert stats['hits'] == 20
+        assert cached < uncached / 2
+        cache.close()
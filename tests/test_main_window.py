@@ -4,13 +4,19 @@ Tests for main_window module
 
 import pytest
 import os
+import socket
+import time
 from unittest.mock import Mock, MagicMock, patch
 from PyQt6.QtWidgets import QApplication, QTableWidgetItem
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QMimeData, QPointF, QUrl
+from PyQt6.QtGui import QDropEvent
 from PyQt6.QtTest import QTest
 
 from src.main_window import MainWindow
-from src.download_item import DownloadItem
+from src.download_item import DownloadItem, DownloadStatus
+from src.download_archive import DownloadArchive
+from src.queue_store import QueueStore
+
 
 @pytest.mark.gui
 class TestMainWindow:
@@ -50,12 +56,14 @@ class TestMainWindow:
             
             window = MainWindow()
             mock_dm_instance = mock_dm.return_value
+            mock_dm_instance.find_duplicate.return_value = None
+            mock_dm_instance.is_archived.return_value = False
             window.download_manager = mock_dm_instance
             
             url = "https://example.com/video"
             initial_rows = window.queue_table.rowCount()
             
-            window.add_single_download(url)
+            window.import_urls([url])
             
             # Check that a row was added to the table
             assert window.queue_table.rowCount() == initial_rows + 1
@@ -67,6 +75,50 @@ class TestMainWindow:
             # Check that download manager was called
             mock_dm_instance.add_download.assert_called_once()
             
+    def test_queue_is_journalled_and_restored(self, qt_app, tmp_path):
+        """Test that a new window brings back the previous session's queue and states"""
+        with patch('src.main_window.DownloadManager') as mock_dm, \
+             patch('src.main_window.ThemeManager'):
+            
+            mock_dm.return_value.find_duplicate.return_value = None
+            mock_dm.return_value.is_archived.return_value = False
+            window = MainWindow(QueueStore(str(tmp_path / 'queue.db')))
+            window.import_urls(f"https://example.com/{i}" for i in range(3))
+            queued, done, failed = window.download_items
+            # Workers fill in the title before reporting it
+            done.update_info("Done video")
+            window.info_extracted(done.id, "Done video", "")
+            window.download_completed(done.id, "/videos/done.mp4")
+            window.download_error(failed.id, "Private video")
+            # Repeated progress reports of an unchanged status are not written again
+            window.update_download_progress(queued.id, {'status': 'downloading'})
+            with patch.object(window.queue_store, 'update') as update:
+                window.update_download_progress(queued.id, {'status': 'downloading'})
+            update.assert_not_called()
+            
+            restored = MainWindow(QueueStore(str(tmp_path / 'queue.db')))
+            
+        assert [item.id for item in restored.download_items] == [queued.id, done.id, failed.id]
+        assert [item.status for item in restored.download_items] == [
+            DownloadStatus.DOWNLOADING, DownloadStatus.COMPLETED, DownloadStatus.ERROR]
+        assert restored.queue_table.item(1, 0).text() == "Done video"
+        assert restored.queue_table.item(1, 2).text() == "Completed"
+        assert restored.queue_table.item(2, 2).text() == "Error: Private video"
+        assert restored.download_manager.restore_download.call_count == 3
+        
+    def test_restore_shows_first_page_then_continues(self, qt_app, tmp_path, process_events_until):
+        """Test that a long journal restores its first rows at once and the rest from the event loop"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        store.add_many((DownloadItem(f"https://example.com/{i}"), {}) for i in range(25))
+        with patch('src.main_window.DownloadManager'), \
+             patch('src.main_window.ThemeManager'), \
+             patch.object(MainWindow, 'restore_first_page', 5), \
+             patch.object(MainWindow, 'restore_page_size', 10):
+            
+            window = MainWindow(store)
+            assert window.queue_table.rowCount() == 5
+            assert process_events_until(lambda: window.queue_table.rowCount() == 25)
+            
     def test_add_download_multiple_urls(self, qt_app):
         """Test adding multiple URLs at once"""
         with patch('src.main_window.DownloadManager') as mock_dm, \
@@ -74,6 +126,8 @@ class TestMainWindow:
             
             window = MainWindow()
             mock_dm_instance = mock_dm.return_value
+            mock_dm_instance.find_duplicate.return_value = None
+            mock_dm_instance.is_archived.return_value = False
             window.download_manager = mock_dm_instance
             
             urls = "https://example.com/video1\nhttps://example.com/video2\nhttps://example.com/video3"
@@ -89,6 +143,305 @@ class TestMainWindow:
             # URL input should be cleared
             assert window.url_input.text() == ""
             
+    def test_max_concurrent_applied_live(self, qt_app):
+        """Test that the max concurrent setting is pushed to the download manager"""
+        with patch('src.main_window.DownloadManager') as mock_dm, \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow()
+            mock_dm_instance = mock_dm.return_value
+            
+            # Applied once when the saved settings are loaded
+            mock_dm_instance.set_max_concurrent.assert_called_with(
+                window.settings_widget.max_concurrent_spinbox.value())
+            
+            new_value = window.settings_widget.max_concurrent_spinbox.value() % 10 + 1
+            window.settings_widget.max_concurrent_spinbox.setValue(new_value)
+            
+            mock_dm_instance.set_max_concurrent.assert_called_with(new_value)
+            
+    def test_host_backoff_status(self, qt_app):
+        """Test that host backoff is shown in the status bar and cleared"""
+        with patch('src.main_window.DownloadManager'), \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow()
+            
+            window.host_backoff_changed("busy.com", 90)
+            assert not window.backoff_label.isHidden()
+            assert "busy.com (1m 30s)" in window.backoff_label.text()
+            assert window.backoff_timer.isActive()
+            
+            window.host_backoff_changed("busy.com", 0)
+            assert window.backoff_label.isHidden()
+            assert not window.backoff_timer.isActive()
+            
+    def test_auto_concurrency_status(self, qt_app):
+        """Test that the auto-chosen slot count is shown and the manual limit restored"""
+        with patch('src.main_window.DownloadManager') as mock_dm, \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow()
+            mock_dm_instance = mock_dm.return_value
+            
+            window.settings_widget.auto_concurrency_checkbox.setChecked(True)
+            mock_dm_instance.set_auto_concurrency.assert_called_with(True)
+            assert not window.settings_widget.max_concurrent_spinbox.isEnabled()
+            
+            window.update_concurrency_label(5, True)
+            assert not window.concurrency_label.isHidden()
+            assert window.concurrency_label.text() == "Concurrency: 5 (auto)"
+            
+            window.settings_widget.auto_concurrency_checkbox.setChecked(False)
+            mock_dm_instance.set_max_concurrent.assert_called_with(
+                window.settings_widget.max_concurrent_spinbox.value())
+            window.update_concurrency_label(3, False)
+            assert window.concurrency_label.isHidden()
+            
+    def test_disk_space_status(self, qt_app):
+        """Test that items held for disk space are counted in the status bar"""
+        with patch('src.main_window.DownloadManager'), \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow()
+            
+            window.update_disk_space_label(2)
+            assert not window.disk_space_label.isHidden()
+            assert window.disk_space_label.text() == "Waiting for disk space: 2"
+            
+            window.update_disk_space_label(0)
+            assert window.disk_space_label.isHidden()
+            
+    def test_pasted_urls_share_a_batch(self, qt_app):
+        """Test that URLs pasted together get one batch id"""
+        with patch('src.main_window.DownloadManager') as mock_dm, \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow()
+            mock_dm.return_value.find_duplicate.return_value = None
+            mock_dm.return_value.is_archived.return_value = False
+            window.url_input.setText("https://a.com/1\nhttps://b.com/2")
+            window.add_download()
+            window.url_input.setText("https://c.com/3")
+            window.add_download()
+            
+            batches = [item.batch_id for item in window.download_items]
+            assert batches[0] and batches[0] == batches[1]
+            assert batches[2] != batches[0]
+            
+    def test_duplicate_urls_are_skipped_and_reported(self, qt_app):
+        """Test that the same video under different URL forms is queued once"""
+        with patch('src.main_window.ThemeManager'), \
+             patch('src.download_manager.WorkerPool'):
+            
+            window = MainWindow()
+            window.url_input.setText("https://youtu.be/dQw4w9WgXcQ\n"
+                                     "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10\n"
+                                     "https://vimeo.com/123456")
+            window.add_download()
+            window.url_input.setText("https://m.youtube.com/watch?v=dQw4w9WgXcQ")
+            window.add_download()
+            
+            assert [item.url for item in window.download_items] == ["https://youtu.be/dQw4w9WgXcQ", "https://vimeo.com/123456"]
+            assert window.status_bar.currentMessage() == "Skipped 1 duplicate already in the queue"
+            
+    def test_archived_videos_are_skipped_and_reported(self, qt_app, tmp_path):
+        """Test that videos recorded in the download archive are not queued again"""
+        archive = DownloadArchive(str(tmp_path / 'archive.txt'))
+        archive.add("youtube dQw4w9WgXcQ")
+        with patch('src.main_window.ThemeManager'), \
+             patch('src.download_manager.WorkerPool'):
+            
+            window = MainWindow(download_archive=archive)
+            window.url_input.setText("https://www.youtube.com/watch?v=dQw4w9WgXcQ\n"
+                                     "https://youtu.be/ccccccccccc")
+            window.add_download()
+            
+            assert [item.url for item in window.download_items] == ["https://youtu.be/ccccccccccc"]
+            assert window.status_bar.currentMessage() == "Skipped 1 already downloaded"
+            
+    def test_playlist_entries_are_grouped_under_their_playlist(self, qt_app, tmp_path):
+        """Test that expanded entries get rows below their playlist and are journalled"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        with patch('src.main_window.DownloadManager'), \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow(store)
+            playlist = DownloadItem("https://example.com/playlist")
+            other = DownloadItem("https://example.com/other")
+            for item in (playlist, other):
+                window.download_items.append(item)
+                window.insert_row(item)
+            entries = []
+            for n in range(2):
+                entry = DownloadItem(f"https://example.com/entry{n}")
+                entry.parent_id = playlist.id
+                entry.title = f"Entry {n}"
+                entries.append(entry)
+                window.add_playlist_entry(entry, {'format': 'best'})
+            playlist.title = "My playlist"
+            window.playlist_expanded(playlist.id, 2)
+            
+            assert window.download_items == [playlist, entries[0], entries[1], other]
+            assert [window.queue_table.item(row, 0).text() for row in range(4)] == ["My playlist", "Entry 0", "Entry 1", "Fetching info..."]
+            assert window.queue_table.item(0, 2).text() == "Playlist: 2 videos"
+            assert store.count() == 2
+            
+    def test_sync_button_queues_sync_job(self, qt_app, tmp_path):
+        """Test that Sync starts a sync job and journals it with its sync settings"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        with patch('src.main_window.ThemeManager'), \
+             patch('src.download_manager.WorkerPool'):
+            
+            window = MainWindow(store)
+            window.url_input.setText("https://www.youtube.com/@channel/videos")
+            window.sync_button.click()
+            
+            [item] = window.download_items
+            assert item.url == "https://www.youtube.com/@channel/videos"
+            [(_, settings)] = store.load_page(0, 10)[0]
+            assert settings['sync'] is True and settings['download_playlist'] is True
+            assert window.download_manager.active_extractions[item.id].known_ids == set()
+            
+    def test_control_api_items_get_rows_and_journal(self, qt_app, tmp_path, process_events_until):
+        """Test that items queued through the control API are shown, journalled and listed with the window's"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        with patch('src.main_window.ThemeManager'), \
+             patch('src.download_manager.WorkerPool'):
+            
+            window = MainWindow(store)
+            window.import_urls(["https://example.com/pasted"])
+            window.start_control_server(0)
+            try:
+                assert window.control_server.port > 0
+                result = window.control_server.enqueue(["https://example.com/a", "https://example.com/b"], {}, 0)
+                assert process_events_until(lambda: len(window.download_items) == 3, timeout=1)
+                
+                assert [window.queue_table.item(row, 1).text() for row in range(3)] == [
+                    "https://example.com/pasted", "https://example.com/a", "https://example.com/b"]
+                assert store.count() == 3
+                assert window.control_server.list_items(set(), "", "", 0, 10)['total'] == 3
+                assert result['batch_id'] == window.download_items[1].batch_id
+                window.clear_all()
+                assert window.control_server.items == {}
+            finally:
+                window.control_server.stop()
+                
+    def test_bad_control_port_is_reported_not_raised(self, qt_app, tmp_path, capsys):
+        """Test that a malformed or busy --control-port leaves the window running without the API"""
+        import main
+        with patch('src.main_window.ThemeManager'), \
+             patch('src.download_manager.WorkerPool'), \
+             patch('PyQt6.QtWidgets.QMessageBox.warning') as warning:
+            
+            window = MainWindow(QueueStore(str(tmp_path / 'queue.db')))
+            busy = socket.socket()
+            busy.bind(('127.0.0.1', 0))
+            busy.listen()
+            try:
+                for argv in (['main.py', '--control-port', 'abc'], ['main.py', '--control-port', '70000'],
+                             ['main.py', '--control-port'],
+                             ['main.py', '--control-port', str(busy.getsockname()[1])]):
+                    main.start_control_server(window, argv)
+            finally:
+                busy.close()
+                
+            assert window.control_server is None
+            assert warning.call_count == 4
+            assert capsys.readouterr().err.count("Control API not started: ") == 4
+            
+    def test_import_file_queues_in_chunks(self, qt_app, tmp_path, process_events_until):
+        """Test that a URL file is queued a chunk per event loop pass, with progress shown meanwhile"""
+        path = tmp_path / 'list.txt'
+        path.write_text("# mirror list\n" + "".join(f"https://example.com/{i}\n" for i in range(1200)))
+        with patch('src.main_window.DownloadManager') as mock_dm, \
+             patch('src.main_window.ThemeManager'), \
+             patch.object(MainWindow, 'import_chunk_size', 500):
+            
+            mock_dm.return_value.find_duplicate.return_value = None
+            mock_dm.return_value.is_archived.return_value = False
+            window = MainWindow()
+            window.import_file(str(path))
+            
+            # The first chunk is there at once; the rest follow from the event loop
+            assert window.queue_table.rowCount() == 500
+            assert not window.import_progress.isHidden()
+            assert process_events_until(lambda: window.queue_table.rowCount() == 1200)
+            process_events_until(lambda: window.import_progress.isHidden(), timeout=1)
+            
+            assert window.import_progress.isHidden()
+            assert window.status_bar.currentMessage() == "Imported 1200 URLs from list.txt"
+            assert mock_dm.return_value.add_download.call_count == 1200
+            assert window.queue_store.count() == 1200
+            assert len({item.batch_id for item in window.download_items}) == 1
+            
+    def test_dropped_file_and_links_are_imported(self, qt_app, tmp_path):
+        """Test that dropping a list file imports it and dropped links are queued directly"""
+        path = tmp_path / 'list.csv'
+        path.write_text("title,url\nA,https://example.com/a\n")
+        with patch('src.main_window.DownloadManager') as mock_dm, \
+             patch('src.main_window.ThemeManager'):
+            
+            mock_dm.return_value.find_duplicate.return_value = None
+            mock_dm.return_value.is_archived.return_value = False
+            window = MainWindow()
+            mime_data = QMimeData()
+            mime_data.setUrls([QUrl.fromLocalFile(str(path)), QUrl("https://example.com/b")])
+            event = QDropEvent(QPointF(10, 10), Qt.DropAction.CopyAction, mime_data,
+                               Qt.MouseButton.LeftButton, Qt.KeyboardModifier.NoModifier)
+            window.dropEvent(event)
+            
+            assert [item.url for item in window.download_items] == ["https://example.com/a", "https://example.com/b"]
+            
+    def test_move_selected_to_top(self, qt_app):
+        """Test that move to top promotes selected items, top row last"""
+        with patch('src.main_window.DownloadManager') as mock_dm, \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow()
+            items = [DownloadItem(f"https://example.com/video{i}") for i in range(3)]
+            window.download_items.extend(items)
+            
+            window.move_selected_to_top({0, 2})
+            
+            calls = [call.args[0] for call in mock_dm.return_value.move_to_top.call_args_list]
+            assert calls == [items[2].id, items[0].id]
+            
+    def test_change_selected_priority(self, qt_app, tmp_path):
+        """Test that raising priority goes through the manager and is journalled"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        with patch('src.main_window.DownloadManager') as mock_dm, \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow(queue_store=store)
+            mock_dm.return_value.set_priority.side_effect = lambda item, priority: setattr(item, 'priority', priority)
+            item = DownloadItem("https://example.com/video")
+            window.download_items.append(item)
+            store.add(item, {})
+            
+            window.change_selected_priority({0}, 1)
+            
+            mock_dm.return_value.set_priority.assert_called_once_with(item, 1)
+            entries, _ = store.load_page()
+            assert entries[0][0].priority == 1
+            
+    def test_set_selected_bandwidth_share(self, qt_app, tmp_path):
+        """Test that an item's bandwidth share is set and journalled"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        with patch('src.main_window.DownloadManager'), \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow(queue_store=store)
+            item = DownloadItem("https://example.com/video")
+            window.download_items.append(item)
+            store.add(item, {})
+            
+            window.set_selected_bandwidth_share({0}, 2.0)
+            
+            assert item.bandwidth_weight == 2.0
+            entries, _ = store.load_page()
+            assert entries[0][0].bandwidth_weight == 2.0
+            
     def test_info_extracted(self, qt_app):
         """Test handling info extraction"""
         with patch('src.main_window.DownloadManager'), \
@@ -208,6 +561,29 @@ class TestMainWindow:
             status_item = window.queue_table.item(0, 2)
             assert status_item.text() == f"Error: {error_msg}"
             
+    def test_retry_uses_original_settings(self, qt_app, tmp_path):
+        """Test that Retry requeues failed and finished items with their journalled settings and leaves others alone"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        with patch('src.main_window.DownloadManager'), \
+             patch('src.main_window.ThemeManager'):
+            
+            window = MainWindow(store)
+            failed = DownloadItem("https://example.com/failed")
+            completed = DownloadItem("https://example.com/completed")
+            completed.status = DownloadStatus.COMPLETED
+            running = DownloadItem("https://example.com/running")
+            running.status = DownloadStatus.DOWNLOADING
+            window.download_items.extend([failed, completed, running])
+            for item in (failed, completed, running):
+                store.add(item, {'format': 'worst', 'url': item.url})
+            manager = window.download_manager
+            manager.retry_download.side_effect = lambda download_id: download_id == failed.id
+            
+            window.retry_selected_downloads([0, 1, 2])
+            
+            manager.requeue.assert_called_once_with(completed, {'format': 'worst', 'url': completed.url})
+            manager.add_download.assert_not_called()
+            
     def test_clear_completed(self, qt_app):
         """Test clearing completed downloads"""
         with patch('src.main_window.DownloadManager'), \
@@ -363,4 +739,36 @@ class TestMainWindow:
                 window.copy_selected_urls({0, 1})  # Copy both URLs
                 
             expected_text = "https://example.com/video1\nhttps://example.com/video2"
-            mock_clipboard.setText.assert_called_once_with(expected_text)
\ No newline at end of file
+            mock_clipboard.setText.assert_called_once_with(expected_text)
+
+
+@pytest.mark.slow
+class TestMainWindowBenchmark:
+    def test_importing_50k_urls_keeps_window_responsive(self, qt_app, tmp_path, process_events_until):
+        """Benchmark: time to interactive and longest event loop stall while importing 50k URLs"""
+        path = tmp_path / 'list.txt'
+        path.write_text("".join(f"https://www.youtube.com/watch?v={i:011d}\n" for i in range(50_000)))
+        with patch('src.main_window.ThemeManager'), \
+             patch('src.download_manager.WorkerPool'):
+            
+            window = MainWindow()
+            chunk_times = []
+            import_next_chunk = window.import_next_chunk
+            
+            def timed_chunk():
+                start = time.monotonic()
+                import_next_chunk()
+                chunk_times.append(time.monotonic() - start)
+                
+            window.import_next_chunk = timed_chunk
+            start = time.monotonic()
+            window.import_file(str(path))
+            interactive = time.monotonic() - start
+            assert process_events_until(lambda: not window.imports, timeout=300)
+            total = time.monotonic() - start
+            
+            print(f"\ninteractive after {interactive * 1000:.0f} ms, longest stall {max(chunk_times) * 1000:.0f} ms, "
+                  f"50k URLs queued in {total:.1f}s")
+            assert window.queue_table.rowCount() == 50_000
+            assert interactive < 0.5
+            assert max(chunk_times) < 0.5
@@ -0,0 +1,192 @@
+"""
+Tests for process_pool module
+"""
+
+import time
+import pytest
+import yt_dlp
+from PyQt6.QtCore import QTimer
+from src.process_pool import ProcessPool, pack_progress, unpack_progress, resident_memory
+from src.download_manager import DownloadManager, InfoWorker
+from src.download_archive import DownloadArchive
+from src.download_item import DownloadItem
+from src.sync_store import SyncStore, source_key
+from src.worker_pool import WorkerPool
+
+
+def use_counting_extractor(media_url):
+    """Worker process initializer: route yt-dlp through CountingIE, as the counting_extractor fixture does"""
+    from conftest import CountingIE, StandInYoutubeDL
+    CountingIE.media_url = media_url
+    yt_dlp.YoutubeDL = StandInYoutubeDL
+
+
+def process_manager(media_url) -> DownloadManager:
+    manager = DownloadManager(process_workers=True)
+    for pool in (manager.worker_pool, manager.info_pool):
+        pool.initializer = use_counting_extractor
+        pool.initargs = (media_url,)
+    return manager
+
+
+@pytest.mark.unit
+class TestProgressWire:
+    def test_progress_round_trip(self):
+        """Test that progress dicts survive the struct encoding, None values included"""
+        progress = {'status': 'downloading', 'downloaded_bytes': 1024, 'total_bytes': 4096,
+                    'speed': 512.5, 'eta': None, 'percent': 25.0}
+        
+        body = pack_progress(progress)
+        
+        assert len(body) == 41
+        assert unpack_progress(body) == progress
+        assert unpack_progress(pack_progress({**progress, 'speed': None, 'eta': 6}))['eta'] == 6
+    
+    def test_other_updates_are_not_packed(self):
+        """Test that status-only and unknown updates are left to the JSON path"""
+        assert pack_progress({'status': 'fetching_info'}) is None
+        assert pack_progress({'status': 'fetching_info', 'downloaded_bytes': 0, 'total_bytes': 0,
+                              'speed': 0, 'eta': None, 'percent': 0}) is None
+    
+    def test_resident_memory(self):
+        """Test that this process reports a plausible resident set size"""
+        assert resident_memory() > 1024 * 1024
+
+
+@pytest.mark.gui
+class TestProcessPool:
+    def test_download_runs_in_worker_process(self, qt_app, process_events_until, local_media_server, tmp_path):
+        """Test that a queued item is resolved and downloaded by child processes, archive included"""
+        manager = process_manager(f"{local_media_server}/media/4096")
+        archive = DownloadArchive(str(tmp_path / 'archive.txt'))
+        manager.set_download_archive(archive)
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        item = DownloadItem("https://counting.invalid/isolated")
+        completed = []
+        progress = []
+        manager.download_completed.connect(lambda download_id, path: completed.append(path))
+        manager.download_error.connect(lambda download_id, error: completed.append(error))
+        manager.download_progress.connect(lambda download_id, update: progress.append(update['status']))
+        
+        manager.add_download(item, settings)
+        
+        assert process_events_until(lambda: completed, timeout=60)
+        assert completed[0].endswith("Video isolated.mp4")
+        assert (tmp_path / "Video isolated.mp4").stat().st_size == 4096
+        assert item.title == "Video isolated"
+        assert 'downloading' in progress
+        # Recorded in the parent's archive through the child's calls
+        assert "counting isolated" in archive
+        assert manager.worker_pool.processes_started == 1
+        assert manager.info_pool.processes_started == 1
+        assert manager.cleanup()
+        archive.close()
+    
+    def test_processes_are_recycled(self, qt_app, process_events_until, local_media_server, tmp_path):
+        """Test that a child is replaced after max_jobs_per_process jobs and past max_rss"""
+        settings = {'output_dir': str(tmp_path), 'extract_audio': True}
+        for pool, jobs, processes in ((ProcessPool(1, max_jobs_per_process=2), 3, 2),
+                                      (ProcessPool(1, max_rss=1), 2, 2)):
+            pool.initializer = use_counting_extractor
+            pool.initargs = (f"{local_media_server}/media/4096",)
+            resolved = []
+            for n in range(jobs):
+                worker = InfoWorker(DownloadItem(f"https://counting.invalid/recycled{n}"), settings)
+                worker.info_resolved.connect(resolved.append)
+                pool.submit(worker)
+            
+            assert process_events_until(lambda: len(resolved) == jobs, timeout=60)
+            assert pool.processes_started == processes
+            assert pool.shutdown(10)
+    
+    def test_limit_and_cancel_reach_worker_process(self, qt_app, process_events_until, local_media_server, tmp_path):
+        """Test that the parent's bandwidth limit throttles a child and cancelling stops it"""
+        manager = process_manager(f"{local_media_server}/media/{8 * 1024 * 1024}")
+        manager.set_bandwidth_limit(256 * 1024)
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        item = DownloadItem("https://counting.invalid/throttled")
+        progress = []
+        errors = []
+        manager.download_progress.connect(lambda download_id, update: progress.append(update))
+        manager.download_error.connect(lambda download_id, error: errors.append(error))
+        
+        manager.add_download(item, settings)
+        
+        assert process_events_until(lambda: any(update.get('downloaded_bytes') for update in progress), timeout=60)
+        started = time.monotonic()
+        assert process_events_until(lambda: progress[-1].get('downloaded_bytes', 0) >= 512 * 1024, timeout=10)
+        # Throttled to 256 KiB/s: the next 512 KiB took most of two seconds
+        assert time.monotonic() - started > 1.0
+        
+        manager.cancel_download(item.id)
+        
+        assert process_events_until(lambda: not manager.active_downloads, timeout=10)
+        assert errors == []
+        assert list(tmp_path.glob('*.part')) == []
+        assert manager.cleanup()
+    
+    def test_sync_queues_failed_entries_again(self, qt_app, process_events_until, local_media_server, tmp_path):
+        """Test that a sync run in a worker process pages on to the entries whose downloads failed"""
+        manager = process_manager(f"{local_media_server}/media/4096")
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        manager.set_sync_store(store)
+        url = "https://counting.invalid/playlist/chan7"
+        store.record_sync(source_key(url), [f"chan{n}" for n in range(7)], pages=2, duration=0.1)
+        store.record_failure(source_key(url), "chan3")
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        added = []
+        synced = []
+        manager.playlist_entry_added.connect(lambda item, entry_settings: added.append(item.url))
+        manager.sync_finished.connect(lambda download_id, stats: synced.append(stats))
+        
+        manager.add_sync(DownloadItem(url), settings)
+        
+        assert process_events_until(lambda: synced, timeout=60)
+        assert added == ["https://counting.invalid/chan3"]
+        assert synced[0]['new_ids'] == ["chan3"]
+        assert manager.cleanup()
+        store.close()
+
+
+@pytest.mark.slow
+class TestProcessPoolBenchmark:
+    def test_event_loop_stays_smooth_during_extractions(self, qt_app, process_events_until, counting_extractor,
+                                                        local_media_server, tmp_path):
+        """Benchmark: longest event loop stall while 10 CPU-heavy extractions run, threads vs processes"""
+        settings = {'output_dir': str(tmp_path), 'extract_audio': True}
+        
+        def longest_stall(pool):
+            resolved = []
+            ticks = [time.monotonic()]
+            timer = QTimer()
+            timer.setInterval(10)
+            timer.timeout.connect(lambda: ticks.append(time.monotonic()))
+            timer.start()
+            start = time.monotonic()
+            for n in range(10):
+                worker = InfoWorker(DownloadItem(f"https://counting.invalid/heavy{n}"), settings)
+                worker.info_resolved.connect(resolved.append)
+                pool.submit(worker)
+            assert process_events_until(lambda: len(resolved) == 10, timeout=120)
+            elapsed = time.monotonic() - start
+            timer.stop()
+            assert pool.shutdown(10)
+            return max(b - a for a, b in zip(ticks, ticks[1:])), elapsed
+        
+        processes = ProcessPool(10, initializer=use_counting_extractor,
+                                initargs=(f"{local_media_server}/media/4096",))
+        # Start the children up front, as a running app will have them
+        warm = []
+        for n in range(10):
+            worker = InfoWorker(DownloadItem(f"https://counting.invalid/warm{n}"), settings)
+            worker.info_resolved.connect(warm.append)
+            processes.submit(worker)
+        assert process_events_until(lambda: len(warm) == 10, timeout=120)
+        
+        thread_stall, thread_time = longest_stall(WorkerPool(10))
+        process_stall, process_time = longest_stall(processes)
+        
+        print(f"\n10 heavy extractions: threads {thread_time:.2f}s, longest stall {thread_stall * 1000:.0f} ms; "
+              f"processes {process_time:.2f}s, longest stall {process_stall * 1000:.0f} ms")
+        assert process_stall < 0.1
+        assert process_stall < thread_stall
@@ -0,0 +1,112 @@
+"""
+Tests for queue_store module
+"""
+
+import time
+
+import pytest
+from src.download_item import DownloadItem, DownloadStatus
+from src.queue_store import QueueStore
+
+
+def load_all(store, page_size=1000):
+    entries = []
+    position = 0
+    while True:
+        page, position = store.load_page(position, page_size)
+        if not page:
+            return entries
+        entries.extend(page)
+
+
+@pytest.mark.unit
+class TestQueueStore:
+    def test_round_trip_keeps_items_and_settings(self, tmp_path):
+        """Test that items come back with their id, state and settings snapshot"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        item = DownloadItem("https://example.com/a", batch_id="b1", priority=2)
+        item.title = "A video"
+        store.add(item, {'format': 'best', 'output_dir': '/videos'})
+        item.set_error("HTTP Error 404: Not Found")
+        store.update(item)
+        store.close()
+        
+        # Reopened as after a restart
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        [(restored, settings)] = load_all(store)
+        assert restored.id == item.id
+        assert (restored.url, restored.batch_id, restored.priority, restored.title) == ("https://example.com/a", "b1", 2, "A video")
+        assert restored.status == DownloadStatus.ERROR
+        assert restored.error_message == "HTTP Error 404: Not Found"
+        assert settings == {'format': 'best', 'output_dir': '/videos'}
+        assert store.settings_for(item.id) == settings
+        assert store.settings_for("unknown") is None
+    
+    def test_pages_keep_queue_order(self, tmp_path):
+        """Test that paging returns every item once, in the order they were added"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        items = [DownloadItem(f"https://example.com/{i}") for i in range(25)]
+        store.add_many((item, {'format': 'best'}) for item in items)
+        store.remove(items[3].id)
+        
+        restored = load_all(store, page_size=10)
+        assert [item.id for item, _ in restored] == [item.id for item in items if item is not items[3]]
+        # Items queued with equal settings share one snapshot
+        assert len({id(settings) for _, settings in restored[:10]}) == 1
+        assert store.conn.execute("SELECT COUNT(*) FROM settings").fetchone()[0] == 1
+    
+    def test_clear(self, tmp_path):
+        """Test that clearing empties the journal"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        store.add(DownloadItem("https://example.com/a"), {})
+        store.clear()
+        assert store.count() == 0
+        assert load_all(store) == []
+    
+    def test_keeps_playlist_parent(self, tmp_path):
+        """Test that playlist entries keep their playlist across sessions"""
+        path = str(tmp_path / 'queue.db')
+        store = QueueStore(path)
+        single = DownloadItem("https://example.com/single")
+        entry = DownloadItem("https://example.com/entry")
+        entry.parent_id = "playlist-id"
+        store.add_many([(single, {}), (entry, {})])
+        store.close()
+        
+        restored = load_all(QueueStore(path))
+        assert [(item.id, item.parent_id) for item, _ in restored] == [(single.id, ""), (entry.id, "playlist-id")]
+        
+    def test_uses_write_ahead_log(self, tmp_path):
+        """Test that the journal runs in WAL mode"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.slow
+class TestQueueStoreBenchmark:
+    def test_restoring_100k_items_is_fast(self, tmp_path):
+        """Benchmark: the first page of a 100k queue is ready at once and the rest soon after"""
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        settings = {'format': 'best', 'output_dir': str(tmp_path)}
+        start = time.monotonic()
+        store.add_many((DownloadItem(f"https://example.com/watch?v={i}"), settings) for i in range(100_000))
+        written = time.monotonic() - start
+        store.close()
+        
+        store = QueueStore(str(tmp_path / 'queue.db'))
+        start = time.monotonic()
+        first_page, position = store.load_page(0, 100)
+        first_page_time = time.monotonic() - start
+        total = len(first_page)
+        while True:
+            page, position = store.load_page(position, 2000)
+            if not page:
+                break
+            total += len(page)
+        restore_time = time.monotonic() - start
+        
+        print(f"\nwrote 100k items in {written:.2f}s, first page in {first_page_time * 1000:.1f} ms, "
+              f"all pages in {restore_time:.2f}s")
+        assert total == 100_000
+        assert first_page_time < 0.1
+        assert restore_time < 10
@@ -0,0 +1,55 @@
+"""
+Tests for retry module
+"""
+
+import pytest
+from src.retry import ErrorKind, RetryPolicy, classify_error
+
+
+@pytest.mark.unit
+class TestClassifyError:
+    def test_network_errors(self):
+        """Test that connection problems and server errors count as network failures"""
+        assert classify_error("Download failed: <urlopen error [Errno -3] Temporary failure in name resolution>") == ErrorKind.NETWORK
+        assert classify_error("Download failed: ('Connection aborted.', RemoteDisconnected('Remote end closed connection'))") == ErrorKind.NETWORK
+        assert classify_error("Download failed: The read operation timed out") == ErrorKind.NETWORK
+        assert classify_error("Unable to download webpage: HTTP Error 503: Service Unavailable") == ErrorKind.NETWORK
+    
+    def test_rate_limits(self):
+        """Test that 429/403 match the host limiter's throttle detection"""
+        assert classify_error("HTTP Error 429: Too Many Requests") == ErrorKind.RATE_LIMITED
+        assert classify_error("unable to download video data: HTTP Error 403: Forbidden") == ErrorKind.RATE_LIMITED
+    
+    def test_unavailable(self):
+        """Test geo blocks, private and removed videos"""
+        assert classify_error("The uploader has not made this video available in your country") == ErrorKind.UNAVAILABLE
+        assert classify_error("This video is not available in your country") == ErrorKind.UNAVAILABLE
+        assert classify_error("Info extraction failed: Private video. Sign in if you've been granted access") == ErrorKind.UNAVAILABLE
+        assert classify_error("Unable to download webpage: HTTP Error 404: Not Found") == ErrorKind.UNAVAILABLE
+        assert classify_error("Sign in to confirm your age") == ErrorKind.UNAVAILABLE
+    
+    def test_extractor_errors(self):
+        """Test that site changes and yt-dlp bugs are told apart from the rest"""
+        assert classify_error("Unable to extract uploader id; please report this issue on https://github.com/yt-dlp/yt-dlp") == ErrorKind.EXTRACTOR
+        assert classify_error("Unsupported URL: https://example.com/") == ErrorKind.EXTRACTOR
+        assert classify_error("Something odd happened") == ErrorKind.UNKNOWN
+        assert classify_error("") == ErrorKind.UNKNOWN
+
+
+@pytest.mark.unit
+class TestRetryPolicy:
+    def test_only_network_failures_retry(self):
+        """Test that permanent failures never go back to the queue"""
+        policy = RetryPolicy(max_attempts=2)
+        assert policy.should_retry(ErrorKind.NETWORK, 0)
+        assert policy.should_retry(ErrorKind.NETWORK, 1)
+        assert not policy.should_retry(ErrorKind.NETWORK, 2)
+        for kind in (ErrorKind.UNAVAILABLE, ErrorKind.EXTRACTOR, ErrorKind.UNKNOWN, ErrorKind.RATE_LIMITED):
+            assert not policy.should_retry(kind, 0)
+    
+    def test_exponential_delay_with_jitter(self):
+        """Test that delays double per attempt, stay capped and jitter within the upper half"""
+        low = RetryPolicy(base_delay=10, max_delay=60, rng=lambda: 0.0)
+        high = RetryPolicy(base_delay=10, max_delay=60, rng=lambda: 1.0)
+        assert [low.delay(n) for n in (1, 2, 3, 4, 5)] == [5, 10, 20, 30, 30]
+        assert [high.delay(n) for n in (1, 2, 3, 4, 5)] == [10, 20, 40, 60, 60]
@@ -0,0 +1,200 @@
+"""
+Tests for scheduler module
+"""
+
+import queue
+import time
+import pytest
+from src.download_item import DownloadItem
+from src.scheduler import (
+    PriorityScheduler, FairShareScheduler, ShortestJobFirstScheduler, create_scheduler
+)
+
+
+def drain(scheduler):
+    order = []
+    while not scheduler.empty():
+        item, settings = scheduler.get_nowait()
+        order.append(item)
+    return order
+
+
+@pytest.mark.unit
+class TestPriorityScheduler:
+    def test_fifo_for_equal_priority(self):
+        """Test that equal priorities keep insertion order"""
+        scheduler = PriorityScheduler()
+        items = [DownloadItem(f"https://example.com/{i}") for i in range(5)]
+        for item in items:
+            scheduler.put((item, {}))
+            
+        assert drain(scheduler) == items
+        
+    def test_higher_priority_first(self):
+        """Test that higher priority items are dequeued first"""
+        scheduler = PriorityScheduler()
+        low = DownloadItem("https://example.com/low")
+        high = DownloadItem("https://example.com/high", priority=5)
+        scheduler.put((low, {}))
+        scheduler.put((high, {}))
+        
+        assert drain(scheduler) == [high, low]
+        
+    def test_move_to_top(self):
+        """Test that a promoted item jumps ahead of everything"""
+        scheduler = PriorityScheduler()
+        items = [DownloadItem(f"https://example.com/{i}") for i in range(4)]
+        urgent = DownloadItem("https://example.com/urgent", priority=10)
+        for item in items + [urgent]:
+            scheduler.put((item, {}))
+            
+        assert scheduler.move_to_top(items[3].id)
+        assert scheduler.move_to_top(items[2].id)
+        assert scheduler.qsize() == 5
+        
+        # Most recently promoted first, then normal priority order
+        assert drain(scheduler) == [items[2], items[3], urgent, items[0], items[1]]
+        
+    def test_remove_and_empty(self):
+        """Test removal and the queue.Queue compatible surface"""
+        scheduler = PriorityScheduler()
+        item = DownloadItem("https://example.com/video")
+        scheduler.put((item, {'format': 'best'}))
+        
+        assert item.id in scheduler
+        assert scheduler.remove(item.id) == (item, {'format': 'best'})
+        assert scheduler.remove(item.id) is None
+        assert scheduler.empty()
+        with pytest.raises(queue.Empty):
+            scheduler.get_nowait()
+            
+    def test_entries_in_dequeue_order(self):
+        """Test listing queued entries without dequeuing them"""
+        scheduler = PriorityScheduler()
+        first = DownloadItem("https://example.com/1")
+        second = DownloadItem("https://example.com/2", priority=1)
+        scheduler.put((first, {}))
+        scheduler.put((second, {}))
+        
+        assert [item for item, settings in scheduler.entries()] == [second, first]
+        assert scheduler.qsize() == 2
+
+
+@pytest.mark.unit
+class TestFairShareScheduler:
+    def test_round_robin_between_batches(self):
+        """Test that a large batch does not starve a later small one"""
+        scheduler = FairShareScheduler()
+        playlist = [DownloadItem(f"https://example.com/p{i}", batch_id="playlist") for i in range(6)]
+        for item in playlist:
+            scheduler.put((item, {}))
+            
+        # Two items of the playlist have started before the single URL arrives
+        started = [scheduler.get_nowait()[0], scheduler.get_nowait()[0]]
+        single = DownloadItem("https://example.com/single", batch_id="single")
+        scheduler.put((single, {}))
+        
+        order = started + drain(scheduler)
+        assert order.index(single) <= 3
+        assert [item for item in order if item is not single] == playlist
+        
+    def test_interleaves_batches(self):
+        """Test that batches queued together alternate"""
+        scheduler = FairShareScheduler()
+        a = [DownloadItem(f"https://a.com/{i}", batch_id="a") for i in range(3)]
+        b = [DownloadItem(f"https://b.com/{i}", batch_id="b") for i in range(3)]
+        for item in a + b:
+            scheduler.put((item, {}))
+            
+        assert drain(scheduler) == [a[0], b[0], a[1], b[1], a[2], b[2]]
+        
+    def test_reprioritize_keeps_round(self):
+        """Test that re-keying an item neither delays it nor its batch"""
+        scheduler = FairShareScheduler()
+        a = [DownloadItem(f"https://a.com/{i}", batch_id="a") for i in range(3)]
+        b = [DownloadItem(f"https://b.com/{i}", batch_id="b") for i in range(3)]
+        for item in a + b:
+            scheduler.put((item, {}))
+            
+        for _ in range(3):
+            assert scheduler.reprioritize(a[0].id)
+        
+        assert drain(scheduler) == [a[0], b[0], a[1], b[1], a[2], b[2]]
+        
+    def test_promoted_item_counts_once(self):
+        """Test that a promoted item leaves its batch's count only when dequeued"""
+        scheduler = FairShareScheduler()
+        a = [DownloadItem(f"https://a.com/{i}", batch_id="a") for i in range(2)]
+        for item in a:
+            scheduler.put((item, {}))
+            
+        assert scheduler.move_to_top(a[1].id)
+        assert drain(scheduler) == [a[1], a[0]]
+        assert scheduler._batch_sizes == {} and scheduler._rounds == {}
+
+
+@pytest.mark.unit
+class TestShortestJobFirstScheduler:
+    def test_smallest_first_unknown_last(self):
+        """Test ordering by estimated size with unknown sizes last"""
+        scheduler = ShortestJobFirstScheduler()
+        unknown = DownloadItem("https://example.com/unknown")
+        big = DownloadItem("https://example.com/big")
+        big.estimated_size = 500_000_000
+        small = DownloadItem("https://example.com/small")
+        small.estimated_size = 5_000_000
+        for item in (unknown, big, small):
+            scheduler.put((item, {}))
+            
+        assert drain(scheduler) == [small, big, unknown]
+        
+    def test_reprioritize_when_size_known(self):
+        """Test that an item moves once its size is extracted"""
+        scheduler = ShortestJobFirstScheduler()
+        first = DownloadItem("https://example.com/first")
+        first.estimated_size = 10_000
+        later = DownloadItem("https://example.com/later")
+        scheduler.put((first, {}))
+        scheduler.put((later, {}))
+        
+        later.estimated_size = 1_000
+        assert scheduler.reprioritize(later.id)
+        
+        assert drain(scheduler) == [later, first]
+
+
+@pytest.mark.unit
+class TestSchedulerFactory:
+    def test_create_scheduler(self):
+        """Test policy names and fallback"""
+        assert isinstance(create_scheduler("priority"), PriorityScheduler)
+        assert isinstance(create_scheduler("fair_share"), FairShareScheduler)
+        assert isinstance(create_scheduler("shortest_first"), ShortestJobFirstScheduler)
+        assert isinstance(create_scheduler("unknown"), PriorityScheduler)
+
+
+@pytest.mark.slow
+class TestSchedulerScaling:
+    @pytest.mark.parametrize("policy", ["priority", "fair_share", "shortest_first"])
+    def test_large_queue(self, policy):
+        """Benchmark: 100k items stay fast to enqueue, promote and dequeue"""
+        scheduler = create_scheduler(policy)
+        items = [DownloadItem(f"https://example.com/{i}", batch_id=str(i % 50), priority=i % 3)
+                 for i in range(100_000)]
+        for i, item in enumerate(items):
+            item.estimated_size = (i * 7919) % 100_000
+            
+        start = time.perf_counter()
+        for item in items:
+            scheduler.put((item, {}))
+        for item in items[::1000]:
+            scheduler.move_to_top(item.id)
+        dequeued = 0
+        while not scheduler.empty():
+            scheduler.get_nowait()
+            dequeued += 1
+        elapsed = time.perf_counter() - start
+        
+        print(f"\n{policy}: 100k put/get in {elapsed:.2f}s")
+        assert dequeued == 100_000
+        assert elapsed < 10
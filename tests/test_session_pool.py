@@ -0,0 +1,159 @@
+"""
+Tests for session_pool module
+"""
+
+import threading
+import time
+import pytest
+import yt_dlp
+from unittest.mock import Mock, patch
+from src.session_pool import SessionPool, can_share, session_key
+from src.worker_pool import WorkerPool, youtube_dl_session
+from src.download_manager import DownloadManager, DownloadWorker
+from src.download_item import DownloadItem
+
+
+class SessionJob:
+    """Job that records the cookie jar and request director of its thread's YoutubeDL"""
+    
+    def __init__(self, params, barrier):
+        self.params = params
+        self.barrier = barrier
+        self.seen = None
+        self.done = threading.Event()
+    
+    def run(self):
+        with youtube_dl_session(self.params) as ydl:
+            self.seen = (threading.current_thread(), ydl.cookiejar, ydl._request_director)
+        # Hold the thread so the other job needs one of its own
+        self.barrier.wait(5)
+        self.done.set()
+
+
+@pytest.mark.unit
+class TestSessionPool:
+    def test_network_options_pick_the_session(self):
+        """Test that instances differing only in output options share a session and a proxy gets its own"""
+        sessions = SessionPool()
+        first = yt_dlp.YoutubeDL({'quiet': True, 'outtmpl': '/a/%(title)s.%(ext)s'})
+        second = yt_dlp.YoutubeDL({'quiet': True, 'outtmpl': '/b/%(title)s.%(ext)s', 'format': 'worst'})
+        proxied = yt_dlp.YoutubeDL({'quiet': True, 'proxy': 'http://127.0.0.1:3128'})
+        
+        for ydl in (first, second, proxied):
+            sessions.attach(ydl)
+        
+        assert session_key(first.params) == session_key(second.params)
+        assert first.cookiejar is second.cookiejar
+        assert first._request_director is second._request_director
+        assert proxied._request_director is not first._request_director
+        assert len(sessions) == 2
+        
+        director = first._request_director
+        with patch.object(director, 'close') as close:
+            sessions.detach(first)
+            first.close()
+            close.assert_not_called()
+            sessions.close()
+            close.assert_called_once()
+        assert len(sessions) == 0
+        second.close()
+        proxied.close()
+    
+    def test_older_yt_dlp_keeps_sessions_per_instance(self):
+        """Test that without lazily built sessions attach() and detach() leave the instance alone"""
+        
+        class EagerYoutubeDL(yt_dlp.YoutubeDL):
+            # As in releases that build these in __init__
+            cookiejar = None
+            _request_director = None
+            
+        assert can_share(yt_dlp.YoutubeDL)
+        assert not can_share(EagerYoutubeDL)
+        sessions = SessionPool()
+        ydl = EagerYoutubeDL({'quiet': True}, auto_init=False)
+        
+        sessions.attach(ydl)
+        ydl.__dict__['_request_director'] = own = Mock()
+        sessions.detach(ydl)
+        
+        assert len(sessions) == 0
+        assert ydl.__dict__['_request_director'] is own
+        
+    def test_pool_threads_share_one_session(self):
+        """Test that jobs on different pool threads, with different output options, use one cookie jar and director"""
+        sessions = SessionPool()
+        pool = WorkerPool(2, name="test", sessions=sessions)
+        barrier = threading.Barrier(2)
+        jobs = [SessionJob({'quiet': True, 'outtmpl': f'/batch{n}/%(title)s.%(ext)s'}, barrier) for n in range(2)]
+        
+        for job in jobs:
+            pool.submit(job)
+        for job in jobs:
+            assert job.done.wait(5)
+        
+        (first_thread, first_jar, first_director), (second_thread, second_jar, second_director) = [job.seen for job in jobs]
+        assert first_thread is not second_thread
+        assert first_jar is second_jar
+        assert first_director is second_director
+        assert pool.shutdown(5)
+        sessions.close()
+    
+    def test_manager_pools_share_sessions(self):
+        """Test that the info and download pools of a manager use the same SessionPool"""
+        manager = DownloadManager()
+        
+        assert manager.worker_pool.sessions is manager.sessions
+        assert manager.info_pool.sessions is manager.sessions
+        assert manager.cleanup()
+
+
+@pytest.mark.slow
+class TestSessionPoolBenchmark:
+    def test_connections_per_100_items(self, counting_extractor, keepalive_media_server, process_events_until,
+                                       tmp_path):
+        """Benchmark: TCP connections opened for 100 small downloads spread over 8 output folders"""
+        from conftest import CountingIE
+        
+        base_url, handler = keepalive_media_server
+        CountingIE.media_url = f"{base_url}/media/4096"
+        
+        def run_items(mode):
+            handler.connections = 0
+            items = [DownloadItem(f"https://counting.invalid/{mode}{n}") for n in range(100)]
+            workers = [DownloadWorker(item, {'output_dir': str(tmp_path / mode / f'batch{n % 8}'),
+                                             'format': 'best', 'extract_audio': True})
+                       for n, item in enumerate(items)]
+            completed = []
+            finished = []
+            for worker in workers:
+                worker.download_completed.connect(lambda download_id, path: completed.append(path))
+                worker.finished.connect(finished.append)
+            start = time.monotonic()
+            if mode == 'fresh':
+                # Outside a pool thread every job builds and closes its own YoutubeDL
+                for worker in workers:
+                    worker.run()
+            else:
+                sessions = SessionPool() if mode == 'shared' else None
+                pool = WorkerPool(4, name=mode, sessions=sessions)
+                for worker in workers:
+                    pool.submit(worker)
+                assert process_events_until(lambda: len(finished) == 100, timeout=120)
+                assert pool.shutdown(10)
+                if sessions is not None:
+                    sessions.close()
+            elapsed = time.monotonic() - start
+            assert len(completed) == 100
+            return handler.connections, elapsed
+        
+        fresh, fresh_time = run_items('fresh')
+        per_thread, per_thread_time = run_items('thread')
+        shared, shared_time = run_items('shared')
+        
+        print(f"\nConnections per 100 items: fresh YoutubeDL per item {fresh} ({fresh_time:.2f}s), "
+              f"per-thread instances {per_thread} ({per_thread_time:.2f}s), "
+              f"shared sessions {shared} ({shared_time:.2f}s)")
+        assert fresh >= 100
+        # At most one connection per pool thread, however many option sets the items use
+        assert shared <= 4
+        assert shared < per_thread
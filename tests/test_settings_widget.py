@@ -10,6 +10,7 @@ from PyQt6.QtCore import QSettings
 
 from src.settings_widget import SettingsWidget
 
+
 @pytest.mark.gui
 class TestSettingsWidget:
     def test_init(self, qt_app):
@@ -272,4 +273,99 @@ class TestSettingsWidget:
         # Check spinbox range
         assert widget.max_concurrent_spinbox.minimum() == 1
         assert widget.max_concurrent_spinbox.maximum() == 10
-        assert widget.max_concurrent_spinbox.value() == 3  # Default value
\ No newline at end of file
+        assert widget.max_concurrent_spinbox.value() == 3  # Default value
+        
+    def test_max_concurrent_changed_signal(self, qt_app):
+        """Test that changing the spinbox emits max_concurrent_changed"""
+        widget = SettingsWidget()
+        received = []
+        widget.max_concurrent_changed.connect(received.append)
+        
+        widget.max_concurrent_spinbox.setValue(7)
+        
+        assert received == [7]
+        
+    def test_max_per_host_setting(self, qt_app):
+        """Test the per-site download limit setting and its signal"""
+        widget = SettingsWidget()
+        received = []
+        widget.max_per_host_changed.connect(received.append)
+        
+        widget.max_per_host_spinbox.setValue(2)
+        
+        assert received == [2]
+        assert widget.get_settings()['max_per_host'] == 2
+        
+    def test_bandwidth_limit_setting(self, qt_app):
+        """Test the bandwidth limit setting emits bytes per second"""
+        widget = SettingsWidget()
+        received = []
+        widget.bandwidth_limit_changed.connect(received.append)
+        
+        assert widget.bandwidth_limit_spinbox.text() == "Unlimited"
+        widget.bandwidth_limit_spinbox.setValue(512)
+        
+        assert received == [512 * 1024]
+        assert widget.get_settings()['bandwidth_limit'] == 512 * 1024
+        
+    def test_auto_concurrency_bounds_stay_ordered(self, qt_app):
+        """Test that the auto-tune bounds emit (min, max) and never cross"""
+        widget = SettingsWidget()
+        received = []
+        widget.auto_concurrency_bounds_changed.connect(lambda low, high: received.append((low, high)))
+        
+        widget.auto_max_spinbox.setValue(6)
+        widget.auto_min_spinbox.setValue(8)
+        
+        assert widget.auto_max_spinbox.value() == 8
+        assert received[0] == (1, 6)
+        assert received[-1] == (8, 8)
+        assert widget.get_settings()['auto_concurrency_min'] == 8
+        
+    def test_concurrent_fragments_setting(self, qt_app):
+        """Test the fragments-per-download setting defaults to auto"""
+        widget = SettingsWidget()
+        
+        assert widget.concurrent_fragments_spinbox.text() == "Auto"
+        assert widget.get_settings()['concurrent_fragments'] == 0
+        widget.concurrent_fragments_spinbox.setValue(8)
+        assert widget.get_settings()['concurrent_fragments'] == 8
+        
+    def test_scheduling_policy_setting(self, qt_app):
+        """Test the queue order setting and its signal"""
+        widget = SettingsWidget()
+        received = []
+        widget.scheduling_policy_changed.connect(received.append)
+        
+        widget.queue_order_combo.setCurrentText("Fair share between batches")
+        
+        assert received == ["fair_share"]
+        assert widget.get_settings()['scheduling_policy'] == "fair_share"
+        
+    def test_process_workers_setting(self, qt_app):
+        """Test that the worker process option is off by default and saved for the next start"""
+        widget = SettingsWidget()
+        with patch.object(widget, 'settings') as mock_settings:
+            mock_settings.value.side_effect = lambda key, default, type_=None: default
+            widget.load_settings()
+            
+        assert widget.get_settings()['process_workers'] is False
+        widget.process_workers_checkbox.setChecked(True)
+        
+        with patch.object(widget, 'settings') as mock_settings:
+            widget.save_settings()
+            mock_settings.setValue.assert_any_call('process_workers', True)
+            
+    def test_use_info_cache_setting(self, qt_app):
+        """Test that reusing cached info is on by default and can be turned off"""
+        widget = SettingsWidget()
+        with patch.object(widget, 'settings') as mock_settings:
+            mock_settings.value.side_effect = lambda key, default, type_=None: default
+            widget.load_settings()
+            
+        assert widget.get_settings()['use_info_cache'] is True
+        widget.use_info_cache_checkbox.setChecked(False)
+        
+        with patch.object(widget, 'settings') as mock_settings:
+            widget.save_settings()
+            mock_settings.setValue.assert_any_call('use_info_cache', False)
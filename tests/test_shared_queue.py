@@ -0,0 +1,228 @@
+"""
+Tests for shared_queue module
+"""
+
+import multiprocessing
+import sys
+import pytest
+from unittest.mock import patch
+from src.download_item import DownloadItem
+from src.download_manager import DownloadManager
+from src.shared_queue import SharedQueue, SharedQueueNode
+
+SETTINGS = {'output_dir': '/downloads', 'format': 'best'}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self):
+        return self.now
+
+
+def run_node(media_url, argv):
+    """Body of one simulated node process: the headless runner draining the shared backlog"""
+    import yt_dlp
+    from conftest import CountingIE, StandInYoutubeDL
+    from src import headless
+    CountingIE.media_url = media_url
+    yt_dlp.YoutubeDL = StandInYoutubeDL
+    sys.exit(headless.main(argv))
+
+
+@pytest.mark.unit
+class TestSharedQueue:
+    @pytest.fixture
+    def nodes(self, tmp_path):
+        clock = FakeClock()
+        path = str(tmp_path / 'backlog.db')
+        first = SharedQueue(path, node_id='first', lease_seconds=60, clock=clock)
+        second = SharedQueue(path, node_id='second', lease_seconds=60, clock=clock)
+        yield first, second, clock
+        first.close()
+        second.close()
+    
+    def test_claims_are_disjoint(self, nodes):
+        """Test that two nodes never claim the same item and URLs are only added once"""
+        first, second, _ = nodes
+        assert first.add([f"https://example.com/{n}" for n in range(5)], SETTINGS) == 5
+        assert second.add(["https://example.com/4", "https://example.com/5"], SETTINGS) == 1
+        
+        claimed_first = first.claim(4)
+        claimed_second = second.claim(4)
+        
+        assert [url for _, url, _ in claimed_first] == [f"https://example.com/{n}" for n in range(4)]
+        assert [url for _, url, _ in claimed_second] == ["https://example.com/4", "https://example.com/5"]
+        assert claimed_first[0][2] == SETTINGS
+        assert first.claim(4) == []
+        assert first.counts() == {'pending': 0, 'claimed': 6, 'done': 0, 'failed': 0}
+    
+    def test_url_forms_of_one_video_are_one_item(self, nodes):
+        """Test that the backlog dedups by video, not by URL text, and keeps the URL first given"""
+        first, second, _ = nodes
+        assert first.add(["https://youtu.be/aaaaaaaaaaa", "https://youtu.be/bbbbbbbbbbb"], SETTINGS) == 2
+        assert second.add(["https://www.youtube.com/watch?v=aaaaaaaaaaa&t=1",
+                           "https://m.youtube.com/watch?v=bbbbbbbbbbb",
+                           "https://youtu.be/ccccccccccc"], SETTINGS) == 1
+        assert second.adopt([("entry", "https://www.youtube.com/watch?v=ccccccccccc")], SETTINGS) == set()
+        
+        assert [url for _, url, _ in first.claim(5)] == ["https://youtu.be/aaaaaaaaaaa", "https://youtu.be/bbbbbbbbbbb",
+                                                         "https://youtu.be/ccccccccccc"]
+    
+    def test_expired_lease_is_reclaimed(self, nodes):
+        """Test that an item whose node stopped renewing goes to another node, which alone can complete it"""
+        first, second, clock = nodes
+        first.add(["https://example.com/a", "https://example.com/b"], SETTINGS)
+        (lost_id, _, _), (kept_id, _, _) = first.claim(2)
+        
+        clock.now += 40
+        assert first.renew([kept_id]) == set()
+        clock.now += 40
+        
+        reclaimed = second.claim(5)
+        
+        assert [item_id for item_id, _, _ in reclaimed] == [lost_id]
+        assert first.renew([lost_id, kept_id]) == {lost_id}
+        assert first.complete(lost_id) is False
+        assert second.complete(lost_id) is True
+        assert first.complete(kept_id) is True
+        assert first.is_drained()
+    
+    def test_repeatedly_expiring_item_fails(self, tmp_path):
+        """Test that an item is marked failed once it has lost max_attempts leases"""
+        clock = FakeClock()
+        queue = SharedQueue(str(tmp_path / 'backlog.db'), lease_seconds=10, max_attempts=2, clock=clock)
+        queue.add(["https://example.com/crasher"], SETTINGS)
+        
+        for _ in range(2):
+            assert len(queue.claim(1)) == 1
+            clock.now += 11
+        
+        assert queue.claim(1) == []
+        assert queue.counts()['failed'] == 1
+        assert queue.is_drained()
+        queue.close()
+    
+    def test_release_returns_items_without_counting_the_claim(self, nodes):
+        """Test that released items are pending again and failures are final"""
+        first, second, _ = nodes
+        first.add(["https://example.com/a", "https://example.com/b"], SETTINGS)
+        (released_id, _, _), (failed_id, _, _) = first.claim(2)
+        
+        first.release([released_id])
+        assert first.fail(failed_id, "Video unavailable") is True
+        
+        assert [item_id for item_id, _, _ in second.claim(5)] == [released_id]
+        assert first.conn.execute("SELECT attempts FROM items WHERE id = ?", (released_id,)).fetchone()[0] == 1
+        assert second.counts() == {'pending': 0, 'claimed': 1, 'done': 0, 'failed': 1}
+
+
+@pytest.mark.gui
+class TestSharedQueueNode:
+    def test_node_feeds_manager_and_records_results(self, qt_app, tmp_path):
+        """Test that a node claims work for the manager's slots and records completions and failures"""
+        queue = SharedQueue(str(tmp_path / 'backlog.db'), node_id='node')
+        queue.add([f"https://example.com/{n}" for n in range(10)], SETTINGS)
+        with patch('src.download_manager.WorkerPool'):
+            manager = DownloadManager()
+        node = SharedQueueNode(manager, queue, {'output_dir': '/local'})
+        claimed = []
+        node.item_claimed.connect(lambda item, settings: claimed.append((item, settings)))
+        
+        node.start()
+        node.poll_timer.stop()
+        
+        assert len(claimed) == 2 * manager.max_concurrent_downloads
+        first, settings = claimed[0]
+        assert settings == {'output_dir': '/local', 'format': 'best'}
+        assert manager.find_duplicate(first.url)
+        
+        manager.download_completed.emit(first.id, "/local/0.mp4")
+        manager.download_error.emit(claimed[1][0].id, "Video unavailable")
+        
+        assert len(claimed) == 8
+        assert queue.counts() == {'pending': 2, 'claimed': 6, 'done': 1, 'failed': 1}
+        
+        node.stop()
+        assert queue.counts()['pending'] == 8
+        manager.cleanup()
+        queue.close()
+    
+    def test_playlist_entries_outlive_a_crashed_node(self, qt_app, tmp_path):
+        """Test that expanded entries go into the queue, so another node claims the unfinished ones"""
+        clock = FakeClock()
+        path = str(tmp_path / 'backlog.db')
+        queue = SharedQueue(path, node_id='node', lease_seconds=30, clock=clock)
+        settings = dict(SETTINGS, download_playlist=True)
+        queue.add(["https://example.com/playlist"], settings)
+        with patch('src.download_manager.WorkerPool'):
+            manager = DownloadManager()
+        node = SharedQueueNode(manager, queue, {'output_dir': '/local'})
+        node.start()
+        node.poll_timer.stop()
+        [playlist_id] = node.held
+        queue.add(["https://example.com/e1"], settings)
+        
+        entries = []
+        for n in range(3):
+            item = DownloadItem(f"https://example.com/e{n}")
+            item.parent_id = playlist_id
+            entries.append(item)
+            manager.playlist_entry_added.emit(item, dict(settings, output_dir='/local'))
+        # Kept from claiming e1 itself
+        with patch.object(node, 'fill'):
+            manager.playlist_expanded.emit(playlist_id, 3)
+            manager.download_completed.emit(entries[0].id, "/local/e0.mp4")
+        
+        # e1 was already in the backlog; it stays there for whoever claims it
+        assert node.held == {entries[2].id}
+        assert queue.counts() == {'pending': 1, 'claimed': 1, 'done': 2, 'failed': 0}
+        
+        # The node dies holding e2; another node takes it, and e1, once its lease runs out
+        clock.now += 60
+        other = SharedQueue(path, node_id='other', clock=clock)
+        claimed = {url: settings for _, url, settings in other.claim(5)}
+        assert claimed == {"https://example.com/e1": settings, "https://example.com/e2": settings}
+        manager.cleanup()
+        other.close()
+        queue.close()
+
+
+@pytest.mark.gui
+class TestSharedQueueNodes:
+    def test_nodes_drain_one_backlog_without_duplicates(self, local_media_server, tmp_path):
+        """Test that three node processes download every item exactly once, including an abandoned lease"""
+        path = str(tmp_path / 'backlog.db')
+        urls = [f"https://counting.invalid/shared{n}" for n in range(30)]
+        queue = SharedQueue(path, node_id='crashed', lease_seconds=1)
+        config = tmp_path / 'settings.json'
+        config.write_text('{"extract_audio": true, "format": "best", "max_concurrent": 2}')
+        settings = {'extract_audio': True, 'format': 'best'}
+        queue.add(urls[:1], settings)
+        # A node that claimed an item and died; its lease has run out by the time the others start
+        assert len(queue.claim(1)) == 1
+        queue.add(urls[1:], settings)
+        queue.close()
+        
+        context = multiprocessing.get_context('spawn')
+        nodes = []
+        for n in range(3):
+            argv = ['--shared-queue', path, '-c', str(config), '-o', str(tmp_path / f'node{n}'),
+                    '--archive', str(tmp_path / f'archive{n}.txt'), '--interval', '60']
+            nodes.append(context.Process(target=run_node, args=(f"{local_media_server}/media/4096", argv)))
+        for node in nodes:
+            node.start()
+        for node in nodes:
+            node.join(120)
+        
+        assert [node.exitcode for node in nodes] == [0, 0, 0]
+        archived = []
+        for n in range(3):
+            archive = tmp_path / f'archive{n}.txt'
+            archived += archive.read_text().split('\n')[:-1] if archive.exists() else []
+        # Every video was downloaded by exactly one node
+        assert sorted(archived) == sorted(f"counting shared{n}" for n in range(30))
+        queue = SharedQueue(path)
+        assert queue.counts() == {'pending': 0, 'claimed': 0, 'done': 30, 'failed': 0}
+        queue.close()
@@ -0,0 +1,75 @@
+"""
+Tests for sync_store module
+"""
+
+import pytest
+from src.sync_store import SyncStore, source_key
+
+
+@pytest.mark.unit
+class TestSyncStore:
+    def test_seen_ids_are_kept_per_source(self, tmp_path):
+        """Test that recorded entries come back for their own source only, after reopening"""
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        store.record_sync("https://example.com/a", ["1", "2"], pages=1, duration=0.5)
+        store.record_sync("https://example.com/b", ["3"], pages=1, duration=0.2)
+        store.record_sync("https://example.com/a", ["4"], pages=1, duration=0.1)
+        store.close()
+        
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        assert store.seen_ids("https://example.com/a") == {"1", "2", "4"}
+        assert store.seen_ids("https://example.com/b") == {"3"}
+        assert store.seen_ids("https://example.com/c") == set()
+        
+    def test_last_sync_statistics(self, tmp_path):
+        """Test that each source keeps the pages, new entries and time of its last sync"""
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        assert store.last_sync("https://example.com/a") is None
+        
+        store.record_sync("https://example.com/a", ["1", "2", "3"], pages=4, duration=2.5)
+        store.record_sync("https://example.com/a", [], pages=1, duration=0.3)
+        
+        last = store.last_sync("https://example.com/a")
+        assert (last['pages'], last['new_entries'], last['duration']) == (1, 0, 0.3)
+        assert last['synced_at'] > 0
+    
+    def test_failed_entries_are_retried_by_the_next_sync(self, tmp_path):
+        """Test that a failed entry is no longer seen but a retry id until a sync records it again"""
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        store.record_sync("src", ["1", "2", "3"], pages=1, duration=0.1)
+        store.record_failure("src", "2")
+        
+        assert store.seen_ids("src") == {"1", "3"}
+        assert store.retry_ids("src") == {"2"}
+        store.record_sync("src", ["2"], pages=2, duration=0.1)
+        assert store.seen_ids("src") == {"1", "2", "3"}
+        assert store.retry_ids("src") == set()
+        
+    def test_unlisted_retry_ids_are_dropped(self, tmp_path):
+        """Test that a retry id a finished sync did not list no longer makes syncs page on"""
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        store.record_sync("src", ["1", "2", "3"], pages=1, duration=0.1)
+        store.record_failure("src", "2")
+        
+        # "2" was deleted from the source: the sync listed everything without finding it
+        store.record_sync("src", [], pages=5, duration=0.1)
+        assert store.retry_ids("src") == set()
+        assert store.seen_ids("src") == {"1", "3"}
+        
+    def test_entries_failing_every_retry_are_given_up(self, tmp_path):
+        """Test that an entry stops being retried once max_retry_syncs syncs have queued it again"""
+        store = SyncStore(str(tmp_path / 'sync.db'))
+        store.record_sync("src", ["1", "2"], pages=1, duration=0.1)
+        store.record_failure("src", "2")
+        for _ in range(store.max_retry_syncs):
+            assert store.retry_ids("src") == {"2"}
+            store.record_sync("src", ["2"], pages=1, duration=0.1)
+            store.record_failure("src", "2")
+            
+        assert store.retry_ids("src") == set()
+        assert store.seen_ids("src") == {"1", "2"}
+        
+    def test_source_key_ignores_url_form(self):
+        """Test that every URL of one playlist gives the same source"""
+        assert len({source_key("https://www.youtube.com/playlist?list=PLabcdefghijk"),
+                    source_key("https://m.youtube.com/playlist?list=PLabcdefghijk&si=share")}) == 1
@@ -0,0 +1,48 @@
+"""
+Tests for url_import module
+"""
+
+import pytest
+from src.url_import import UrlFileReader, UrlImport, parse_batch_lines, parse_csv_lines
+
+
+@pytest.mark.unit
+class TestUrlImport:
+    def test_batch_lines_skip_comments_and_blanks(self):
+        """Test that yt-dlp batch file comments and blank lines are not taken for URLs"""
+        lines = ["# channel mirror\n", "https://youtu.be/a\n", "\n", "; old\n", "] note\n", "  https://youtu.be/b  \n"]
+        assert list(parse_batch_lines(lines)) == ["https://youtu.be/a", "https://youtu.be/b"]
+        
+    def test_csv_rows_give_their_url_cell(self):
+        """Test that each CSV row yields the first cell holding a URL, wherever it is"""
+        lines = ["title,url\n", "First,https://youtu.be/a\n", "\"Second, with comma\",https://youtu.be/b\n", "no url,here\n"]
+        assert list(parse_csv_lines(lines)) == ["https://youtu.be/a", "https://youtu.be/b"]
+        
+    def test_file_reader_streams_and_reports_progress(self, tmp_path):
+        """Test that a file is read line by line, with its progress, and a BOM is dropped"""
+        path = tmp_path / 'list.txt'
+        path.write_bytes("﻿https://youtu.be/a\nhttps://youtu.be/b\n".encode('utf-8'))
+        reader = UrlFileReader(str(path))
+        urls = iter(reader)
+        
+        assert reader.fraction_read == 0
+        assert next(urls) == "https://youtu.be/a"
+        assert 0 < reader.fraction_read < 1
+        assert list(urls) == ["https://youtu.be/b"]
+        assert reader.fraction_read == 1
+        
+    def test_file_reader_picks_csv_by_extension(self, tmp_path):
+        """Test that .csv files are parsed as CSV"""
+        path = tmp_path / 'list.csv'
+        path.write_text("id,link\n1,https://youtu.be/a\n")
+        assert list(UrlFileReader(str(path))) == ["https://youtu.be/a"]
+        
+    def test_import_takes_chunks_until_done(self):
+        """Test that an import hands out URLs in chunks and notices when they run out"""
+        url_import = UrlImport((f"https://youtu.be/{i}" for i in range(5)), {})
+        
+        assert len(url_import.take(3)) == 3
+        assert not url_import.done
+        assert len(url_import.take(3)) == 2
+        assert url_import.done
+        assert url_import.fraction_done is None
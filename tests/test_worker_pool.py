@@ -0,0 +1,257 @@
+"""
+Tests for worker_pool module
+"""
+
+import os
+import threading
+import time
+import pytest
+from unittest.mock import Mock, patch
+from PyQt6.QtCore import QEventLoop, QTimer
+from src.worker_pool import WorkerPool, PoolThread, options_key, youtube_dl_session
+from src.download_manager import DownloadManager
+from src.download_item import DownloadItem
+
+
+class RecordingJob:
+    """Job that records which thread ran it"""
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.thread = None
+        self.done = threading.Event()
+        
+    def run(self):
+        self.thread = threading.current_thread()
+        time.sleep(self.delay)
+        self.done.set()
+
+
+def os_thread_count() -> int:
+    try:
+        return len(os.listdir('/proc/self/task'))
+    except OSError:
+        return threading.active_count()
+
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@pytest.mark.unit
+class TestWorkerPool:
+    def test_threads_are_reused(self):
+        """Test that many jobs run on at most max_workers threads"""
+        pool = WorkerPool(2, name="test")
+        jobs = [RecordingJob() for _ in range(50)]
+        
+        for job in jobs:
+            pool.submit(job)
+        for job in jobs:
+            assert job.done.wait(5)
+            
+        assert pool.thread_count <= 2
+        assert len({job.thread for job in jobs}) <= 2
+        assert all(isinstance(job.thread, PoolThread) for job in jobs)
+        assert pool.shutdown(timeout=5)
+        
+    def test_resize_grows_and_shrinks(self):
+        """Test growing starts threads for pending jobs and shrinking retires idle ones"""
+        pool = WorkerPool(1, name="test")
+        jobs = [RecordingJob(delay=0.2) for _ in range(3)]
+        for job in jobs:
+            pool.submit(job)
+            
+        pool.resize(3)
+        for job in jobs:
+            assert job.done.wait(5)
+        assert len({job.thread for job in jobs}) == 3
+        
+        pool.resize(1)
+        deadline = time.monotonic() + 5
+        while pool.thread_count > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.thread_count == 1
+        assert pool.shutdown(timeout=5)
+        
+    def test_shrink_does_not_interrupt_running_job(self):
+        """Test that a running job completes after the pool is shrunk"""
+        pool = WorkerPool(2, name="test")
+        slow = RecordingJob(delay=0.3)
+        pool.submit(slow)
+        pool.submit(RecordingJob(delay=0.3))
+        time.sleep(0.05)
+        
+        pool.resize(1)
+        
+        assert slow.done.wait(5)
+        assert pool.shutdown(timeout=5)
+        
+    def test_shutdown_deadline(self):
+        """Test that shutdown returns by its deadline even if a job is stuck"""
+        pool = WorkerPool(1, name="test")
+        release = threading.Event()
+        stuck = Mock(run=lambda: release.wait(5))
+        pool.submit(stuck)
+        time.sleep(0.05)
+        
+        start = time.monotonic()
+        assert pool.shutdown(timeout=0.1) is False
+        assert time.monotonic() - start < 1
+        
+        release.set()
+        with pytest.raises(RuntimeError):
+            pool.submit(RecordingJob())
+            
+    def test_failing_job_keeps_thread_alive(self, caplog):
+        """Test that an exception in a job does not kill its thread and is reported"""
+        pool = WorkerPool(1, name="test")
+        failing = Mock(run=Mock(side_effect=ValueError("boom")))
+        # No download_error signal to report on, so it is logged
+        bare = Mock(spec=['run'], run=Mock(side_effect=ValueError("bare")))
+        after = RecordingJob()
+        
+        pool.submit(failing)
+        pool.submit(bare)
+        pool.submit(after)
+        
+        assert after.done.wait(5)
+        assert pool.thread_count == 1
+        failing.download_error.emit.assert_called_once_with(failing.download_item.id, "Unexpected error: boom")
+        assert "Unhandled error in pool job" in caplog.text
+        assert pool.shutdown(timeout=5)
+
+
+@pytest.mark.unit
+class TestYoutubeDLReuse:
+    def test_options_key_ignores_hooks(self):
+        """Test that progress hooks do not affect the options key"""
+        assert options_key({'format': 'best', 'progress_hooks': [Mock()]}) == \
+            options_key({'progress_hooks': [Mock()], 'format': 'best'})
+        assert options_key({'format': 'best'}) != options_key({'format': 'worst'})
+        
+    def test_per_job_params_are_applied_to_reused_instance(self):
+        """Test that tuned values like fragment workers don't force a new YoutubeDL"""
+        thread = PoolThread(WorkerPool(1), "test")
+        with patch('src.worker_pool.yt_dlp.YoutubeDL') as mock_ydl_class:
+            mock_ydl_class.return_value.params = {}
+            first = thread.youtube_dl({'format': 'best', 'concurrent_fragment_downloads': 2})
+            second = thread.youtube_dl({'format': 'best', 'concurrent_fragment_downloads': 8})
+            
+        assert first is second
+        assert mock_ydl_class.call_count == 1
+        assert second.params['concurrent_fragment_downloads'] == 8
+        
+    def test_pool_thread_reuses_instance(self):
+        """Test that a pool thread reuses its YoutubeDL across jobs and routes hooks per job"""
+        pool = WorkerPool(1, name="test")
+        seen = []
+        
+        class SessionJob:
+            def __init__(self, params):
+                self.params = params
+                self.done = threading.Event()
+                
+            def run(self):
+                with youtube_dl_session(self.params) as ydl:
+                    seen.append(ydl)
+                    for hook in ydl.params['progress_hooks']:
+                        hook({'status': 'downloading'})
+                self.done.set()
+                
+        first_hook, second_hook = Mock(), Mock()
+        jobs = [
+            SessionJob({'quiet': True, 'progress_hooks': [first_hook]}),
+            SessionJob({'quiet': True, 'progress_hooks': [second_hook]}),
+        ]
+        with patch('yt_dlp.YoutubeDL') as mock_ydl_class:
+            for job in jobs:
+                pool.submit(job)
+            for job in jobs:
+                assert job.done.wait(5)
+                
+        mock_ydl_class.assert_called_once()
+        assert seen[0] is seen[1]
+        first_hook.assert_not_called()
+        second_hook.assert_not_called()
+        assert pool.shutdown(timeout=5)
+        
+    def test_pool_thread_dispatches_hooks_to_current_job(self):
+        """Test that the shared instance's hook forwards to the running job's hooks"""
+        pool = WorkerPool(1, name="test")
+        thread = PoolThread(pool, "test-direct")
+        first_hook, second_hook = Mock(), Mock()
+        
+        with patch('yt_dlp.YoutubeDL') as mock_ydl_class:
+            thread.youtube_dl({'progress_hooks': [first_hook]})
+            dispatch = mock_ydl_class.call_args[0][0]['progress_hooks'][0]
+            thread.youtube_dl({'progress_hooks': [second_hook]})
+            dispatch({'status': 'downloading'})
+            
+        first_hook.assert_not_called()
+        second_hook.assert_called_once_with({'status': 'downloading'})
+
+
+@pytest.mark.slow
+class TestWorkerPoolBenchmark:
+    def test_long_queue_keeps_threads_and_rss_flat(self, counting_extractor, process_events_until, tmp_path):
+        """Benchmark: thread count and RSS stay flat over a long synthetic queue"""
+        from conftest import StandInYoutubeDL
+        
+        warmup_items = 100
+        total_items = 400
+        manager = DownloadManager()
+        manager.set_max_concurrent(4)
+        settings = {'output_dir': str(tmp_path), 'format': 'best', 'extract_audio': True}
+        finished = []
+        manager.download_completed.connect(lambda download_id, path: finished.append(download_id))
+        manager.download_error.connect(lambda download_id, error: finished.append(download_id))
+        
+        def settle():
+            # Workers released on pool threads are deleted once control returns to an event loop
+            loop = QEventLoop()
+            QTimer.singleShot(0, loop.quit)
+            loop.exec()
+            
+        # Measured from after a warm-up, so caches and pool threads filled once are not counted
+        for i in range(warmup_items):
+            manager.add_download(DownloadItem(f"https://counting.invalid/warm{i}"), settings)
+        assert process_events_until(lambda: len(finished) >= warmup_items, timeout=60)
+        settle()
+        warm_rss = rss_bytes()
+        finished.clear()
+        samples = []
+        start = time.monotonic()
+        
+        for i in range(total_items):
+            manager.add_download(DownloadItem(f"https://counting.invalid/v{i}"), settings)
+            
+        for checkpoint in range(50, total_items + 1, 50):
+            assert process_events_until(lambda: len(finished) >= checkpoint, timeout=60)
+            settle()
+            samples.append((checkpoint, manager.worker_pool.thread_count, manager.info_pool.thread_count,
+                            rss_bytes()))
+            
+        elapsed = time.monotonic() - start
+        assert process_events_until(lambda: not manager.active_downloads)
+        
+        print(f"\n{total_items} items in {elapsed:.2f}s ({total_items / elapsed:.0f} items/s), "
+              f"{os_thread_count()} threads in the process")
+        for done, download_threads, info_threads, rss in samples:
+            print(f"  after {done:4d}: pool threads={download_threads}+{info_threads} rss={rss / 1024 / 1024:.1f} MB")
+            
+        # Pool threads never exceed the limits
+        info_limit = manager.max_concurrent_extractions
+        assert max(sample[1] for sample in samples) <= 4
+        assert max(sample[2] for sample in samples) <= info_limit
+        # One YoutubeDL per pool thread instead of one per item
+        assert StandInYoutubeDL.instances <= 4 + info_limit
+        assert samples[-1][3] - warm_rss < 32 * 1024 * 1024
+        assert sum(counting_extractor.values()) == warmup_items + total_items
+        
+        manager.cleanup()